@@ -6,7 +6,9 @@ from unittest.mock import Mock, PropertyMock, call, patch
 import pytest
 
 from upsies import errors
-from upsies.jobs.torrent import CreateTorrentJob, _torrent_process
+from upsies.jobs.torrent import (CreateTorrentJob, VerifyTorrentJob,
+                                 _torrent_process, _verify_process)
+from upsies.utils import types
 from upsies.utils.daemon import MsgType
 
 
@@ -36,11 +38,11 @@ def queues():
     queues.input.cancel_join_thread()
 
 
-@patch('upsies.utils.torrent.create')
+@patch('upsies.utils.torrent.create_many')
 def test_torrent_process_creates_torrent(create_mock, queues):
-    create_mock.return_value = 'path/to/foo.mkv.torrent'
+    create_mock.return_value = ('path/to/foo.mkv.foo.torrent', 'path/to/foo.mkv.bar.torrent')
     _torrent_process(queues.output, queues.input, some='argument', another='one')
-    assert queues.output.get() == (MsgType.result, 'path/to/foo.mkv.torrent')
+    assert queues.output.get() == (MsgType.result, ('path/to/foo.mkv.foo.torrent', 'path/to/foo.mkv.bar.torrent'))
     assert queues.output.empty()
     assert queues.input.empty()
     assert create_mock.call_args_list == [call(
@@ -50,7 +52,7 @@ def test_torrent_process_creates_torrent(create_mock, queues):
         another='one',
     )]
 
-@patch('upsies.utils.torrent.create')
+@patch('upsies.utils.torrent.create_many')
 def test_torrent_process_catches_TorrentError(create_mock, queues):
     create_mock.side_effect = errors.TorrentError('Argh')
     _torrent_process(queues.output, queues.input, some='argument')
@@ -62,7 +64,7 @@ def test_torrent_process_initializes_with_file_tree(mocker, queues):
     def create_mock(init_callback, **kwargs):
         init_callback('this is not a file tree')
 
-    mocker.patch('upsies.utils.torrent.create', create_mock)
+    mocker.patch('upsies.utils.torrent.create_many', create_mock)
     _torrent_process(queues.output, queues.input, some='argument')
     assert queues.output.get() == (MsgType.init, 'this is not a file tree')
 
@@ -71,7 +73,7 @@ def test_torrent_process_sends_progress(mocker, queues):
         for progress in (10, 50, 100):
             progress_callback(progress)
 
-    mocker.patch('upsies.utils.torrent.create', create_mock)
+    mocker.patch('upsies.utils.torrent.create_many', create_mock)
     _torrent_process(queues.output, queues.input, some='argument')
     assert queues.output.get() == (MsgType.info, 10)
     assert queues.output.get() == (MsgType.info, 50)
@@ -88,7 +90,7 @@ def test_torrent_process_cancels_when_terminator_is_in_input_queue(mocker, queue
             time.sleep(0.1)
         return 'mocked result'
 
-    mocker.patch('upsies.utils.torrent.create', create_mock)
+    mocker.patch('upsies.utils.torrent.create_many', create_mock)
     _torrent_process(queues.output, queues.input, some='argument')
     info = []
     while not queues.output.empty():
@@ -137,6 +139,34 @@ def test_CreateTorrentJob_initialize(tracker, tmp_path):
     assert job._torrent_process is None
 
 
+@pytest.mark.parametrize(
+    argnames='kwargs, exp_workers, exp_read_size, exp_io_strategy, exp_page_cache',
+    argvalues=(
+        ({}, 'default workers', 'default read_size', 'default io_strategy', 'default page_cache'),
+        ({'workers': 3, 'read_size': 1024, 'io_strategy': 'parallel', 'page_cache': 'drop'},
+         3, 1024, 'parallel', 'drop'),
+    ),
+)
+def test_CreateTorrentJob_initialize_hashing_options(kwargs, exp_workers, exp_read_size, exp_io_strategy,
+                                                     exp_page_cache, tracker, tmp_path, mocker):
+    mocker.patch('upsies.jobs.torrent.default_workers', 'default workers')
+    mocker.patch('upsies.jobs.torrent.default_read_size', 'default read_size')
+    mocker.patch('upsies.jobs.torrent.default_io_strategy', 'default io_strategy')
+    mocker.patch('upsies.jobs.torrent.default_page_cache', 'default page_cache')
+    job = CreateTorrentJob(
+        home_directory=tmp_path,
+        cache_directory=tmp_path,
+        ignore_cache=False,
+        content_path='path/to/foo',
+        tracker=tracker,
+        **kwargs,
+    )
+    assert job._workers == exp_workers
+    assert job._read_size == exp_read_size
+    assert job._io_strategy == exp_io_strategy
+    assert job._page_cache == exp_page_cache
+
+
 @pytest.fixture
 def job(tmp_path, tracker):
     return CreateTorrentJob(
@@ -147,6 +177,88 @@ def job(tmp_path, tracker):
         tracker=tracker,
     )
 
+@pytest.fixture
+def multi_job(tmp_path, tracker):
+    other_tracker = Mock()
+    other_tracker.configure_mock(
+        name='Foo',
+        options={
+            'source'   : 'FOO',
+            'exclude'  : (),
+            'private'  : False,
+            'piece_size_min' : types.Bytes('32 KiB'),
+        },
+        login=AsyncMock(),
+        get_announce_url=AsyncMock(),
+        logout=AsyncMock(),
+    )
+    return CreateTorrentJob(
+        home_directory=tmp_path,
+        cache_directory=tmp_path,
+        ignore_cache=False,
+        content_path='path/to/foo',
+        tracker=tracker,
+        additional_trackers=(other_tracker,),
+    )
+
+def test_CreateTorrentJob_initialize_with_additional_trackers(multi_job, tmp_path):
+    assert len(multi_job._trackers) == 2
+    assert multi_job._trackers[0] is multi_job._tracker
+    assert multi_job._trackers[1].name == 'Foo'
+    assert multi_job._torrent_paths == (
+        str(tmp_path / 'foo.asdf.torrent'),
+        str(tmp_path / 'foo.foo.torrent'),
+    )
+    assert multi_job._torrent_path == multi_job._torrent_paths[0]
+
+@pytest.mark.parametrize(
+    argnames='existing_files, exp_torrent_created',
+    argvalues=(
+        ((), True),
+        (('foo.asdf.torrent',), True),
+        (('foo.foo.torrent',), True),
+        (('foo.asdf.torrent', 'foo.foo.torrent'), False),
+    ),
+)
+@pytest.mark.asyncio
+async def test_CreateTorrentJob_execute_with_additional_trackers(existing_files, exp_torrent_created,
+                                                                 multi_job, mocker, tmp_path):
+    mocker.patch.object(multi_job, '_get_announce_urls', AsyncMock())
+    mocker.patch.object(multi_job, '_handle_torrent_created', Mock())
+    mocker.patch.object(multi_job, '_create_torrent_process', Mock())
+    for filename in existing_files:
+        (tmp_path / filename).write_bytes(b'mock torrent data')
+
+    multi_job.execute()
+    if hasattr(multi_job, '_get_announce_url_task'):
+        await multi_job._get_announce_url_task
+
+    if exp_torrent_created:
+        assert multi_job._create_torrent_process.call_args_list == [call(multi_job._get_announce_urls.return_value)]
+        assert multi_job._handle_torrent_created.call_args_list == []
+    else:
+        assert multi_job._create_torrent_process.call_args_list == []
+        assert multi_job._handle_torrent_created.call_args_list == [call(multi_job._torrent_paths)]
+        assert multi_job.is_finished
+
+@pytest.mark.asyncio
+async def test_CreateTorrentJob_get_announce_urls(multi_job, mocker):
+    mocker.patch.object(multi_job, '_get_announce_url', AsyncMock(side_effect=('http://a', 'http://b')))
+    announce_urls = await multi_job._get_announce_urls()
+    assert announce_urls == ('http://a', 'http://b')
+    assert multi_job._get_announce_url.call_args_list == [
+        call(multi_job._trackers[0]),
+        call(multi_job._trackers[1]),
+    ]
+
+@pytest.mark.asyncio
+async def test_CreateTorrentJob_get_announce_urls_stops_at_first_failure(multi_job, mocker):
+    mocker.patch.object(multi_job, '_get_announce_url', AsyncMock(side_effect=(None, 'http://b')))
+    announce_urls = await multi_job._get_announce_urls()
+    assert announce_urls is None
+    assert multi_job._get_announce_url.call_args_list == [call(multi_job._trackers[0])]
+
+
 @pytest.mark.parametrize(
     argnames='ignore_cache, path_exists, exp_torrent_created',
     argvalues=(
@@ -158,7 +270,7 @@ def job(tmp_path, tracker):
 )
 @pytest.mark.asyncio
 async def test_CreateTorrentJob_execute(ignore_cache, path_exists, exp_torrent_created, job, mocker, tmp_path):
-    mocker.patch.object(job, '_get_announce_url', AsyncMock())
+    mocker.patch.object(job, '_get_announce_urls', AsyncMock())
     mocker.patch.object(job, '_handle_torrent_created', Mock())
     mocker.patch.object(job, '_create_torrent_process', Mock())
     mocker.patch.object(type(job), 'ignore_cache', PropertyMock(return_value=ignore_cache))
@@ -171,13 +283,13 @@ async def test_CreateTorrentJob_execute(ignore_cache, path_exists, exp_torrent_c
         await job._get_announce_url_task
 
     if exp_torrent_created:
-        assert job._get_announce_url.call_args_list == [call()]
+        assert job._get_announce_urls.call_args_list == [call()]
         assert job._handle_torrent_created.call_args_list == []
-        assert job._create_torrent_process.call_args_list == [call(job._get_announce_url.return_value)]
+        assert job._create_torrent_process.call_args_list == [call(job._get_announce_urls.return_value)]
         assert not job.is_finished
     else:
-        assert job._get_announce_url.call_args_list == []
-        assert job._handle_torrent_created.call_args_list == [call(job._torrent_path)]
+        assert job._get_announce_urls.call_args_list == []
+        assert job._handle_torrent_created.call_args_list == [call((job._torrent_path,))]
         assert job._create_torrent_process.call_args_list == []
         assert job.is_finished
 
@@ -194,7 +306,7 @@ async def test_CreateTorrentJob_get_announce_url(job, mocker):
     job.signal.register('announce_url', mocks.announce_url_callback)
 
     assert job.info == ''
-    announce_url = await job._get_announce_url()
+    announce_url = await job._get_announce_url(job._tracker)
     assert announce_url == mocks.get_announce_url.return_value
     assert mocks.mock_calls == [
         call.announce_url_callback(Ellipsis),
@@ -218,7 +330,7 @@ async def test_CreateTorrentJob_get_announce_url_catches_RequestError_from_login
     job.signal.register('announce_url', mocks.announce_url_callback)
 
     assert job.info == ''
-    announce_url = await job._get_announce_url()
+    announce_url = await job._get_announce_url(job._tracker)
     assert announce_url is None
     assert mocks.mock_calls == [
         call.announce_url_callback(Ellipsis),
@@ -241,7 +353,7 @@ async def test_CreateTorrentJob_get_announce_url_catches_RequestError_from_get_a
     job.signal.register('announce_url', mocks.announce_url_callback)
 
     assert job.info == ''
-    announce_url = await job._get_announce_url()
+    announce_url = await job._get_announce_url(job._tracker)
     assert announce_url is None
     assert mocks.mock_calls == [
         call.announce_url_callback(Ellipsis),
@@ -266,7 +378,7 @@ async def test_CreateTorrentJob_get_announce_url_catches_RequestError_from_logou
     job.signal.register('announce_url', mocks.announce_url_callback)
 
     assert job.info == ''
-    announce_url = await job._get_announce_url()
+    announce_url = await job._get_announce_url(job._tracker)
     assert announce_url == mocks.get_announce_url.return_value
     assert mocks.mock_calls == [
         call.announce_url_callback(Ellipsis),
@@ -281,24 +393,35 @@ async def test_CreateTorrentJob_get_announce_url_catches_RequestError_from_logou
 
 
 def test_CreateTorrentJob_create_torrent_process(job, mocker):
+    mocker.patch('upsies.jobs.torrent.store_directory', 'path/to/store')
     DaemonProcess_mock = mocker.patch('upsies.utils.daemon.DaemonProcess', Mock(
         return_value=Mock(join=AsyncMock()),
     ))
     announce_url = 'http:/foo/announce'
-    job._create_torrent_process(announce_url)
+    job._create_torrent_process((announce_url,))
     assert DaemonProcess_mock.call_args_list == [call(
         name=job.name,
         target=_torrent_process,
         kwargs={
             'content_path' : 'path/to/foo',
-            'torrent_path' : os.path.join(
-                job.home_directory,
-                f'foo.{job._tracker.options["source"].lower()}.torrent',
-            ),
+            'targets'      : ({
+                'torrent_path' : os.path.join(
+                    job.home_directory,
+                    f'foo.{job._tracker.options["source"].lower()}.torrent',
+                ),
+                'announce'     : announce_url,
+                'source'       : job._tracker.options['source'],
+                'private'      : True,
+                'piece_size_min' : None,
+                'piece_size_max' : None,
+            },),
             'overwrite'    : False,
-            'announce'     : announce_url,
-            'source'       : job._tracker.options['source'],
             'exclude'      : job._tracker.options['exclude'],
+            'store_directory' : 'path/to/store',
+            'workers'      : None,
+            'read_size'    : None,
+            'io_strategy'  : 'sequential',
+            'page_cache'   : 'keep',
         },
         init_callback=job._handle_file_tree,
         info_callback=job._handle_progress_update,
@@ -308,6 +431,38 @@ def test_CreateTorrentJob_create_torrent_process(job, mocker):
     )]
     assert job._torrent_process.start.call_args_list == [call()]
 
+def test_CreateTorrentJob_create_torrent_process_with_additional_trackers(multi_job, mocker):
+    DaemonProcess_mock = mocker.patch('upsies.utils.daemon.DaemonProcess', Mock(
+        return_value=Mock(join=AsyncMock()),
+    ))
+    multi_job._create_torrent_process(('http://asdf/announce', 'http://foo/announce'))
+    assert DaemonProcess_mock.call_args_list[0][1]['kwargs']['targets'] == (
+        {
+            'torrent_path' : os.path.join(multi_job.home_directory, 'foo.asdf.torrent'),
+            'announce'     : 'http://asdf/announce',
+            'source'       : 'AsdF',
+            'private'      : True,
+            'piece_size_min' : None,
+            'piece_size_max' : None,
+        },
+        {
+            'torrent_path' : os.path.join(multi_job.home_directory, 'foo.foo.torrent'),
+            'announce'     : 'http://foo/announce',
+            'source'       : 'FOO',
+            'private'      : False,
+            'piece_size_min' : 32768,
+            'piece_size_max' : None,
+        },
+    )
+    assert DaemonProcess_mock.call_args_list[0][1]['kwargs']['exclude'] == ('a', 'b')
+    assert multi_job._torrent_process.start.call_args_list == [call()]
+
+def test_CreateTorrentJob_create_torrent_process_without_announce_urls(job, mocker):
+    DaemonProcess_mock = mocker.patch('upsies.utils.daemon.DaemonProcess')
+    job._create_torrent_process(None)
+    assert DaemonProcess_mock.call_args_list == []
+    assert job._torrent_process is None
+
 
 @pytest.mark.parametrize('torrent_process', (None, Mock()))
 def test_CreateTorrentJob_finish(torrent_process, job):
@@ -341,16 +496,17 @@ def test_handle_progress_update(job):
 
 
 @pytest.mark.parametrize(
-    argnames='torrent_path, exp_output',
+    argnames='torrent_paths, exp_output',
     argvalues=(
         (None, ()),
-        ('', ()),
-        ('foo/bar.torrent', ('foo/bar.torrent',),),
+        ((), ()),
+        (('foo/bar.torrent',), ('foo/bar.torrent',),),
+        (('foo/bar.torrent', 'foo/baz.torrent'), ('foo/bar.torrent', 'foo/baz.torrent'),),
     ),
 )
-def test_handle_torrent_created(torrent_path, exp_output, job):
+def test_handle_torrent_created(torrent_paths, exp_output, job):
     assert job.output == ()
-    job._handle_torrent_created(torrent_path)
+    job._handle_torrent_created(torrent_paths)
     assert job.output == exp_output
 
 
@@ -361,3 +517,121 @@ def test_handle_error(job, mocker):
     assert job.error.call_args_list == [call('message')]
     job._handle_error(errors.RequestError('message'))
     assert job.exception.call_args_list == [call(errors.RequestError('message'))]
+
+
+@patch('upsies.utils.torrent.verify')
+def test_verify_process_sends_mismatching_files(verify_mock, queues):
+    verify_mock.return_value = ('path/to/foo',)
+    _verify_process(queues.output, queues.input, some='argument')
+    assert queues.output.get() == (MsgType.result, ('path/to/foo',))
+    assert verify_mock.call_args_list == [call(
+        progress_callback=Callable(),
+        some='argument',
+    )]
+
+@patch('upsies.utils.torrent.verify')
+def test_verify_process_catches_TorrentError(verify_mock, queues):
+    verify_mock.side_effect = errors.TorrentError('Argh')
+    _verify_process(queues.output, queues.input, some='argument')
+    assert queues.output.get() == (MsgType.error, 'Argh')
+
+def test_verify_process_sends_progress(mocker, queues):
+    def verify_mock(progress_callback, **kwargs):
+        for progress in (10, 100):
+            progress_callback(progress)
+
+    mocker.patch('upsies.utils.torrent.verify', verify_mock)
+    _verify_process(queues.output, queues.input, some='argument')
+    assert queues.output.get() == (MsgType.info, 10)
+    assert queues.output.get() == (MsgType.info, 100)
+
+
+@pytest.fixture
+def verify_job(tmp_path):
+    return VerifyTorrentJob(
+        home_directory=tmp_path,
+        cache_directory=tmp_path,
+        ignore_cache=False,
+        torrent_path='path/to/foo.torrent',
+        content_path='path/to/foo',
+        sample=20,
+    )
+
+def test_VerifyTorrentJob_cache_id(verify_job):
+    assert verify_job.cache_id is None
+
+def test_VerifyTorrentJob_execute(verify_job, mocker):
+    mocker.patch('upsies.jobs.torrent.default_workers', 3)
+    mocker.patch('upsies.jobs.torrent.default_read_size', None)
+    mocker.patch('upsies.jobs.torrent.default_io_strategy', 'parallel')
+    mocker.patch('upsies.jobs.torrent.default_page_cache', 'direct')
+    DaemonProcess_mock = mocker.patch('upsies.utils.daemon.DaemonProcess')
+    verify_job = VerifyTorrentJob(
+        home_directory=verify_job.home_directory,
+        cache_directory=verify_job.cache_directory,
+        ignore_cache=False,
+        torrent_path='path/to/foo.torrent',
+        content_path='path/to/foo',
+        sample=20,
+    )
+    verify_job.execute()
+    assert DaemonProcess_mock.call_args_list == [call(
+        name=verify_job.name,
+        target=_verify_process,
+        kwargs={
+            'torrent_path' : 'path/to/foo.torrent',
+            'content_path' : 'path/to/foo',
+            'sample'       : 20.0,
+            'workers'      : 3,
+            'read_size'    : None,
+            'io_strategy'  : 'parallel',
+            'page_cache'   : 'direct',
+        },
+        info_callback=verify_job._handle_progress_update,
+        error_callback=verify_job._handle_error,
+        result_callback=verify_job._handle_verified,
+        finished_callback=verify_job.finish,
+    )]
+    assert DaemonProcess_mock.return_value.start.call_args_list == [call()]
+
+@pytest.mark.parametrize('verify_process', (None, Mock()))
+def test_VerifyTorrentJob_finish(verify_process, verify_job):
+    verify_job._verify_process = verify_process
+    verify_job.finish()
+    assert verify_job.is_finished
+    if verify_process:
+        assert verify_process.stop.call_args_list == [call()]
+
+def test_VerifyTorrentJob_handle_progress_update(verify_job):
+    cb = Mock()
+    verify_job.signal.register('progress_update', cb)
+    verify_job._handle_progress_update(10)
+    assert cb.call_args_list == [call(10)]
+
+def test_VerifyTorrentJob_handle_verified_with_matching_content(verify_job):
+    verify_job._handle_verified(())
+    assert verify_job.output == ('path/to/foo.torrent',)
+    assert verify_job.errors == ()
+
+def test_VerifyTorrentJob_handle_verified_with_mismatching_content(verify_job):
+    verify_job._handle_verified(('path/to/foo/a', 'path/to/foo/b'))
+    assert verify_job.output == ()
+    assert verify_job.errors == (
+        'Corrupt, incomplete or missing files:\n'
+        '  path/to/foo/a\n'
+        '  path/to/foo/b',
+    )
+    assert verify_job.is_finished
+
+def test_VerifyTorrentJob_handle_verified_after_cancellation(verify_job):
+    verify_job._handle_verified(None)
+    assert verify_job.output == ()
+    assert verify_job.errors == ()
+
+def test_VerifyTorrentJob_handle_error(verify_job, mocker):
+    mocker.patch.object(verify_job, 'exception')
+    mocker.patch.object(verify_job, 'error')
+    verify_job._handle_error('message')
+    assert verify_job.error.call_args_list == [call('message')]
+    verify_job._handle_error(errors.TorrentError('message'))
+    assert verify_job.exception.call_args_list == [call(errors.TorrentError('message'))]
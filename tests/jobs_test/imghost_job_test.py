@@ -1,3 +1,5 @@
+import concurrent.futures
+import threading
 from unittest.mock import Mock, call
 
 import pytest
@@ -25,7 +27,7 @@ def imghost(tmp_path):
 
 @pytest.fixture
 async def make_ImageHostJob(tmp_path, imghost):
-    def make_ImageHostJob(home_directory=tmp_path, images_total=0, enqueue=()):
+    def make_ImageHostJob(home_directory=tmp_path, images_total=0, enqueue=(), **kwargs):
         return ImageHostJob(
             home_directory=home_directory,
             cache_directory=tmp_path,
@@ -33,6 +35,7 @@ async def make_ImageHostJob(tmp_path, imghost):
             imghost=imghost,
             images_total=images_total,
             enqueue=enqueue,
+            **kwargs,
         )
     return make_ImageHostJob
 
@@ -136,3 +139,133 @@ async def test_exit_code(make_ImageHostJob):
     assert job.exit_code == 1
     job._images_uploaded = 123
     assert job.exit_code == 0
+
+
+@pytest.mark.parametrize(
+    argnames='optimize_png, default_optimize_png, image_path, exp_uploaded_path',
+    argvalues=(
+        (True, False, 'foo.png', 'optimized.png'),
+        (True, False, 'foo.PNG', 'optimized.png'),
+        (True, False, 'foo.jpg', 'foo.jpg'),
+        (False, True, 'foo.png', 'foo.png'),
+        (None, True, 'foo.png', 'optimized.png'),
+        (None, False, 'foo.png', 'foo.png'),
+    ),
+)
+@pytest.mark.asyncio
+async def test_handle_input_optimizes_png(optimize_png, default_optimize_png, image_path, exp_uploaded_path,
+                                          make_ImageHostJob, mocker):
+    mocker.patch('upsies.jobs.imghost.default_optimize_png', default_optimize_png)
+    mocker.patch('concurrent.futures.ProcessPoolExecutor',
+                 lambda mp_context: concurrent.futures.ThreadPoolExecutor())
+    optimize_png_mock = mocker.patch('upsies.utils.image.optimize_png', return_value='optimized.png')
+    job = make_ImageHostJob(images_total=1, optimize_png=optimize_png)
+    job._imghost.upload.return_value = UploadedImage('http://foo')
+    await job.handle_input(image_path)
+    assert job._imghost.upload.call_args_list == [call(exp_uploaded_path, cache=not job.ignore_cache)]
+    if exp_uploaded_path == 'optimized.png':
+        assert optimize_png_mock.call_args_list == [call(image_path, job.cache_directory)]
+    else:
+        assert optimize_png_mock.call_args_list == []
+    job.finish()
+
+@pytest.mark.asyncio
+async def test_enqueue_optimizes_pngs_in_parallel(make_ImageHostJob, mocker):
+    mocker.patch('concurrent.futures.ProcessPoolExecutor',
+                 lambda mp_context: concurrent.futures.ThreadPoolExecutor(max_workers=3))
+    # Each optimization only finishes if all of them run at the same time
+    barrier = threading.Barrier(3, timeout=5)
+
+    def optimize_png(image_path, cache_directory):
+        barrier.wait()
+        return f'optimized {image_path}'
+
+    mocker.patch('upsies.utils.image.optimize_png', side_effect=optimize_png)
+    job = make_ImageHostJob(enqueue=('a.png', 'b.png', 'c.png'), optimize_png=True)
+    job._imghost.upload.return_value = UploadedImage('http://foo')
+    job.execute()
+    await job.wait()
+    assert job.errors == ()
+    assert job._imghost.upload.call_args_list == [
+        call('optimized a.png', cache=not job.ignore_cache),
+        call('optimized b.png', cache=not job.ignore_cache),
+        call('optimized c.png', cache=not job.ignore_cache),
+    ]
+
+@pytest.mark.asyncio
+async def test_enqueue_converts_images_in_parallel(make_ImageHostJob, mocker):
+    mocker.patch('concurrent.futures.ProcessPoolExecutor',
+                 lambda mp_context: concurrent.futures.ThreadPoolExecutor(max_workers=3))
+    # Each conversion only finishes if all of them run at the same time
+    barrier = threading.Barrier(3, timeout=5)
+
+    def convert(image_path, image_format, cache_directory, quality):
+        barrier.wait()
+        return f'{image_path}.{image_format}'
+
+    mocker.patch('upsies.utils.image.convert', side_effect=convert)
+    job = make_ImageHostJob(enqueue=('a.png', 'b.png', 'c.png'))
+    job._imghost.config['image_format'] = 'webp'
+    job._imghost.upload.return_value = UploadedImage('http://foo')
+    job.execute()
+    await job.wait()
+    assert job.errors == ()
+    assert job._imghost.upload.call_args_list == [
+        call('a.png.webp', cache=not job.ignore_cache),
+        call('b.png.webp', cache=not job.ignore_cache),
+        call('c.png.webp', cache=not job.ignore_cache),
+    ]
+
+@pytest.mark.parametrize(
+    argnames='config, exp_convert_args',
+    argvalues=(
+        ({}, None),
+        ({'image_format': 'png'}, None),
+        ({'image_format': 'webp'}, ('webp', 90)),
+        ({'image_format': 'jpeg', 'jpeg_quality': 75}, ('jpeg', 75)),
+    ),
+)
+@pytest.mark.asyncio
+async def test_handle_input_converts_image(config, exp_convert_args, make_ImageHostJob, mocker):
+    mocker.patch('concurrent.futures.ProcessPoolExecutor',
+                 lambda mp_context: concurrent.futures.ThreadPoolExecutor())
+    convert_mock = mocker.patch('upsies.utils.image.convert', return_value='converted.img')
+    optimize_png_mock = mocker.patch('upsies.utils.image.optimize_png')
+    job = make_ImageHostJob(images_total=1, optimize_png=True)
+    job._imghost.config.update(config)
+    job._imghost.upload.return_value = UploadedImage('http://foo')
+    await job.handle_input('foo.png')
+    if exp_convert_args:
+        image_format, quality = exp_convert_args
+        assert convert_mock.call_args_list == [call('foo.png', image_format, job.cache_directory, quality)]
+        assert optimize_png_mock.call_args_list == []
+        assert job._imghost.upload.call_args_list == [call('converted.img', cache=not job.ignore_cache)]
+    else:
+        assert convert_mock.call_args_list == []
+        assert optimize_png_mock.call_args_list == [call('foo.png', job.cache_directory)]
+    job.finish()
+
+@pytest.mark.asyncio
+async def test_handle_input_uploads_original_image_if_conversion_fails(make_ImageHostJob, mocker):
+    mocker.patch('concurrent.futures.ProcessPoolExecutor',
+                 lambda mp_context: concurrent.futures.ThreadPoolExecutor())
+    mocker.patch('upsies.utils.image.convert', side_effect=errors.ImageConvertError('Unknown encoder'))
+    job = make_ImageHostJob(images_total=1, optimize_png=False)
+    job._imghost.config['image_format'] = 'webp'
+    job._imghost.upload.return_value = UploadedImage('http://foo')
+    await job.handle_input('foo.png')
+    assert job._imghost.upload.call_args_list == [call('foo.png', cache=not job.ignore_cache)]
+    assert job.warnings == ('Unknown encoder',)
+    job.finish()
+
+@pytest.mark.asyncio
+async def test_handle_input_uploads_original_image_if_optimization_fails(make_ImageHostJob, mocker):
+    mocker.patch('concurrent.futures.ProcessPoolExecutor',
+                 lambda mp_context: concurrent.futures.ThreadPoolExecutor())
+    mocker.patch('upsies.utils.image.optimize_png', side_effect=errors.ImageOptimizeError('Invalid PNG'))
+    job = make_ImageHostJob(images_total=1, optimize_png=True)
+    job._imghost.upload.return_value = UploadedImage('http://foo')
+    await job.handle_input('foo.png')
+    assert job._imghost.upload.call_args_list == [call('foo.png', cache=not job.ignore_cache)]
+    assert job.warnings == ('Invalid PNG',)
+    job.finish()
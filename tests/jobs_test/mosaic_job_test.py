@@ -0,0 +1,62 @@
+import asyncio
+from unittest.mock import call
+
+from upsies import errors
+from upsies.jobs.mosaic import MosaicJob
+
+
+def test_cache_id(tmp_path):
+    job = MosaicJob(home_directory=tmp_path, cache_directory=tmp_path, content_path='some/path')
+    assert job.cache_id is None
+
+
+def test_execute_creates_mosaic(tmp_path, mocker):
+    first_video_mock = mocker.patch('upsies.utils.video.first_video', return_value='path/to/foo/bar.mkv')
+    mosaic_mock = mocker.patch('upsies.utils.image.mosaic', return_value=f'{tmp_path}/bar.mkv.mosaic.png')
+    job = MosaicJob(
+        home_directory=tmp_path,
+        cache_directory=tmp_path,
+        ignore_cache=True,
+        content_path='path/to/foo',
+        columns=3,
+        rows=5,
+        tile_width=200,
+    )
+    mosaics = []
+    job.signal.register('mosaic', mosaics.append)
+    job.execute()
+    asyncio.get_event_loop().run_until_complete(job.wait())
+    assert first_video_mock.call_args_list == [call('path/to/foo')]
+    assert mosaic_mock.call_args_list == [call(
+        video_file='path/to/foo/bar.mkv',
+        mosaic_file=f'{tmp_path}/bar.mkv.mosaic.png',
+        columns=3,
+        rows=5,
+        tile_width=200,
+        overwrite=True,
+    )]
+    assert mosaics == [f'{tmp_path}/bar.mkv.mosaic.png']
+    assert job.output == (f'{tmp_path}/bar.mkv.mosaic.png',)
+    assert job.errors == ()
+    assert job.exit_code == 0
+
+def test_execute_fails_to_find_video(tmp_path, mocker):
+    mocker.patch('upsies.utils.video.first_video', side_effect=errors.ContentError('No video file found'))
+    mosaic_mock = mocker.patch('upsies.utils.image.mosaic')
+    job = MosaicJob(home_directory=tmp_path, cache_directory=tmp_path, content_path='path/to/foo')
+    job.execute()
+    asyncio.get_event_loop().run_until_complete(job.wait())
+    assert mosaic_mock.call_args_list == []
+    assert job.output == ()
+    assert [str(e) for e in job.errors] == ['No video file found']
+    assert job.exit_code == 1
+
+def test_execute_fails_to_create_mosaic(tmp_path, mocker):
+    mocker.patch('upsies.utils.video.first_video', return_value='path/to/foo/bar.mkv')
+    mocker.patch('upsies.utils.image.mosaic', side_effect=errors.ScreenshotError('Failed to create mosaic'))
+    job = MosaicJob(home_directory=tmp_path, cache_directory=tmp_path, content_path='path/to/foo')
+    job.execute()
+    asyncio.get_event_loop().run_until_complete(job.wait())
+    assert job.output == ()
+    assert [str(e) for e in job.errors] == ['Failed to create mosaic']
+    assert job.exit_code == 1
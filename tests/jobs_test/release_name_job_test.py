@@ -6,6 +6,7 @@ import pytest
 from upsies import errors
 from upsies.jobs.release_name import ReleaseNameJob
 from upsies.utils.release import ReleaseName
+from upsies.utils.types import ReleaseType
 
 
 class AsyncMock(Mock):
@@ -124,3 +125,60 @@ def test_fetch_info_raises_exception(tmp_path, mocker):
     assert cb.release_name_updating.call_args_list == [call()]
     assert cb.release_name_updated.call_args_list == []
     assert cb.release_name.call_args_list == []
+
+
+@pytest.mark.parametrize(
+    argnames='release_type, is_dir, consistent, exp_warnings',
+    argvalues=(
+        (ReleaseType.movie, True, {}, []),
+        (ReleaseType.episode, True, {}, []),
+        (ReleaseType.season, False, {}, []),
+        (ReleaseType.season, True, {}, []),
+        (ReleaseType.season, True, {'resolution': False}, ['Episodes differ in resolution']),
+        (ReleaseType.season, True, {'video_format': False, 'audio': False},
+         ['Episodes differ in video format, audio']),
+    ),
+)
+def test_execute_warns_about_inconsistent_season(release_type, is_dir, consistent, exp_warnings, tmp_path, mocker):
+    content_path = tmp_path / 'Foo.S01'
+    if is_dir:
+        content_path.mkdir()
+    flags = {'resolution': True, 'video_format': True, 'audio': True, **consistent}
+    season_info_mock = mocker.patch('upsies.utils.video.season_info', return_value=Mock(
+        has_consistent_resolution=flags['resolution'],
+        has_consistent_video_format=flags['video_format'],
+        has_consistent_audio=flags['audio'],
+        is_consistent=all(flags.values()),
+    ))
+    job = ReleaseNameJob(
+        home_directory=tmp_path,
+        cache_directory=tmp_path,
+        ignore_cache=True,
+        content_path=str(content_path),
+    )
+    mocker.patch.object(job, '_release_name', Mock(spec=ReleaseName, type=release_type))
+    cb = Mock()
+    job.signal.register('warning', cb.warning)
+    job.start()
+    asyncio.get_event_loop().run_until_complete(job.await_tasks())
+    assert cb.warning.call_args_list == [call(w) for w in exp_warnings]
+    if release_type is ReleaseType.season and is_dir:
+        assert season_info_mock.call_args_list == [call(str(content_path))]
+    else:
+        assert season_info_mock.call_args_list == []
+
+def test_execute_ignores_unreadable_season(tmp_path, mocker):
+    mocker.patch('upsies.utils.video.season_info', side_effect=errors.ContentError('No video file found'))
+    job = ReleaseNameJob(
+        home_directory=tmp_path,
+        cache_directory=tmp_path,
+        ignore_cache=True,
+        content_path=str(tmp_path),
+    )
+    mocker.patch.object(job, '_release_name', Mock(spec=ReleaseName, type=ReleaseType.season))
+    cb = Mock()
+    job.signal.register('warning', cb.warning)
+    job.start()
+    asyncio.get_event_loop().run_until_complete(job.await_tasks())
+    assert cb.warning.call_args_list == []
+    assert job.errors == ()
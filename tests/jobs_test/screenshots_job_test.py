@@ -1,11 +1,17 @@
+import os
 import queue
+import threading
+import time
 from unittest.mock import Mock, call, patch
 
 import pytest
 
 from upsies import errors
-from upsies.jobs.screenshots import (ScreenshotsJob, _normalize_timestamps,
-                                     _screenshots_process, _shall_terminate)
+from upsies.jobs.screenshots import (ScreenshotsJob, _avoid_blank_frames,
+                                     _normalize_timestamps, _place_in_scenes,
+                                     _screenshots_process, _shall_terminate,
+                                     _snap_to_keyframes)
+from upsies.utils import image
 from upsies.utils.daemon import MsgType
 
 try:
@@ -204,12 +210,17 @@ def test_screenshots_process_is_cancelled_after_first_screenshot(tmp_path, scree
         call.shall_terminate(screenshots_process_patches.input_queue),
     ]
 
-def test_screenshots_process_fails_to_create_second_screenshot(tmp_path, screenshots_process_patches):
+@pytest.mark.parametrize(
+    argnames='exception',
+    argvalues=(errors.ScreenshotError('No space left'), errors.ProcessError('No space left')),
+    ids=lambda v: type(v).__name__,
+)
+def test_screenshots_process_fails_to_create_second_screenshot(exception, tmp_path, screenshots_process_patches):
     screenshots_process_patches.first_video.return_value = 'path/to/foo/bar.mkv'
     screenshots_process_patches.normalize_timestamps.return_value = ('0:10:00', '0:20:00')
     screenshots_process_patches.screenshot.side_effect = (
         'path/to/destination/bar.mkv.0:10:00.png',
-        errors.ScreenshotError('No space left'),
+        exception,
     )
     _screenshots_process(
         output_queue=screenshots_process_patches.output_queue,
@@ -289,6 +300,401 @@ def test_screenshots_process_succeeds(tmp_path, screenshots_process_patches):
     ]
 
 
+def test_screenshots_process_uses_screenshot_store(tmp_path, screenshots_process_patches, mocker):
+    mocker.patch('upsies.utils.fs.file_fingerprint', return_value='123-456-abc')
+    screenshots_process_patches.first_video.return_value = 'path/to/foo/bar.mkv'
+    screenshots_process_patches.normalize_timestamps.return_value = ('0:10:00', '0:20:00')
+    store = image.ScreenshotStore(tmp_path / 'store')
+    stored_file = tmp_path / 'stored.png'
+    stored_file.write_bytes(b'stored image')
+    store.put('path/to/other/baz.mkv', '0:10:00', str(stored_file))
+
+    def screenshot(video_file, screenshot_file, timestamp, overwrite):
+        if not os.path.exists(screenshot_file):
+            with open(screenshot_file, 'wb') as f:
+                f.write(f'new image at {timestamp}'.encode('ascii'))
+        return screenshot_file
+
+    screenshots_process_patches.screenshot.side_effect = screenshot
+    output_dir = tmp_path / 'destination'
+    output_dir.mkdir()
+    _screenshots_process(
+        output_queue=screenshots_process_patches.output_queue,
+        input_queue=screenshots_process_patches.input_queue,
+        content_path='path/to/foo',
+        timestamps=(),
+        count=2,
+        output_dir=str(output_dir),
+        overwrite=False,
+        store_directory=str(tmp_path / 'store'),
+    )
+    assert (output_dir / 'bar.mkv.0:10:00.png').read_bytes() == b'stored image'
+    assert (output_dir / 'bar.mkv.0:20:00.png').read_bytes() == b'new image at 0:20:00'
+    assert sorted(os.listdir(tmp_path / 'store')) == sorted((
+        os.path.basename(store.path('path/to/foo/bar.mkv', '0:10:00')),
+        os.path.basename(store.path('path/to/foo/bar.mkv', '0:20:00')),
+    ))
+    assert screenshots_process_patches.output_queue.put.call_args_list[-2:] == [
+        call((MsgType.info, ('screenshot', str(output_dir / 'bar.mkv.0:10:00.png')))),
+        call((MsgType.info, ('screenshot', str(output_dir / 'bar.mkv.0:20:00.png')))),
+    ]
+
+
+def _screenshot_with_delays(delays, exceptions={}):
+    def screenshot(video_file, screenshot_file, timestamp, overwrite):
+        time.sleep(delays[timestamp])
+        if timestamp in exceptions:
+            raise exceptions[timestamp]
+        return screenshot_file
+    return screenshot
+
+def test_screenshots_process_reports_concurrent_screenshots_in_order(tmp_path, screenshots_process_patches):
+    screenshots_process_patches.first_video.return_value = 'path/to/foo/bar.mkv'
+    screenshots_process_patches.normalize_timestamps.return_value = ('0:10:00', '0:20:00', '0:30:00')
+    screenshots_process_patches.screenshot.side_effect = _screenshot_with_delays(
+        delays={'0:10:00': 0.3, '0:20:00': 0, '0:30:00': 0.1},
+        exceptions={'0:20:00': errors.ScreenshotError('No space left')},
+    )
+    _screenshots_process(
+        output_queue=screenshots_process_patches.output_queue,
+        input_queue=screenshots_process_patches.input_queue,
+        content_path='path/to/foo',
+        timestamps=(),
+        count=3,
+        output_dir='path/to/destination',
+        overwrite=False,
+        workers=3,
+    )
+    assert screenshots_process_patches.output_queue.put.call_args_list == [
+        call((MsgType.info, ('video_file', 'path/to/foo/bar.mkv'))),
+        call((MsgType.info, ('timestamps', ('0:10:00', '0:20:00', '0:30:00')))),
+        call((MsgType.info, ('screenshot', 'path/to/destination/bar.mkv.0:10:00.png'))),
+        call((MsgType.error, 'No space left')),
+        call((MsgType.info, ('screenshot', 'path/to/destination/bar.mkv.0:30:00.png'))),
+    ]
+    assert sorted(c.kwargs['timestamp'] for c in screenshots_process_patches.screenshot.call_args_list) == [
+        '0:10:00', '0:20:00', '0:30:00',
+    ]
+
+def test_screenshots_process_cancels_concurrent_screenshots(tmp_path, screenshots_process_patches, mocker):
+    stop_mock = mocker.patch('upsies.utils.subproc.governor.stop')
+    screenshots_process_patches.first_video.return_value = 'path/to/foo/bar.mkv'
+    screenshots_process_patches.normalize_timestamps.return_value = ('0:10:00', '0:20:00', '0:30:00')
+    screenshots_process_patches.screenshot.side_effect = _screenshot_with_delays(
+        delays={'0:10:00': 0, '0:20:00': 0.5, '0:30:00': 0.5},
+    )
+    screenshots_process_patches.shall_terminate.side_effect = (False, False, False, True)
+    _screenshots_process(
+        output_queue=screenshots_process_patches.output_queue,
+        input_queue=screenshots_process_patches.input_queue,
+        content_path='path/to/foo',
+        timestamps=(),
+        count=3,
+        output_dir='path/to/destination',
+        overwrite=False,
+        workers=2,
+    )
+    assert screenshots_process_patches.output_queue.put.call_args_list == [
+        call((MsgType.info, ('video_file', 'path/to/foo/bar.mkv'))),
+        call((MsgType.info, ('timestamps', ('0:10:00', '0:20:00', '0:30:00')))),
+        call((MsgType.info, ('screenshot', 'path/to/destination/bar.mkv.0:10:00.png'))),
+    ]
+    assert stop_mock.call_args_list == [call()]
+
+def test_screenshots_process_stops_running_screenshot(tmp_path, screenshots_process_patches, mocker):
+    stopped = threading.Event()
+    stop_mock = mocker.patch('upsies.utils.subproc.governor.stop', side_effect=stopped.set)
+
+    def screenshot(video_file, screenshot_file, timestamp, overwrite):
+        # Pretend ffmpeg runs until it is killed
+        stopped.wait(timeout=5)
+        raise errors.ProcessError('ffmpeg: Cancelled')
+
+    screenshots_process_patches.first_video.return_value = 'path/to/foo/bar.mkv'
+    screenshots_process_patches.normalize_timestamps.return_value = ('0:10:00', '0:20:00')
+    screenshots_process_patches.screenshot.side_effect = screenshot
+    screenshots_process_patches.shall_terminate.side_effect = (False, False, False, True)
+    _screenshots_process(
+        output_queue=screenshots_process_patches.output_queue,
+        input_queue=screenshots_process_patches.input_queue,
+        content_path='path/to/foo',
+        timestamps=(),
+        count=2,
+        output_dir='path/to/destination',
+        overwrite=False,
+        workers=1,
+    )
+    assert screenshots_process_patches.output_queue.put.call_args_list == [
+        call((MsgType.info, ('video_file', 'path/to/foo/bar.mkv'))),
+        call((MsgType.info, ('timestamps', ('0:10:00', '0:20:00')))),
+    ]
+    assert [c.kwargs['timestamp'] for c in screenshots_process_patches.screenshot.call_args_list] == ['0:10:00']
+    assert stop_mock.call_args_list == [call()]
+
+def test_screenshots_process_creates_screenshots_in_batch(tmp_path, screenshots_process_patches, mocker):
+    screenshots_mock = mocker.patch('upsies.utils.image.screenshots')
+    screenshots_process_patches.first_video.return_value = 'path/to/foo/bar.mkv'
+    screenshots_process_patches.normalize_timestamps.return_value = ('0:10:00', '0:20:00')
+    _screenshots_process(
+        output_queue=screenshots_process_patches.output_queue,
+        input_queue=screenshots_process_patches.input_queue,
+        content_path='path/to/foo',
+        timestamps=(),
+        count=2,
+        output_dir='path/to/destination',
+        overwrite=True,
+        workers=4,
+        batch=True,
+    )
+    assert screenshots_mock.call_args_list == [call(
+        video_file='path/to/foo/bar.mkv',
+        timestamps=['0:10:00', '0:20:00'],
+        screenshot_files=[
+            'path/to/destination/bar.mkv.0:10:00.png',
+            'path/to/destination/bar.mkv.0:20:00.png',
+        ],
+        overwrite=True,
+    )]
+    assert screenshots_process_patches.screenshot.call_args_list == []
+    assert screenshots_process_patches.output_queue.put.call_args_list == [
+        call((MsgType.info, ('video_file', 'path/to/foo/bar.mkv'))),
+        call((MsgType.info, ('timestamps', ('0:10:00', '0:20:00')))),
+        call((MsgType.info, ('screenshot', 'path/to/destination/bar.mkv.0:10:00.png'))),
+        call((MsgType.info, ('screenshot', 'path/to/destination/bar.mkv.0:20:00.png'))),
+    ]
+
+def test_screenshots_process_fails_to_create_screenshots_in_batch(tmp_path, screenshots_process_patches, mocker):
+    mocker.patch('upsies.utils.image.screenshots', side_effect=errors.ScreenshotError('No space left'))
+    screenshots_process_patches.first_video.return_value = 'path/to/foo/bar.mkv'
+    screenshots_process_patches.normalize_timestamps.return_value = ('0:10:00', '0:20:00')
+    _screenshots_process(
+        output_queue=screenshots_process_patches.output_queue,
+        input_queue=screenshots_process_patches.input_queue,
+        content_path='path/to/foo',
+        timestamps=(),
+        count=2,
+        output_dir='path/to/destination',
+        overwrite=False,
+        batch=True,
+    )
+    assert screenshots_process_patches.output_queue.put.call_args_list == [
+        call((MsgType.info, ('video_file', 'path/to/foo/bar.mkv'))),
+        call((MsgType.info, ('timestamps', ('0:10:00', '0:20:00')))),
+        call((MsgType.error, 'No space left')),
+    ]
+
+def test_screenshots_process_snaps_to_keyframes(tmp_path, screenshots_process_patches, mocker):
+    keyframes_mock = mocker.patch('upsies.utils.video.keyframes', return_value=(0.0, 598.2, 1203.5, 1210.0))
+    screenshots_process_patches.first_video.return_value = 'path/to/foo/bar.mkv'
+    screenshots_process_patches.normalize_timestamps.return_value = ('0:10:00', '0:20:00')
+    _screenshots_process(
+        output_queue=screenshots_process_patches.output_queue,
+        input_queue=screenshots_process_patches.input_queue,
+        content_path='path/to/foo',
+        timestamps=(),
+        count=2,
+        output_dir='path/to/destination',
+        overwrite=False,
+        seek_mode='keyframe',
+        cache_directory='path/to/cache',
+    )
+    assert len(keyframes_mock.call_args_list) == 1
+    assert keyframes_mock.call_args_list[0].args == ('path/to/foo/bar.mkv',)
+    assert tuple(keyframes_mock.call_args_list[0].kwargs['timestamps']) == (600.0, 1200.0)
+    assert keyframes_mock.call_args_list[0].kwargs['cache_directory'] == 'path/to/cache'
+    assert screenshots_process_patches.screenshot.call_args_list == [
+        call(
+            video_file='path/to/foo/bar.mkv',
+            screenshot_file='path/to/destination/bar.mkv.0:09:58.png',
+            timestamp=598.2,
+            overwrite=False,
+        ),
+        call(
+            video_file='path/to/foo/bar.mkv',
+            screenshot_file='path/to/destination/bar.mkv.0:20:03.png',
+            timestamp=1203.5,
+            overwrite=False,
+        ),
+    ]
+    assert screenshots_process_patches.output_queue.put.call_args_list == [
+        call((MsgType.info, ('video_file', 'path/to/foo/bar.mkv'))),
+        call((MsgType.info, ('timestamps', ('0:09:58', '0:20:03')))),
+        call((MsgType.info, ('screenshot', 'path/to/destination/bar.mkv.0:09:58.png'))),
+        call((MsgType.info, ('screenshot', 'path/to/destination/bar.mkv.0:20:03.png'))),
+    ]
+
+def test_screenshots_process_creates_screenshots_in_memory(tmp_path, screenshots_process_patches, mocker):
+    def screenshot_buffer(video_file, timestamp, name):
+        if timestamp == '0:20:00':
+            raise errors.ScreenshotError('Invalid data')
+        return f'buffer:{name}'
+
+    screenshot_buffer_mock = mocker.patch('upsies.utils.image.screenshot_buffer',
+                                          side_effect=screenshot_buffer)
+    screenshots_process_patches.first_video.return_value = 'path/to/foo/bar.mkv'
+    screenshots_process_patches.normalize_timestamps.return_value = ('0:10:00', '0:20:00', '0:30:00')
+    _screenshots_process(
+        output_queue=screenshots_process_patches.output_queue,
+        input_queue=screenshots_process_patches.input_queue,
+        content_path='path/to/foo',
+        timestamps=(),
+        count=3,
+        output_dir='path/to/destination',
+        overwrite=False,
+        workers=2,
+        batch=True,
+        in_memory=True,
+    )
+    assert sorted(screenshot_buffer_mock.call_args_list, key=lambda c: c.kwargs['timestamp']) == [
+        call(video_file='path/to/foo/bar.mkv', timestamp='0:10:00', name='bar.mkv.0:10:00.png'),
+        call(video_file='path/to/foo/bar.mkv', timestamp='0:20:00', name='bar.mkv.0:20:00.png'),
+        call(video_file='path/to/foo/bar.mkv', timestamp='0:30:00', name='bar.mkv.0:30:00.png'),
+    ]
+    assert screenshots_process_patches.screenshot.call_args_list == []
+    assert screenshots_process_patches.output_queue.put.call_args_list == [
+        call((MsgType.info, ('video_file', 'path/to/foo/bar.mkv'))),
+        call((MsgType.info, ('timestamps', ('0:10:00', '0:20:00', '0:30:00')))),
+        call((MsgType.info, ('screenshot', 'buffer:bar.mkv.0:10:00.png'))),
+        call((MsgType.error, 'Invalid data')),
+        call((MsgType.info, ('screenshot', 'buffer:bar.mkv.0:30:00.png'))),
+    ]
+
+def test_screenshots_process_avoids_blank_frames(tmp_path, screenshots_process_patches, mocker):
+    mocker.patch('upsies.utils.video.duration', return_value=3600)
+    best_frames_mock = mocker.patch('upsies.utils.image.best_frames', return_value=[1203, 2400])
+    screenshots_process_patches.first_video.return_value = 'path/to/foo/bar.mkv'
+    screenshots_process_patches.normalize_timestamps.return_value = ('0:10:00', '0:20:00', '0:40:00')
+    _screenshots_process(
+        output_queue=screenshots_process_patches.output_queue,
+        input_queue=screenshots_process_patches.input_queue,
+        content_path='path/to/foo',
+        timestamps=('10:00',),
+        count=3,
+        output_dir='path/to/destination',
+        overwrite=False,
+        avoid_blank_frames=True,
+    )
+    assert best_frames_mock.call_args_list == [call('path/to/foo/bar.mkv', [1200, 2400])]
+    assert screenshots_process_patches.output_queue.put.call_args_list[:2] == [
+        call((MsgType.info, ('video_file', 'path/to/foo/bar.mkv'))),
+        call((MsgType.info, ('timestamps', ['0:10:00', '0:20:03', '0:40:00']))),
+    ]
+
+def test_avoid_blank_frames_without_automatic_timestamps(mocker):
+    best_frames_mock = mocker.patch('upsies.utils.image.best_frames')
+    output_queue = Mock()
+    timestamps = ['0:10:00', '0:20:00']
+    assert _avoid_blank_frames(output_queue, 'foo.mkv', timestamps, timestamps) is timestamps
+    assert best_frames_mock.call_args_list == []
+    assert output_queue.put.call_args_list == []
+
+def test_avoid_blank_frames_deduplicates_timestamps(mocker):
+    mocker.patch('upsies.utils.image.best_frames', return_value=[600, 1200])
+    output_queue = Mock()
+    assert _avoid_blank_frames(output_queue, 'foo.mkv', ['0:10:00', '0:10:03', '0:19:57'], ['0:10:00']) == [
+        '0:10:00', '0:20:00',
+    ]
+    assert output_queue.put.call_args_list == []
+
+@pytest.mark.parametrize('exception', (errors.DependencyError('Missing dependency: numpy'),
+                                       errors.ScreenshotError('Failed to analyze frames')))
+def test_avoid_blank_frames_fails_to_analyze_frames(exception, mocker):
+    mocker.patch('upsies.utils.image.best_frames', side_effect=exception)
+    output_queue = Mock()
+    timestamps = ['0:10:00', '0:20:00']
+    assert _avoid_blank_frames(output_queue, 'foo.mkv', timestamps, []) is timestamps
+    assert output_queue.put.call_args_list == [
+        call((MsgType.info, ('warning', f'Not avoiding blank frames: {exception}'))),
+    ]
+
+def test_screenshots_process_places_timestamps_in_scenes(tmp_path, screenshots_process_patches, mocker):
+    mocker.patch('upsies.utils.video.duration', return_value=3600)
+    scenes_mock = mocker.patch('upsies.utils.video.scenes', return_value=(1199, 1200.5))
+    best_frames_mock = mocker.patch('upsies.utils.image.best_frames', return_value=[1803])
+    screenshots_process_patches.first_video.return_value = 'path/to/foo/bar.mkv'
+    screenshots_process_patches.normalize_timestamps.return_value = ('0:10:00', '0:20:00')
+    _screenshots_process(
+        output_queue=screenshots_process_patches.output_queue,
+        input_queue=screenshots_process_patches.input_queue,
+        content_path='path/to/foo',
+        timestamps=('10:00',),
+        count=2,
+        output_dir='path/to/destination',
+        overwrite=False,
+        avoid_blank_frames=True,
+        timestamp_strategy='scenes',
+        cache_directory='path/to/cache',
+    )
+    assert scenes_mock.call_args_list == [call('path/to/foo/bar.mkv', cache_directory='path/to/cache')]
+    # Blank frames are avoided after placing timestamps in scenes
+    assert best_frames_mock.call_args_list == [call('path/to/foo/bar.mkv', [1203])]
+    assert screenshots_process_patches.output_queue.put.call_args_list[:2] == [
+        call((MsgType.info, ('video_file', 'path/to/foo/bar.mkv'))),
+        call((MsgType.info, ('timestamps', ['0:10:00', '0:30:03']))),
+    ]
+
+@pytest.mark.parametrize(
+    argnames='timestamps, boundaries, exp_timestamps',
+    argvalues=(
+        # Timestamps far away from boundaries are not moved
+        (['0:10:00', '0:20:00'], (300, 900, 1500), ['0:10:00', '0:20:00']),
+        # Timestamps are moved away from boundaries
+        (['0:10:00', '0:20:00'], (599, 1201), ['0:10:02', '0:19:58']),
+        # Timestamps are moved into the middle of short shots
+        (['0:10:00'], (596, 601), ['0:09:58']),
+        # Shots that are too short are ignored
+        (['0:10:00'], (597, 599.5, 601, 605), ['0:09:58']),
+        # Timestamps that end up in the same shot are deduplicated
+        (['0:10:00', '0:10:01'], (598, 604, 620), ['0:10:01']),
+        # The whole video is one shot
+        (['0:10:00'], (), ['0:10:00']),
+    ),
+)
+def test_place_in_scenes(timestamps, boundaries, exp_timestamps, mocker):
+    mocker.patch('upsies.utils.video.duration', return_value=3600)
+    mocker.patch('upsies.utils.video.scenes', return_value=boundaries)
+    output_queue = Mock()
+    assert _place_in_scenes(output_queue, 'foo.mkv', timestamps, [], 'cache') == exp_timestamps
+    assert output_queue.put.call_args_list == []
+
+def test_place_in_scenes_does_not_move_fixed_timestamps(mocker):
+    scenes_mock = mocker.patch('upsies.utils.video.scenes', return_value=(599, 1201))
+    output_queue = Mock()
+    timestamps = ['0:10:00', '0:20:00']
+    assert _place_in_scenes(output_queue, 'foo.mkv', timestamps, timestamps, 'cache') is timestamps
+    assert scenes_mock.call_args_list == []
+
+def test_place_in_scenes_fails_to_detect_scenes(mocker):
+    mocker.patch('upsies.utils.video.scenes', side_effect=errors.ContentError('Missing dependency: ffmpeg'))
+    output_queue = Mock()
+    timestamps = ['0:10:00', '0:20:00']
+    assert _place_in_scenes(output_queue, 'foo.mkv', timestamps, [], 'cache') is timestamps
+    assert output_queue.put.call_args_list == [
+        call((MsgType.info, ('warning', 'Not placing screenshots in scenes: Missing dependency: ffmpeg'))),
+    ]
+
+def test_snap_to_keyframes_keeps_timestamps_if_keyframe_is_taken(mocker):
+    mocker.patch('upsies.utils.video.keyframes', return_value=(0.0, 60.5, 120.0))
+    assert _snap_to_keyframes('foo.mkv', ('0:00:50', '0:01:10', '0:01:50'), 'cache') == {
+        '0:01:00': 60.5,
+        '0:01:10': '0:01:10',
+        '0:02:00': 120.0,
+    }
+
+def test_snap_to_keyframes_deduplicates_identical_timestamps(mocker):
+    mocker.patch('upsies.utils.video.keyframes', return_value=(0.0, 60.0, 120.0))
+    assert _snap_to_keyframes('foo.mkv', ('0:00:55', '0:01:00'), 'cache') == {
+        '0:01:00': 60.0,
+    }
+
+def test_snap_to_keyframes_fails_to_get_keyframes(mocker):
+    mocker.patch('upsies.utils.video.keyframes', side_effect=errors.ContentError('No ffprobe'))
+    assert _snap_to_keyframes('foo.mkv', ('0:00:50', '0:01:10'), 'cache') == {
+        '0:00:50': '0:00:50',
+        '0:01:10': '0:01:10',
+    }
+
+
 def test_shall_terminate_with_empty_queue():
     q = Mock()
     q.get_nowait.side_effect = queue.Empty()
@@ -347,6 +753,14 @@ def test_ScreenshotsJob_initialize(DaemonProcess_mock, tmp_path):
             'count'        : 2,
             'output_dir'   : job.home_directory,
             'overwrite'    : job.ignore_cache,
+            'workers'      : 1,
+            'batch'        : False,
+            'seek_mode'    : 'accurate',
+            'in_memory'    : False,
+            'avoid_blank_frames' : False,
+            'timestamp_strategy' : 'interval',
+            'cache_directory' : job.cache_directory,
+            'store_directory' : None,
         },
         info_callback=job._handle_info,
         error_callback=job._handle_error,
@@ -362,6 +776,30 @@ def test_ScreenshotsJob_initialize(DaemonProcess_mock, tmp_path):
     assert job.screenshots_created == 0
     assert job.screenshots_total == -1
 
+@pytest.mark.parametrize('workers, default_workers, exp_workers', ((None, 3, 3), (5, 3, 5)))
+def test_ScreenshotsJob_initialize_workers(workers, default_workers, exp_workers, tmp_path, mocker):
+    DaemonProcess_mock = mocker.patch('upsies.utils.daemon.DaemonProcess')
+    mocker.patch('upsies.jobs.screenshots.default_workers', default_workers)
+    ScreenshotsJob(
+        home_directory=tmp_path,
+        cache_directory=tmp_path,
+        content_path='some/path',
+        workers=workers,
+    )
+    assert DaemonProcess_mock.call_args_list[0].kwargs['kwargs']['workers'] == exp_workers
+
+@pytest.mark.parametrize('in_memory, default_in_memory, exp_in_memory', ((None, True, True), (False, True, False)))
+def test_ScreenshotsJob_initialize_in_memory(in_memory, default_in_memory, exp_in_memory, tmp_path, mocker):
+    DaemonProcess_mock = mocker.patch('upsies.utils.daemon.DaemonProcess')
+    mocker.patch('upsies.jobs.screenshots.default_in_memory', default_in_memory)
+    ScreenshotsJob(
+        home_directory=tmp_path,
+        cache_directory=tmp_path,
+        content_path='some/path',
+        in_memory=in_memory,
+    )
+    assert DaemonProcess_mock.call_args_list[0].kwargs['kwargs']['in_memory'] is exp_in_memory
+
 
 def test_ScreenshotsJob_execute(job, tmp_path):
     assert job._screenshots_process.start.call_args_list == []
@@ -403,6 +841,19 @@ def test_ScreenshotsJob_handle_info_sends_screenshot_paths(job):
     job._handle_info(('screenshot', 'path/to/baz.png'))
     assert job.output == ('path/to/foo.png', 'path/to/bar.png', 'path/to/baz.png')
 
+def test_ScreenshotsJob_handle_info_sends_warning(job):
+    job._handle_info(('warning', 'Not avoiding blank frames: Missing dependency: numpy'))
+    assert job.warnings == ('Not avoiding blank frames: Missing dependency: numpy',)
+
+def test_ScreenshotsJob_handle_info_emits_screenshot_signal(job):
+    cb = Mock()
+    job.signal.register('screenshot', cb)
+    buffer = image.ImageBuffer(b'png data', 'foo.png')
+    job._handle_info(('screenshot', 'path/to/bar.png'))
+    job._handle_info(('screenshot', buffer))
+    assert cb.call_args_list == [call('path/to/bar.png'), call(buffer)]
+    assert job.output == ('path/to/bar.png', 'foo.png')
+
 
 def test_ScreenshotsJob_handle_error_with_exception(job):
     assert job.raised is None
@@ -15,6 +15,9 @@ def test_defaults():
         'screenshots' : 2,
         'add-to'      : '',
         'copy-to'     : '',
+        'private'     : 'yes',
+        'piece_size_min' : 16384,
+        'piece_size_max' : 16777216,
         'exclude'     : [
             r'\.(?i:nfo|txt|jpg|jpeg|png|sfv|md5)$',
             r'/(?i:sample|extra|bonus|feature)',
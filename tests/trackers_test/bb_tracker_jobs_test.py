@@ -1502,7 +1502,7 @@ async def test_get_resized_poster_url_fails_to_get_poster_file(bb_tracker_jobs,
     error_mock = mocker.patch.object(bb_tracker_jobs, 'error')
     resize_mock = mocker.patch('upsies.utils.image.resize', return_value='path/to/resized.jpg')
     upload_mock = mocker.patch.object(bb_tracker_jobs.image_host, 'upload', AsyncMock(return_value='http://real.poster.jpg'))
-    poster_job = Mock(home_directory='path/to/job')
+    poster_job = Mock(home_directory='path/to/job', cache_directory='path/to/cache')
     poster_url_getter = AsyncMock()
     poster_url = await bb_tracker_jobs.get_resized_poster_url(poster_job, poster_url_getter)
     assert poster_url is None
@@ -1517,12 +1517,12 @@ async def test_get_resized_poster_url_fails_to_resize_poster(bb_tracker_jobs, mo
     error_mock = mocker.patch.object(bb_tracker_jobs, 'error')
     resize_mock = mocker.patch('upsies.utils.image.resize', side_effect=errors.ImageResizeError('No resize!'))
     upload_mock = mocker.patch.object(bb_tracker_jobs.image_host, 'upload', AsyncMock(return_value='http://real.poster.jpg'))
-    poster_job = Mock(home_directory='path/to/job')
+    poster_job = Mock(home_directory='path/to/job', cache_directory='path/to/cache')
     poster_url_getter = AsyncMock()
     poster_url = await bb_tracker_jobs.get_resized_poster_url(poster_job, poster_url_getter)
     assert poster_url is None
     assert get_poster_file_mock.call_args_list == [call(poster_job, poster_url_getter)]
-    assert resize_mock.call_args_list == [call('poster/path.jpg', width=300)]
+    assert resize_mock.call_args_list == [call('poster/path.jpg', width=300, cache_directory='path/to/cache')]
     assert upload_mock.call_args_list == []
     assert error_mock.call_args_list == [call('Poster resizing failed: No resize!')]
 
@@ -1532,12 +1532,12 @@ async def test_get_resized_poster_url_fails_to_reupload_poster(bb_tracker_jobs,
     error_mock = mocker.patch.object(bb_tracker_jobs, 'error')
     resize_mock = mocker.patch('upsies.utils.image.resize', return_value='path/to/resized.jpg')
     upload_mock = mocker.patch.object(bb_tracker_jobs.image_host, 'upload', AsyncMock(side_effect=errors.RequestError('nope')))
-    poster_job = Mock(home_directory='path/to/job')
+    poster_job = Mock(home_directory='path/to/job', cache_directory='path/to/cache')
     poster_url_getter = AsyncMock()
     poster_url = await bb_tracker_jobs.get_resized_poster_url(poster_job, poster_url_getter)
     assert poster_url is None
     assert get_poster_file_mock.call_args_list == [call(poster_job, poster_url_getter)]
-    assert resize_mock.call_args_list == [call('poster/path.jpg', width=300)]
+    assert resize_mock.call_args_list == [call('poster/path.jpg', width=300, cache_directory='path/to/cache')]
     assert upload_mock.call_args_list == [call('path/to/resized.jpg')]
     assert error_mock.call_args_list == [call('Poster upload failed: nope')]
 
@@ -1547,12 +1547,12 @@ async def test_get_resized_poster_url_succeeds(bb_tracker_jobs, mocker):
     error_mock = mocker.patch.object(bb_tracker_jobs, 'error')
     resize_mock = mocker.patch('upsies.utils.image.resize', return_value='path/to/resized.jpg')
     upload_mock = mocker.patch.object(bb_tracker_jobs.image_host, 'upload', AsyncMock(return_value='http://real.poster.jpg'))
-    poster_job = Mock(home_directory='path/to/job')
+    poster_job = Mock(home_directory='path/to/job', cache_directory='path/to/cache')
     poster_url_getter = AsyncMock()
     poster_url = await bb_tracker_jobs.get_resized_poster_url(poster_job, poster_url_getter)
     assert poster_url == 'http://real.poster.jpg'
     assert get_poster_file_mock.call_args_list == [call(poster_job, poster_url_getter)]
-    assert resize_mock.call_args_list == [call('poster/path.jpg', width=300)]
+    assert resize_mock.call_args_list == [call('poster/path.jpg', width=300, cache_directory='path/to/cache')]
     assert upload_mock.call_args_list == [call('path/to/resized.jpg')]
     assert error_mock.call_args_list == []
 
@@ -2144,47 +2144,15 @@ async def test_format_description_runtime_for_episode(bb_tracker_jobs, mocker):
     assert duration_mock.call_args_list == [call('path/to/content')]
 
 @pytest.mark.asyncio
-async def test_format_description_runtime_for_season_with_few_episodes(bb_tracker_jobs, mocker, tmp_path):
+async def test_format_description_runtime_for_season(bb_tracker_jobs, mocker):
     mocker.patch.object(type(bb_tracker_jobs), 'is_movie_release', PropertyMock(return_value=False))
     mocker.patch.object(type(bb_tracker_jobs), 'is_episode_release', PropertyMock(return_value=False))
     mocker.patch.object(type(bb_tracker_jobs), 'is_season_release', PropertyMock(return_value=True))
-    content_path = tmp_path / 'content'
-    content_path.mkdir()
-    (content_path / 'episode 1.mkv').write_bytes(b'episode 1 data')
-    (content_path / 'episode 2.mkv').write_bytes(b'episode 2 data')
-    (content_path / 'content.nfo').write_bytes(b'text')
-    mocker.patch.object(type(bb_tracker_jobs), 'content_path', PropertyMock(return_value=str(content_path)))
-    duration_mock = mocker.patch('upsies.utils.video.duration', side_effect=(80, 100))
-    text = await bb_tracker_jobs.format_description_runtime()
-    assert text == '[b]Runtime[/b]: 0:01:30'
-    assert duration_mock.call_args_list == [
-        call(str(content_path / 'episode 1.mkv')),
-        call(str(content_path / 'episode 2.mkv')),
-    ]
-
-@pytest.mark.asyncio
-async def test_format_description_runtime_for_season_with_many_episodes(bb_tracker_jobs, mocker, tmp_path):
-    mocker.patch.object(type(bb_tracker_jobs), 'is_movie_release', PropertyMock(return_value=False))
-    mocker.patch.object(type(bb_tracker_jobs), 'is_episode_release', PropertyMock(return_value=False))
-    mocker.patch.object(type(bb_tracker_jobs), 'is_season_release', PropertyMock(return_value=True))
-    content_path = tmp_path / 'content'
-    content_path.mkdir()
-    (content_path / 'episode 1.mkv').write_bytes(b'episode 1 data')
-    (content_path / 'episode 2.mkv').write_bytes(b'episode 2 data')
-    (content_path / 'episode 3.mkv').write_bytes(b'episode 3 data')
-    (content_path / 'episode 4.mkv').write_bytes(b'episode 4 data')
-    (content_path / 'episode 5.mkv').write_bytes(b'episode 5 data')
-    (content_path / 'episode 6.mkv').write_bytes(b'episode 6 data')
-    (content_path / 'content.nfo').write_bytes(b'text')
-    mocker.patch.object(type(bb_tracker_jobs), 'content_path', PropertyMock(return_value=str(content_path)))
-    duration_mock = mocker.patch('upsies.utils.video.duration', side_effect=(80, 105, 115))
+    mocker.patch.object(type(bb_tracker_jobs), 'content_path', PropertyMock(return_value='path/to/content'))
+    season_info_mock = mocker.patch('upsies.utils.video.season_info', return_value=Mock(runtime=100))
     text = await bb_tracker_jobs.format_description_runtime()
     assert text == '[b]Runtime[/b]: 0:01:40'
-    assert duration_mock.call_args_list == [
-        call(str(content_path / 'episode 2.mkv')),
-        call(str(content_path / 'episode 3.mkv')),
-        call(str(content_path / 'episode 4.mkv')),
-    ]
+    assert season_info_mock.call_args_list == [call('path/to/content')]
 
 @pytest.mark.asyncio
 async def test_format_description_runtime_for_unknown_type(bb_tracker_jobs, mocker):
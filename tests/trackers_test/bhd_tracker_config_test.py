@@ -20,6 +20,9 @@ def test_defaults():
             options=(client.name for client in btclients.clients()),
         ),
         'copy-to'          : '',
+        'private'          : types.Bool('yes'),
+        'piece_size_min'   : types.Bytes('16 KiB'),
+        'piece_size_max'   : types.Bytes('16 MiB'),
         'exclude'          : [
             r'\.(?i:nfo|txt|jpg|jpeg|png|sfv|md5)$',
             r'/(?i:sample)',
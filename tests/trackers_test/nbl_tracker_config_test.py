@@ -13,4 +13,7 @@ def test_defaults():
         'image_host' : '',
         'add-to'     : '',
         'copy-to'    : '',
+        'private'    : 'yes',
+        'piece_size_min' : 16384,
+        'piece_size_max' : 16777216,
     }
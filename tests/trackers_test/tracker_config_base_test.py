@@ -15,6 +15,9 @@ def test_no_arguments():
         'exclude': [],
         'add-to': '',
         'copy-to': '',
+        'private': 'yes',
+        'piece_size_min': 16384,
+        'piece_size_max': 16777216,
         'foo': '1',
         'bar': '',
         'baz': 'asdf',
@@ -33,6 +36,9 @@ def test_arguments_overload_defaults():
         'exclude': [],
         'add-to': '',
         'copy-to': '',
+        'private': 'yes',
+        'piece_size_min': 16384,
+        'piece_size_max': 16777216,
         'foo': '2',
         'bar': 'hello',
         'baz': 'asdf',
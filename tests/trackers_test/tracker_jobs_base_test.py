@@ -439,7 +439,7 @@ def test_upload_screenshots_job_with_image_host_argument(mocker):
     # ScreenshotsJob also registers a callback for "timestamps", but that
     # doesn't concern us
     assert tracker_jobs.screenshots_job.signal.register.call_args_list[-2:] == [
-        call('output', tracker_jobs.upload_screenshots_job.enqueue),
+        call('screenshot', tracker_jobs.upload_screenshots_job.enqueue),
         call('finished', tracker_jobs.finalize_upload_screenshots_job),
     ]
 
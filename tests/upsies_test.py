@@ -0,0 +1,45 @@
+import os
+
+from upsies import application_shutdown
+
+
+def make_config(tmp_path):
+    return {
+        'config': {
+            'main': {
+                'cache_directory': str(tmp_path / 'cache'),
+                'max_cache_size': 100,
+                'screenshot_store_directory': str(tmp_path / 'store'),
+                'max_screenshot_store_size': 1000,
+            },
+        },
+    }
+
+
+def test_application_shutdown_does_not_prune_screenshot_store_with_cache(tmp_path, mocker):
+    mocker.patch('upsies.utils.http.close')
+    mocker.patch('upsies.utils.daemon.shutdown')
+    mocker.patch('upsies.utils.subproc.governor')
+    (tmp_path / 'cache').mkdir()
+    (tmp_path / 'cache' / 'old').write_text('_' * 200)
+    (tmp_path / 'store' / 'ab').mkdir(parents=True)
+    (tmp_path / 'store' / 'ab' / 'screenshot.png').write_text('_' * 500)
+
+    application_shutdown(make_config(tmp_path))
+
+    assert not os.path.exists(tmp_path / 'cache' / 'old')
+    assert os.listdir(tmp_path / 'store' / 'ab') == ['screenshot.png']
+
+
+def test_application_shutdown_limits_screenshot_store_size(tmp_path, mocker):
+    mocker.patch('upsies.utils.http.close')
+    mocker.patch('upsies.utils.daemon.shutdown')
+    mocker.patch('upsies.utils.subproc.governor')
+    (tmp_path / 'store').mkdir()
+    for i, name in enumerate(('a.png', 'b.png', 'c.png')):
+        (tmp_path / 'store' / name).write_text('_' * 400)
+        os.utime(tmp_path / 'store' / name, (1000 + i, 1000 + i))
+
+    application_shutdown(make_config(tmp_path))
+
+    assert sorted(os.listdir(tmp_path / 'store')) == ['b.png', 'c.png']
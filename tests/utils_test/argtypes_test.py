@@ -69,6 +69,26 @@ def test_integer_invalid_value(value):
         argtypes.integer(value)
 
 
+@pytest.mark.parametrize('value, exp_value', (('0.1', 0.1), (1, 1.0), ('50', 50.0), ('100', 100.0)))
+def test_percentage_valid_value(value, exp_value):
+    assert argtypes.percentage(value) == exp_value
+
+@pytest.mark.parametrize(
+    argnames='value, exp_msg',
+    argvalues=(
+        ('one', 'Not a number'),
+        ((1, 2), 'Not a number'),
+        ('0', 'Not a percentage'),
+        ('-1', 'Not a percentage'),
+        ('100.1', 'Not a percentage'),
+    ),
+    ids=lambda v: repr(v),
+)
+def test_percentage_invalid_value(value, exp_msg):
+    with pytest.raises(argparse.ArgumentTypeError, match=rf'^{exp_msg}: {re.escape(repr(value))}$'):
+        argtypes.percentage(value)
+
+
 @pytest.mark.parametrize('option', defaults.option_paths())
 def test_option_valid_value(option):
     assert argtypes.option(option) == option
@@ -5,6 +5,7 @@ from unittest.mock import Mock, call
 
 import pytest
 
+from upsies.utils import daemon, subproc
 from upsies.utils.daemon import DaemonProcess, MsgType
 
 # DaemonProcess targets must be picklable and nested functions aren't.
@@ -44,6 +45,25 @@ def target_never_terminating(output_queue, input_queue):
 
         time.sleep(1)
 
+def target_ignoring_termination(output_queue, input_queue):
+    output_queue.put((MsgType.info, 'something'))
+    while True:
+        time.sleep(1)
+
+def target_running_subprocess(output_queue, input_queue, pid_file):
+    output_queue.put((MsgType.info, 'something'))
+    subproc.run(['sh', '-c', f'sleep 30 & echo $! > {pid_file}; wait'])
+    output_queue.put((MsgType.info, 'subprocess finished'))
+
+def target_reporting_governor(output_queue, input_queue):
+    # Parent process holds the only "io" slot
+    _, semaphore = subproc.governor._semaphores['io']
+    output_queue.put((MsgType.result, (
+        subproc.governor.slots,
+        subproc.governor.timeouts,
+        semaphore.acquire(block=False),
+    )))
+
 def target_taking_arguments(output_queue, input_queue, foo, bar, *, baz):
     output_queue.put((MsgType.info, foo))
     output_queue.put((MsgType.info, bar))
@@ -141,6 +161,21 @@ async def test_target_sends_to_result_callback():
     assert result_callback.call_args_list == [call('foo')]
 
 
+@pytest.mark.asyncio
+async def test_target_shares_subprocess_slots_with_parent_process(mocker):
+    governor = subproc.Governor(slots={'cpu': 3, 'io': 1}, timeouts={'io': 60})
+    mocker.patch.object(subproc, 'governor', governor)
+    result_callback = Mock()
+    proc = DaemonProcess(
+        target=target_reporting_governor,
+        result_callback=result_callback,
+    )
+    with governor.slot('io'):
+        proc.start()
+        await proc.join()
+    assert result_callback.call_args_list == [call(({'cpu': 3, 'io': 1}, {'io': 60.0}, False))]
+
+
 @pytest.mark.parametrize(
     argnames='target',
     argvalues=(
@@ -184,6 +219,72 @@ async def test_stop_sends_termination_signal_to_running_process():
     assert info_callback.call_args_list == [call('something')]
 
 
+@pytest.mark.parametrize(
+    argnames='target, exp_info',
+    argvalues=(
+        (target_never_terminating, ['something']),
+        (target_ignoring_termination, ['something']),
+    ),
+)
+@pytest.mark.asyncio
+async def test_shutdown_terminates_processes_after_deadline(target, exp_info):
+    info_callback = Mock()
+    error_callback = Mock()
+    proc = DaemonProcess(
+        target=target,
+        info_callback=info_callback,
+        error_callback=error_callback,
+    )
+    proc.start()
+    await asyncio.sleep(1)
+    assert proc.is_alive
+    start = time.monotonic()
+    daemon.shutdown(deadline=0.5)
+    assert time.monotonic() - start < 0.5 + daemon._TERMINATE_TIMEOUT + 0.5
+    assert not proc.is_alive
+    await proc.join()
+    assert info_callback.call_args_list == [call(e) for e in exp_info]
+    assert error_callback.call_args_list == []
+
+@pytest.mark.asyncio
+async def test_shutdown_kills_subprocesses(tmp_path):
+    pid_file = tmp_path / 'pid'
+    info_callback = Mock()
+    error_callback = Mock()
+    proc = DaemonProcess(
+        target=target_running_subprocess,
+        kwargs={'pid_file': str(pid_file)},
+        info_callback=info_callback,
+        error_callback=error_callback,
+    )
+    proc.start()
+    while not pid_file.exists() or not pid_file.read_text().strip():
+        await asyncio.sleep(0.01)
+    daemon.shutdown(deadline=0)
+    assert not proc.is_alive
+    await proc.join()
+    assert info_callback.call_args_list == [call('something')]
+    assert error_callback.call_args_list == []
+
+    # Grandchild process is dead or a zombie
+    pid = int(pid_file.read_text())
+    for _ in range(100):
+        try:
+            with open(f'/proc/{pid}/stat') as f:
+                state = f.read().rsplit(')', 1)[1].split()[0]
+        except FileNotFoundError:
+            break
+        else:
+            if state == 'Z':
+                break
+        await asyncio.sleep(0.01)
+    else:
+        raise AssertionError(f'Process is still running: {pid}')
+
+def test_shutdown_without_running_processes():
+    daemon.shutdown(deadline=0)
+
+
 @pytest.mark.asyncio
 async def test_is_alive_property():
     proc = DaemonProcess(
@@ -198,6 +198,13 @@ def test_limit_directory_size(tmp_path):
     )
     assert get_total_size() == 2
 
+def test_limit_directory_size_counts_hard_links_once(tmp_path):
+    (tmp_path / 'a').write_text('_' * 100)
+    os.link(tmp_path / 'a', tmp_path / 'b')
+    (tmp_path / 'c').write_text('_' * 50)
+    fs.limit_directory_size(tmp_path, max_total_size=150)
+    assert sorted(os.listdir(tmp_path)) == ['a', 'b', 'c']
+
 def test_limit_directory_size_with_nonexisting_path(tmp_path):
     fs.limit_directory_size(tmp_path / 'does' / 'not' / 'exist', max_total_size=123)
     assert not os.path.exists(tmp_path / 'does' / 'not' / 'exist')
@@ -427,6 +434,30 @@ def test_file_size_of_nonexisting_file():
     assert fs.file_size('path/to/nothing') is None
 
 
+def test_file_fingerprint_ignores_path(tmp_path):
+    filepath = tmp_path / 'file'
+    filepath.write_bytes(b'foo' * 1000)
+    os.utime(filepath, ns=(123, 456))
+    fingerprint = fs.file_fingerprint(filepath, chunk_size=100)
+    assert fingerprint.startswith('3000-456-')
+    filepath.rename(tmp_path / 'renamed')
+    assert fs.file_fingerprint(tmp_path / 'renamed', chunk_size=100) == fingerprint
+
+def test_file_fingerprint_changes_with_content(tmp_path):
+    filepath = tmp_path / 'file'
+    filepath.write_bytes(b'a' * 1000)
+    os.utime(filepath, ns=(123, 456))
+    fingerprint = fs.file_fingerprint(filepath, chunk_size=100)
+    filepath.write_bytes(b'a' * 999 + b'b')
+    os.utime(filepath, ns=(123, 456))
+    assert fs.file_fingerprint(filepath, chunk_size=100) != fingerprint
+
+def test_file_fingerprint_of_nonexisting_file(tmp_path):
+    filepath = tmp_path / 'file'
+    with pytest.raises(errors.ContentError, match=rf'^{filepath}: No such file or directory$'):
+        fs.file_fingerprint(filepath)
+
+
 def test_file_list_recurses_into_subdirectories(tmp_path):
     (tmp_path / 'a.txt').write_bytes(b'foo')
     (tmp_path / 'a').mkdir()
@@ -736,6 +736,19 @@ def test_open_files_opens_files(mocker):
     assert_opened('h', 'kangaroo', b'in-memory data3', None)
     assert_opened('i', 'kangaroo', b'in-memory data4')
 
+def test_open_files_accepts_file_objects(mocker):
+    named = io.BytesIO(b'named data')
+    named.name = 'path/to/foo.png'
+    opened_files = http._open_files({
+        'a': named,
+        'b': io.BytesIO(b'anonymous data'),
+    })
+    assert opened_files == {
+        'a': ('foo.png', named),
+        'b': (None, opened_files['b'][1]),
+    }
+    assert opened_files['b'][1].read() == b'anonymous data'
+
 def test_open_files_catches_invalid_file_value(mocker):
     mocker.patch('upsies.utils.http._get_file_object', return_value='mock file object')
     with pytest.raises(RuntimeError, match=r'^Invalid "file" value in fileinfo: \[1, 2, 3\]$'):
@@ -0,0 +1,134 @@
+import hashlib
+import sys
+from unittest.mock import call
+
+import pytest
+
+from upsies import errors
+from upsies.utils import image
+
+
+@pytest.mark.parametrize(
+    argnames='image_format, quality, exp_encoder_args',
+    argvalues=(
+        ('jpeg', 100, ('-q:v', '2')),
+        ('jpeg', 1, ('-q:v', '31')),
+        ('jpeg', 90, ('-q:v', '5')),
+        ('webp', 90, ('-c:v', 'libwebp', '-lossless', '1')),
+        ('png', 90, ()),
+    ),
+    ids=lambda v: str(v),
+)
+def test_make_convert_cmd(image_format, quality, exp_encoder_args):
+    cmd = image._make_convert_cmd('a.png', image_format, quality, 'out_%f.img')
+    assert cmd == (
+        image._ffmpeg_executable(), '-y', '-loglevel', 'level+error', '-i', 'file:a.png',
+        *exp_encoder_args,
+        'file:out_%%f.img',
+    )
+
+
+def test_convert_with_unsupported_format(tmp_path):
+    with pytest.raises(errors.ImageConvertError, match=r'^Unsupported image format: gif$'):
+        image.convert('a.png', 'gif', tmp_path)
+
+@pytest.mark.parametrize(
+    argnames='image_file, image_format',
+    argvalues=(
+        ('a.png', 'png'),
+        ('a.JPG', 'jpeg'),
+        ('a.jpeg', 'jpeg'),
+        ('a.webp', 'webp'),
+        (image.ImageBuffer(b'data', 'a.webp'), 'webp'),
+    ),
+    ids=lambda v: str(v),
+)
+def test_convert_returns_image_with_same_format(image_file, image_format, tmp_path, mocker):
+    run_mock = mocker.patch('upsies.utils.subproc.run')
+    assert image.convert(image_file, image_format, tmp_path) is image_file
+    assert run_mock.call_args_list == []
+
+def test_convert_with_unreadable_file(tmp_path):
+    with pytest.raises(errors.ImageConvertError, match=rf'^{tmp_path / "a.png"}: No such file or directory$'):
+        image.convert(str(tmp_path / 'a.png'), 'webp', tmp_path)
+
+@pytest.mark.parametrize(
+    argnames='image_format, quality, exp_filename',
+    argvalues=(
+        ('jpeg', 85, '{digest}.quality=85.jpg'),
+        ('webp', 85, '{digest}.lossless.webp'),
+    ),
+)
+def test_convert_caches_converted_images(image_format, quality, exp_filename, tmp_path, mocker):
+    def convert_with_pillow(image_file, image_format, quality, target):
+        with open(target, 'wb') as f:
+            f.write(f'{image_format} {quality}'.encode('ascii'))
+        return True
+
+    convert_mock = mocker.patch('upsies.utils.image._convert_with_pillow', side_effect=convert_with_pillow)
+    image_file = tmp_path / 'a.png'
+    image_file.write_bytes(b'image data')
+    cache_directory = tmp_path / 'cache'
+    exp_converted_file = str(cache_directory / exp_filename.format(
+        digest=hashlib.sha256(b'image data').hexdigest(),
+    ))
+    for _ in range(3):
+        converted_file = image.convert(str(image_file), image_format, str(cache_directory), quality=quality)
+        assert converted_file == exp_converted_file
+        assert open(converted_file, 'rb').read() == f'{image_format} {quality}'.encode('ascii')
+    assert len(convert_mock.call_args_list) == 1
+    assert sorted(p.name for p in cache_directory.iterdir()) == [exp_converted_file.split('/')[-1]]
+
+def test_convert_falls_back_to_ffmpeg_without_pillow(mocker, tmp_path):
+    mocker.patch.dict(sys.modules, {'PIL': None})
+
+    def run(cmd, **kwargs):
+        with open(cmd[-1][len('file:'):], 'wb') as f:
+            f.write(b'webp data')
+        return ''
+
+    run_mock = mocker.patch('upsies.utils.subproc.run', side_effect=run)
+    image_file = tmp_path / 'a.png'
+    image_file.write_bytes(b'image data')
+    digest = hashlib.sha256(b'image data').hexdigest()
+    converted_file = image.convert(str(image_file), 'webp', str(tmp_path))
+    assert converted_file == str(tmp_path / f'{digest}.lossless.webp')
+    assert open(converted_file, 'rb').read() == b'webp data'
+    assert run_mock.call_args_list == [call(
+        image._make_convert_cmd(str(image_file), 'webp', 90, str(tmp_path / f'{digest}.lossless.webp.tmp.webp')),
+        ignore_errors=True, join_stderr=True, resource='cpu',
+    )]
+
+def test_convert_with_failed_ffmpeg_command(mocker, tmp_path):
+    mocker.patch.dict(sys.modules, {'PIL': None})
+    mocker.patch('upsies.utils.subproc.run', return_value='Unknown encoder')
+    image_file = tmp_path / 'a.png'
+    image_file.write_bytes(b'image data')
+    with pytest.raises(errors.ImageConvertError, match=rf'^{image_file}: Failed to convert to webp: Unknown encoder$'):
+        image.convert(str(image_file), 'webp', str(tmp_path))
+
+def test_convert_ImageBuffer_without_pillow(mocker, tmp_path):
+    mocker.patch.dict(sys.modules, {'PIL': None})
+    with pytest.raises(errors.ImageConvertError,
+                       match=r'^a.png: Failed to convert to jpeg: Missing dependency: Pillow$'):
+        image.convert(image.ImageBuffer(b'data', 'a.png'), 'jpeg', str(tmp_path))
+    assert list(tmp_path.iterdir()) == []
+
+@pytest.mark.parametrize(
+    argnames='image_format, exp_name, exp_pillow_format',
+    argvalues=(
+        ('jpeg', 'a.mkv.0:01:00.jpg', 'JPEG'),
+        ('webp', 'a.mkv.0:01:00.webp', 'WEBP'),
+    ),
+)
+def test_convert_ImageBuffer_with_pillow(image_format, exp_name, exp_pillow_format, tmp_path):
+    Image = pytest.importorskip('PIL.Image')
+    buffer = image.ImageBuffer(b'', 'a.mkv.0:01:00.png')
+    Image.new('RGBA', (60, 30), color='red').save(buffer, format='PNG')
+    converted = image.convert(buffer, image_format, str(tmp_path))
+    assert isinstance(converted, image.ImageBuffer)
+    assert converted.name == exp_name
+    with Image.open(converted) as img:
+        assert img.format == exp_pillow_format
+        assert img.size == (60, 30)
+    assert list(tmp_path.iterdir()) == []
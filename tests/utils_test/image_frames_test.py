@@ -0,0 +1,100 @@
+import sys
+
+import pytest
+
+from upsies import errors
+from upsies.utils import image
+
+
+def test_make_frame_analysis_cmd(mocker):
+    mocker.patch('upsies.utils.video.make_ffmpeg_input', return_value='bluray:path/to/video')
+    mocker.patch('upsies.utils.image._FRAME_ANALYSIS_SIZE', (16, 9))
+    cmd = image._make_frame_analysis_cmd('path/to/video', (0, 95), 11)
+    assert cmd == (
+        image._ffmpeg_executable(), '-loglevel', 'level+error',
+        '-ss', '0', '-t', '11', '-i', 'bluray:path/to/video',
+        '-ss', '95', '-t', '11', '-i', 'bluray:path/to/video',
+        '-filter_complex', (
+            '[0:v:0]fps=1,scale=16:9,setsar=1/1,format=gray,'
+            'tpad=stop=11:stop_mode=clone,trim=end_frame=11,setpts=PTS-STARTPTS[v0];'
+            '[1:v:0]fps=1,scale=16:9,setsar=1/1,format=gray,'
+            'tpad=stop=11:stop_mode=clone,trim=end_frame=11,setpts=PTS-STARTPTS[v1];'
+            '[v0][v1]concat=n=2:v=1:a=0[frames]'
+        ),
+        '-map', '[frames]', '-r', '1', '-f', 'rawvideo', '-pix_fmt', 'gray', 'pipe:1',
+    )
+
+
+def test_best_frames_without_numpy(mocker):
+    mocker.patch.dict(sys.modules, {'numpy': None})
+    run_mock = mocker.patch('upsies.utils.subproc.run')
+    with pytest.raises(errors.DependencyError, match=r'^Missing dependency: numpy$'):
+        image.best_frames('foo.mkv', (10, 20))
+    assert run_mock.call_args_list == []
+
+
+def _make_frames(numpy, count, blank=()):
+    # Return `count` frames; frames with an index in `blank` are black and the
+    # others get more detailed with increasing index
+    width, height = image._FRAME_ANALYSIS_SIZE
+    frames = []
+    for i in range(count):
+        if i in blank:
+            frame = numpy.zeros((height, width), dtype=numpy.uint8)
+        else:
+            rng = numpy.random.default_rng(i)
+            noise = rng.integers(0, 20 * (i + 1), size=(height, width))
+            frame = numpy.clip(100 + noise, 0, 255).astype(numpy.uint8)
+        frames.append(frame)
+    return numpy.stack(frames)
+
+def test_score_frames_rejects_blank_frames():
+    numpy = pytest.importorskip('numpy')
+    width, height = image._FRAME_ANALYSIS_SIZE
+    black = numpy.zeros((height, width), dtype=numpy.uint8)
+    white = numpy.full((height, width), 255, dtype=numpy.uint8)
+    flat = numpy.full((height, width), 128, dtype=numpy.uint8)
+    detailed = _make_frames(numpy, 3)[2]
+    scores = image._score_frames(numpy.stack((black, white, flat, detailed)))
+    assert list(scores[:3]) == [-1, -1, -1]
+    assert scores[3] > 0
+
+def test_best_frames_picks_most_detailed_frame(mocker):
+    numpy = pytest.importorskip('numpy')
+    mocker.patch('upsies.utils.fs.assert_file_readable')
+    mocker.patch('upsies.utils.video.duration', return_value=3600)
+    frames = numpy.concatenate((
+        # Frames around 0:10:00, the most detailed frame is the last one
+        _make_frames(numpy, 5),
+        # Frames around 0:20:00, only blank frames
+        _make_frames(numpy, 5, blank=range(5)),
+    ))
+    run_mock = mocker.patch('upsies.utils.subproc.run', return_value=frames.tobytes())
+    assert image.best_frames('foo.mkv', (600, 1200.7), radius=2) == [602, 1200]
+    assert run_mock.call_args_list == [mocker.call(
+        image._make_frame_analysis_cmd('foo.mkv', (598, 1198), 5),
+        binary=True, resource='cpu',
+    )]
+
+def test_best_frames_ignores_frames_after_video_end(mocker):
+    numpy = pytest.importorskip('numpy')
+    mocker.patch('upsies.utils.fs.assert_file_readable')
+    mocker.patch('upsies.utils.video.duration', return_value=601)
+    frames = _make_frames(numpy, 5, blank=(2,))
+    mocker.patch('upsies.utils.subproc.run', return_value=frames.tobytes())
+    assert image.best_frames('foo.mkv', (600,), radius=2) == [599]
+
+@pytest.mark.parametrize(
+    argnames='run_kwargs, exp_error',
+    argvalues=(
+        ({'side_effect': errors.ProcessError('Invalid data')}, 'Invalid data'),
+        ({'return_value': b'\x00' * 10}, 'Expected 72000 bytes, got 10'),
+    ),
+)
+def test_best_frames_fails_to_analyze_frames(run_kwargs, exp_error, mocker):
+    pytest.importorskip('numpy')
+    mocker.patch('upsies.utils.fs.assert_file_readable')
+    mocker.patch('upsies.utils.video.duration', return_value=3600)
+    mocker.patch('upsies.utils.subproc.run', **run_kwargs)
+    with pytest.raises(errors.ScreenshotError, match=rf'^foo.mkv: Failed to analyze frames: {exp_error}$'):
+        image.best_frames('foo.mkv', (600,), radius=2)
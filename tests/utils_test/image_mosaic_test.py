@@ -0,0 +1,74 @@
+from unittest.mock import call
+
+import pytest
+
+from upsies import errors
+from upsies.utils import image
+
+
+def test_make_mosaic_cmd(mocker):
+    mocker.patch('upsies.utils.video.make_ffmpeg_input', return_value='bluray:path/to/video')
+    cmd = image._make_mosaic_cmd('path/to/video', '100%.png', columns=4, rows=3, tile_width=320, interval=30)
+    assert cmd == (
+        image._ffmpeg_executable(), '-y', '-loglevel', 'level+error',
+        '-skip_frame', 'nokey',
+        '-i', 'bluray:path/to/video',
+        '-map', '0:v:0',
+        '-vf', (
+            "select='gte(t,15.000)*(isnan(prev_selected_t)+gte(t-prev_selected_t,30.000))',"
+            'scale=320:trunc(ow/dar/2)*2,'
+            'setsar=1/1,'
+            'tile=4x3:padding=4:margin=4'
+        ),
+        '-frames:v', '1',
+        'file:100%%.png',
+    )
+
+
+def test_mosaic_runs_single_ffmpeg_process(tmp_path, mocker):
+    mocker.patch('upsies.utils.fs.assert_file_readable')
+    mocker.patch('upsies.utils.video.duration', return_value=3600)
+    mosaic_file = tmp_path / 'mosaic.png'
+
+    def run(cmd, **kwargs):
+        mosaic_file.write_bytes(b'data')
+        return ''
+
+    run_mock = mocker.patch('upsies.utils.subproc.run', side_effect=run)
+    assert image.mosaic('foo.mkv', str(mosaic_file), columns=3, rows=4, tile_width=200) == str(mosaic_file)
+    assert run_mock.call_args_list == [call(
+        image._make_mosaic_cmd('foo.mkv', str(mosaic_file), columns=3, rows=4, tile_width=200, interval=300),
+        ignore_errors=True, join_stderr=True, resource='cpu',
+    )]
+
+def test_mosaic_does_not_overwrite_existing_file(tmp_path, mocker):
+    mocker.patch('upsies.utils.fs.assert_file_readable')
+    run_mock = mocker.patch('upsies.utils.subproc.run')
+    mosaic_file = tmp_path / 'mosaic.png'
+    mosaic_file.write_bytes(b'data')
+    assert image.mosaic('foo.mkv', str(mosaic_file)) == str(mosaic_file)
+    assert run_mock.call_args_list == []
+
+def test_mosaic_overwrites_existing_file_on_request(tmp_path, mocker):
+    mocker.patch('upsies.utils.fs.assert_file_readable')
+    mocker.patch('upsies.utils.video.duration', return_value=3600)
+    run_mock = mocker.patch('upsies.utils.subproc.run')
+    mosaic_file = tmp_path / 'mosaic.png'
+    mosaic_file.write_bytes(b'data')
+    assert image.mosaic('foo.mkv', str(mosaic_file), overwrite=True) == str(mosaic_file)
+    assert len(run_mock.call_args_list) == 1
+
+def test_mosaic_fails_to_get_duration(tmp_path, mocker):
+    mocker.patch('upsies.utils.fs.assert_file_readable')
+    mocker.patch('upsies.utils.video.duration', side_effect=errors.ContentError('foo.mkv: Not a video file'))
+    run_mock = mocker.patch('upsies.utils.subproc.run')
+    with pytest.raises(errors.ScreenshotError, match=r'^foo.mkv: Not a video file$'):
+        image.mosaic('foo.mkv', str(tmp_path / 'mosaic.png'))
+    assert run_mock.call_args_list == []
+
+def test_mosaic_fails_to_create_mosaic(tmp_path, mocker):
+    mocker.patch('upsies.utils.fs.assert_file_readable')
+    mocker.patch('upsies.utils.video.duration', return_value=3600)
+    mocker.patch('upsies.utils.subproc.run', return_value='Invalid data')
+    with pytest.raises(errors.ScreenshotError, match=r'^foo.mkv: Failed to create mosaic: Invalid data$'):
+        image.mosaic('foo.mkv', str(tmp_path / 'mosaic.png'))
@@ -0,0 +1,85 @@
+import hashlib
+import os
+import struct
+import zlib
+
+import pytest
+
+from upsies import errors
+from upsies.utils import image
+
+
+def make_chunk(chunk_type, chunk_data):
+    return (struct.pack('>I', len(chunk_data)) + chunk_type + chunk_data
+            + struct.pack('>I', zlib.crc32(chunk_type + chunk_data) & 0xffffffff))
+
+def make_png(width=32, height=32, idat_chunks=2):
+    raw = b''.join(b'\x00' + bytes((x * y) % 256 for x in range(width * 3))
+                   for y in range(height))
+    idat = zlib.compress(raw, 0)
+    step = -(-len(idat) // idat_chunks)
+    return (
+        image._PNG_SIGNATURE
+        + make_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+        + make_chunk(b'tEXt', b'Comment\x00foo')
+        + b''.join(make_chunk(b'IDAT', idat[i:i + step]) for i in range(0, len(idat), step))
+        + make_chunk(b'IEND', b'')
+    ), raw
+
+
+def test_optimize_png_is_lossless_and_smaller(tmp_path):
+    data, raw = make_png()
+    image_file = tmp_path / 'foo.png'
+    image_file.write_bytes(data)
+    cache_directory = tmp_path / 'cache'
+    optimized_file = image.optimize_png(str(image_file), str(cache_directory))
+    assert optimized_file == str(cache_directory / (hashlib.sha256(data).hexdigest() + '.optimized.png'))
+
+    optimized_data = open(optimized_file, 'rb').read()
+    assert len(optimized_data) < len(data)
+    chunks = image._read_png_chunks(optimized_data)
+    assert [chunk_type for chunk_type, _ in chunks] == [b'IHDR', b'tEXt', b'IDAT', b'IEND']
+    assert zlib.decompress(chunks[2][1]) == raw
+    assert chunks[1] == (b'tEXt', b'Comment\x00foo')
+
+def test_optimize_png_uses_cached_result(tmp_path, mocker):
+    data, _ = make_png()
+    image_file = tmp_path / 'foo.png'
+    image_file.write_bytes(data)
+    optimize_png_data_spy = mocker.spy(image, '_optimize_png_data')
+    for _ in range(3):
+        image.optimize_png(str(image_file), str(tmp_path / 'cache'))
+    assert optimize_png_data_spy.call_count == 1
+    assert os.listdir(tmp_path / 'cache') == [hashlib.sha256(data).hexdigest() + '.optimized.png']
+
+def test_optimize_png_optimizes_ImageBuffer_in_memory(tmp_path):
+    data, raw = make_png()
+    buffer = image.ImageBuffer(data, 'foo.png')
+    optimized = image.optimize_png(buffer, str(tmp_path / 'cache'))
+    assert isinstance(optimized, image.ImageBuffer)
+    assert optimized.name == 'foo.png'
+    assert len(optimized.getvalue()) < len(data)
+    assert zlib.decompress(image._read_png_chunks(optimized.getvalue())[2][1]) == raw
+    assert not os.path.exists(tmp_path / 'cache')
+
+def test_optimize_png_gets_invalid_ImageBuffer(tmp_path):
+    with pytest.raises(errors.ImageOptimizeError, match=r'^foo.png: Invalid PNG image: Missing PNG signature$'):
+        image.optimize_png(image.ImageBuffer(b'foo', 'foo.png'), str(tmp_path))
+
+def test_optimize_png_gets_nonexisting_file(tmp_path):
+    with pytest.raises(errors.ImageOptimizeError, match=rf'^{tmp_path / "foo.png"}: No such file or directory$'):
+        image.optimize_png(str(tmp_path / 'foo.png'), str(tmp_path / 'cache'))
+
+@pytest.mark.parametrize(
+    argnames='data, exp_error',
+    argvalues=(
+        (b'not a png', 'Missing PNG signature'),
+        (image._PNG_SIGNATURE + b'\x00\x00\x00\xffIDATfoo', 'Truncated chunk'),
+        (image._PNG_SIGNATURE + make_chunk(b'IEND', b''), 'No IDAT chunk'),
+    ),
+)
+def test_optimize_png_gets_invalid_png(data, exp_error, tmp_path):
+    image_file = tmp_path / 'foo.png'
+    image_file.write_bytes(data)
+    with pytest.raises(errors.ImageOptimizeError, match=rf'^{image_file}: Invalid PNG image: {exp_error}$'):
+        image.optimize_png(str(image_file), str(tmp_path / 'cache'))
@@ -1,4 +1,6 @@
+import hashlib
 import os
+import sys
 from unittest.mock import call
 
 import pytest
@@ -89,7 +91,7 @@ def test_resize_with_valid_dimensions(width, height, target_file, extension, moc
     else:
         exp_ffmpeg_cmd = None
     if exp_ffmpeg_cmd:
-        assert run_mock.call_args_list == [call(exp_ffmpeg_cmd, ignore_errors=True, join_stderr=True)]
+        assert run_mock.call_args_list == [call(exp_ffmpeg_cmd, ignore_errors=True, join_stderr=True, resource='cpu')]
     else:
         assert run_mock.call_args_list == []
 
@@ -109,3 +111,92 @@ def test_resize_with_failed_ffmpeg_command(mocker):
     mocker.patch('os.path.exists', return_value=False)
     with pytest.raises(errors.ImageResizeError, match=r'^a.jpg: Failed to resize: The error message$'):
         image.resize('a.jpg', 10, 20)
+
+
+def test_resize_falls_back_to_ffmpeg_without_pillow(mocker, tmp_path):
+    mocker.patch.dict(sys.modules, {'PIL': None})
+    run_mock = mocker.patch('upsies.utils.subproc.run')
+    mocker.patch('os.path.exists', return_value=True)
+    image_file = tmp_path / 'a.jpg'
+    image_file.write_bytes(b'image data')
+    assert image.resize(str(image_file), 10) == str(tmp_path / 'a.width=10.jpg')
+    assert run_mock.call_args_list == [call(
+        image._make_resize_cmd(str(image_file), 'w=10:h=-1', str(tmp_path / 'a.width=10.jpg')),
+        ignore_errors=True, join_stderr=True, resource='cpu',
+    )]
+
+@pytest.mark.parametrize(
+    argnames='width, height, exp_size',
+    argvalues=(
+        (30, None, (30, 15)),
+        (None, 10, (20, 10)),
+        (30, 30, (30, 30)),
+    ),
+)
+@pytest.mark.parametrize('extension', ('png', 'jpg'))
+def test_resize_with_pillow(width, height, exp_size, extension, mocker, tmp_path):
+    Image = pytest.importorskip('PIL.Image')
+    run_mock = mocker.patch('upsies.utils.subproc.run')
+    image_file = tmp_path / f'a.{extension}'
+    Image.new('RGB', (60, 30), color='red').save(image_file)
+    resized_file = image.resize(str(image_file), width, height)
+    assert run_mock.call_args_list == []
+    with Image.open(resized_file) as img:
+        assert img.size == exp_size
+
+def test_resize_with_pillow_does_not_leave_incomplete_files(mocker, tmp_path):
+    Image = pytest.importorskip('PIL.Image')
+    run_mock = mocker.patch('upsies.utils.subproc.run')
+    image_file = tmp_path / 'a.png'
+    Image.new('RGB', (60, 30), color='red').save(image_file)
+
+    def save(self, fp, *args, **kwargs):
+        with open(fp, 'wb') as f:
+            f.write(b'incomplete image data')
+        raise OSError('No space left on device')
+
+    mocker.patch.object(Image.Image, 'save', save)
+    assert image._resize_with_pillow(str(image_file), 30, None, str(tmp_path / 'b.png')) is False
+    assert os.listdir(tmp_path) == ['a.png']
+    assert run_mock.call_args_list == []
+
+def test_resize_falls_back_to_ffmpeg_if_pillow_fails(mocker, tmp_path):
+    pytest.importorskip('PIL')
+    run_mock = mocker.patch('upsies.utils.subproc.run')
+    mocker.patch('os.path.exists', return_value=True)
+    image_file = tmp_path / 'a.jpg'
+    image_file.write_bytes(b'not an image')
+    assert image.resize(str(image_file), 10) == str(tmp_path / 'a.width=10.jpg')
+    assert len(run_mock.call_args_list) == 1
+
+def test_resize_caches_resized_images(mocker, tmp_path):
+    def resize(image_file, width, height, dimensions, target_file):
+        with open(target_file, 'wb') as f:
+            f.write(b'resized ' + open(image_file, 'rb').read())
+        return target_file
+
+    resize_mock = mocker.patch('upsies.utils.image._resize', side_effect=resize)
+    cache_directory = tmp_path / 'cache'
+    image_file = tmp_path / 'a.jpg'
+    image_file.write_bytes(b'image data')
+    exp_cached_file = str(cache_directory / (hashlib.sha256(b'image data').hexdigest() + '.width=10.jpg'))
+    for _ in range(3):
+        assert image.resize(str(image_file), 10, cache_directory=str(cache_directory)) == exp_cached_file
+    assert resize_mock.call_count == 1
+    assert open(exp_cached_file, 'rb').read() == b'resized image data'
+
+    # Identical content at a different path is not resized again
+    other_image_file = tmp_path / 'b.jpg'
+    other_image_file.write_bytes(b'image data')
+    assert image.resize(str(other_image_file), 10, cache_directory=str(cache_directory)) == exp_cached_file
+    assert resize_mock.call_count == 1
+
+    # Different size is resized again
+    assert image.resize(str(image_file), 20, cache_directory=str(cache_directory)) != exp_cached_file
+    assert resize_mock.call_count == 2
+
+    # Cached image is copied to target_file
+    target_file = str(tmp_path / 'target.jpg')
+    assert image.resize(str(image_file), 10, target_file=target_file, cache_directory=str(cache_directory)) == target_file
+    assert open(target_file, 'rb').read() == b'resized image data'
+    assert resize_mock.call_count == 2
@@ -1,5 +1,8 @@
 import os
+import pickle
 import re
+import shutil
+import subprocess
 from unittest.mock import Mock, call, patch
 
 import pytest
@@ -27,10 +30,10 @@ def test_ffmpeg_executable(os, exp_executable, mocker):
     argvalues=(
         ('video.mkv', '123', 'out.png',
          ('-y', '-loglevel', 'level+error', '-ss', '123', '-i', 'video.mkv',
-          '-vframes', '1', '-vf', 'scale=trunc(ih*dar):ih,setsar=1/1', 'file:out.png')),
+          '-vframes', '1', '-vf', 'scale=trunc(ih*dar):ih,setsar=1/1', '-pred', 'mixed', 'file:out.png')),
         ('video.mkv', '123', '100%.png',
          ('-y', '-loglevel', 'level+error', '-ss', '123', '-i', 'video.mkv',
-          '-vframes', '1', '-vf', 'scale=trunc(ih*dar):ih,setsar=1/1', 'file:100%%.png')),
+          '-vframes', '1', '-vf', 'scale=trunc(ih*dar):ih,setsar=1/1', '-pred', 'mixed', 'file:100%%.png')),
     ),
     ids=lambda v: str(v),
 )
@@ -75,7 +78,7 @@ def test_valid_timestamp(duration_mock, run_mock, exists_mock):
         exp_cmd = image._make_screenshot_cmd(mock_file, ts, 'image.png')
         assert run_mock.call_args_list == [call(exp_cmd,
                                                 ignore_errors=True,
-                                                join_stderr=True)]
+                                                join_stderr=True, resource='cpu')]
         run_mock.reset_mock()
 
 
@@ -99,7 +102,7 @@ def test_timestamp_after_video_end(duration_mock, run_mock, exists_mock):
     exp_cmd = image._make_screenshot_cmd(mock_file, 599, 'image.png')
     assert run_mock.call_args_list == [call(exp_cmd,
                                             ignore_errors=True,
-                                            join_stderr=True)]
+                                            join_stderr=True, resource='cpu')]
 
 
 @patch('os.path.exists')
@@ -144,7 +147,7 @@ def test_overwrite_existing_screenshot_file(duration_mock, run_mock, exists_mock
     exp_cmd = image._make_screenshot_cmd(mock_file, '1:02:03', 'image.png')
     assert run_mock.call_args_list == [call(exp_cmd,
                                             ignore_errors=True,
-                                            join_stderr=True)]
+                                            join_stderr=True, resource='cpu')]
 
 
 @patch('os.path.exists')
@@ -161,6 +164,216 @@ def test_screenshot_file_does_not_exist_for_some_reason(duration_mock, run_mock,
         image.screenshot(mock_file, 601, 'image.png')
 
 
+@pytest.mark.skipif(not shutil.which('ffmpeg'), reason='ffmpeg is not installed')
+def test_screenshot_png_options_reduce_file_size(tmp_path):
+    def make_png(filepath, *options):
+        subprocess.run(
+            ('ffmpeg', '-y', '-loglevel', 'error',
+             '-f', 'lavfi', '-i', 'testsrc2=size=1280x720:duration=1',
+             '-vframes', '1', *options, str(filepath)),
+            check=True,
+        )
+        return os.path.getsize(filepath)
+
+    default_size = make_png(tmp_path / 'default.png')
+    optimized_size = make_png(tmp_path / 'optimized.png', *image._SCREENSHOT_PNG_OPTIONS)
+    savings = 1 - optimized_size / default_size
+    assert optimized_size < default_size, f'{default_size} -> {optimized_size} bytes ({savings:.1%} smaller)'
+
+def test_make_screenshots_cmd(mocker):
+    mocker.patch('upsies.utils.video.make_ffmpeg_input', return_value='bluray:path/to/video')
+    cmd = image._make_screenshots_cmd('path/to/video', ('12', '0:01:00'), ('a.png', '100%.png'))
+    assert cmd == (
+        image._ffmpeg_executable(), '-y', '-loglevel', 'level+error',
+        '-ss', '12', '-i', 'bluray:path/to/video',
+        '-ss', '0:01:00', '-i', 'bluray:path/to/video',
+        '-map', '0:v:0', '-vframes', '1', '-vf', 'scale=trunc(ih*dar):ih,setsar=1/1', '-pred', 'mixed', 'file:a.png',
+        '-map', '1:v:0', '-vframes', '1', '-vf', 'scale=trunc(ih*dar):ih,setsar=1/1', '-pred', 'mixed', 'file:100%%.png',
+    )
+
+def test_screenshots_runs_single_ffmpeg_process(tmp_path, mocker):
+    mocker.patch('upsies.utils.fs.assert_file_readable')
+    mocker.patch('upsies.utils.video.duration', return_value=3600)
+    existing_file = tmp_path / 'b.png'
+    existing_file.write_bytes(b'png data')
+    files = (str(tmp_path / 'a.png'), str(existing_file), str(tmp_path / 'c.png'))
+
+    def run(cmd, **kwargs):
+        for f in (files[0], files[2]):
+            with open(f, 'wb') as fp:
+                fp.write(b'png data')
+
+    run_mock = mocker.patch('upsies.utils.subproc.run', side_effect=run)
+    assert image.screenshots('foo.mkv', ('0:01:00', '0:02:00', '0:03:00'), files) == files
+    assert run_mock.call_args_list == [call(
+        image._make_screenshots_cmd('foo.mkv', ('0:01:00', '0:03:00'), (files[0], files[2])),
+        ignore_errors=True, join_stderr=True, resource='cpu',
+    )]
+
+def test_screenshots_does_not_run_ffmpeg_if_all_screenshots_exist(tmp_path, mocker):
+    mocker.patch('upsies.utils.fs.assert_file_readable')
+    run_mock = mocker.patch('upsies.utils.subproc.run')
+    (tmp_path / 'a.png').write_bytes(b'png data')
+    files = (str(tmp_path / 'a.png'),)
+    assert image.screenshots('foo.mkv', ('0:01:00',), files) == files
+    assert run_mock.call_args_list == []
+
+def test_screenshots_fails_to_create_screenshot(tmp_path, mocker):
+    mocker.patch('upsies.utils.fs.assert_file_readable')
+    mocker.patch('upsies.utils.video.duration', return_value=3600)
+    mocker.patch('upsies.utils.subproc.run', return_value='Disk full')
+    files = (str(tmp_path / 'a.png'),)
+    with pytest.raises(errors.ScreenshotError, match=r'^foo.mkv: Failed to create screenshot at 0:01:00: Disk full$'):
+        image.screenshots('foo.mkv', ('0:01:00',), files)
+
+def test_screenshots_falls_back_to_single_screenshots_for_missing_files(tmp_path, mocker):
+    mocker.patch('upsies.utils.fs.assert_file_readable')
+    mocker.patch('upsies.utils.video.duration', return_value=3600)
+    files = (str(tmp_path / 'a.png'), str(tmp_path / 'b.png'), str(tmp_path / 'c.png'))
+
+    def run(cmd, **kwargs):
+        # Batch only creates first screenshot, single screenshot command creates
+        # whatever it is asked for
+        if cmd == image._make_screenshots_cmd('foo.mkv', ('0:01:00', '0:02:00', '0:03:00'), files):
+            with open(files[0], 'wb') as fp:
+                fp.write(b'png data')
+            return 'Something went wrong'
+        else:
+            with open(cmd[-1][len('file:'):], 'wb') as fp:
+                fp.write(b'png data')
+
+    run_mock = mocker.patch('upsies.utils.subproc.run', side_effect=run)
+    assert image.screenshots('foo.mkv', ('0:01:00', '0:02:00', '0:03:00'), files) == files
+    assert run_mock.call_args_list == [
+        call(
+            image._make_screenshots_cmd('foo.mkv', ('0:01:00', '0:02:00', '0:03:00'), files),
+            ignore_errors=True, join_stderr=True, resource='cpu',
+        ),
+        call(
+            image._make_screenshot_cmd('foo.mkv', '0:02:00', files[1]),
+            ignore_errors=True, join_stderr=True, resource='cpu',
+        ),
+        call(
+            image._make_screenshot_cmd('foo.mkv', '0:03:00', files[2]),
+            ignore_errors=True, join_stderr=True, resource='cpu',
+        ),
+    ]
+
+@pytest.mark.parametrize(
+    argnames='timestamps, exp_error',
+    argvalues=(
+        (('0:01:00', 'foo'), "Invalid timestamp: 'foo'"),
+        (('0:01:00', '2:00:00'), 'Timestamp is after video end (1:00:00): 2:00:00'),
+        (('0:01:00',), 'Got 1 timestamps and 2 screenshot files'),
+    ),
+)
+def test_screenshots_validates_timestamps(timestamps, exp_error, tmp_path, mocker):
+    mocker.patch('upsies.utils.fs.assert_file_readable')
+    mocker.patch('upsies.utils.video.duration', return_value=3600)
+    run_mock = mocker.patch('upsies.utils.subproc.run')
+    files = (str(tmp_path / 'a.png'), str(tmp_path / 'b.png'))
+    with pytest.raises(errors.ScreenshotError, match=rf'^{re.escape(exp_error)}$'):
+        image.screenshots('foo.mkv', timestamps, files)
+    assert run_mock.call_args_list == []
+
+
+def test_ImageBuffer_is_picklable():
+    buffer = pickle.loads(pickle.dumps(image.ImageBuffer(b'png data', 'foo.png')))
+    assert isinstance(buffer, image.ImageBuffer)
+    assert buffer.read() == b'png data'
+    assert buffer.name == 'foo.png'
+    assert str(buffer) == 'foo.png'
+    assert repr(buffer) == "ImageBuffer(<8 bytes>, name='foo.png')"
+
+def test_make_screenshot_buffer_cmd():
+    assert image._make_screenshot_buffer_cmd('video.mkv', '0:01:00') == (
+        image._ffmpeg_executable(),
+        '-loglevel', 'level+error',
+        '-ss', '0:01:00', '-i', 'video.mkv',
+        '-vframes', '1', '-vf', 'scale=trunc(ih*dar):ih,setsar=1/1',
+        '-f', 'image2pipe', '-vcodec', 'png', '-pred', 'mixed', 'pipe:1',
+    )
+
+def test_screenshot_buffer_returns_ImageBuffer(mocker):
+    mocker.patch('upsies.utils.fs.assert_file_readable')
+    mocker.patch('upsies.utils.video.duration', return_value=3600)
+    run_mock = mocker.patch('upsies.utils.subproc.run', return_value=image._PNG_SIGNATURE + b'data')
+    buffer = image.screenshot_buffer('foo.mkv', '0:01:00', 'foo.mkv.0:01:00.png')
+    assert buffer.getvalue() == image._PNG_SIGNATURE + b'data'
+    assert buffer.name == 'foo.mkv.0:01:00.png'
+    assert run_mock.call_args_list == [call(
+        image._make_screenshot_buffer_cmd('foo.mkv', '0:01:00'),
+        binary=True, resource='cpu',
+    )]
+
+@pytest.mark.parametrize(
+    argnames='run_kwargs, exp_error',
+    argvalues=(
+        ({'side_effect': errors.ProcessError('Invalid data')}, 'Invalid data'),
+        ({'return_value': b''}, 'No PNG data'),
+    ),
+)
+def test_screenshot_buffer_fails_to_create_screenshot(run_kwargs, exp_error, mocker):
+    mocker.patch('upsies.utils.fs.assert_file_readable')
+    mocker.patch('upsies.utils.video.duration', return_value=3600)
+    mocker.patch('upsies.utils.subproc.run', **run_kwargs)
+    with pytest.raises(errors.ScreenshotError,
+                       match=rf'^foo.mkv: Failed to create screenshot at 0:01:00: {exp_error}$'):
+        image.screenshot_buffer('foo.mkv', '0:01:00', 'foo.png')
+
+def test_screenshot_buffer_validates_timestamp(mocker):
+    mocker.patch('upsies.utils.fs.assert_file_readable')
+    mocker.patch('upsies.utils.video.duration', return_value=3600)
+    run_mock = mocker.patch('upsies.utils.subproc.run')
+    with pytest.raises(errors.ScreenshotError, match=r'^Timestamp is after video end \(1:00:00\): 2:00:00$'):
+        image.screenshot_buffer('foo.mkv', '2:00:00', 'foo.png')
+    assert run_mock.call_args_list == []
+
+
+def test_ScreenshotStore_path_is_independent_of_video_path(tmp_path, mocker):
+    fingerprint_mock = mocker.patch('upsies.utils.fs.file_fingerprint', return_value='123-456-abc')
+    store = image.ScreenshotStore(tmp_path / 'store')
+    path = store.path('path/to/foo.mkv', '0:01:02')
+    assert re.search(r'^123-456-abc\.62\.000\.[0-9a-f]{8}\.png$', os.path.basename(path))
+    assert os.path.dirname(path) == str(tmp_path / 'store')
+    assert store.path('other/path/to/bar.mkv', 62) == path
+    assert fingerprint_mock.call_args_list == [call('path/to/foo.mkv'), call('other/path/to/bar.mkv')]
+
+def test_ScreenshotStore_put_and_get(tmp_path, mocker):
+    mocker.patch('upsies.utils.fs.file_fingerprint', return_value='123-456-abc')
+    store = image.ScreenshotStore(tmp_path / 'store')
+    screenshot_file = tmp_path / 'foo.mkv.0:01:02.png'
+    screenshot_file.write_bytes(b'image data')
+    store.put('foo.mkv', '0:01:02', str(screenshot_file))
+    assert os.listdir(tmp_path / 'store') == [os.path.basename(store.path('foo.mkv', 62))]
+
+    target_file = tmp_path / 'elsewhere' / 'bar.mkv.0:01:02.png'
+    target_file.parent.mkdir()
+    assert store.get('bar.mkv', 62, str(target_file)) is True
+    assert target_file.read_bytes() == b'image data'
+    assert store.get('bar.mkv', 63, str(tmp_path / 'nope.png')) is False
+    assert not os.path.exists(tmp_path / 'nope.png')
+
+def test_ScreenshotStore_copies_if_linking_fails(tmp_path, mocker):
+    mocker.patch('upsies.utils.fs.file_fingerprint', return_value='123-456-abc')
+    mocker.patch('os.link', side_effect=OSError('Invalid cross-device link'))
+    store = image.ScreenshotStore(tmp_path / 'store')
+    screenshot_file = tmp_path / 'foo.png'
+    screenshot_file.write_bytes(b'image data')
+    store.put('foo.mkv', 62, str(screenshot_file))
+    assert store.get('foo.mkv', 62, str(tmp_path / 'bar.png')) is True
+    assert (tmp_path / 'bar.png').read_bytes() == b'image data'
+
+def test_ScreenshotStore_ignores_unreadable_video_file(tmp_path, mocker):
+    mocker.patch('upsies.utils.fs.file_fingerprint', side_effect=errors.ContentError('foo.mkv: Permission denied'))
+    store = image.ScreenshotStore(tmp_path / 'store')
+    screenshot_file = tmp_path / 'foo.png'
+    screenshot_file.write_bytes(b'image data')
+    store.put('foo.mkv', 62, str(screenshot_file))
+    assert not os.path.exists(tmp_path / 'store')
+    assert store.get('foo.mkv', 62, str(tmp_path / 'bar.png')) is False
+
+
 def test_screenshot_has_display_aspect_ratio(data_dir, tmp_path):
     video_file = os.path.join(data_dir, 'video', 'aspect_ratio.mkv')
     screenshot_file = tmp_path / 'image.jpg'
@@ -20,6 +20,8 @@ def test_name():
 def test_default_config():
     assert imgbox.ImgboxImageHost.default_config == {
         'thumb_width': 0,
+        'image_format': 'png',
+        'jpeg_quality': 90,
     }
 
 @patch('pyimgbox.Gallery')
@@ -1,10 +1,11 @@
+import hashlib
 import os
 import re
 from unittest.mock import Mock, call
 
 import pytest
 
-from upsies.utils import imghosts
+from upsies.utils import image, imghosts
 
 
 class AsyncMock(Mock):
@@ -94,6 +95,25 @@ def test_cache_file_uses_cache_directory_argument(mocker, image_dir, cache_dir,
     assert imghost._cache_file(image_path) == exp_cache_file
 
 
+def test_cache_file_for_in_memory_image(tmp_path):
+    imghost = make_TestImageHost(cache_directory=str(tmp_path))
+    buffer = image.ImageBuffer(b'png data', 'path/to/foo.png')
+    digest = hashlib.sha256(b'png data').hexdigest()
+    assert imghost._cache_file(buffer) == os.path.join(str(tmp_path), f'foo.png.{digest}.imgw00t.json')
+    other_buffer = image.ImageBuffer(b'other data', 'path/to/foo.png')
+    assert imghost._cache_file(other_buffer) != imghost._cache_file(buffer)
+
+def test_cache_file_for_file_object_without_getvalue(tmp_path):
+    imghost = make_TestImageHost(cache_directory=str(tmp_path / 'cache'))
+    image_file = tmp_path / 'foo.png'
+    image_file.write_bytes(b'png data')
+    digest = hashlib.sha256(b'png data').hexdigest()
+    with open(image_file, 'rb') as f:
+        f.read(3)
+        assert imghost._cache_file(f) == os.path.join(str(tmp_path / 'cache'), f'foo.png.{digest}.imgw00t.json')
+        assert f.read() == b'png data'
+
+
 def test_store_info_to_cache_succeeds(mocker, tmp_path):
     mkdir_mock = mocker.patch('upsies.utils.fs.mkdir')
     imghost = make_TestImageHost(cache_directory=tmp_path)
@@ -265,3 +285,20 @@ async def test_upload_with_cache_set_to_False(tmp_path):
     assert image.thumbnail_url == 'http://foo.bar/thumbnail'
     assert image.delete_url == 'http://foo.bar/delete'
     assert image.edit_url == 'http://foo.bar/edit'
+
+@pytest.mark.asyncio
+async def test_upload_accepts_in_memory_image(tmp_path):
+    ih = make_TestImageHost(cache_directory=str(tmp_path))
+    uploaded = []
+
+    async def upload(image_path):
+        uploaded.append(image_path.read())
+        return {'url': 'http://foo.bar'}
+
+    ih._upload = upload
+    buffer = image.ImageBuffer(b'png data', 'foo.png')
+    buffer.read()
+    assert await ih.upload(buffer) == 'http://foo.bar'
+    assert await ih.upload(buffer) == 'http://foo.bar'
+    assert await ih.upload(buffer, cache=False) == 'http://foo.bar'
+    assert uploaded == [b'png data', b'png data']
@@ -24,6 +24,8 @@ def test_default_config():
     assert ptpimg.PtpimgImageHost.default_config == {
         'apikey': '',
         'base_url': 'https://ptpimg.me',
+        'image_format': 'png',
+        'jpeg_quality': 90,
     }
 
 
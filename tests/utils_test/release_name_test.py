@@ -501,6 +501,31 @@ def test_resolution_getter_defaults_to_placeholder(resolution_mock, ReleaseInfo_
     assert ReleaseName('path/to/something').resolution == 'UNKNOWN_RESOLUTION'
     assert resolution_mock.call_args_list == [call('path/to/something')]
 
+@pytest.mark.parametrize('attribute', ('resolution', 'audio_format', 'audio_channels', 'video_format'))
+def test_video_property_of_season_pack_is_shared_by_all_episodes(attribute, tmp_path, mocker):
+    mocker.patch('upsies.utils.release.ReleaseInfo', Mock(return_value={'type': ReleaseType.season}))
+    season_info_mock = mocker.patch('upsies.utils.video.season_info', return_value=Mock(**{attribute: 'common'}))
+    first_video_mock = mocker.patch(f'upsies.utils.video.{attribute}', return_value='first video')
+    assert getattr(ReleaseName(str(tmp_path)), attribute) == 'common'
+    assert season_info_mock.call_args_list == [call(str(tmp_path))]
+    assert first_video_mock.call_args_list == []
+
+@pytest.mark.parametrize('attribute', ('resolution', 'audio_format', 'audio_channels', 'video_format'))
+def test_video_property_of_inconsistent_season_pack_is_from_first_video(attribute, tmp_path, mocker):
+    mocker.patch('upsies.utils.release.ReleaseInfo', Mock(return_value={'type': ReleaseType.season}))
+    mocker.patch('upsies.utils.video.season_info', return_value=Mock(**{attribute: None}))
+    first_video_mock = mocker.patch(f'upsies.utils.video.{attribute}', return_value='first video')
+    assert getattr(ReleaseName(str(tmp_path)), attribute) == 'first video'
+    assert first_video_mock.call_args_list == [call(str(tmp_path))]
+
+@pytest.mark.parametrize('attribute', ('resolution', 'audio_format', 'audio_channels', 'video_format'))
+def test_video_property_of_unreadable_season_pack_is_from_first_video(attribute, tmp_path, mocker):
+    mocker.patch('upsies.utils.release.ReleaseInfo', Mock(return_value={'type': ReleaseType.season}))
+    mocker.patch('upsies.utils.video.season_info', side_effect=errors.ContentError('No video file found'))
+    first_video_mock = mocker.patch(f'upsies.utils.video.{attribute}', return_value='first video')
+    assert getattr(ReleaseName(str(tmp_path)), attribute) == 'first video'
+    assert first_video_mock.call_args_list == [call(str(tmp_path))]
+
 @patch('upsies.utils.release.ReleaseInfo', new_callable=lambda: Mock(return_value={}))
 def test_resolution_setter(ReleaseInfo_mock):
     rn = ReleaseName('path/to/something')
@@ -1,4 +1,6 @@
-from unittest.mock import call, patch
+import threading
+import time
+from unittest.mock import Mock, call, patch
 
 import pytest
 
@@ -6,73 +8,280 @@ from upsies import errors
 from upsies.utils import subproc
 
 
-@patch('subprocess.run')
+@pytest.fixture(autouse=True)
+def clear_command_output_cache():
+    subproc._command_output_cache.clear()
+
+
+@patch('subprocess.Popen')
 @patch('subprocess.PIPE', 'Mocked PIPE')
-def test_run_returns_stdout(run_mock):
-    run_mock.return_value.stderr = ''
-    run_mock.return_value.stdout = 'process output'
+def test_run_returns_stdout(popen_mock):
+    popen_mock.return_value.communicate.return_value = ('process output', '')
     stdout = subproc.run(['foo', 'bar', '--baz'])
     assert stdout == 'process output'
-    assert run_mock.call_args_list == [call(
+    assert popen_mock.call_args_list == [call(
         ('foo', 'bar', '--baz'),
         shell=False,
         encoding='utf-8',
         stdout='Mocked PIPE',
         stderr='Mocked PIPE',
         stdin='Mocked PIPE',
+        start_new_session=True,
     )]
+    assert popen_mock.return_value.communicate.call_args_list == [call(timeout=None)]
 
-@patch('subprocess.run')
+@patch('subprocess.Popen')
 @patch('subprocess.PIPE', 'Mocked PIPE')
-def test_run_raises_DependencyError_if_command_cannot_be_executed(run_mock):
-    run_mock.side_effect = OSError()
+def test_run_raises_DependencyError_if_command_cannot_be_executed(popen_mock):
+    popen_mock.side_effect = OSError()
     with pytest.raises(errors.DependencyError, match=r'^Missing dependency: foo$'):
         subproc.run(['foo', 'bar', '--baz'])
 
-@patch('subprocess.run')
+@patch('subprocess.Popen')
 @patch('subprocess.PIPE', 'Mocked PIPE')
-def test_run_raises_ProcessError_if_stderr_is_truthy(run_mock):
-    run_mock.return_value.stderr = 'something went wrong'
-    run_mock.return_value.stdout = 'process output'
+def test_run_raises_ProcessError_if_stderr_is_truthy(popen_mock):
+    popen_mock.return_value.communicate.return_value = ('process output', 'something went wrong')
     with pytest.raises(errors.ProcessError, match=r'^something went wrong$'):
         subproc.run(('foo', 'bar', '--baz'))
 
-@patch('subprocess.run')
+@patch('subprocess.Popen')
 @patch('subprocess.PIPE', 'Mocked PIPE')
-def test_run_ignores_stderr_on_request(run_mock):
-    run_mock.return_value.stderr = 'something went wrong'
-    run_mock.return_value.stdout = 'process output'
+def test_run_ignores_stderr_on_request(popen_mock):
+    popen_mock.return_value.communicate.return_value = ('process output', 'something went wrong')
     stdout = subproc.run(('foo', 'bar', '--baz'), ignore_errors=True)
     assert stdout == 'process output'
 
-@patch('subprocess.run')
+@patch('subprocess.Popen')
 @patch('subprocess.PIPE', 'Mocked PIPE')
-def test_run_caches_stdout_on_request(run_mock):
-    run_mock.return_value.stderr = ''
-    run_mock.return_value.stdout = 'process output'
+def test_run_caches_stdout_on_request(popen_mock):
+    popen_mock.return_value.communicate.return_value = ('process output', '')
     for _ in range(5):
         assert subproc.run(['foo', 'bar', '--baz'], cache=True) == 'process output'
-        assert run_mock.call_args_list == [call(
+        assert popen_mock.call_args_list == [call(
             ('foo', 'bar', '--baz'),
             shell=False,
             encoding='utf-8',
             stdout='Mocked PIPE',
             stderr='Mocked PIPE',
             stdin='Mocked PIPE',
+            start_new_session=True,
         )]
 
-@patch('subprocess.run')
+@patch('subprocess.Popen')
 @patch('subprocess.PIPE', 'Mocked PIPE')
 @patch('subprocess.STDOUT', 'Mocked STDOUT')
-def test_run_joins_stdout_and_stderr_on_request(run_mock):
-    run_mock.return_value.stdout = 'foo'
-    run_mock.return_value.stderr = ''
+def test_run_joins_stdout_and_stderr_on_request(popen_mock):
+    popen_mock.return_value.communicate.return_value = ('foo', None)
     subproc.run(['foo'], join_stderr=True)
-    assert run_mock.call_args_list == [call(
+    assert popen_mock.call_args_list == [call(
         ('foo',),
         shell=False,
         encoding='utf-8',
         stdout='Mocked PIPE',
         stderr='Mocked STDOUT',
         stdin='Mocked PIPE',
+        start_new_session=True,
+    )]
+
+@patch('subprocess.Popen')
+@patch('subprocess.PIPE', 'Mocked PIPE')
+def test_run_returns_binary_stdout_on_request(popen_mock):
+    popen_mock.return_value.communicate.return_value = (b'\x89PNG', b'')
+    stdout = subproc.run(['foo'], binary=True)
+    assert stdout == b'\x89PNG'
+    assert popen_mock.call_args_list == [call(
+        ('foo',),
+        shell=False,
+        encoding=None,
+        stdout='Mocked PIPE',
+        stderr='Mocked PIPE',
+        stdin='Mocked PIPE',
+        start_new_session=True,
     )]
+
+@patch('subprocess.Popen')
+@patch('subprocess.PIPE', 'Mocked PIPE')
+def test_run_decodes_stderr_in_binary_mode(popen_mock):
+    popen_mock.return_value.communicate.return_value = (b'', b'something went \xffwrong')
+    with pytest.raises(errors.ProcessError, match=r'^something went �wrong$'):
+        subproc.run(['foo'], binary=True)
+
+def test_run_kills_process_after_timeout():
+    with pytest.raises(errors.ProcessError, match=r'^sleep: Timed out after 0.1 seconds$'):
+        subproc.run(['sleep', '10'], timeout=0.1)
+    assert subproc.governor._processes == set()
+
+@patch('subprocess.Popen')
+def test_run_kills_process_on_unexpected_exception(popen_mock, mocker):
+    kill_mock = mocker.patch('upsies.utils.subproc._kill')
+    popen_mock.return_value.communicate.side_effect = KeyboardInterrupt()
+    with pytest.raises(KeyboardInterrupt):
+        subproc.run(['foo'])
+    assert kill_mock.call_args_list == [call(popen_mock.return_value)]
+    assert popen_mock.return_value.wait.call_args_list == [call()]
+    assert subproc.governor._processes == set()
+
+def test_run_kills_child_processes_if_process_is_cancelled(tmp_path):
+    pid_file = tmp_path / 'pid'
+    exceptions = []
+
+    def run():
+        try:
+            subproc.run(['sh', '-c', f'sleep 10 & echo $! > {pid_file}; wait'])
+        except errors.ProcessError as e:
+            exceptions.append(e)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    while not pid_file.exists() or not pid_file.read_text().strip():
+        time.sleep(0.01)
+    subproc.governor.cancel()
+    thread.join(timeout=5)
+    assert [str(e) for e in exceptions] == ['sh: Cancelled']
+
+    # Grandchild process is dead or a zombie
+    pid = int(pid_file.read_text())
+    for _ in range(100):
+        try:
+            with open(f'/proc/{pid}/stat') as f:
+                state = f.read().rsplit(')', 1)[1].split()[0]
+        except FileNotFoundError:
+            break
+        else:
+            if state == 'Z':
+                break
+        time.sleep(0.01)
+    else:
+        raise AssertionError(f'Process is still running: {pid}')
+
+def test_run_raises_ProcessError_if_process_is_cancelled():
+    exceptions = []
+
+    def run():
+        try:
+            subproc.run(['sleep', '10'])
+        except errors.ProcessError as e:
+            exceptions.append(e)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    while not subproc.governor._processes:
+        time.sleep(0.01)
+    subproc.governor.cancel()
+    thread.join(timeout=5)
+    assert [str(e) for e in exceptions] == ['sleep: Cancelled']
+    assert subproc.governor._processes == set()
+    assert subproc.governor._cancelled == set()
+
+@patch('subprocess.Popen')
+def test_run_waits_for_free_slot(popen_mock, mocker):
+    mocker.patch.object(subproc, 'governor', subproc.Governor(slots={'cpu': 2}))
+    running = []
+    max_running = []
+
+    def communicate(timeout):
+        running.append(None)
+        max_running.append(len(running))
+        time.sleep(0.05)
+        running.pop()
+        return ('', '')
+
+    popen_mock.return_value.communicate.side_effect = communicate
+    threads = [threading.Thread(target=subproc.run, args=(['foo'],), kwargs={'resource': 'cpu'})
+               for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(max_running) == 6
+    assert max(max_running) == 2
+
+
+def test_Governor_slots():
+    governor = subproc.Governor(slots={'cpu': 3, 'io': '4'})
+    assert governor.slots == {'cpu': 3, 'io': 4}
+    governor.slots = {'cpu': 1}
+    assert governor.slots == {'cpu': 1}
+
+def test_Governor_timeouts():
+    governor = subproc.Governor(slots={}, timeouts={'cpu': 0, 'io': '4'})
+    assert governor.timeouts == {'io': 4.0}
+    assert governor.timeout('io') == 4.0
+    assert governor.timeout('cpu') is None
+    assert governor.timeout(None) is None
+
+@patch('upsies.utils.subproc._run', return_value=('', ''))
+def test_run_uses_timeout_of_resource(_run_mock, mocker):
+    mocker.patch.object(subproc, 'governor', subproc.Governor(slots={}, timeouts={'io': 12}))
+    subproc.run(['foo'], resource='io')
+    subproc.run(['foo'], resource='cpu')
+    subproc.run(['foo'], resource='io', timeout=3)
+    assert _run_mock.call_args_list == [
+        call(('foo',), False, 12.0, False),
+        call(('foo',), False, None, False),
+        call(('foo',), False, 3, False),
+    ]
+
+def test_Governor_slot_does_not_limit_unknown_resource():
+    governor = subproc.Governor(slots={'cpu': 1})
+    with governor.slot('cpu'):
+        with governor.slot('foo'):
+            with governor.slot(None):
+                pass
+
+def test_Governor_cancel_kills_registered_processes(mocker):
+    kill_mock = mocker.patch('upsies.utils.subproc._kill')
+    governor = subproc.Governor(slots={})
+    procs = (Mock(), Mock(), Mock())
+    for proc in procs:
+        governor.register(proc)
+    governor.unregister(procs[1])
+    governor.cancel()
+    assert len(kill_mock.call_args_list) == 2
+    assert call(procs[0]) in kill_mock.call_args_list
+    assert call(procs[2]) in kill_mock.call_args_list
+    assert governor.unregister(procs[0]) is True
+    assert governor.unregister(procs[1]) is False
+    assert governor.unregister(procs[2]) is True
+    assert not governor.is_stopped
+
+def test_Governor_stop_kills_registered_and_future_processes(mocker):
+    kill_mock = mocker.patch('upsies.utils.subproc._kill')
+    governor = subproc.Governor(slots={})
+    procs = (Mock(), Mock())
+    governor.register(procs[0])
+    governor.stop()
+    assert governor.is_stopped
+    assert kill_mock.call_args_list == [call(procs[0])]
+    governor.register(procs[1])
+    assert kill_mock.call_args_list == [call(procs[0]), call(procs[1])]
+    assert governor.unregister(procs[0]) is True
+    assert governor.unregister(procs[1]) is True
+
+
+@pytest.mark.parametrize('os_family', ('unix', 'windows'))
+def test_kill_kills_process_group(os_family, mocker):
+    mocker.patch('upsies.utils.subproc.os_family', return_value=os_family)
+    killpg_mock = mocker.patch('os.killpg', create=True)
+    process = Mock(pid=123)
+    subproc._kill(process)
+    if os_family == 'windows':
+        assert killpg_mock.call_args_list == []
+        assert process.kill.call_args_list == [call()]
+    else:
+        assert killpg_mock.call_args_list == [call(123, subproc.signal.SIGKILL)]
+        assert process.kill.call_args_list == []
+
+def test_kill_ignores_terminated_process(mocker):
+    mocker.patch('upsies.utils.subproc.os_family', return_value='unix')
+    mocker.patch('os.killpg', side_effect=ProcessLookupError())
+    process = Mock(pid=123)
+    subproc._kill(process)
+    assert process.kill.call_args_list == []
+
+def test_kill_falls_back_to_killing_process(mocker):
+    mocker.patch('upsies.utils.subproc.os_family', return_value='unix')
+    mocker.patch('os.killpg', side_effect=PermissionError('Operation not permitted'))
+    process = Mock(pid=123)
+    subproc._kill(process)
+    assert process.kill.call_args_list == [call()]
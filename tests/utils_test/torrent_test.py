@@ -1,10 +1,29 @@
+import functools
+import hashlib
+import os
+import time
 from unittest.mock import Mock, call, patch
 
 import pytest
 import torf
 
 from upsies import __project_name__, __version__, errors
-from upsies.utils.torrent import _make_file_tree, create
+from upsies.utils import torrent
+from upsies.utils.torrent import (_generate, _get_files, _get_reusable_hashes,
+                                  _hash_pieces, _make_file_tree, _PieceLayout,
+                                  benchmark, create, create_many)
+
+
+@pytest.fixture(autouse=True)
+def hashing_mocks(mocker):
+    mocks = Mock()
+    mocks.get_files.return_value = (('path/to/content', 123),)
+    mocks.generate.return_value = b'mock hashes'
+    mocks.get_reusable_hashes.return_value = {}
+    mocker.patch('upsies.utils.torrent._get_files', mocks.get_files)
+    mocker.patch('upsies.utils.torrent._generate', mocks.generate)
+    mocker.patch('upsies.utils.torrent._get_reusable_hashes', mocks.get_reusable_hashes)
+    return mocks
 
 
 class File(str):
@@ -33,11 +52,6 @@ def test_make_file_tree():
         ))),
     )
 
-
-class Callable:
-    def __eq__(self, other):
-        return callable(other)
-
 @patch('upsies.utils.torrent._path_exists')
 @patch('upsies.utils.torrent._make_file_tree')
 @patch('torf.Torrent')
@@ -140,27 +154,76 @@ def test_create_init_callback(Torrent_mock, file_tree_mock, path_exists_mock):
 @patch('upsies.utils.torrent._path_exists')
 @patch('upsies.utils.torrent._make_file_tree')
 @patch('torf.Torrent')
-def test_create_generates_torrent(Torrent_mock, file_tree_mock, path_exists_mock):
+def test_create_generates_torrent(Torrent_mock, file_tree_mock, path_exists_mock, hashing_mocks):
     path_exists_mock.side_effect = (False, True)
+    progress_cb = Mock()
     torrent_path = create(
         content_path='path/to/content',
         announce='http://announce.url',
         torrent_path='path/to/torrent',
         init_callback=Mock(),
-        progress_callback=Mock(),
+        progress_callback=progress_cb,
+        workers=3,
+        read_size=1024,
+        io_strategy='parallel',
+        page_cache='drop',
     )
     assert torrent_path == 'path/to/torrent'
-    assert Torrent_mock.return_value.generate.call_args_list == [call(
-        callback=Callable(),
-        interval=0.5,
+    assert hashing_mocks.get_files.call_args_list == [call(Torrent_mock.return_value)]
+    assert hashing_mocks.generate.call_args_list == [call(
+        files=hashing_mocks.get_files.return_value,
+        piece_size=Torrent_mock.return_value.piece_size,
+        progress_callback=progress_cb,
+        known_hashes={},
+        checkpoint_callback=None,
+        workers=3,
+        read_size=1024,
+        io_strategy='parallel',
+        page_cache='drop',
     )]
+    assert Torrent_mock.return_value.metainfo.__setitem__.call_args_list == []
+    assert Torrent_mock.return_value.metainfo['info'].__setitem__.call_args_list == [
+        call('pieces', b'mock hashes'),
+    ]
+
+@patch('upsies.utils.torrent._path_exists')
+@patch('upsies.utils.torrent._make_file_tree')
+@patch('torf.Torrent')
+def test_create_does_not_write_torrent_file_if_cancelled(Torrent_mock, file_tree_mock, path_exists_mock, hashing_mocks):
+    path_exists_mock.side_effect = (False, True)
+    hashing_mocks.generate.return_value = None
+    torrent_path = create(
+        content_path='path/to/content',
+        announce='http://announce.url',
+        torrent_path='path/to/torrent',
+        init_callback=Mock(),
+        progress_callback=Mock(),
+    )
+    assert torrent_path is None
+    assert Torrent_mock.return_value.write.call_args_list == []
 
 @patch('upsies.utils.torrent._path_exists')
 @patch('upsies.utils.torrent._make_file_tree')
 @patch('torf.Torrent')
-def test_create_catches_exception_from_torrent_generation(Torrent_mock, file_tree_mock, path_exists_mock):
+def test_create_refuses_empty_content(Torrent_mock, file_tree_mock, path_exists_mock, hashing_mocks):
     path_exists_mock.side_effect = (False, True)
-    Torrent_mock.return_value.generate.side_effect = torf.TorfError('Nyet')
+    hashing_mocks.get_files.return_value = (('path/to/content/a', 0), ('path/to/content/b', 0))
+    with pytest.raises(errors.TorrentError, match=r'^path/to/content: Empty or all files excluded$'):
+        create(
+            content_path='path/to/content',
+            announce='http://announce.url',
+            torrent_path='path/to/torrent',
+            init_callback=Mock(),
+            progress_callback=Mock(),
+        )
+    assert hashing_mocks.generate.call_args_list == []
+
+@patch('upsies.utils.torrent._path_exists')
+@patch('upsies.utils.torrent._make_file_tree')
+@patch('torf.Torrent')
+def test_create_catches_exception_from_torrent_generation(Torrent_mock, file_tree_mock, path_exists_mock, hashing_mocks):
+    path_exists_mock.side_effect = (False, True)
+    hashing_mocks.generate.side_effect = errors.TorrentError('Nyet')
     with pytest.raises(errors.TorrentError, match=r'^Nyet$'):
         create(
             content_path='path/to/content',
@@ -216,3 +279,736 @@ def test_create_catches_error_when_writing_torrent_file(Torrent_mock, file_tree_
             progress_callback=Mock(),
         )
     assert Torrent_mock.return_value.write.call_args_list == [call('path/to/torrent', overwrite=False)]
+
+
+@pytest.fixture
+def content(tmp_path):
+    content = tmp_path / 'content'
+    content.mkdir()
+    (content / 'a').write_bytes(os.urandom(100_000))
+    (content / 'b').write_bytes(os.urandom(333))
+    (content / 'c').write_bytes(b'')
+    (content / 'd').write_bytes(os.urandom(70_001))
+    return content
+
+class Instance:
+    def __init__(self, type):
+        self._type = type
+
+    def __eq__(self, other):
+        return isinstance(other, self._type)
+
+def expected_hashes(files, piece_size):
+    data = b''.join(open(filepath, 'rb').read() for filepath, _ in files)
+    return tuple(hashlib.sha1(data[pos:pos + piece_size]).digest()
+                 for pos in range(0, len(data), piece_size))
+
+
+def test_get_files_with_singlefile_torrent(content):
+    t = torf.Torrent(path=content / 'a')
+    assert _get_files(t) == ((str(content / 'a'), 100_000),)
+
+def test_get_files_with_multifile_torrent(content):
+    t = torf.Torrent(path=content)
+    assert _get_files(t) == tuple(
+        (str(filepath), os.path.getsize(filepath))
+        for filepath in t.filepaths
+    )
+
+
+@pytest.mark.parametrize(
+    argnames='piece_index, exp_segments',
+    argvalues=(
+        (0, ((0, 0, 100),)),
+        (1, ((0, 100, 50), (2, 0, 50))),
+        (2, ((2, 50, 100),)),
+        (3, ((2, 150, 10), (3, 0, 1))),
+    ),
+)
+def test_PieceLayout_segments(piece_index, exp_segments):
+    layout = _PieceLayout((('a', 150), ('b', 0), ('c', 160), ('d', 1)), piece_size=100)
+    assert layout.pieces_total == 4
+    assert layout.segments(piece_index) == exp_segments
+
+
+@pytest.mark.parametrize('io_strategy', torrent.IO_STRATEGIES)
+@pytest.mark.parametrize('read_size', (None, 1000))
+@pytest.mark.parametrize('workers', (1, 3))
+def test_hash_pieces_yields_all_hashes(workers, read_size, io_strategy, content):
+    files = _get_files(torf.Torrent(path=content))
+    hashes = tuple(_hash_pieces(files, 16384, workers=workers, read_size=read_size,
+                                io_strategy=io_strategy))
+    assert hashes == tuple(enumerate(expected_hashes(files, 16384)))
+
+@pytest.mark.parametrize(
+    argnames='workers, max_pending_bytes, exp_max_buffers',
+    argvalues=(
+        (1, 3 * 16384, 3),
+        (2, 1, 2),
+        (4, 16384, 4),
+    ),
+)
+def test_hash_pieces_limits_bytes_in_flight(workers, max_pending_bytes, exp_max_buffers, content, mocker):
+    mocker.patch.object(torrent, '_MAX_PENDING_BYTES', max_pending_bytes)
+    buffers = set()
+    real_readinto = torrent._PieceReader.readinto
+
+    def readinto(self, segments, buffer):
+        buffers.add(id(buffer.obj))
+        return real_readinto(self, segments, buffer)
+
+    mocker.patch.object(torrent._PieceReader, 'readinto', readinto)
+    files = _get_files(torf.Torrent(path=content))
+    hashes = tuple(_hash_pieces(files, 16384, workers=workers, io_strategy='sequential'))
+    assert hashes == tuple(enumerate(expected_hashes(files, 16384)))
+    assert len(hashes) > exp_max_buffers
+    assert 1 <= len(buffers) <= exp_max_buffers
+
+@pytest.mark.parametrize('workers', (1, 3))
+def test_hash_pieces_reuses_one_buffer_per_worker(workers, content, mocker):
+    buffers = set()
+    real_readinto = torrent._PieceReader.readinto
+
+    def readinto(self, segments, buffer):
+        buffers.add(id(buffer.obj))
+        return real_readinto(self, segments, buffer)
+
+    mocker.patch.object(torrent._PieceReader, 'readinto', readinto)
+    files = _get_files(torf.Torrent(path=content))
+    hashes = tuple(_hash_pieces(files, 16384, workers=workers, io_strategy='parallel'))
+    assert hashes == tuple(enumerate(expected_hashes(files, 16384)))
+    assert 1 <= len(buffers) <= workers
+
+@pytest.mark.parametrize('io_strategy', torrent.IO_STRATEGIES)
+def test_hash_pieces_yields_selected_hashes(io_strategy, content):
+    files = _get_files(torf.Torrent(path=content))
+    exp_hashes = expected_hashes(files, 16384)
+    hashes = tuple(_hash_pieces(files, 16384, piece_indexes=(9, 2, 3), io_strategy=io_strategy))
+    assert hashes == ((9, exp_hashes[9]), (2, exp_hashes[2]), (3, exp_hashes[3]))
+
+@pytest.mark.parametrize('page_cache', torrent.PAGE_CACHE_MODES)
+@pytest.mark.parametrize('io_strategy', torrent.IO_STRATEGIES)
+@pytest.mark.parametrize('read_size', (None, 1000, 4096))
+def test_hash_pieces_with_page_cache_mode(read_size, io_strategy, page_cache, content):
+    files = _get_files(torf.Torrent(path=content))
+    hashes = tuple(_hash_pieces(files, 16384, workers=2, read_size=read_size,
+                                io_strategy=io_strategy, page_cache=page_cache))
+    assert hashes == tuple(enumerate(expected_hashes(files, 16384)))
+
+def test_hash_pieces_gets_invalid_page_cache_mode(content):
+    with pytest.raises(errors.TorrentError, match=r"^Invalid page cache mode: 'foo'$"):
+        tuple(_hash_pieces(((str(content / 'a'), 100_000),), 16384, page_cache='foo'))
+
+@pytest.mark.skipif(not hasattr(os, 'posix_fadvise'), reason='posix_fadvise() is not supported')
+def test_hash_pieces_drops_read_data_from_page_cache(content, mocker):
+    fadvise_mock = mocker.patch('os.posix_fadvise')
+    files = ((str(content / 'a'), 100_000),)
+    tuple(_hash_pieces(files, 65536, workers=1, read_size=40_000, page_cache='drop'))
+    assert fadvise_mock.call_args_list == [
+        call(Instance(int), 0, 0, os.POSIX_FADV_SEQUENTIAL),
+        call(Instance(int), 0, 40_000, os.POSIX_FADV_DONTNEED),
+        call(Instance(int), 40_000, 25_536, os.POSIX_FADV_DONTNEED),
+        call(Instance(int), 65_536, 34_464, os.POSIX_FADV_DONTNEED),
+    ]
+
+@pytest.mark.skipif(not hasattr(os, 'posix_fadvise'), reason='posix_fadvise() is not supported')
+def test_hash_pieces_keeps_read_data_in_page_cache(content, mocker):
+    fadvise_mock = mocker.patch('os.posix_fadvise')
+    tuple(_hash_pieces(((str(content / 'a'), 100_000),), 65536, page_cache='keep'))
+    assert fadvise_mock.call_args_list == []
+
+@pytest.mark.skipif(not torrent._DIRECT_IO_SUPPORTED, reason='O_DIRECT is not supported')
+def test_hash_pieces_falls_back_if_O_DIRECT_fails(content, mocker):
+    real_open = os.open
+
+    def open_mock(path, flags, *args, **kwargs):
+        if flags & os.O_DIRECT:
+            raise OSError(22, 'Invalid argument')
+        return real_open(path, flags, *args, **kwargs)
+
+    mocker.patch('os.open', open_mock)
+    pread_direct_mock = mocker.patch('upsies.utils.torrent._pread_direct')
+    files = _get_files(torf.Torrent(path=content))
+    hashes = tuple(_hash_pieces(files, 16384, page_cache='direct'))
+    assert hashes == tuple(enumerate(expected_hashes(files, 16384)))
+    assert pread_direct_mock.call_args_list == []
+
+@pytest.mark.skipif(not torrent._DIRECT_IO_SUPPORTED, reason='O_DIRECT is not supported')
+@pytest.mark.parametrize(
+    argnames='offset, size',
+    argvalues=((0, 4096), (1, 10), (4095, 2), (5000, 10_000), (99_000, 1000), (99_000, 5000), (100_000, 1)),
+)
+def test_pread_direct(offset, size, content):
+    data = (content / 'a').read_bytes()
+    fd = os.open(content / 'a', os.O_RDONLY | os.O_DIRECT)
+    try:
+        assert torrent._pread_direct(fd, size, offset) == data[offset:offset + size]
+    finally:
+        os.close(fd)
+
+def test_hash_pieces_gets_invalid_io_strategy(content):
+    with pytest.raises(errors.TorrentError, match=r"^Invalid I/O strategy: 'foo'$"):
+        tuple(_hash_pieces(((str(content / 'a'), 100_000),), 16384, io_strategy='foo'))
+
+@pytest.mark.parametrize('io_strategy', torrent.IO_STRATEGIES)
+def test_hash_pieces_reports_missing_file(io_strategy, content):
+    files = ((str(content / 'a'), 100_000), (str(content / 'nope'), 123))
+    with pytest.raises(errors.TorrentError, match=rf'^{content / "nope"}: No such file or directory$'):
+        tuple(_hash_pieces(files, 16384, io_strategy=io_strategy))
+
+@pytest.mark.parametrize('io_strategy', torrent.IO_STRATEGIES)
+def test_hash_pieces_reports_truncated_file(io_strategy, content):
+    files = ((str(content / 'a'), 100_001),)
+    with pytest.raises(errors.TorrentError, match=rf'^{content / "a"}: Unexpected end of file$'):
+        tuple(_hash_pieces(files, 16384, io_strategy=io_strategy))
+
+
+def test_generate_returns_concatenated_hashes(content):
+    files = _get_files(torf.Torrent(path=content))
+    progress_cb = Mock(return_value=None)
+    hashes = _generate(files=files, piece_size=16384, progress_callback=progress_cb, interval=0)
+    assert hashes == b''.join(expected_hashes(files, 16384))
+    assert progress_cb.call_args_list == [
+        call(pytest.approx(i / 11 * 100)) for i in range(1, 12)
+    ]
+
+def test_generate_is_cancelled_by_progress_callback(content):
+    files = _get_files(torf.Torrent(path=content))
+    progress_cb = Mock(side_effect=(None, None, 'cancel'))
+    hashes = _generate(files=files, piece_size=16384, progress_callback=progress_cb, interval=0)
+    assert hashes is None
+    assert len(progress_cb.call_args_list) == 3
+
+def test_generate_reports_resumed_progress_first(content):
+    files = _get_files(torf.Torrent(path=content))
+    all_hashes = expected_hashes(files, 16384)
+    progress_cb = Mock(return_value=None)
+    hashes = _generate(files=files, piece_size=16384, progress_callback=progress_cb, interval=0,
+                       known_hashes={i: all_hashes[i] for i in range(8)})
+    assert hashes == b''.join(all_hashes)
+    assert progress_cb.call_args_list == [
+        call(pytest.approx(i / 11 * 100)) for i in range(8, 12)
+    ]
+
+def test_generate_checkpoints_periodically(content):
+    files = _get_files(torf.Torrent(path=content))
+    checkpoint_cb = Mock()
+    hashes = _generate(files=files, piece_size=16384, progress_callback=Mock(return_value=None),
+                       checkpoint_callback=checkpoint_cb, checkpoint_interval=0)
+    assert hashes == b''.join(expected_hashes(files, 16384))
+    # The list of hashes is passed to the callback and filled in afterwards
+    assert len(checkpoint_cb.call_args_list) == 11
+
+def test_generate_checkpoints_when_cancelled(content):
+    files = _get_files(torf.Torrent(path=content))
+    all_hashes = expected_hashes(files, 16384)
+    checkpoints = []
+    progress_cb = Mock(side_effect=(None, None, 'cancel'))
+    hashes = _generate(files=files, piece_size=16384, progress_callback=progress_cb, interval=0,
+                       checkpoint_callback=lambda hashes: checkpoints.append(list(hashes)))
+    assert hashes is None
+    assert checkpoints == [list(all_hashes[:3]) + [None] * 8]
+
+def test_generate_creates_valid_torrent(content, tmp_path):
+    t = torf.Torrent(path=content)
+    t.metainfo['info']['pieces'] = _generate(
+        files=_get_files(t),
+        piece_size=t.piece_size,
+        progress_callback=Mock(return_value=None),
+        workers=2,
+        io_strategy='parallel',
+    )
+    t.validate()
+    assert t.verify(content)
+
+
+def test_benchmark(content):
+    results = tuple(benchmark(content, workers=(1, 2), read_sizes=(None, 4096),
+                              io_strategies=('parallel',), piece_size=16384))
+    assert [r[:3] for r in results] == [
+        ('parallel', 1, None),
+        ('parallel', 1, 4096),
+        ('parallel', 2, None),
+        ('parallel', 2, 4096),
+    ]
+    for r in results:
+        assert r[3] > 0
+
+
+def test_benchmark_uses_calculated_piece_size(content, mocker):
+    generate_mock = mocker.patch('upsies.utils.torrent._generate')
+    calculate_piece_size_mock = mocker.patch('upsies.utils.torrent.calculate_piece_size', return_value=2**20)
+    tuple(benchmark(content, workers=(1,), io_strategies=('parallel',)))
+    total_size = sum(size for _, size in generate_mock.call_args_list[0].kwargs['files'])
+    assert calculate_piece_size_mock.call_args_list == [call(total_size)]
+    assert generate_mock.call_args_list[0].kwargs['piece_size'] == 2**20
+
+@patch('upsies.utils.torrent._path_exists')
+@patch('upsies.utils.torrent._make_file_tree')
+@patch('torf.Torrent')
+def test_create_many_does_not_accept_empty_announce_url(Torrent_mock, file_tree_mock, path_exists_mock):
+    with pytest.raises(errors.TorrentError, match=r'^Announce URL is empty$'):
+        create_many(
+            content_path='path/to/content',
+            targets=(
+                {'torrent_path': 'a.torrent', 'announce': 'http://a'},
+                {'torrent_path': 'b.torrent', 'announce': ''},
+            ),
+            init_callback=Mock(),
+            progress_callback=Mock(),
+        )
+    assert Torrent_mock.call_args_list == []
+
+@patch('upsies.utils.torrent._path_exists')
+@patch('upsies.utils.torrent._make_file_tree')
+@patch('torf.Torrent')
+def test_create_many_only_writes_missing_torrent_files(Torrent_mock, file_tree_mock, path_exists_mock, hashing_mocks):
+    path_exists_mock.side_effect = lambda path: path == 'b.torrent'
+    targets = (
+        {'torrent_path': 'a.torrent', 'announce': 'http://a'},
+        {'torrent_path': 'b.torrent', 'announce': 'http://b'},
+        {'torrent_path': 'c.torrent', 'announce': 'http://c', 'source': 'C', 'private': False},
+    )
+    torrent_paths = create_many(
+        content_path='path/to/content',
+        targets=targets,
+        init_callback=Mock(),
+        progress_callback=Mock(),
+    )
+    assert torrent_paths == ('a.torrent', 'b.torrent', 'c.torrent')
+    assert len(hashing_mocks.generate.call_args_list) == 1
+    assert Torrent_mock.return_value.write.call_args_list == [
+        call('a.torrent', overwrite=False),
+        call('c.torrent', overwrite=False),
+    ]
+    assert Torrent_mock.return_value.trackers == (('http://c',),)
+    assert Torrent_mock.return_value.source == 'C'
+    assert Torrent_mock.return_value.private is False
+
+@patch('upsies.utils.torrent._path_exists')
+@patch('upsies.utils.torrent._make_file_tree')
+@patch('torf.Torrent')
+def test_create_many_does_not_hash_if_all_torrent_files_exist(Torrent_mock, file_tree_mock, path_exists_mock, hashing_mocks):
+    path_exists_mock.return_value = True
+    torrent_paths = create_many(
+        content_path='path/to/content',
+        targets=(
+            {'torrent_path': 'a.torrent', 'announce': 'http://a'},
+            {'torrent_path': 'b.torrent', 'announce': 'http://b'},
+        ),
+        init_callback=Mock(),
+        progress_callback=Mock(),
+    )
+    assert torrent_paths == ('a.torrent', 'b.torrent')
+    assert Torrent_mock.call_args_list == []
+    assert hashing_mocks.generate.call_args_list == []
+
+def test_create_many_writes_torrents_with_same_pieces(content, tmp_path, mocker):
+    mocker.patch('upsies.utils.torrent._get_files', _get_files)
+    mocker.patch('upsies.utils.torrent._generate', _generate)
+    torrent_paths = create_many(
+        content_path=str(content),
+        targets=(
+            {'torrent_path': str(tmp_path / 'a.torrent'), 'announce': 'http://a/announce', 'source': 'A'},
+            {'torrent_path': str(tmp_path / 'b.torrent'), 'announce': 'http://b/announce', 'private': False},
+        ),
+        init_callback=Mock(),
+        progress_callback=Mock(return_value=None),
+    )
+    assert torrent_paths == (str(tmp_path / 'a.torrent'), str(tmp_path / 'b.torrent'))
+    a = torf.Torrent.read(torrent_paths[0])
+    b = torf.Torrent.read(torrent_paths[1])
+    assert a.hashes == b.hashes
+    assert a.trackers == [['http://a/announce']]
+    assert b.trackers == [['http://b/announce']]
+    assert (a.source, a.private) == ('A', True)
+    assert (b.source, bool(b.private)) == (None, False)
+    assert a.infohash != b.infohash
+    assert a.verify(content)
+
+
+@pytest.mark.parametrize(
+    argnames='content_size, kwargs, exp_piece_size',
+    argvalues=(
+        (1, {}, 16 * 2**10),
+        (100 * 2**20, {}, 64 * 2**10),
+        (1.5 * 2**30, {}, 1 * 2**20),
+        (30 * 2**30, {}, 16 * 2**20),
+        (300 * 2**30, {}, 16 * 2**20),
+        (30 * 2**30, {'max_piece_size': 4 * 2**20}, 4 * 2**20),
+        (100 * 2**20, {'min_piece_size': 1 * 2**20}, 1 * 2**20),
+        (100 * 2**20, {'min_piece_size': 20 * 2**10}, 64 * 2**10),
+        (100 * 2**20, {'min_piece_size': 20 * 2**10, 'max_piece_size': 40 * 2**10}, 32 * 2**10),
+        (100 * 2**20, {'min_pieces': 100, 'max_pieces': 200}, 1 * 2**20),
+        # No piece size results in 1700 - 1800 pieces
+        (100 * 2**20, {'min_pieces': 1700, 'max_pieces': 1800}, 64 * 2**10),
+    ),
+    ids=lambda v: str(v),
+)
+def test_calculate_piece_size(content_size, kwargs, exp_piece_size):
+    assert torrent.calculate_piece_size(int(content_size), **kwargs) == exp_piece_size
+
+def test_calculate_piece_size_with_impossible_limits():
+    with pytest.raises(ValueError, match=r'^Minimum piece size is larger than maximum piece size: 32768 > 16384$'):
+        torrent.calculate_piece_size(123, min_piece_size=20 * 2**10, max_piece_size=30 * 2**10)
+
+def test_create_many_uses_most_restrictive_piece_size_limits(content, tmp_path, mocker):
+    mocker.patch('upsies.utils.torrent._get_files', _get_files)
+    mocker.patch('upsies.utils.torrent._generate', _generate)
+    create_many(
+        content_path=str(content),
+        targets=(
+            {'torrent_path': str(tmp_path / 'a.torrent'), 'announce': 'http://a', 'piece_size_min': 32768},
+            {'torrent_path': str(tmp_path / 'b.torrent'), 'announce': 'http://b', 'piece_size_min': 65536,
+             'piece_size_max': 2**20},
+        ),
+        init_callback=Mock(),
+        progress_callback=Mock(return_value=None),
+    )
+    for name in ('a.torrent', 'b.torrent'):
+        t = torf.Torrent.read(tmp_path / name)
+        assert t.piece_size == 65536
+        assert t.verify(content)
+
+def test_create_many_with_incompatible_piece_size_limits(content, tmp_path, mocker):
+    mocker.patch('upsies.utils.torrent._get_files', _get_files)
+    with pytest.raises(errors.TorrentError, match=r'^Minimum piece size is larger than maximum piece size: '
+                       r'65536 > 32768$'):
+        create_many(
+            content_path=str(content),
+            targets=(
+                {'torrent_path': str(tmp_path / 'a.torrent'), 'announce': 'http://a', 'piece_size_max': 32768},
+                {'torrent_path': str(tmp_path / 'b.torrent'), 'announce': 'http://b', 'piece_size_min': 65536},
+            ),
+            init_callback=Mock(),
+            progress_callback=Mock(return_value=None),
+        )
+
+
+def test_PieceHashStore_directory(tmp_path):
+    store = torrent.PieceHashStore(tmp_path / 'store')
+    assert store.directory == str(tmp_path / 'store')
+
+def test_PieceHashStore_key_changes_with_files_sizes_mtimes_and_piece_size(content, tmp_path):
+    store = torrent.PieceHashStore(tmp_path / 'store')
+    files = _get_files(torf.Torrent(path=content))
+    key = store.key(files, 16384)
+    assert key == store.key(files, 16384)
+    assert key != store.key(files, 32768)
+    assert key != store.key(files[:-1], 16384)
+    assert key != store.key(files[:-1] + ((files[-1][0], files[-1][1] + 1),), 16384)
+    os.utime(files[0][0], ns=(123, 456))
+    assert key != store.key(files, 16384)
+
+def test_PieceHashStore_key_does_not_change_when_content_is_moved(content, tmp_path):
+    store = torrent.PieceHashStore(tmp_path / 'store')
+    files = _get_files(torf.Torrent(path=content))
+    key = store.key(files, 16384)
+    os.rename(content, tmp_path / 'renamed')
+    files = _get_files(torf.Torrent(path=tmp_path / 'renamed'))
+    assert store.key(files, 16384) == key
+
+def test_PieceHashStore_key_with_missing_file(content, tmp_path):
+    store = torrent.PieceHashStore(tmp_path / 'store')
+    assert store.key(((str(content / 'nope'), 123),), 16384) is None
+
+def test_PieceHashStore_get_and_put(tmp_path):
+    store = torrent.PieceHashStore(tmp_path / 'store')
+    assert store.get('foo') is None
+    store.put('foo', b'x' * 40)
+    assert store.get('foo') == b'x' * 40
+    assert os.listdir(tmp_path / 'store') == ['foo.pieces']
+
+def test_PieceHashStore_get_ignores_invalid_hashes(tmp_path):
+    store = torrent.PieceHashStore(tmp_path)
+    (tmp_path / 'foo.pieces').write_bytes(b'x' * 21)
+    assert store.get('foo') is None
+    (tmp_path / 'foo.pieces').write_bytes(b'')
+    assert store.get('foo') is None
+
+def test_PieceHashStore_put_ignores_errors(tmp_path):
+    (tmp_path / 'store').write_bytes(b'not a directory')
+    store = torrent.PieceHashStore(tmp_path / 'store')
+    store.put('foo', b'x' * 20)
+    assert store.get('foo') is None
+
+def test_PieceHashStore_get_and_put_checkpoint(tmp_path):
+    store = torrent.PieceHashStore(tmp_path / 'store')
+    assert store.get_checkpoint('foo') == {}
+    store.put_checkpoint('foo', [b'a' * 20, None, b'c' * 20, None])
+    assert store.get_checkpoint('foo') == {0: b'a' * 20, 2: b'c' * 20}
+    assert os.listdir(tmp_path / 'store') == ['foo.partial']
+    store.put('foo', b'x' * 80)
+    assert store.get_checkpoint('foo') == {}
+    assert os.listdir(tmp_path / 'store') == ['foo.pieces']
+
+def test_PieceHashStore_get_checkpoint_ignores_invalid_hashes(tmp_path):
+    store = torrent.PieceHashStore(tmp_path)
+    (tmp_path / 'foo.partial').write_bytes(b'x' * 21)
+    assert store.get_checkpoint('foo') == {}
+
+def test_create_many_resumes_from_checkpoint(content, tmp_path, mocker):
+    mocker.patch('upsies.utils.torrent._get_files', _get_files)
+    mocker.patch('upsies.utils.torrent._generate', functools.partial(_generate, interval=0))
+    hash_pieces_mock = mocker.patch('upsies.utils.torrent._hash_pieces', Mock(wraps=torrent._hash_pieces))
+    create_kwargs = {
+        'content_path': str(content),
+        'targets': ({'torrent_path': str(tmp_path / 'a.torrent'), 'announce': 'http://a'},),
+        'init_callback': Mock(),
+        'store_directory': str(tmp_path / 'store'),
+    }
+    progress_cb = Mock(side_effect=lambda progress: 'cancel' if progress >= 50 else None)
+    assert create_many(progress_callback=progress_cb, **create_kwargs) is None
+    assert not os.path.exists(tmp_path / 'a.torrent')
+    pieces_done = round(progress_cb.call_args_list[-1][0][0] / 100 * 11)
+    assert 0 < pieces_done < 11
+
+    progress_cb = Mock(return_value=None)
+    create_many(progress_callback=progress_cb, **create_kwargs)
+    assert list(hash_pieces_mock.call_args_list[1][0][2]) == list(range(pieces_done, 11))
+    assert progress_cb.call_args_list[0] == call(pieces_done / 11 * 100)
+    assert progress_cb.call_args_list[-1] == call(100.0)
+    assert torf.Torrent.read(tmp_path / 'a.torrent').verify(content)
+    assert sorted(os.path.splitext(f)[1] for f in os.listdir(tmp_path / 'store')) == ['.files', '.pieces']
+
+def test_create_many_reuses_stored_piece_hashes(content, tmp_path, mocker):
+    mocker.patch('upsies.utils.torrent._get_files', _get_files)
+    generate_mock = mocker.patch('upsies.utils.torrent._generate', Mock(wraps=_generate))
+    create_kwargs = {
+        'content_path': str(content),
+        'init_callback': Mock(),
+        'store_directory': str(tmp_path / 'store'),
+        'overwrite': True,
+    }
+    progress_cb = Mock(return_value=None)
+    create_many(targets=({'torrent_path': str(tmp_path / 'a.torrent'), 'announce': 'http://a'},),
+                progress_callback=progress_cb, **create_kwargs)
+    assert len(generate_mock.call_args_list) == 1
+    assert sorted(os.path.splitext(f)[1] for f in os.listdir(tmp_path / 'store')) == ['.files', '.pieces']
+
+    progress_cb.reset_mock()
+    create_many(targets=({'torrent_path': str(tmp_path / 'b.torrent'), 'announce': 'http://b'},),
+                progress_callback=progress_cb, **create_kwargs)
+    assert len(generate_mock.call_args_list) == 1
+    assert progress_cb.call_args_list == [call(100.0)]
+    a = torf.Torrent.read(tmp_path / 'a.torrent')
+    b = torf.Torrent.read(tmp_path / 'b.torrent')
+    assert a.hashes == b.hashes
+    assert b.verify(content)
+
+    (content / 'b').write_bytes(os.urandom(334))
+    create_many(targets=({'torrent_path': str(tmp_path / 'c.torrent'), 'announce': 'http://c'},),
+                progress_callback=progress_cb, **create_kwargs)
+    assert len(generate_mock.call_args_list) == 2
+    assert torf.Torrent.read(tmp_path / 'c.torrent').verify(content)
+
+
+def _get_all_hashes(content_path, piece_size):
+    t = torf.Torrent(path=content_path)
+    t.piece_size = piece_size
+    return t, _get_files(t), _generate(files=_get_files(t), piece_size=piece_size,
+                                       progress_callback=Mock(return_value=None))
+
+def _make_previous_torrent(content_path, piece_size, torrent_path, store):
+    previous, files, previous_hashes = _get_all_hashes(content_path, piece_size)
+    previous.metainfo['info']['pieces'] = previous_hashes
+    previous.write(torrent_path)
+    store.put_file_stats(previous_hashes, torrent._get_file_stats(previous, files))
+    return previous_hashes
+
+def _get_reusable_hashes_for(content_path, piece_size, torrent_path, store):
+    t, files, hashes = _get_all_hashes(content_path, piece_size)
+    file_stats = torrent._get_file_stats(t, files)
+    return _get_reusable_hashes(t, files, file_stats, str(torrent_path), store), hashes
+
+def test_PieceHashStore_get_and_put_file_stats(tmp_path):
+    store = torrent.PieceHashStore(tmp_path / 'store')
+    assert store.get_file_stats(b'hashes') is None
+    store.put_file_stats(b'hashes', [['a/b', 123, 456]])
+    assert store.get_file_stats(b'hashes') == [['a/b', 123, 456]]
+    assert store.get_file_stats(b'other hashes') is None
+    assert os.listdir(tmp_path / 'store') == [hashlib.sha256(b'hashes').hexdigest() + '.files']
+
+@pytest.mark.parametrize('data', (b'not json', b'{}', b'[["a", 1]]'))
+def test_PieceHashStore_get_file_stats_ignores_invalid_data(data, tmp_path):
+    store = torrent.PieceHashStore(tmp_path)
+    (tmp_path / (hashlib.sha256(b'hashes').hexdigest() + '.files')).write_bytes(data)
+    assert store.get_file_stats(b'hashes') is None
+
+def test_get_reusable_hashes_with_added_file(content, tmp_path):
+    store = torrent.PieceHashStore(tmp_path / 'store')
+    previous_hashes = _make_previous_torrent(content, 16384, tmp_path / 'previous.torrent', store)
+    (content / 'e').write_bytes(os.urandom(50_000))
+    reusable, hashes = _get_reusable_hashes_for(content, 16384, tmp_path / 'previous.torrent', store)
+    # The last piece of "d" now also contains bytes from "e"
+    assert sorted(reusable) == list(range(len(previous_hashes) // 20 - 1))
+    for i, piece_hash in reusable.items():
+        assert piece_hash == hashes[i * 20:i * 20 + 20]
+
+def test_get_reusable_hashes_with_changed_file(content, tmp_path):
+    store = torrent.PieceHashStore(tmp_path / 'store')
+    _make_previous_torrent(content, 16384, tmp_path / 'previous.torrent', store)
+    (content / 'b').write_bytes(os.urandom(333))
+    future = time.time() + 60
+    os.utime(content / 'b', (future, future))
+    reusable, hashes = _get_reusable_hashes_for(content, 16384, tmp_path / 'previous.torrent', store)
+    # "b" is at 100000 - 100333, which is in piece 6
+    assert sorted(reusable) == [0, 1, 2, 3, 4, 5, 7, 8, 9, 10]
+    for i, piece_hash in reusable.items():
+        assert piece_hash == hashes[i * 20:i * 20 + 20]
+
+def test_get_reusable_hashes_with_replaced_file_with_older_mtime(content, tmp_path):
+    store = torrent.PieceHashStore(tmp_path / 'store')
+    _make_previous_torrent(content, 16384, tmp_path / 'previous.torrent', store)
+    # Same size, but different content and a modification time from before the
+    # previous torrent was created (e.g. "cp -p" or "rsync -t")
+    (content / 'b').write_bytes(os.urandom(333))
+    past = os.stat(content / 'a').st_mtime - 3600
+    os.utime(content / 'b', (past, past))
+    reusable, hashes = _get_reusable_hashes_for(content, 16384, tmp_path / 'previous.torrent', store)
+    assert sorted(reusable) == [0, 1, 2, 3, 4, 5, 7, 8, 9, 10]
+    for i, piece_hash in reusable.items():
+        assert piece_hash == hashes[i * 20:i * 20 + 20]
+
+def test_get_reusable_hashes_without_file_stats(content, tmp_path):
+    store = torrent.PieceHashStore(tmp_path / 'store')
+    previous, _, previous_hashes = _get_all_hashes(content, 16384)
+    previous.metainfo['info']['pieces'] = previous_hashes
+    previous.write(tmp_path / 'previous.torrent')
+    reusable, _ = _get_reusable_hashes_for(content, 16384, tmp_path / 'previous.torrent', store)
+    assert reusable == {}
+
+def test_get_reusable_hashes_with_different_piece_size(content, tmp_path):
+    store = torrent.PieceHashStore(tmp_path / 'store')
+    _make_previous_torrent(content, 16384, tmp_path / 'previous.torrent', store)
+    reusable, _ = _get_reusable_hashes_for(content, 32768, tmp_path / 'previous.torrent', store)
+    assert reusable == {}
+
+def test_get_reusable_hashes_with_unreadable_torrent(content, tmp_path):
+    store = torrent.PieceHashStore(tmp_path / 'store')
+    reusable, _ = _get_reusable_hashes_for(content, 16384, tmp_path / 'nope.torrent', store)
+    assert reusable == {}
+
+def test_create_many_rehashes_only_changed_pieces(content, tmp_path, mocker):
+    mocker.patch('upsies.utils.torrent._get_files', _get_files)
+    mocker.patch('upsies.utils.torrent._generate', _generate)
+    mocker.patch('upsies.utils.torrent._get_reusable_hashes', _get_reusable_hashes)
+    hash_pieces_mock = mocker.patch('upsies.utils.torrent._hash_pieces', Mock(wraps=torrent._hash_pieces))
+    create_kwargs = {
+        'content_path': str(content),
+        'targets': ({'torrent_path': str(tmp_path / 'a.torrent'), 'announce': 'http://a'},),
+        'init_callback': Mock(),
+        'store_directory': str(tmp_path / 'store'),
+        'overwrite': True,
+    }
+    create_many(progress_callback=Mock(return_value=None), **create_kwargs)
+    pieces_total = len(torf.Torrent.read(tmp_path / 'a.torrent').hashes)
+    assert list(hash_pieces_mock.call_args_list[0][0][2]) == list(range(pieces_total))
+
+    (content / 'e').write_bytes(os.urandom(50_000))
+    progress_cb = Mock(return_value=None)
+    create_many(progress_callback=progress_cb, **create_kwargs)
+    t = torf.Torrent.read(tmp_path / 'a.torrent')
+    assert list(hash_pieces_mock.call_args_list[1][0][2]) == list(range(pieces_total - 1, len(t.hashes)))
+    assert progress_cb.call_args_list[0] == call((pieces_total - 1) / len(t.hashes) * 100)
+    assert progress_cb.call_args_list[-1] == call(100.0)
+    assert t.verify(content)
+
+def test_create_many_does_not_reuse_pieces_without_store_directory(content, tmp_path, mocker):
+    mocker.patch('upsies.utils.torrent._get_files', _get_files)
+    mocker.patch('upsies.utils.torrent._generate', _generate)
+    get_reusable_hashes_mock = mocker.patch('upsies.utils.torrent._get_reusable_hashes')
+    (tmp_path / 'a.torrent').write_bytes(b'previous torrent')
+    create_many(content_path=str(content),
+                targets=({'torrent_path': str(tmp_path / 'a.torrent'), 'announce': 'http://a'},),
+                init_callback=Mock(), progress_callback=Mock(return_value=None), overwrite=True)
+    assert get_reusable_hashes_mock.call_args_list == []
+    assert torf.Torrent.read(tmp_path / 'a.torrent').verify(content)
+
+
+@pytest.fixture
+def verifiable(content, tmp_path):
+    t = torf.Torrent(path=content)
+    t.piece_size = 16384
+    t.generate()
+    t.write(tmp_path / 'content.torrent')
+    return str(tmp_path / 'content.torrent')
+
+@pytest.mark.parametrize('io_strategy', torrent.IO_STRATEGIES)
+def test_verify_reports_no_mismatching_files(io_strategy, verifiable, content):
+    progress_cb = Mock(return_value=None)
+    mismatching_files = torrent.verify(torrent_path=verifiable, content_path=content,
+                                       progress_callback=progress_cb, io_strategy=io_strategy)
+    assert mismatching_files == ()
+    assert progress_cb.call_args_list[-1] == call(100.0)
+
+def test_verify_reports_corrupt_file(verifiable, content):
+    with open(content / 'd', 'r+b') as f:
+        f.seek(50_000)
+        f.write(b'corrupt')
+    mismatching_files = torrent.verify(torrent_path=verifiable, content_path=content,
+                                       progress_callback=Mock(return_value=None))
+    assert mismatching_files == (str(content / 'd'),)
+
+def test_verify_reports_piece_that_spans_multiple_files(verifiable, content):
+    # Piece 6 contains the end of "a", all of "b" and the beginning of "d"
+    with open(content / 'a', 'r+b') as f:
+        f.seek(99_990)
+        f.write(b'corrupt')
+    mismatching_files = torrent.verify(torrent_path=verifiable, content_path=content,
+                                       progress_callback=Mock(return_value=None))
+    assert mismatching_files == (
+        f'piece 6 (spans files {content / "a"}, {content / "b"}, {content / "d"})',
+    )
+
+def test_verify_blames_piece_that_spans_multiple_files_on_known_corrupt_file(verifiable, content):
+    with open(content / 'a', 'r+b') as f:
+        f.seek(99_990)
+        f.write(b'corrupt')
+        f.seek(0)
+        f.write(b'corrupt')
+    mismatching_files = torrent.verify(torrent_path=verifiable, content_path=content,
+                                       progress_callback=Mock(return_value=None))
+    assert mismatching_files == (str(content / 'a'),)
+
+def test_blame_files_blames_file_that_is_part_of_multiple_corrupt_pieces():
+    layout = _PieceLayout((('a', 150), ('b', 100), ('c', 150)), piece_size=100)
+    # Piece 1 spans "a" and "b", piece 2 spans "b" and "c"
+    assert torrent._blame_files(layout, {1, 2}, set()) == ({1}, [])
+    assert torrent._blame_files(layout, {1}, set()) == (set(), [(1, (0, 1))])
+    assert torrent._blame_files(layout, {1}, {0}) == ({0}, [])
+
+def test_verify_reports_files_with_wrong_size_or_missing_files(verifiable, content):
+    os.truncate(content / 'b', 300)
+    os.remove(content / 'd')
+    mismatching_files = torrent.verify(torrent_path=verifiable, content_path=content,
+                                       progress_callback=Mock(return_value=None))
+    assert mismatching_files == (str(content / 'b'), str(content / 'd'))
+
+def test_verify_only_verifies_sample(verifiable, content):
+    with open(content / 'd', 'r+b') as f:
+        f.seek(50_000)
+        f.write(b'corrupt')
+    progress_cb = Mock(return_value=None)
+    mismatching_files = torrent.verify(torrent_path=verifiable, content_path=content,
+                                       progress_callback=progress_cb, sample=50)
+    assert mismatching_files == ()
+    assert progress_cb.call_args_list[-1] == call(100.0)
+
+@pytest.mark.parametrize('sample', (0, -1, 101))
+def test_verify_gets_invalid_sample(sample, verifiable, content):
+    with pytest.raises(errors.TorrentError, match=rf'^Invalid sample percentage: {sample}$'):
+        torrent.verify(torrent_path=verifiable, content_path=content,
+                       progress_callback=Mock(), sample=sample)
+
+def test_verify_is_cancelled_by_progress_callback(verifiable, content):
+    progress_cb = Mock(return_value='cancel')
+    mismatching_files = torrent.verify(torrent_path=verifiable, content_path=content,
+                                       progress_callback=progress_cb)
+    assert mismatching_files is None
+    assert len(progress_cb.call_args_list) == 1
+
+def test_verify_gets_unreadable_torrent_file(content, tmp_path):
+    with pytest.raises(errors.TorrentError, match=rf'^{tmp_path / "nope.torrent"}: No such file or directory$'):
+        torrent.verify(torrent_path=str(tmp_path / 'nope.torrent'), content_path=content,
+                       progress_callback=Mock())
@@ -1,3 +1,4 @@
+import json
 import os
 import random
 import re
@@ -6,7 +7,15 @@ from unittest.mock import Mock, call, patch
 import pytest
 
 from upsies import constants, errors
-from upsies.utils import video
+from upsies.utils import fs, video
+
+
+@pytest.fixture(autouse=True)
+def clear_tracks_cache():
+    video._tracks_cache.clear()
+
+def cached_tracks():
+    return {path: tracks for (path, _, _), tracks in video._tracks_cache.items()}
 
 
 def test_run_mediainfo_gets_unreadable_file(mocker):
@@ -31,7 +40,7 @@ def test_run_mediainfo_passes_positional_args_to_mediainfo_command(mocker):
         call('some/path'),
     ]
     assert run_mock.call_args_list == [
-        call((video._mediainfo_executable, 'some/path') + args, cache=True),
+        call((video._mediainfo_executable, 'some/path') + args, cache=True, resource='io'),
     ]
 
 def test_run_mediainfo_catches_DependencyError(mocker):
@@ -46,7 +55,7 @@ def test_run_mediainfo_catches_DependencyError(mocker):
         call('some/path'),
     ]
     assert run_mock.call_args_list == [
-        call((video._mediainfo_executable, 'some/path'), cache=True),
+        call((video._mediainfo_executable, 'some/path'), cache=True, resource='io'),
     ]
 
 def test_run_mediainfo_does_not_catch_ProcessError(mocker):
@@ -62,7 +71,7 @@ def test_run_mediainfo_does_not_catch_ProcessError(mocker):
     ]
     assert run_mock.call_args_list == [
         call((video._mediainfo_executable, 'some/path'),
-             cache=True),
+             cache=True, resource='io'),
     ]
 
 
@@ -143,6 +152,7 @@ def test_duration_from_ffprobe_succeeds(run_mock, make_ffmpeg_input_mock):
          '-of', 'default=noprint_wrappers=1:nokey=1',
          make_ffmpeg_input_mock.return_value),
         ignore_errors=True,
+        resource='io',
     )]
 
 @patch('upsies.utils.video.make_ffmpeg_input')
@@ -166,8 +176,206 @@ def test_duration_from_ffprobe_fails(run_mock, make_ffmpeg_input_mock):
          '-of', 'default=noprint_wrappers=1:nokey=1',
          make_ffmpeg_input_mock.return_value),
         ignore_errors=True,
+        resource='io',
+    )]
+
+
+def test_keyframes_from_ffprobe(mocker, tmp_path):
+    video_file = tmp_path / 'foo.mkv'
+    video_file.write_bytes(b'video data')
+    run_mock = mocker.patch('upsies.utils.subproc.run', side_effect=(
+        '1.400000\n',
+        (
+            '1.400000,K_\n'
+            '1.441000,__\n'
+            'N/A,K_\n'
+            '11.410000,K_\n'
+            '6.405000,K__\n'
+        ),
+    ))
+    assert video.keyframes(str(video_file)) == (0.0, 5.005, 10.01)
+    assert run_mock.call_args_list == [
+        call(
+            (video._ffprobe_executable, '-v', 'error', '-show_entries', 'format=start_time',
+             '-of', 'default=noprint_wrappers=1:nokey=1', str(video_file)),
+            ignore_errors=True,
+            resource='io',
+        ),
+        call(
+            (video._ffprobe_executable, '-v', 'error', '-select_streams', 'v:0',
+             '-show_entries', 'packet=pts_time,flags', '-of', 'csv=print_section=0',
+             str(video_file)),
+            ignore_errors=True,
+            resource='io',
+        ),
+    ]
+
+def test_keyframes_from_ffprobe_only_reads_around_timestamps(mocker, tmp_path):
+    video_file = tmp_path / 'foo.mkv'
+    video_file.write_bytes(b'video data')
+    run_mock = mocker.patch('upsies.utils.subproc.run', side_effect=(
+        'N/A\n',
+        '0.000000,K_\n10.010000,K_\n595.000000,K_\n605.000000,K_\n',
+    ))
+    assert video.keyframes(str(video_file), timestamps=(600, 5.0, 600.0)) == (0.0, 10.01, 595.0, 605.0)
+    assert run_mock.call_args_list[1] == call(
+        (video._ffprobe_executable, '-v', 'error', '-select_streams', 'v:0',
+         '-read_intervals', '0.000%+20,585.000%+30',
+         '-show_entries', 'packet=pts_time,flags', '-of', 'csv=print_section=0',
+         str(video_file)),
+        ignore_errors=True,
+        resource='io',
+    )
+    assert len(run_mock.call_args_list) == 2
+
+def test_keyframes_from_ffprobe_widens_window_without_keyframes(mocker, tmp_path):
+    video_file = tmp_path / 'foo.mkv'
+    video_file.write_bytes(b'video data')
+    run_mock = mocker.patch('upsies.utils.subproc.run', side_effect=(
+        '1.000000\n',
+        '101.000000,K_\n',
+        '101.000000,K_\n',
+        '101.000000,K_\n531.000000,K_\n',
+    ))
+    assert video.keyframes(str(video_file), timestamps=(100, 500)) == (100.0, 530.0)
+    assert run_mock.call_args_list[1:] == [
+        call(
+            (video._ffprobe_executable, '-v', 'error', '-select_streams', 'v:0',
+             '-read_intervals', f'{start}',
+             '-show_entries', 'packet=pts_time,flags', '-of', 'csv=print_section=0',
+             str(video_file)),
+            ignore_errors=True,
+            resource='io',
+        )
+        for start in ('86.000%+30,486.000%+30', '471.000%+60', '441.000%+120')
+    ]
+
+def test_keyframes_from_ffprobe_gives_up_widening_window(mocker, tmp_path):
+    video_file = tmp_path / 'foo.mkv'
+    video_file.write_bytes(b'video data')
+    run_mock = mocker.patch('upsies.utils.subproc.run', side_effect=(
+        '0.000000\n',
+        '100.000000,K_\n',
+        '',
+        '',
+        '',
+    ))
+    assert video.keyframes(str(video_file), timestamps=(100, 1000)) == (100.0,)
+    assert [c.args[0][6] for c in run_mock.call_args_list[1:]] == [
+        '85.000%+30,985.000%+30', '970.000%+60', '940.000%+120', '880.000%+240',
+    ]
+
+def test_keyframes_without_keyframes(mocker, tmp_path):
+    video_file = tmp_path / 'foo.mkv'
+    video_file.write_bytes(b'video data')
+    mocker.patch('upsies.utils.subproc.run', return_value='0.041000,__\n')
+    with pytest.raises(errors.ContentError, match=rf'^{re.escape(str(video_file))}: Failed to find keyframes$'):
+        video.keyframes(str(video_file))
+
+def test_keyframes_without_ffprobe(mocker, tmp_path):
+    video_file = tmp_path / 'foo.mkv'
+    video_file.write_bytes(b'video data')
+    mocker.patch('upsies.utils.subproc.run', side_effect=errors.DependencyError('Missing dependency: ffprobe'))
+    with pytest.raises(errors.ContentError, match=r'^Missing dependency: ffprobe$'):
+        video.keyframes(str(video_file))
+
+def test_keyframes_are_cached(mocker, tmp_path):
+    video_file = tmp_path / 'foo.mkv'
+    video_file.write_bytes(b'video data')
+    cache_directory = tmp_path / 'cache'
+    run_mock = mocker.patch('upsies.utils.subproc.run', side_effect=('0.0', '0.0,K_\n2.5,K_\n'))
+    for _ in range(3):
+        assert video.keyframes(str(video_file), cache_directory=str(cache_directory)) == (0.0, 2.5)
+    assert len(run_mock.call_args_list) == 2
+    fingerprint = fs.file_fingerprint(str(video_file))
+    assert sorted(os.listdir(cache_directory)) == [
+        f'foo.mkv.{fingerprint}.keyframes',
+        f'foo.mkv.{fingerprint}.keyframes.intervals',
+    ]
+
+    # The whole file was probed, so any timestamps are cached
+    assert video.keyframes(str(video_file), timestamps=(1,), cache_directory=str(cache_directory)) == (0.0, 2.5)
+    assert len(run_mock.call_args_list) == 2
+
+    # Changing the video file invalidates the cache
+    video_file.write_bytes(b'different video data')
+    run_mock.side_effect = ('0.0', '0.0,K_\n3.5,K_\n')
+    assert video.keyframes(str(video_file), cache_directory=str(cache_directory)) == (0.0, 3.5)
+    assert len(run_mock.call_args_list) == 4
+
+def test_keyframes_around_timestamps_are_cached_per_file(mocker, tmp_path):
+    video_file = tmp_path / 'foo.mkv'
+    video_file.write_bytes(b'video data')
+    cache_directory = tmp_path / 'cache'
+    run_mock = mocker.patch('upsies.utils.subproc.run', side_effect=(
+        '0.0', '100.0,K_\n',
+        '0.0', '300.0,K_\n',
+        '0.0', '0.0,K_\n100.0,K_\n300.0,K_\n400.0,K_\n',
+    ))
+    assert video.keyframes(str(video_file), timestamps=(100,), cache_directory=str(cache_directory)) == (100.0,)
+    assert len(run_mock.call_args_list) == 2
+
+    # Only the window that wasn't probed yet is read
+    assert video.keyframes(str(video_file), timestamps=(100, 300),
+                           cache_directory=str(cache_directory)) == (100.0, 300.0)
+    assert len(run_mock.call_args_list) == 4
+    assert run_mock.call_args_list[3].args[0][6] == '285.000%+30'
+
+    # Windows that were probed before are read from cache
+    assert video.keyframes(str(video_file), timestamps=(300, 100),
+                           cache_directory=str(cache_directory)) == (100.0, 300.0)
+    assert len(run_mock.call_args_list) == 4
+
+    # Probing the whole file is not covered by any windows
+    assert video.keyframes(str(video_file), cache_directory=str(cache_directory)) == (0.0, 100.0, 300.0, 400.0)
+    assert len(run_mock.call_args_list) == 6
+    assert video.keyframes(str(video_file), cache_directory=str(cache_directory)) == (0.0, 100.0, 300.0, 400.0)
+    assert len(run_mock.call_args_list) == 6
+
+
+def test_scenes_from_ffmpeg(mocker, tmp_path):
+    video_file = tmp_path / 'foo.mkv'
+    video_file.write_bytes(b'video data')
+    run_mock = mocker.patch('upsies.utils.subproc.run', return_value=(
+        'frame:0    pts:24000   pts_time:24\n'
+        'lavfi.scene_score=0.524580\n'
+        'frame:1    pts:12000   pts_time:12.5\n'
+        'lavfi.scene_score=0.424043\n'
+    ))
+    assert video.scenes(str(video_file)) == (12.5, 24.0)
+    assert run_mock.call_args_list == [call(
+        (video._ffmpeg_executable, '-hide_banner', '-loglevel', 'error',
+         '-skip_frame', 'nokey', '-i', str(video_file), '-map', '0:v:0',
+         '-vf', "scale=160:-2,select='gt(scene,0.3)',metadata=print:file=-",
+         '-f', 'null', '-'),
+        resource='cpu',
     )]
 
+@pytest.mark.parametrize('exception', (errors.DependencyError('Missing dependency: ffmpeg'),
+                                       errors.ProcessError('Invalid data')))
+def test_scenes_fails_to_run_ffmpeg(exception, mocker, tmp_path):
+    video_file = tmp_path / 'foo.mkv'
+    video_file.write_bytes(b'video data')
+    mocker.patch('upsies.utils.subproc.run', side_effect=exception)
+    with pytest.raises(errors.ContentError, match=rf'^{exception}$'):
+        video.scenes(str(video_file))
+
+def test_scenes_are_cached(mocker, tmp_path):
+    video_file = tmp_path / 'foo.mkv'
+    video_file.write_bytes(b'video data')
+    cache_directory = tmp_path / 'cache'
+    run_mock = mocker.patch('upsies.utils.subproc.run', return_value='')
+    for _ in range(3):
+        assert video.scenes(str(video_file), cache_directory=str(cache_directory)) == ()
+    assert len(run_mock.call_args_list) == 1
+    assert os.listdir(cache_directory) == [f'foo.mkv.{fs.file_fingerprint(str(video_file))}.scenes']
+
+    # Changing the video file invalidates the cache
+    video_file.write_bytes(b'different video data')
+    run_mock.return_value = 'frame:0    pts:3500   pts_time:3.5\n'
+    assert video.scenes(str(video_file), cache_directory=str(cache_directory)) == (3.5,)
+    assert len(run_mock.call_args_list) == 2
+
 
 @patch('upsies.utils.video._tracks')
 def test_duration_from_mediainfo_finds_duration(tracks_mock):
@@ -224,6 +432,104 @@ def test_tracks_gets_unexpected_output_from_mediainfo(run_mediainfo_mock):
         video.tracks('foo/bar.mkv')
 
 
+@patch('upsies.utils.video._run_mediainfo')
+def test_tracks_are_cached(run_mediainfo_mock):
+    run_mediainfo_mock.return_value = '{"media": {"track": [{"@type": "Video", "foo": "bar"}]}}'
+    for _ in range(3):
+        assert video._tracks('foo/bar.mkv') == {'Video': [{'@type': 'Video', 'foo': 'bar'}]}
+    assert run_mediainfo_mock.call_args_list == [call('foo/bar.mkv', '--Output=JSON')]
+
+
+def test_probe_runs_mediainfo_once_per_chunk(mocker):
+    mocker.patch.object(video, '_MEDIAINFO_BATCH_SIZE', 2)
+    mocker.patch('upsies.utils.fs.assert_file_readable')
+    run_mock = mocker.patch('upsies.utils.subproc.run', side_effect=(
+        ('[{"media": {"@ref": "a.mkv", "track": [{"@type": "General", "Duration": "1.0"}]}},'
+         ' {"media": {"@ref": "b.mkv", "track": [{"@type": "General", "Duration": "2.0"}]}}]'),
+        '{"media": {"@ref": "c.mkv", "track": [{"@type": "General", "Duration": "3.0"}]}}',
+    ))
+    video.probe(('a.mkv', 'b.mkv', 'c.mkv', 'a.mkv'))
+    assert run_mock.call_args_list == [
+        call((video._mediainfo_executable, '--Output=JSON', 'a.mkv', 'b.mkv'), resource='io'),
+        call((video._mediainfo_executable, '--Output=JSON', 'c.mkv'), resource='io'),
+    ]
+    assert cached_tracks() == {
+        'a.mkv': {'General': [{'@type': 'General', 'Duration': '1.0'}]},
+        'b.mkv': {'General': [{'@type': 'General', 'Duration': '2.0'}]},
+        'c.mkv': {'General': [{'@type': 'General', 'Duration': '3.0'}]},
+    }
+
+    # Cached files are not probed again and durations don't need ffprobe
+    duration_from_ffprobe_mock = mocker.patch('upsies.utils.video._duration_from_ffprobe')
+    video.probe(('a.mkv', 'c.mkv'))
+    assert len(run_mock.call_args_list) == 2
+    assert [video._duration(fp) for fp in ('a.mkv', 'b.mkv', 'c.mkv')] == [1.0, 2.0, 3.0]
+    assert duration_from_ffprobe_mock.call_args_list == []
+
+@pytest.mark.parametrize(
+    argnames='output, exception',
+    argvalues=(
+        ('not json', None),
+        ('[{"media": {"track": []}}]', None),
+        ('[{"no media": {}}, {"no media": {}}]', None),
+        (None, errors.DependencyError('Missing dependency: mediainfo')),
+        (None, errors.ProcessError('Something went wrong')),
+    ),
+    ids=lambda v: repr(v),
+)
+def test_probe_ignores_errors(output, exception, mocker):
+    mocker.patch('upsies.utils.fs.assert_file_readable')
+    mocker.patch('upsies.utils.subproc.run', return_value=output, side_effect=exception)
+    video.probe(('a.mkv', 'b.mkv'))
+    assert cached_tracks() == {}
+
+def test_probe_ignores_unreadable_files(mocker):
+    mocker.patch('upsies.utils.fs.assert_file_readable', side_effect=errors.ContentError('Nope'))
+    run_mock = mocker.patch('upsies.utils.subproc.run')
+    video.probe(('a.mkv', 'b.mkv'))
+    assert run_mock.call_args_list == []
+    assert cached_tracks() == {}
+
+
+def test_probe_maps_results_to_files_by_path(mocker):
+    mocker.patch('upsies.utils.fs.assert_file_readable')
+    mocker.patch('upsies.utils.subproc.run', return_value=(
+        '[{"media": {"@ref": "c.mkv", "track": [{"@type": "General", "Duration": "3.0"}]}},'
+        ' {"media": {"@ref": "a.mkv", "track": [{"@type": "General", "Duration": "1.0"}]}},'
+        ' {"media": {"@ref": "x.mkv", "track": [{"@type": "General", "Duration": "9.0"}]}}]'
+    ))
+    video.probe(('a.mkv', 'b.mkv', 'c.mkv'))
+    assert cached_tracks() == {
+        'c.mkv': {'General': [{'@type': 'General', 'Duration': '3.0'}]},
+        'a.mkv': {'General': [{'@type': 'General', 'Duration': '1.0'}]},
+    }
+
+def test_tracks_cache_uses_same_key_for_str_and_path(tmp_path, mocker):
+    (tmp_path / 'a.mkv').write_bytes(b'foo')
+    run_mediainfo_mock = mocker.patch('upsies.utils.video._run_mediainfo',
+                                      return_value='{"media": {"track": [{"@type": "Video"}]}}')
+    video._tracks(tmp_path / 'a.mkv')
+    video._tracks(str(tmp_path / 'a.mkv'))
+    assert len(run_mediainfo_mock.call_args_list) == 1
+
+def test_tracks_cache_is_invalidated_when_file_changes(tmp_path, mocker):
+    (tmp_path / 'a.mkv').write_bytes(b'foo')
+    run_mediainfo_mock = mocker.patch('upsies.utils.video._run_mediainfo',
+                                      return_value='{"media": {"track": [{"@type": "Video"}]}}')
+    video._tracks(str(tmp_path / 'a.mkv'))
+    (tmp_path / 'a.mkv').write_bytes(b'foo bar')
+    video._tracks(str(tmp_path / 'a.mkv'))
+    assert len(run_mediainfo_mock.call_args_list) == 2
+
+def test_tracks_cache_is_limited(mocker):
+    mocker.patch.object(video, '_TRACKS_CACHE_SIZE', 2)
+    mocker.patch('upsies.utils.video._run_mediainfo',
+                 return_value='{"media": {"track": [{"@type": "Video"}]}}')
+    for fp in ('a.mkv', 'b.mkv', 'a.mkv', 'c.mkv'):
+        video._tracks(fp)
+    assert list(cached_tracks()) == ['a.mkv', 'c.mkv']
+
+
 @patch('upsies.utils.video.tracks')
 def test_default_track_returns_track_with_default_tag(default_track_mock):
     default_track_mock.return_value = {
@@ -267,6 +573,51 @@ def test_default_track_fails_to_find_any_track(default_track_mock):
         video.default_track('video', 'foo.mkv')
 
 
+@patch('upsies.utils.video.tracks')
+def test_info_gets_all_properties_from_single_tracks_call(tracks_mock):
+    tracks_mock.return_value = {
+        'Video': [{'@type': 'Video', 'Width': '1920', 'Height': '1080', 'FrameRate': '23.976',
+                   'BitDepth': '10', 'HDR_Format_Compatibility': 'HDR10', 'Encoded_Library_Name': 'x265'}],
+        'Audio': [{'@type': 'Audio', 'Format': 'AC-3', 'Channels': '6', 'Language': 'en'},
+                  {'@type': 'Audio', 'Format': 'AAC', 'Channels': '2', 'Language': 'fr'}],
+    }
+    video.info.cache_clear()
+    assert video.width('foo.mkv') == 1920
+    assert video.height('foo.mkv') == 1080
+    assert video.resolution('foo.mkv') == '1080p'
+    assert video.frame_rate('foo.mkv') == 23.976
+    assert video.bit_depth('foo.mkv') == '10'
+    assert video.hdr_format('foo.mkv') == 'HDR10'
+    assert video.video_format('foo.mkv') == 'x265'
+    assert video.audio_format('foo.mkv') == 'AC-3'
+    assert video.audio_channels('foo.mkv') == '5.1'
+    assert video.has_dual_audio('foo.mkv') is True
+    assert tracks_mock.call_args_list == [call('foo.mkv')]
+
+def test_VideoInfo_without_tracks():
+    info = video.VideoInfo(None)
+    assert info.width == 0
+    assert info.height == 0
+    assert info.resolution is None
+    assert info.frame_rate == 0
+    assert info.bit_depth is None
+    assert info.hdr_format is None
+    assert info.video_format is None
+    assert info.audio_format is None
+    assert info.audio_channels is None
+    assert info.has_dual_audio is None
+    with pytest.raises(AttributeError):
+        info.foo = 'bar'
+
+def test_VideoInfo_repr():
+    info = video.VideoInfo({'Video': [{'Width': '1280', 'Height': '720'}]})
+    assert repr(info) == (
+        'VideoInfo(width=1280, height=720, resolution=\'720p\', frame_rate=0.0, '
+        'bit_depth=None, hdr_format=None, audio_format=None, audio_channels=None, '
+        'video_format=None, has_dual_audio=False)'
+    )
+
+
 @pytest.mark.parametrize(
     argnames='width, par, exp_width',
     argvalues=(
@@ -275,17 +626,17 @@ def test_default_track_fails_to_find_any_track(default_track_mock):
         ('704', '0.888', 704),
     ),
 )
-@patch('upsies.utils.video.default_track')
-def test_width(default_track_mock, width, par, exp_width):
-    default_track_mock.return_value = {
+@patch('upsies.utils.video.tracks')
+def test_width(tracks_mock, width, par, exp_width):
+    tracks_mock.return_value = {'Video': [{
         '@type': 'Video',
         'Width': width,
         'PixelAspectRatio': par,
-    }
-    video.width.cache_clear()
+    }]}
+    video.info.cache_clear()
     assert video.width('foo.mkv') == exp_width
-    default_track_mock.side_effect = errors.ContentError('No')
-    video.width.cache_clear()
+    tracks_mock.side_effect = errors.ContentError('No')
+    video.info.cache_clear()
     assert video.width('foo.mkv') == 0
 
 
@@ -297,17 +648,17 @@ def test_width(default_track_mock, width, par, exp_width):
         ('480', '0.888', 540),
     ),
 )
-@patch('upsies.utils.video.default_track')
-def test_height(default_track_mock, height, par, exp_height):
-    default_track_mock.return_value = {
+@patch('upsies.utils.video.tracks')
+def test_height(tracks_mock, height, par, exp_height):
+    tracks_mock.return_value = {'Video': [{
         '@type': 'Video',
         'Height': height,
         'PixelAspectRatio': par,
-    }
-    video.height.cache_clear()
+    }]}
+    video.info.cache_clear()
     assert video.height('foo.mkv') == exp_height
-    default_track_mock.side_effect = errors.ContentError('No')
-    video.height.cache_clear()
+    tracks_mock.side_effect = errors.ContentError('No')
+    video.info.cache_clear()
     assert video.height('foo.mkv') == 0
 
 
@@ -337,32 +688,32 @@ def test_height(default_track_mock, height, par, exp_height):
     ),
     ids=lambda value: str(value),
 )
-@patch('upsies.utils.video.default_track')
-def test_resolution(default_track_mock, width, height, par, exp_res, scan_type, exp_scan_type):
-    default_track_mock.return_value = {
+@patch('upsies.utils.video.tracks')
+def test_resolution(tracks_mock, width, height, par, exp_res, scan_type, exp_scan_type):
+    tracks_mock.return_value = {'Video': [{
         '@type': 'Video',
         'Width': width,
         'Height': height,
         'PixelAspectRatio': par,
         'ScanType': scan_type,
-    }
-    video.resolution.cache_clear()
+    }]}
+    video.info.cache_clear()
     assert video.resolution('foo.mkv') == f'{exp_res}{exp_scan_type}'
 
-@patch('upsies.utils.video.default_track')
-def test_resolution_is_unknown(default_track_mock):
-    default_track_mock.return_value = {}
-    video.resolution.cache_clear()
+@patch('upsies.utils.video.tracks')
+def test_resolution_is_unknown(tracks_mock):
+    tracks_mock.return_value = {'Video': [{}]}
+    video.info.cache_clear()
     assert video.resolution('foo.mkv') is None
 
-@patch('upsies.utils.video.default_track')
-def test_resolution_catches_ContentError_from_default_track(default_track_mock):
-    default_track_mock.side_effect = errors.ContentError('Something went wrong')
-    video.resolution.cache_clear()
+@patch('upsies.utils.video.tracks')
+def test_resolution_catches_ContentError_from_tracks(tracks_mock):
+    tracks_mock.side_effect = errors.ContentError('Something went wrong')
+    video.info.cache_clear()
     assert video.resolution('foo.mkv') is None
 
 def test_resolution_uses_display_aspect_ratio(data_dir):
-    video.resolution.cache_clear()
+    video.info.cache_clear()
     video_file = os.path.join(data_dir, 'video', 'aspect_ratio.mkv')
     assert video.resolution(video_file) == '720p'
 
@@ -376,16 +727,16 @@ def test_resolution_uses_display_aspect_ratio(data_dir):
     ),
     ids=lambda v: str(v),
 )
-@patch('upsies.utils.video.default_track')
-def test_frame_rate(default_track_mock, exp_frame_rate, video_dict):
-    default_track_mock.return_value = video_dict
-    video.frame_rate.cache_clear()
+@patch('upsies.utils.video.tracks')
+def test_frame_rate(tracks_mock, exp_frame_rate, video_dict):
+    tracks_mock.return_value = {'Video': [video_dict]}
+    video.info.cache_clear()
     assert video.frame_rate('foo.mkv') == exp_frame_rate
 
-@patch('upsies.utils.video.default_track')
-def test_frame_rate_catches_ContentError(default_track_mock):
-    default_track_mock.side_effect = errors.ContentError('Something went wrong')
-    video.frame_rate.cache_clear()
+@patch('upsies.utils.video.tracks')
+def test_frame_rate_catches_ContentError(tracks_mock):
+    tracks_mock.side_effect = errors.ContentError('Something went wrong')
+    video.info.cache_clear()
     assert video.frame_rate('foo.mkv') == 0.0
 
 
@@ -398,16 +749,16 @@ def test_frame_rate_catches_ContentError(default_track_mock):
     ),
     ids=lambda v: str(v),
 )
-@patch('upsies.utils.video.default_track')
-def test_bit_depth(default_track_mock, exp_bit_depth, video_dict):
-    default_track_mock.return_value = video_dict
-    video.bit_depth.cache_clear()
+@patch('upsies.utils.video.tracks')
+def test_bit_depth(tracks_mock, exp_bit_depth, video_dict):
+    tracks_mock.return_value = {'Video': [video_dict]}
+    video.info.cache_clear()
     assert video.bit_depth('foo.mkv') == exp_bit_depth
 
-@patch('upsies.utils.video.default_track')
-def test_bit_depth_catches_ContentError(default_track_mock):
-    default_track_mock.side_effect = errors.ContentError('Something went wrong')
-    video.bit_depth.cache_clear()
+@patch('upsies.utils.video.tracks')
+def test_bit_depth_catches_ContentError(tracks_mock):
+    tracks_mock.side_effect = errors.ContentError('Something went wrong')
+    video.info.cache_clear()
     assert video.bit_depth('foo.mkv') is None
 
 
@@ -425,17 +776,17 @@ def test_bit_depth_catches_ContentError(default_track_mock):
     ),
     ids=lambda v: str(v),
 )
-@patch('upsies.utils.video.default_track')
-def test_hdr_format(default_track_mock, exp_return_value, video_dict):
+@patch('upsies.utils.video.tracks')
+def test_hdr_format(tracks_mock, exp_return_value, video_dict):
     print('Setting default video track to', video_dict)
-    default_track_mock.return_value = video_dict
-    video.hdr_format.cache_clear()
+    tracks_mock.return_value = {'Video': [video_dict]}
+    video.info.cache_clear()
     assert video.hdr_format('foo.mkv') == exp_return_value
 
-@patch('upsies.utils.video.default_track')
-def test_hdr_format_catches_ContentError(default_track_mock):
-    default_track_mock.side_effect = errors.ContentError('Something went wrong')
-    video.hdr_format.cache_clear()
+@patch('upsies.utils.video.tracks')
+def test_hdr_format_catches_ContentError(tracks_mock):
+    tracks_mock.side_effect = errors.ContentError('Something went wrong')
+    video.info.cache_clear()
     assert video.hdr_format('foo.mkv') is None
 
 
@@ -456,13 +807,13 @@ def test_hdr_format_catches_ContentError(default_track_mock):
 @patch('upsies.utils.video.tracks')
 def test_has_dual_audio(tracks_mock, exp_return_value, audio_dicts):
     tracks_mock.return_value = {'Audio': audio_dicts}
-    video.has_dual_audio.cache_clear()
+    video.info.cache_clear()
     assert video.has_dual_audio('foo.mkv') == exp_return_value
 
-@patch('upsies.utils.video.default_track')
-def test_has_dual_audio_catches_ContentError(default_track_mock):
-    default_track_mock.side_effect = errors.ContentError('Something went wrong')
-    video.has_dual_audio.cache_clear()
+@patch('upsies.utils.video.tracks')
+def test_has_dual_audio_catches_ContentError(tracks_mock):
+    tracks_mock.side_effect = errors.ContentError('Something went wrong')
+    video.info.cache_clear()
     assert video.has_dual_audio('foo.mkv') is None
 
 
@@ -489,16 +840,16 @@ def test_has_dual_audio_catches_ContentError(default_track_mock):
     ),
     ids=lambda v: str(v),
 )
-@patch('upsies.utils.video.default_track')
-def test_audio_format(default_track_mock, exp_audio_format, audio_dict):
-    default_track_mock.return_value = audio_dict
-    video.audio_format.cache_clear()
+@patch('upsies.utils.video.tracks')
+def test_audio_format(tracks_mock, exp_audio_format, audio_dict):
+    tracks_mock.return_value = {'Audio': [audio_dict]}
+    video.info.cache_clear()
     assert video.audio_format('foo.mkv') == exp_audio_format
 
-@patch('upsies.utils.video.default_track')
-def test_audio_format_catches_ContentError_from_default_track(default_track_mock):
-    default_track_mock.side_effect = errors.ContentError('Something went wrong')
-    video.audio_format.cache_clear()
+@patch('upsies.utils.video.tracks')
+def test_audio_format_catches_ContentError_from_tracks(tracks_mock):
+    tracks_mock.side_effect = errors.ContentError('Something went wrong')
+    video.info.cache_clear()
     assert video.audio_format('foo.mkv') is None
 
 
@@ -517,16 +868,16 @@ def test_audio_format_catches_ContentError_from_default_track(default_track_mock
     ),
     ids=lambda value: str(value),
 )
-@patch('upsies.utils.video.default_track')
-def test_audio_channels(default_track_mock, exp_audio_channels, audio_dict):
-    default_track_mock.return_value = audio_dict
-    video.audio_channels.cache_clear()
+@patch('upsies.utils.video.tracks')
+def test_audio_channels(tracks_mock, exp_audio_channels, audio_dict):
+    tracks_mock.return_value = {'Audio': [audio_dict]}
+    video.info.cache_clear()
     assert video.audio_channels('foo.mkv') == exp_audio_channels
 
-@patch('upsies.utils.video.default_track')
-def test_audio_channels_catches_ContentError_from_default_track(default_track_mock):
-    default_track_mock.side_effect = errors.ContentError('Something went wrong')
-    video.audio_channels.cache_clear()
+@patch('upsies.utils.video.tracks')
+def test_audio_channels_catches_ContentError_from_tracks(tracks_mock):
+    tracks_mock.side_effect = errors.ContentError('Something went wrong')
+    video.info.cache_clear()
     assert video.audio_channels('foo.mkv') is None
 
 
@@ -544,16 +895,16 @@ def test_audio_channels_catches_ContentError_from_default_track(default_track_mo
     ),
     ids=lambda value: str(value),
 )
-@patch('upsies.utils.video.default_track')
-def test_video_format(default_track_mock, exp_video_format, video_dict):
-    default_track_mock.return_value = video_dict
-    video.video_format.cache_clear()
+@patch('upsies.utils.video.tracks')
+def test_video_format(tracks_mock, exp_video_format, video_dict):
+    tracks_mock.return_value = {'Video': [video_dict]}
+    video.info.cache_clear()
     assert video.video_format('foo.mkv') == exp_video_format
 
-@patch('upsies.utils.video.default_track')
-def test_video_format_of_unsupported_or_nonexisting_file(default_track_mock):
-    default_track_mock.side_effect = errors.ContentError('Something went wrong')
-    video.video_format.cache_clear()
+@patch('upsies.utils.video.tracks')
+def test_video_format_of_unsupported_or_nonexisting_file(tracks_mock):
+    tracks_mock.side_effect = errors.ContentError('Something went wrong')
+    video.info.cache_clear()
     assert video.video_format('foo.mkv') is None
 
 
@@ -703,6 +1054,191 @@ def test_filter_similar_duration_gets_no_files(mocker):
     assert duration_mock.call_args_list == []
 
 
+def test_filter_similar_duration_does_not_probe_files_of_similar_size(tmp_path, mocker):
+    for name, size in (('a.mkv', 1000), ('b.mkv', 900), ('c.mkv', 600)):
+        (tmp_path / name).write_bytes(b'x' * size)
+    duration_mock = mocker.patch('upsies.utils.video._duration', return_value=12345)
+    probe_mock = mocker.patch('upsies.utils.video.probe')
+    paths = tuple(str(tmp_path / name) for name in ('a.mkv', 'b.mkv', 'c.mkv'))
+    assert video.filter_similar_duration(paths) == paths
+    assert duration_mock.call_args_list == []
+    assert probe_mock.call_args_list == []
+
+def test_filter_similar_duration_probes_ambiguous_files_only(tmp_path, mocker):
+    (tmp_path / 'Extras').mkdir()
+    (tmp_path / 'Sample').mkdir()
+    files = {
+        'movie.mkv': 1000,
+        'movie-sample.mkv': 1000,
+        'Sample/movie.mkv': 1000,
+        'Extras/interview.mkv': 499,
+        'commentary.mkv': 300,
+        'tiny.mkv': 99,
+    }
+    for name, size in files.items():
+        (tmp_path / name).write_bytes(b'x' * size)
+    durations = {
+        str(tmp_path / 'movie.mkv'): 6000,
+        str(tmp_path / 'movie-sample.mkv'): 60,
+        str(tmp_path / 'Sample/movie.mkv'): 60,
+        str(tmp_path / 'commentary.mkv'): 600,
+    }
+    duration_mock = mocker.patch('upsies.utils.video._duration', side_effect=durations.get)
+    mocker.patch('upsies.utils.video.probe')
+    paths = tuple(str(tmp_path / name) for name in files)
+    assert video.filter_similar_duration(paths) == (str(tmp_path / 'movie.mkv'),)
+    assert duration_mock.call_args_list == [call(fp) for fp in durations]
+
+def test_filter_similar_duration_does_not_exclude_all_extras(tmp_path, mocker):
+    (tmp_path / 'foo.sample.mkv').write_bytes(b'x' * 1000)
+    (tmp_path / 'bar.sample.mkv').write_bytes(b'x' * 1000)
+    mocker.patch('upsies.utils.video._duration', return_value=12345)
+    mocker.patch('upsies.utils.video.probe')
+    paths = (str(tmp_path / 'foo.sample.mkv'), str(tmp_path / 'bar.sample.mkv'))
+    assert video.filter_similar_duration(paths) == paths
+
+def test_filter_similar_duration_probes_extras_of_similar_size_and_sorts_them_last(tmp_path, mocker):
+    for name in ('Movie.mkv', 'Movie.Making.Of.mkv', 'Behind the Scenes.mkv', 'Movie Trailer.mkv'):
+        (tmp_path / name).write_bytes(b'x' * 1000)
+    paths = tuple(str(tmp_path / name) for name in
+                  ('Movie.Making.Of.mkv', 'Behind the Scenes.mkv', 'Movie.mkv', 'Movie Trailer.mkv'))
+    mocker.patch('upsies.utils.video._duration', side_effect=(1800, 1500, 7200, 120))
+    probe_mock = mocker.patch('upsies.utils.video.probe')
+    assert video.filter_similar_duration(paths) == (
+        str(tmp_path / 'Movie.mkv'),
+        str(tmp_path / 'Movie.Making.Of.mkv'),
+        str(tmp_path / 'Behind the Scenes.mkv'),
+    )
+    assert probe_mock.call_args_list == [call(paths)]
+
+def test_filter_similar_duration_excludes_small_extras_without_probing(tmp_path, mocker):
+    (tmp_path / 'Movie.mkv').write_bytes(b'x' * 1000)
+    (tmp_path / 'Movie.Trailer.mkv').write_bytes(b'x' * 499)
+    duration_mock = mocker.patch('upsies.utils.video._duration', return_value=12345)
+    paths = (str(tmp_path / 'Movie.mkv'), str(tmp_path / 'Movie.Trailer.mkv'))
+    assert video.filter_similar_duration(paths) == paths[:1]
+    assert duration_mock.call_args_list == []
+
+def test_filter_similar_duration_ignores_names_of_parent_directories(tmp_path, mocker):
+    content_path = tmp_path / 'Extras' / 'Samples' / 'Show.S01'
+    content_path.mkdir(parents=True)
+    (content_path / 'Extras').mkdir()
+    for name in ('Show.S01E01.mkv', 'Show.S01E02.mkv', 'Extras/Bloopers.mkv'):
+        (content_path / name).write_bytes(b'x' * 1000)
+    mocker.patch('upsies.utils.video._duration', side_effect=(1400, 1400, 300))
+    mocker.patch('upsies.utils.video.probe')
+    paths = tuple(str(content_path / name) for name in
+                  ('Show.S01E01.mkv', 'Show.S01E02.mkv', 'Extras/Bloopers.mkv'))
+    assert video.filter_similar_duration(paths) == paths[:2]
+
+def test_first_video_does_not_mistake_main_video_for_extra(tmp_path, mocker):
+    content_path = tmp_path / 'The.Interview.2014.1080p.BluRay.x264-GRP'
+    content_path.mkdir()
+    (content_path / 'The.Interview.2014.1080p.BluRay.x264-GRP.mkv').write_bytes(b'x' * 5000)
+    (content_path / 'Bloopers.mkv').write_bytes(b'x' * 300)
+    duration_mock = mocker.patch('upsies.utils.video._duration', return_value=12345)
+    assert video.first_video(str(content_path)) == str(content_path / 'The.Interview.2014.1080p.BluRay.x264-GRP.mkv')
+    assert duration_mock.call_args_list == []
+
+
+def _make_season(tmp_path, episodes):
+    content_path = tmp_path / 'content'
+    content_path.mkdir()
+    for name in episodes:
+        (content_path / name).write_bytes(b'video data')
+    (content_path / 'content.nfo').write_bytes(b'text')
+    return content_path
+
+def _fake_mediainfo(episodes):
+    def run(argv, *args, **kwargs):
+        medias = []
+        for path in argv[2:]:
+            duration, bitrate, height, audio_format = episodes[os.path.basename(path)]
+            medias.append({'media': {'@ref': path, 'track': [
+                {'@type': 'General', 'Duration': str(duration), 'OverallBitRate': str(bitrate)},
+                {'@type': 'Video', 'Width': str(height * 16 // 9), 'Height': str(height), 'Format': 'AVC'},
+                {'@type': 'Audio', 'Format': audio_format, 'Channels': '2'},
+            ]}})
+        return json.dumps(medias)
+    return run
+
+def test_season_info_probes_all_episodes_concurrently(mocker, tmp_path):
+    episodes = {
+        'S01E01.mkv': (1200, 4000, 1080, 'AC-3'),
+        'S01E02.mkv': (1000, 2000, 1080, 'AC-3'),
+        'S01E03.mkv': (1100, 3000, 1080, 'AC-3'),
+        'S01E04.mkv': (1200, 6000, 1080, 'AC-3'),
+        'S01E05.mkv': (1500, 5000, 1080, 'AC-3'),
+        'S01E05.sample.mkv': (30, 5000, 1080, 'AC-3'),
+    }
+    content_path = _make_season(tmp_path, episodes)
+    mocker.patch('os.cpu_count', return_value=2)
+    run_mock = mocker.patch('upsies.utils.subproc.run', side_effect=_fake_mediainfo(episodes))
+    video.info.cache_clear()
+    video.season_info.cache_clear()
+    season = video.season_info(str(content_path))
+    # The sample has the same size as the episodes, so it is probed and excluded by duration
+    assert sorted(len(c.args[0]) - 2 for c in run_mock.call_args_list) == [3, 3]
+    assert season.video_files == tuple(
+        str(content_path / name) for name in episodes if 'sample' not in name
+    )
+    assert season.runtime == 1100
+    assert season.min_bitrate == 2000
+    assert season.avg_bitrate == 4000
+    assert season.max_bitrate == 6000
+    assert season.resolution == '1080p'
+    assert season.audio_format == 'AC-3'
+    assert season.audio_channels == '2.0'
+    assert season.is_consistent is True
+    assert video.season_info(str(content_path)) is season
+    assert len(run_mock.call_args_list) == 2
+
+def test_season_info_detects_mixed_season_pack(mocker, tmp_path):
+    episodes = {
+        'S01E01.mkv': (1200, 4000, 1080, 'AC-3'),
+        'S01E02.mkv': (1000, 2000, 720, 'AC-3'),
+        'S01E03.mkv': (1100, 3000, 1080, 'AAC'),
+    }
+    content_path = _make_season(tmp_path, episodes)
+    mocker.patch('upsies.utils.subproc.run', side_effect=_fake_mediainfo(episodes))
+    video.info.cache_clear()
+    video.season_info.cache_clear()
+    season = video.season_info(str(content_path))
+    assert season.runtime == 1100
+    assert season.has_consistent_resolution is False
+    assert season.has_consistent_video_format is True
+    assert season.has_consistent_audio is False
+    assert season.is_consistent is False
+    assert season.resolution is None
+    assert season.audio_format is None
+    assert season.video_format is not None
+
+def test_season_info_gets_directory_without_videos(tmp_path):
+    video.season_info.cache_clear()
+    with pytest.raises(errors.ContentError, match=rf'^{re.escape(str(tmp_path))}: No video file found$'):
+        video.season_info(str(tmp_path))
+
+def test_SeasonInfo_without_episodes():
+    season = video.SeasonInfo({}, {}, {})
+    assert season.runtime == 0.0
+    assert season.min_bitrate == 0
+    assert season.avg_bitrate == 0
+    assert season.max_bitrate == 0
+
+@pytest.mark.parametrize(
+    argnames='general_track, size, exp_bitrate',
+    argvalues=(
+        ({'OverallBitRate': '12345'}, 1000, 12345),
+        ({}, 1000, 80),
+        ({}, None, 0),
+    ),
+)
+def test_bitrate(general_track, size, exp_bitrate, mocker):
+    mocker.patch('upsies.utils.video._tracks', return_value={'General': [general_track]})
+    mocker.patch('upsies.utils.fs.file_size', return_value=size)
+    assert video._bitrate('foo.mkv', 100) == exp_bitrate
+
+
 def test_make_ffmpeg_input_gets_bluray_directory(tmp_path):
     path = tmp_path / 'foo'
     (path / 'BDMV').mkdir(parents=True)
@@ -713,9 +1249,9 @@ def test_make_ffmpeg_input_gets_bluray_directory(tmp_path):
 def test_make_ffmpeg_input_gets_dvd_directory(duration_mock, tmp_path):
     path = tmp_path / 'foo'
     (path / 'VIDEO_TS').mkdir(parents=True)
-    (path / 'VIDEO_TS' / '1.VOB').write_text('video data')
-    (path / 'VIDEO_TS' / '2.VOB').write_text('video data')
-    (path / 'VIDEO_TS' / '3.VOB').write_text('video data')
+    (path / 'VIDEO_TS' / '1.VOB').write_bytes(b'x' * 100)
+    (path / 'VIDEO_TS' / '2.VOB').write_bytes(b'x' * 1000)
+    (path / 'VIDEO_TS' / '3.VOB').write_bytes(b'x' * 900)
     duration_mock.side_effect = (100, 1000, 900)
     assert video.make_ffmpeg_input(path) == str(path / 'VIDEO_TS' / '2.VOB')
     assert duration_mock.call_args_list == [
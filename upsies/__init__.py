@@ -12,8 +12,35 @@ def application_setup(config):
 
     :param config: :class:`~.configfiles.ConfigFiles` instance
     """
-    from . import utils
+    import os
+
+    from . import jobs, utils
     utils.http.cache_directory = config['config']['main']['cache_directory']
+    jobs.screenshots.default_workers = config['config']['main']['screenshot_workers']
+    jobs.screenshots.default_batch = config['config']['main']['screenshot_batch']
+    jobs.screenshots.default_seek_mode = config['config']['main']['screenshot_seek_mode']
+    jobs.screenshots.default_in_memory = config['config']['main']['screenshot_in_memory']
+    jobs.screenshots.default_avoid_blank_frames = config['config']['main']['screenshot_avoid_blank_frames']
+    jobs.screenshots.default_timestamp_strategy = config['config']['main']['screenshot_timestamp_strategy']
+    jobs.screenshots.store_directory = config['config']['main']['screenshot_store_directory']
+    jobs.imghost.default_optimize_png = config['config']['main']['optimize_png']
+    jobs.torrent.store_directory = os.path.join(
+        config['config']['main']['cache_directory'],
+        'piece_hashes',
+    )
+    jobs.torrent.default_workers = config['config']['main']['torrent_workers']
+    jobs.torrent.default_read_size = config['config']['main']['torrent_read_size']
+    jobs.torrent.default_io_strategy = config['config']['main']['torrent_io_strategy']
+    jobs.torrent.default_page_cache = config['config']['main']['torrent_page_cache']
+    utils.subproc.governor.slots = {
+        'cpu': config['config']['main']['subprocess_cpu_slots'],
+        'io': config['config']['main']['subprocess_io_slots'],
+    }
+    utils.subproc.governor.timeouts = {
+        'cpu': config['config']['main']['subprocess_cpu_timeout'],
+        'io': config['config']['main']['subprocess_io_timeout'],
+    }
+    utils.daemon.shutdown_deadline = config['config']['main']['shutdown_deadline']
 
 
 def application_shutdown(config):
@@ -24,7 +51,13 @@ def application_shutdown(config):
     """
     from . import utils
     utils.http.close()
+    utils.daemon.shutdown()
+    utils.subproc.governor.cancel()
     utils.fs.limit_directory_size(
         path=config['config']['main']['cache_directory'],
         max_total_size=config['config']['main']['max_cache_size'],
     )
+    utils.fs.limit_directory_size(
+        path=config['config']['main']['screenshot_store_directory'],
+        max_total_size=config['config']['main']['max_screenshot_store_size'],
+    )
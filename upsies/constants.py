@@ -6,12 +6,16 @@ import os
 
 from xdg.BaseDirectory import xdg_cache_home as XDG_CACHE_HOME
 from xdg.BaseDirectory import xdg_config_home as XDG_CONFIG_HOME
+from xdg.BaseDirectory import xdg_data_home as XDG_DATA_HOME
 
 from . import __project_name__
 
 CACHE_DIRPATH = os.path.join(XDG_CACHE_HOME, __project_name__)
 """Path cache directory"""
 
+SCREENSHOT_STORE_DIRPATH = os.path.join(XDG_DATA_HOME, __project_name__, 'screenshots')
+"""Path to directory where screenshots are stored for reuse"""
+
 CONFIG_FILEPATH = os.path.join(XDG_CONFIG_HOME, __project_name__, 'config.ini')
 """Path to general configuration file"""
 
@@ -1,4 +1,5 @@
 import functools
+import os
 
 from . import constants, trackers, utils
 
@@ -7,6 +8,24 @@ defaults = {
         'main': {
             'cache_directory': constants.CACHE_DIRPATH,
             'max_cache_size': utils.types.Bytes.from_string('20 MB'),
+            'screenshot_store_directory': constants.SCREENSHOT_STORE_DIRPATH,
+            'max_screenshot_store_size': utils.types.Bytes.from_string('1 GB'),
+            'subprocess_cpu_slots': utils.types.Integer(os.cpu_count() or 1, min=1),
+            'subprocess_io_slots': utils.types.Integer(4, min=1),
+            'subprocess_cpu_timeout': utils.types.Integer(0, min=0),
+            'subprocess_io_timeout': utils.types.Integer(600, min=0),
+            'shutdown_deadline': utils.types.Integer(3, min=0),
+            'screenshot_workers': utils.types.Integer(min(4, os.cpu_count() or 1), min=1),
+            'screenshot_batch': utils.types.Bool('no'),
+            'screenshot_seek_mode': utils.types.Choice('accurate', options=('accurate', 'keyframe')),
+            'screenshot_in_memory': utils.types.Bool('no'),
+            'screenshot_avoid_blank_frames': utils.types.Bool('no'),
+            'screenshot_timestamp_strategy': utils.types.Choice('interval', options=('interval', 'scenes')),
+            'optimize_png': utils.types.Bool('no'),
+            'torrent_workers': utils.types.Integer(os.cpu_count() or 1, min=1),
+            'torrent_read_size': utils.types.Bytes.from_string('4 MiB'),
+            'torrent_io_strategy': utils.types.Choice('sequential', options=utils.torrent.IO_STRATEGIES),
+            'torrent_page_cache': utils.types.Choice('keep', options=utils.torrent.PAGE_CACHE_MODES),
         },
     },
 
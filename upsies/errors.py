@@ -85,6 +85,14 @@ class ImageResizeError(UpsiesError):
     """Image resizing failed"""
 
 
+class ImageOptimizeError(UpsiesError):
+    """Image optimization failed"""
+
+
+class ImageConvertError(UpsiesError):
+    """Image conversion failed"""
+
+
 class TorrentError(UpsiesError):
     """Torrent file creation failed"""
 
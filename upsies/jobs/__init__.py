@@ -3,5 +3,5 @@ Connect the user interface to the engine room
 """
 
 from .base import JobBase, QueueJobBase  # isort:skip
-from . import (config, custom, dialog, imghost, mediainfo, release_name, scene,
-               screenshots, submit, torrent, webdb)
+from . import (config, custom, dialog, imghost, mediainfo, mosaic,
+               release_name, scene, screenshots, submit, torrent, webdb)
@@ -2,13 +2,26 @@
 Upload images to image hosting services
 """
 
+import asyncio
+import concurrent.futures
+import multiprocessing
+
 from .. import errors
+from ..utils import image
 from ..utils.imghosts import ImageHostBase
 from . import QueueJobBase
 
 import logging  # isort:skip
 _log = logging.getLogger(__name__)
 
+default_optimize_png = False
+"""
+Whether PNG images are optimized before they are uploaded by default
+
+This is set by :func:`~.application_setup` from the ``optimize_png`` option
+in the main configuration file.
+"""
+
 
 class ImageHostJob(QueueJobBase):
     """Upload images to an image hosting service"""
@@ -20,7 +33,7 @@ class ImageHostJob(QueueJobBase):
     # single failed/cancelled upload would throw away all the gathered URLs.
     cache_id = None
 
-    def initialize(self, *, imghost, images_total=0, enqueue=()):
+    def initialize(self, *, imghost, images_total=0, enqueue=(), optimize_png=None):
         """
         Validate arguments and set internal state
 
@@ -31,6 +44,13 @@ class ImageHostJob(QueueJobBase):
         :param images_total: Number of images that are going to be uploaded. The
             only purpose of this value is to provide it via the :attr:`images_total`
             property to calculate progress.
+        :param optimize_png: Whether to recompress PNG images losslessly with
+            :func:`~.image.optimize_png` in a separate process before they are
+            uploaded or `None` to use :attr:`default_optimize_png`
+
+        Images are converted with :func:`~.image.convert` in a separate process
+        before they are uploaded if the ``image_format`` option in `imghost`'s
+        :attr:`~.ImageHostBase.config` is not "png".
 
         If `enqueue` is given, the job finishes after all images are uploaded.
 
@@ -47,12 +67,40 @@ class ImageHostJob(QueueJobBase):
             self._imghost = imghost
             self._images_uploaded = 0
             self._uploaded_images = []
+            self._optimize_png = bool(default_optimize_png if optimize_png is None else optimize_png)
+            self._process_pool = None
+            self._prepared_images = {}
             if images_total > 0:
                 self.images_total = images_total
             else:
                 self.images_total = len(enqueue)
 
+    def enqueue(self, image_path):
+        """
+        Put `image_path` in queue
+
+        Conversion and PNG optimization start immediately, so multiple images
+        are processed in parallel while previous images are uploaded.
+        """
+        self._start_preparing_image(image_path)
+        super().enqueue(image_path)
+
+    def _start_preparing_image(self, image_path):
+        if image_path not in self._prepared_images:
+            self._prepared_images[image_path] = asyncio.ensure_future(self._prepare_image(image_path))
+
+    async def _prepare_image(self, image_path):
+        image_format = str(self._imghost.config.get('image_format', 'png'))
+        if image_format != 'png':
+            image_path = await self._get_converted_image(image_path, image_format)
+        if self._optimize_png and str(image_path).lower().endswith('.png'):
+            image_path = await self._get_optimized_png(image_path)
+        return image_path
+
     async def handle_input(self, image_path):
+        self._start_preparing_image(image_path)
+        image_path = await self._prepared_images.pop(image_path)
+
         try:
             info = await self._imghost.upload(image_path, cache=not self.ignore_cache)
         except errors.RequestError as e:
@@ -64,6 +112,44 @@ class ImageHostJob(QueueJobBase):
             image_url = str(info)
             self.send(image_url)
 
+    async def _get_converted_image(self, image_path, image_format):
+        loop = asyncio.get_event_loop()
+        try:
+            return await loop.run_in_executor(
+                self._get_process_pool(), image.convert, image_path, image_format,
+                self.cache_directory, int(self._imghost.config.get('jpeg_quality', 90)),
+            )
+        except errors.ImageConvertError as e:
+            # Upload the original image
+            self.warn(e)
+            return image_path
+
+    async def _get_optimized_png(self, image_path):
+        loop = asyncio.get_event_loop()
+        try:
+            return await loop.run_in_executor(
+                self._get_process_pool(), image.optimize_png, image_path, self.cache_directory,
+            )
+        except errors.ImageOptimizeError as e:
+            # Upload the original image
+            self.warn(e)
+            return image_path
+
+    def _get_process_pool(self):
+        if self._process_pool is None:
+            self._process_pool = concurrent.futures.ProcessPoolExecutor(
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return self._process_pool
+
+    def finish(self):
+        """Shut down optimization processes and finish"""
+        for task in self._prepared_images.values():
+            task.cancel()
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False)
+        super().finish()
+
     @property
     def exit_code(self):
         """`0` if all images were uploaded, `1` otherwise, `None` if unfinished"""
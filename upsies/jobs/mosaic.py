@@ -0,0 +1,82 @@
+"""
+Create thumbnail mosaic from video file
+"""
+
+import asyncio
+import os
+
+from .. import errors
+from ..utils import fs, image, video
+from . import JobBase
+
+import logging  # isort:skip
+_log = logging.getLogger(__name__)
+
+
+class MosaicJob(JobBase):
+    """
+    Create thumbnail mosaic (a.k.a. contact sheet) from video file
+
+    See :func:`.utils.image.mosaic` for more information.
+
+    This job adds the following signals to the :attr:`~.JobBase.signal`
+    attribute:
+
+        ``mosaic``
+            Emitted after the mosaic was created. Registered callbacks get the
+            mosaic file path as a positional argument. Pass this to
+            :meth:`~.ImageHostJob.enqueue` to upload the mosaic.
+    """
+
+    name = 'mosaic'
+    label = 'Mosaic'
+
+    # Don't cache output and rely on image.mosaic() finding the existing file
+    cache_id = None
+
+    def initialize(self, *, content_path, columns=4, rows=4, tile_width=480):
+        """
+        Set internal state
+
+        :param str content_path: Path to file or directory (filtered through
+            :func:`~.video.first_video`)
+        :param int columns: Number of thumbnails in each row
+        :param int rows: Number of thumbnails in each column
+        :param int tile_width: Width of each thumbnail in pixels
+        """
+        self._content_path = content_path
+        self._columns = columns
+        self._rows = rows
+        self._tile_width = tile_width
+        self.signal.add('mosaic')
+
+    def execute(self):
+        """Call :func:`~.image.mosaic` in an asynchronous thread"""
+        self.add_task(
+            coro=self._make_mosaic(),
+            finish_when_done=True,
+        )
+
+    async def _make_mosaic(self):
+        loop = asyncio.get_event_loop()
+        try:
+            mosaic_file = await loop.run_in_executor(None, self._make_mosaic_sync)
+        except (errors.ContentError, errors.ScreenshotError) as e:
+            self.error(e)
+        else:
+            self.signal.emit('mosaic', mosaic_file)
+            self.send(mosaic_file)
+
+    def _make_mosaic_sync(self):
+        video_file = video.first_video(self._content_path)
+        return image.mosaic(
+            video_file=video_file,
+            mosaic_file=os.path.join(
+                self.home_directory,
+                fs.basename(video_file) + '.mosaic.png',
+            ),
+            columns=self._columns,
+            rows=self._rows,
+            tile_width=self._tile_width,
+            overwrite=self.ignore_cache,
+        )
@@ -2,8 +2,11 @@
 Generate uniform release name
 """
 
+import asyncio
+import os
+
 from .. import errors
-from ..utils import fs, release
+from ..utils import fs, release, types, video
 from . import JobBase
 
 import logging  # isort:skip
@@ -57,6 +60,29 @@ class ReleaseNameJob(JobBase):
         self.signal.add('release_name_updated')
         self.signal.add('release_name')
 
+    def execute(self):
+        """Warn about season packs with inconsistent episodes"""
+        if self.release_name.type is types.ReleaseType.season and os.path.isdir(self._content_path):
+            self.add_task(self._check_season_consistency())
+
+    async def _check_season_consistency(self):
+        loop = asyncio.get_event_loop()
+        try:
+            info = await loop.run_in_executor(None, video.season_info, self._content_path)
+        except errors.ContentError:
+            # Release name falls back to the first video
+            return
+
+        if not info.is_consistent:
+            differences = []
+            if not info.has_consistent_resolution:
+                differences.append('resolution')
+            if not info.has_consistent_video_format:
+                differences.append('video format')
+            if not info.has_consistent_audio:
+                differences.append('audio')
+            self.warn(f'Episodes differ in {", ".join(differences)}')
+
     def release_name_selected(self, release_name):
         """
         :meth:`Send <upsies.jobs.base.JobBase.send>` release name and :meth:`finish
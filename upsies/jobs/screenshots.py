@@ -2,11 +2,13 @@
 Create screenshots from video file(s)
 """
 
+import concurrent.futures
 import os
 import queue
 
 from .. import errors
-from ..utils import LazyModule, daemon, fs, image, timestamp, video
+from ..utils import (LazyModule, closest_number, daemon, fs, image, subproc,
+                     timestamp, video)
 from . import JobBase
 
 import logging  # isort:skip
@@ -14,6 +16,93 @@ _log = logging.getLogger(__name__)
 
 DEFAULT_NUMBER_OF_SCREENSHOTS = 2
 
+default_workers = 1
+"""
+Default number of screenshots that are created concurrently
+
+This is set by :func:`~.application_setup` from the
+``screenshot_workers`` option in the main configuration file.
+"""
+
+default_batch = False
+"""
+Whether all screenshots are created by a single ffmpeg process by default
+
+This is set by :func:`~.application_setup` from the
+``screenshot_batch`` option in the main configuration file.
+"""
+
+SEEK_MODES = ('accurate', 'keyframe')
+"""
+Valid values for the `seek_mode` argument of :class:`ScreenshotsJob`
+
+``accurate``
+    Screenshots are made at the exact timestamps.
+
+``keyframe``
+    Timestamps are moved to the closest keyframe so that ffmpeg only needs to
+    decode a single frame per screenshot. Keyframes are indexed once per video
+    file and cached.
+"""
+
+default_seek_mode = 'accurate'
+"""
+Default seek mode (see :attr:`SEEK_MODES`)
+
+This is set by :func:`~.application_setup` from the
+``screenshot_seek_mode`` option in the main configuration file.
+"""
+
+default_in_memory = False
+"""
+Whether screenshots are kept in memory instead of written to files by default
+
+Image hosts that can only upload files (e.g. imgbox) still write each
+screenshot to a temporary file before uploading it.
+
+This is set by :func:`~.application_setup` from the
+``screenshot_in_memory`` option in the main configuration file.
+"""
+
+TIMESTAMP_STRATEGIES = ('interval', 'scenes')
+"""
+Valid values for the `timestamp_strategy` argument of :class:`ScreenshotsJob`
+
+``interval``
+    Automatically picked timestamps are spread evenly across the video.
+
+``scenes``
+    Like ``interval``, but timestamps are moved away from shot boundaries
+    (cuts, fades, etc). Shot boundaries are detected once per video file by a
+    single low-resolution ``ffmpeg`` pass and cached.
+"""
+
+default_timestamp_strategy = 'interval'
+"""
+Default timestamp strategy (see :attr:`TIMESTAMP_STRATEGIES`)
+
+This is set by :func:`~.application_setup` from the
+``screenshot_timestamp_strategy`` option in the main configuration file.
+"""
+
+default_avoid_blank_frames = False
+"""
+Whether automatically picked timestamps are moved away from blank frames by
+default
+
+This is set by :func:`~.application_setup` from the
+``screenshot_avoid_blank_frames`` option in the main configuration file.
+"""
+
+store_directory = None
+"""
+Where screenshots are stored by video content (see :class:`~.image.ScreenshotStore`)
+or `None` to disable the store
+
+This is set by :func:`~.application_setup` from the
+``screenshot_store_directory`` option in the main configuration file.
+"""
+
 natsort = LazyModule(module='natsort', namespace=globals())
 
 
@@ -33,13 +122,22 @@ class ScreenshotsJob(JobBase):
             Emitted after the screenshot timestamps are determined. Registered
             callbacks get the list of timestamps in the form of "H+:MM:SS" as a
             positional argument.
+
+        ``screenshot``
+            Emitted for each screenshot before it is added to
+            :attr:`~.JobBase.output`. Registered callbacks get the screenshot
+            file path or, in in-memory mode, an :class:`~.image.ImageBuffer`
+            instance as a positional argument. Pass this to
+            :meth:`~.ImageHostJob.enqueue` to upload screenshots.
     """
 
     name = 'screenshots'
     label = 'Screenshots'
     cache_id = None
 
-    def initialize(self, *, content_path, timestamps=(), count=0):
+    def initialize(self, *, content_path, timestamps=(), count=0, workers=None, batch=None,
+                   seek_mode=None, in_memory=None, avoid_blank_frames=None,
+                   timestamp_strategy=None):
         """
         Set internal state
 
@@ -48,10 +146,30 @@ class ScreenshotsJob(JobBase):
         :param timestamps: Screenshot positions in the video
         :type timestamps: sequence of "[[H+:]M+:]S+" strings or seconds
         :param count: How many screenshots to make
+        :param workers: How many ffmpeg processes to run concurrently or `None`
+            to use :attr:`default_workers`
+        :param batch: Whether to create all screenshots with a single ffmpeg
+            process (see :func:`~.image.screenshots`) or `None` to use
+            :attr:`default_batch`; `workers` is ignored in batch mode
+        :param seek_mode: One of :attr:`SEEK_MODES` or `None` to use
+            :attr:`default_seek_mode`
+        :param in_memory: Whether ffmpeg writes screenshots to its stdout instead
+            of files in :attr:`~.JobBase.home_directory` or `None` to use
+            :attr:`default_in_memory`; :attr:`~.JobBase.output` contains file
+            names instead of paths and `batch` is ignored in in-memory mode
+        :param avoid_blank_frames: Whether to move automatically picked
+            timestamps to the most detailed frame nearby with
+            :func:`~.image.best_frames` (requires NumPy) or `None` to use
+            :attr:`default_avoid_blank_frames`
+        :param timestamp_strategy: One of :attr:`TIMESTAMP_STRATEGIES` or `None`
+            to use :attr:`default_timestamp_strategy`
 
         If `timestamps` and `count` are not given, screenshot positions are
         picked at even intervals. If `count` is larger than the length of
         `timestamps`, more timestamps are added.
+
+        Screenshots are always reported in the order of their timestamps, even
+        if they are created concurrently.
         """
         self._content_path = content_path
         self._screenshots_created = 0
@@ -60,6 +178,7 @@ class ScreenshotsJob(JobBase):
         self._timestamps = ()
         self.signal.add('video_file')
         self.signal.add('timestamps', record=True)
+        self.signal.add('screenshot')
         self._screenshots_process = daemon.DaemonProcess(
             name=self.name,
             target=_screenshots_process,
@@ -69,6 +188,15 @@ class ScreenshotsJob(JobBase):
                 'count'        : count,
                 'output_dir'   : self.home_directory,
                 'overwrite'    : self.ignore_cache,
+                'workers'      : workers or default_workers,
+                'batch'        : bool(default_batch if batch is None else batch),
+                'seek_mode'    : seek_mode or default_seek_mode,
+                'in_memory'    : bool(default_in_memory if in_memory is None else in_memory),
+                'avoid_blank_frames' : bool(default_avoid_blank_frames if avoid_blank_frames is None
+                                            else avoid_blank_frames),
+                'timestamp_strategy' : timestamp_strategy or default_timestamp_strategy,
+                'cache_directory' : self.cache_directory,
+                'store_directory' : store_directory,
             },
             info_callback=self._handle_info,
             error_callback=self._handle_error,
@@ -98,8 +226,11 @@ class ScreenshotsJob(JobBase):
                 self._timestamps = tuple(info[1])
                 self._screenshots_total = len(self._timestamps)
                 self.signal.emit('timestamps', self._timestamps)
+            elif info[0] == 'warning':
+                self.warn(info[1])
             elif info[0] == 'screenshot':
                 self._screenshots_created += 1
+                self.signal.emit('screenshot', info[1])
                 self.send(info[1])
 
     def _handle_error(self, error):
@@ -178,11 +309,7 @@ def _normalize_timestamps(video_file, timestamps, count):
     :raise ContentError: if `video_file` is not a video file
     """
     total_secs = video.duration(video_file)
-
-    timestamps_pretty = []
-    for ts in timestamps:
-        ts = max(0, min(total_secs, timestamp.parse(ts)))
-        timestamps_pretty.append(timestamp.pretty(ts))
+    timestamps_pretty = _fixed_timestamps(video_file, timestamps)
 
     if not timestamps and not count:
         count = DEFAULT_NUMBER_OF_SCREENSHOTS
@@ -213,8 +340,139 @@ def _normalize_timestamps(video_file, timestamps, count):
     return natsort.natsorted(timestamps_pretty)
 
 
+def _fixed_timestamps(video_file, timestamps):
+    """
+    Return list of validated human-readable timestamps given by the user
+
+    Timestamps are limited to the duration of `video_file`.
+
+    :raise ValueError: if an item in `timestamps` is invalid
+    :raise ContentError: if `video_file` is not a video file
+    """
+    total_secs = video.duration(video_file)
+    return [
+        timestamp.pretty(max(0, min(total_secs, timestamp.parse(ts))))
+        for ts in timestamps
+    ]
+
+
+def _avoid_blank_frames(output_queue, video_file, timestamps, fixed_timestamps):
+    """
+    Move automatically picked timestamps to the most detailed frame nearby
+
+    :param timestamps: Human-readable timestamps from
+        :func:`_normalize_timestamps`
+    :param fixed_timestamps: Human-readable timestamps from
+        :func:`_fixed_timestamps`; these are not moved
+
+    If frames can't be analyzed, a warning is sent to `output_queue` and
+    `timestamps` are returned unchanged.
+
+    :return: List of human-readable timestamps
+    """
+    auto_timestamps = [ts for ts in timestamps if ts not in fixed_timestamps]
+    if not auto_timestamps:
+        return timestamps
+
+    try:
+        best = image.best_frames(video_file, [timestamp.parse(ts) for ts in auto_timestamps])
+    except (errors.DependencyError, errors.ScreenshotError) as e:
+        output_queue.put((daemon.MsgType.info, ('warning', f'Not avoiding blank frames: {e}')))
+        return timestamps
+    else:
+        best_pretty = [timestamp.pretty(ts) for ts in best]
+        # Remove duplicates
+        return natsort.natsorted(set(timestamps).difference(auto_timestamps).union(best_pretty))
+
+
+_MAX_SHOT_MARGIN = 3
+_MIN_SHOT_LENGTH = 2
+
+def _place_in_scenes(output_queue, video_file, timestamps, fixed_timestamps, cache_directory):
+    """
+    Move automatically picked timestamps away from shot boundaries
+
+    Each timestamp is moved into the closest shot that is not too short. Inside
+    the shot, it is kept a few seconds away from the shot's boundaries or put in
+    the middle of short shots. Timestamps that are already far enough from any
+    shot boundary are not moved, so the even spacing is mostly preserved.
+
+    :param timestamps: Human-readable timestamps from
+        :func:`_normalize_timestamps`
+    :param fixed_timestamps: Human-readable timestamps from
+        :func:`_fixed_timestamps`; these are not moved
+
+    If shot boundaries can't be detected, a warning is sent to `output_queue`
+    and `timestamps` are returned unchanged.
+
+    :return: List of human-readable timestamps
+    """
+    auto_timestamps = [ts for ts in timestamps if ts not in fixed_timestamps]
+    if not auto_timestamps:
+        return timestamps
+
+    try:
+        boundaries = video.scenes(video_file, cache_directory=cache_directory)
+        total_secs = video.duration(video_file)
+    except errors.ContentError as e:
+        output_queue.put((daemon.MsgType.info, ('warning', f'Not placing screenshots in scenes: {e}')))
+        return timestamps
+
+    edges = [0] + [b for b in boundaries if 0 < b < total_secs] + [total_secs]
+    shots = [(start, end) for start, end in zip(edges, edges[1:])]
+    shots = [shot for shot in shots if shot[1] - shot[0] >= _MIN_SHOT_LENGTH] or shots
+
+    def position_in_shot(shot, target):
+        start, end = shot
+        margin = min((end - start) / 2, _MAX_SHOT_MARGIN)
+        return max(start + margin, min(end - margin, target))
+
+    placed = []
+    for ts in auto_timestamps:
+        target = timestamp.parse(ts)
+        position = min(
+            (position_in_shot(shot, target) for shot in shots),
+            key=lambda pos: abs(pos - target),
+        )
+        placed.append(timestamp.pretty(position))
+
+    # Remove duplicates
+    return natsort.natsorted(set(timestamps).difference(auto_timestamps).union(placed))
+
+
+def _snap_to_keyframes(video_file, timestamps, cache_directory):
+    """
+    Map each human-readable timestamp to the closest keyframe
+
+    If the closest keyframe is already used by another timestamp, the timestamp
+    is kept and seeked accurately so that no screenshot is lost.
+
+    :return: Dictionary that maps human-readable keyframe timestamps to
+        keyframe positions in seconds; if the keyframes can't be determined,
+        `timestamps` are mapped to themselves
+    """
+    seconds = {ts: timestamp.parse(ts) for ts in timestamps}
+    try:
+        kfs = video.keyframes(video_file, timestamps=seconds.values(), cache_directory=cache_directory)
+    except errors.ContentError as e:
+        _log.debug('Not snapping to keyframes: %r', e)
+        return {ts: ts for ts in timestamps}
+    else:
+        positions = {}
+        for ts in timestamps:
+            kf = closest_number(seconds[ts], kfs)
+            if timestamp.pretty(kf) in positions:
+                positions.setdefault(ts, ts)
+            else:
+                positions[timestamp.pretty(kf)] = kf
+        return positions
+
+
 def _screenshots_process(output_queue, input_queue,
-                         content_path, timestamps, count, output_dir, overwrite):
+                         content_path, timestamps, count, output_dir, overwrite,
+                         workers=1, batch=False, seek_mode='accurate', in_memory=False,
+                         avoid_blank_frames=False, timestamp_strategy='interval',
+                         cache_directory=None, store_directory=None):
     # Find appropriate video file if `content_path` is a directory
     try:
         video_file = video.first_video(content_path)
@@ -230,36 +488,206 @@ def _screenshots_process(output_queue, input_queue,
         # Get list of valid timestamps based on fixed timestamps and desired
         # amount of screenshots
         try:
-            timestamps = _normalize_timestamps(
+            normalized_timestamps = _normalize_timestamps(
                 video_file=video_file,
                 timestamps=timestamps,
                 count=count,
             )
+            if timestamp_strategy == 'scenes' or avoid_blank_frames:
+                fixed_timestamps = _fixed_timestamps(video_file, timestamps)
+            if timestamp_strategy == 'scenes':
+                normalized_timestamps = _place_in_scenes(
+                    output_queue, video_file, normalized_timestamps,
+                    fixed_timestamps=fixed_timestamps,
+                    cache_directory=cache_directory,
+                )
+            if avoid_blank_frames:
+                normalized_timestamps = _avoid_blank_frames(
+                    output_queue, video_file, normalized_timestamps,
+                    fixed_timestamps=fixed_timestamps,
+                )
         except (ValueError, errors.ContentError) as e:
             output_queue.put((daemon.MsgType.error, str(e)))
         else:
+            timestamps = normalized_timestamps
+
+            # Map human-readable timestamps to positions passed to ffmpeg
+            if seek_mode == 'keyframe':
+                positions = _snap_to_keyframes(video_file, timestamps, cache_directory)
+                timestamps = tuple(positions)
+            else:
+                positions = {ts: ts for ts in timestamps}
+
             # Report valid timestamps
             output_queue.put((daemon.MsgType.info, ('timestamps', timestamps)))
 
-            for ts in timestamps:
-                if _shall_terminate(input_queue):
-                    return
-
-                screenshot_file = os.path.join(
-                    output_dir,
-                    fs.basename(video_file) + f'.{ts}.png',
-                )
-                try:
-                    image.screenshot(
-                        video_file=video_file,
-                        screenshot_file=screenshot_file,
-                        timestamp=ts,
-                        overwrite=overwrite,
-                    )
-                except errors.ScreenshotError as e:
-                    output_queue.put((daemon.MsgType.error, str(e)))
+            screenshot_kwargs = [
+                {
+                    'video_file': video_file,
+                    'screenshot_file': os.path.join(
+                        output_dir,
+                        fs.basename(video_file) + f'.{ts}.png',
+                    ),
+                    'timestamp': positions[ts],
+                    'overwrite': overwrite,
+                }
+                for ts in timestamps
+            ]
+            if in_memory:
+                _make_screenshot_buffers(output_queue, input_queue, screenshot_kwargs, workers)
+            else:
+                if store_directory:
+                    store = image.ScreenshotStore(store_directory)
+                    missing = _get_from_store(store, screenshot_kwargs)
+
+                if batch and screenshot_kwargs:
+                    _make_screenshots_in_batch(output_queue, input_queue, screenshot_kwargs)
+                elif workers > 1 and len(screenshot_kwargs) > 1:
+                    _make_screenshots_concurrently(output_queue, input_queue, screenshot_kwargs, workers)
                 else:
-                    output_queue.put((daemon.MsgType.info, ('screenshot', screenshot_file)))
+                    _make_screenshots(output_queue, input_queue, screenshot_kwargs)
+
+                if store_directory:
+                    _put_in_store(store, missing)
+
+
+def _get_from_store(store, screenshot_kwargs):
+    # Link or copy stored screenshots to their destination and return the
+    # screenshot_kwargs items that must be created by ffmpeg
+    missing = []
+    for kwargs in screenshot_kwargs:
+        if kwargs['overwrite']:
+            missing.append(kwargs)
+        elif not os.path.exists(kwargs['screenshot_file']) and not store.get(**_store_kwargs(kwargs)):
+            missing.append(kwargs)
+    return missing
+
+
+def _put_in_store(store, screenshot_kwargs):
+    for kwargs in screenshot_kwargs:
+        if os.path.exists(kwargs['screenshot_file']):
+            store.put(**_store_kwargs(kwargs))
+
+
+def _store_kwargs(kwargs):
+    return {
+        'video_file': kwargs['video_file'],
+        'timestamp': kwargs['timestamp'],
+        'screenshot_file': kwargs['screenshot_file'],
+    }
+
+
+def _make_screenshots(output_queue, input_queue, screenshot_kwargs):
+    # Run ffmpeg in a thread so we can kill it if we are told to terminate
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    try:
+        for kwargs in screenshot_kwargs:
+            if _shall_terminate(input_queue):
+                return
+
+            future = executor.submit(image.screenshot, **kwargs)
+            if not _wait_for_future(future, (future,), input_queue):
+                return
+
+            try:
+                future.result()
+            except (errors.ScreenshotError, errors.ProcessError) as e:
+                output_queue.put((daemon.MsgType.error, str(e)))
+            else:
+                output_queue.put((daemon.MsgType.info, ('screenshot', kwargs['screenshot_file'])))
+    finally:
+        executor.shutdown(wait=False)
+
+
+def _make_screenshots_concurrently(output_queue, input_queue, screenshot_kwargs, workers):
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = [executor.submit(image.screenshot, **kwargs)
+                   for kwargs in screenshot_kwargs]
+
+        # Report screenshots in the same order as they were requested
+        for future, kwargs in zip(futures, screenshot_kwargs):
+            if not _wait_for_future(future, futures, input_queue):
+                return
+
+            try:
+                future.result()
+            except (errors.ScreenshotError, errors.ProcessError) as e:
+                output_queue.put((daemon.MsgType.error, str(e)))
+            else:
+                output_queue.put((daemon.MsgType.info, ('screenshot', kwargs['screenshot_file'])))
+    finally:
+        executor.shutdown(wait=False)
+
+
+def _make_screenshots_in_batch(output_queue, input_queue, screenshot_kwargs):
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    try:
+        future = executor.submit(
+            image.screenshots,
+            video_file=screenshot_kwargs[0]['video_file'],
+            timestamps=[kwargs['timestamp'] for kwargs in screenshot_kwargs],
+            screenshot_files=[kwargs['screenshot_file'] for kwargs in screenshot_kwargs],
+            overwrite=screenshot_kwargs[0]['overwrite'],
+        )
+        if not _wait_for_future(future, (future,), input_queue):
+            return
+
+        try:
+            future.result()
+        except (errors.ScreenshotError, errors.ProcessError) as e:
+            output_queue.put((daemon.MsgType.error, str(e)))
+        else:
+            for kwargs in screenshot_kwargs:
+                output_queue.put((daemon.MsgType.info, ('screenshot', kwargs['screenshot_file'])))
+    finally:
+        executor.shutdown(wait=False)
+
+
+def _make_screenshot_buffers(output_queue, input_queue, screenshot_kwargs, workers):
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, workers))
+    try:
+        futures = [
+            executor.submit(
+                image.screenshot_buffer,
+                video_file=kwargs['video_file'],
+                timestamp=kwargs['timestamp'],
+                name=os.path.basename(kwargs['screenshot_file']),
+            )
+            for kwargs in screenshot_kwargs
+        ]
+
+        # Report screenshots in the same order as they were requested
+        for future in futures:
+            if not _wait_for_future(future, futures, input_queue):
+                return
+
+            try:
+                buffer = future.result()
+            except (errors.ScreenshotError, errors.ProcessError) as e:
+                output_queue.put((daemon.MsgType.error, str(e)))
+            else:
+                output_queue.put((daemon.MsgType.info, ('screenshot', buffer)))
+    finally:
+        executor.shutdown(wait=False)
+
+
+def _wait_for_future(future, futures, input_queue):
+    # Return True when `future` is done or False if we were told to terminate
+    while True:
+        done, _ = concurrent.futures.wait((future,), timeout=0.1)
+        if done:
+            return True
+
+        if _shall_terminate(input_queue):
+            # Don't start any more ffmpeg processes and kill running ones. This
+            # also kills processes of workers that are still waiting for a
+            # slot. The governor belongs to this daemon process, so stopping
+            # it doesn't affect anything else.
+            for f in futures:
+                f.cancel()
+            subproc.governor.stop()
+            return False
 
 
 def _shall_terminate(input_queue):
@@ -12,11 +12,60 @@ from . import base
 import logging  # isort:skip
 _log = logging.getLogger(__name__)
 
+store_directory = None
+"""
+Where piece hashes are stored for reuse (see :class:`~.utils.torrent.PieceHashStore`)
+
+Incomplete piece hashes are also checkpointed here so that a cancelled or
+crashed job resumes where it stopped.
+
+This is set by :func:`~.application_setup` to a subdirectory of the
+``cache_directory`` option in the main configuration file. If this is `None`,
+content is always hashed.
+"""
+
+default_workers = None
+"""
+Default number of threads that hash pieces or `None` to use one thread per CPU
+core
+
+This is set by :func:`~.application_setup` from the ``torrent_workers`` option
+in the main configuration file.
+"""
+
+default_read_size = None
+"""
+Default maximum number of bytes per read or `None` to read each piece in one go
+
+This is set by :func:`~.application_setup` from the ``torrent_read_size``
+option in the main configuration file.
+"""
+
+default_io_strategy = 'sequential'
+"""
+Default I/O strategy (see :attr:`.utils.torrent.IO_STRATEGIES`)
+
+This is set by :func:`~.application_setup` from the ``torrent_io_strategy``
+option in the main configuration file.
+"""
+
+default_page_cache = 'keep'
+"""
+Default page cache mode (see :attr:`.utils.torrent.PAGE_CACHE_MODES`)
+
+This is set by :func:`~.application_setup` from the ``torrent_page_cache``
+option in the main configuration file.
+"""
+
 
 class CreateTorrentJob(base.JobBase):
     """
     Create torrent file
 
+    If `additional_trackers` are given, the content is hashed only once and one
+    torrent file is created for each tracker. Files are excluded as configured
+    for `tracker`.
+
     This job adds the following signals to the :attr:`~.JobBase.signal`
     attribute:
 
@@ -37,39 +86,68 @@ class CreateTorrentJob(base.JobBase):
     label = 'Torrent'
     cache_id = None
 
-    def initialize(self, *, tracker, content_path):
+    def initialize(self, *, tracker, content_path, additional_trackers=(),
+                   workers=None, read_size=None, io_strategy=None, page_cache=None):
         """
         Set internal state
 
         :param TrackerBase tracker: Return value of :func:`.trackers.tracker`
         :param content_path: Path to file or directory
+        :param additional_trackers: Sequence of :class:`~.TrackerBase`
+            instances that also get a torrent file
+        :param int workers: Number of threads that hash pieces or `None` to use
+            :attr:`default_workers`
+        :param int read_size: Maximum number of bytes per read or `None` to use
+            :attr:`default_read_size`
+        :param str io_strategy: One of :attr:`.utils.torrent.IO_STRATEGIES` or
+            `None` to use :attr:`default_io_strategy`
+        :param str page_cache: One of :attr:`.utils.torrent.PAGE_CACHE_MODES`
+            or `None` to use :attr:`default_page_cache`
         """
         self._tracker = tracker
+        self._trackers = (tracker,) + tuple(additional_trackers)
         self._content_path = content_path
-        self._torrent_path = os.path.join(
-            self.home_directory,
-            f'{fs.basename(content_path)}.{tracker.name.lower()}.torrent',
+        self._workers = workers if workers is not None else default_workers
+        self._read_size = read_size if read_size is not None else default_read_size
+        self._io_strategy = io_strategy if io_strategy is not None else default_io_strategy
+        self._page_cache = page_cache if page_cache is not None else default_page_cache
+        self._torrent_paths = tuple(
+            os.path.join(
+                self.home_directory,
+                f'{fs.basename(content_path)}.{tracker.name.lower()}.torrent',
+            )
+            for tracker in self._trackers
         )
+        self._torrent_path = self._torrent_paths[0]
         self.signal.add('progress_update')
         self.signal.add('announce_url')
         self._torrent_process = None
 
     def execute(self):
-        """Get announce URL from `tracker`, then execute torrent creation subprocess"""
-        if not self.ignore_cache and os.path.exists(self._torrent_path):
-            self._handle_torrent_created(self._torrent_path)
+        """Get announce URLs from trackers, then execute torrent creation subprocess"""
+        if not self.ignore_cache and all(os.path.exists(tp) for tp in self._torrent_paths):
+            self._handle_torrent_created(self._torrent_paths)
             self.finish()
         else:
-            self._get_announce_url_task = self.add_task(self._get_announce_url())
+            self._get_announce_url_task = self.add_task(self._get_announce_urls())
             self._get_announce_url_task.add_done_callback(
                 lambda task: self._create_torrent_process(task.result()))
 
-    async def _get_announce_url(self):
+    async def _get_announce_urls(self):
+        announce_urls = []
+        for tracker in self._trackers:
+            announce_url = await self._get_announce_url(tracker)
+            if not announce_url:
+                return None
+            announce_urls.append(announce_url)
+        return tuple(announce_urls)
+
+    async def _get_announce_url(self, tracker):
         self.info = 'Getting announce URL'
         self.signal.emit('announce_url', Ellipsis)
         try:
-            await self._tracker.login()
-            announce_url = await self._tracker.get_announce_url()
+            await tracker.login()
+            announce_url = await tracker.get_announce_url()
         except errors.RequestError as e:
             self.error(e)
         else:
@@ -78,21 +156,39 @@ class CreateTorrentJob(base.JobBase):
         finally:
             self.info = ''
             try:
-                await self._tracker.logout()
+                await tracker.logout()
             except errors.RequestError as e:
                 self.warn(e)
 
-    def _create_torrent_process(self, announce_url):
+    def _create_torrent_process(self, announce_urls):
+        if not announce_urls:
+            return
         self._torrent_process = daemon.DaemonProcess(
             name=self.name,
             target=_torrent_process,
             kwargs={
                 'content_path' : self._content_path,
-                'torrent_path' : self._torrent_path,
+                'targets'      : tuple(
+                    {
+                        'torrent_path' : torrent_path,
+                        'announce'     : announce_url,
+                        'source'       : tracker.options['source'],
+                        'private'      : bool(tracker.options.get('private', True)),
+                        # Config values are not picklable
+                        'piece_size_min' : int(tracker.options.get('piece_size_min') or 0) or None,
+                        'piece_size_max' : int(tracker.options.get('piece_size_max') or 0) or None,
+                    }
+                    for tracker, torrent_path, announce_url
+                    in zip(self._trackers, self._torrent_paths, announce_urls)
+                ),
                 'overwrite'    : self.ignore_cache,
-                'announce'     : announce_url,
-                'source'       : self._tracker.options['source'],
                 'exclude'      : self._tracker.options['exclude'],
+                'store_directory' : store_directory,
+                # Config values are not picklable
+                'workers'      : int(self._workers) if self._workers else None,
+                'read_size'    : int(self._read_size) if self._read_size else None,
+                'io_strategy'  : str(self._io_strategy),
+                'page_cache'   : str(self._page_cache),
             },
             init_callback=self._handle_file_tree,
             info_callback=self._handle_progress_update,
@@ -114,9 +210,9 @@ class CreateTorrentJob(base.JobBase):
     def _handle_progress_update(self, percent_done):
         self.signal.emit('progress_update', percent_done)
 
-    def _handle_torrent_created(self, torrent_path=None):
-        _log.debug('Torrent created: %r', torrent_path)
-        if torrent_path:
+    def _handle_torrent_created(self, torrent_paths=None):
+        _log.debug('Torrents created: %r', torrent_paths)
+        for torrent_path in torrent_paths or ():
             self.send(torrent_path)
 
     def _handle_error(self, error):
@@ -129,9 +225,24 @@ class CreateTorrentJob(base.JobBase):
 
 
 def _torrent_process(output_queue, input_queue, *args, **kwargs):
+    kwargs['init_callback'] = _make_init_callback(output_queue)
+    kwargs['progress_callback'] = _make_progress_callback(output_queue, input_queue)
+    try:
+        torrent_paths = torrent.create_many(*args, **kwargs)
+    except errors.TorrentError as e:
+        output_queue.put((daemon.MsgType.error, str(e)))
+    else:
+        output_queue.put((daemon.MsgType.result, torrent_paths))
+
+
+def _make_init_callback(output_queue):
     def init_callback(file_tree):
         output_queue.put((daemon.MsgType.init, file_tree))
 
+    return init_callback
+
+
+def _make_progress_callback(output_queue, input_queue):
     def progress_callback(progress):
         try:
             typ, msg = input_queue.get_nowait()
@@ -139,20 +250,121 @@ def _torrent_process(output_queue, input_queue, *args, **kwargs):
             pass
         else:
             if typ == daemon.MsgType.terminate:
-                # Any truthy return value cancels torrent.create()
+                # Any truthy return value cancels hashing
                 return 'cancel'
 
         output_queue.put((daemon.MsgType.info, progress))
 
-    kwargs['init_callback'] = init_callback
-    kwargs['progress_callback'] = progress_callback
+    return progress_callback
+
+
+class VerifyTorrentJob(base.JobBase):
+    """
+    Check if content matches an existing torrent file
+
+    Pieces are hashed in a background process with the same settings as
+    :class:`CreateTorrentJob`. The torrent file path is sent as output if the
+    content matches. Otherwise, all mismatching files are reported in one error.
+
+    This job adds the following signals to the :attr:`~.JobBase.signal`
+    attribute:
+
+        ``progress_update``
+            Emitted in roughly equal intervals to provide verification progress.
+            Registered callbacks get a `float` between 0.0 and 100.0 as a
+            positional argument.
+    """
+
+    name = 'verify-torrent'
+    label = 'Verify Torrent'
+    cache_id = None
+
+    def initialize(self, *, torrent_path, content_path, sample=100,
+                   workers=None, read_size=None, io_strategy=None, page_cache=None):
+        """
+        Set internal state
+
+        :param torrent_path: Path to torrent file
+        :param content_path: Path to the torrent's payload
+        :param sample: Only verify this percentage of pieces, starting with the
+            first piece
+        :param int workers: Number of threads that hash pieces or `None` to use
+            :attr:`default_workers`
+        :param int read_size: Maximum number of bytes per read or `None` to use
+            :attr:`default_read_size`
+        :param str io_strategy: One of :attr:`.utils.torrent.IO_STRATEGIES` or
+            `None` to use :attr:`default_io_strategy`
+        :param str page_cache: One of :attr:`.utils.torrent.PAGE_CACHE_MODES`
+            or `None` to use :attr:`default_page_cache`
+        """
+        self._torrent_path = torrent_path
+        self._content_path = content_path
+        self._sample = sample
+        self._workers = workers if workers is not None else default_workers
+        self._read_size = read_size if read_size is not None else default_read_size
+        self._io_strategy = io_strategy if io_strategy is not None else default_io_strategy
+        self._page_cache = page_cache if page_cache is not None else default_page_cache
+        self.signal.add('progress_update')
+        self._verify_process = None
+
+    def execute(self):
+        """Execute verification subprocess"""
+        self._verify_process = daemon.DaemonProcess(
+            name=self.name,
+            target=_verify_process,
+            kwargs={
+                'torrent_path' : str(self._torrent_path),
+                'content_path' : str(self._content_path),
+                'sample'       : float(self._sample),
+                # Config values are not picklable
+                'workers'      : int(self._workers) if self._workers else None,
+                'read_size'    : int(self._read_size) if self._read_size else None,
+                'io_strategy'  : str(self._io_strategy),
+                'page_cache'   : str(self._page_cache),
+            },
+            info_callback=self._handle_progress_update,
+            error_callback=self._handle_error,
+            result_callback=self._handle_verified,
+            finished_callback=self.finish,
+        )
+        self._verify_process.start()
+
+    def finish(self):
+        """Terminate verification subprocess and finish"""
+        if self._verify_process:
+            self._verify_process.stop()
+        super().finish()
+
+    def _handle_progress_update(self, percent_done):
+        self.signal.emit('progress_update', percent_done)
+
+    def _handle_verified(self, mismatching_files):
+        _log.debug('Mismatching files: %r', mismatching_files)
+        if mismatching_files is None:
+            # Verification was cancelled
+            pass
+        elif mismatching_files:
+            self.error('Corrupt, incomplete or missing files:\n' + '\n'.join(
+                f'  {filepath}' for filepath in mismatching_files
+            ))
+        else:
+            self.send(self._torrent_path)
+
+    def _handle_error(self, error):
+        if isinstance(error, BaseException):
+            self.exception(error)
+        else:
+            self.error(error)
+
 
+def _verify_process(output_queue, input_queue, **kwargs):
+    kwargs['progress_callback'] = _make_progress_callback(output_queue, input_queue)
     try:
-        torrent_path = torrent.create(*args, **kwargs)
+        mismatching_files = torrent.verify(**kwargs)
     except errors.TorrentError as e:
         output_queue.put((daemon.MsgType.error, str(e)))
     else:
-        output_queue.put((daemon.MsgType.result, torrent_path))
+        output_queue.put((daemon.MsgType.result, mismatching_files))
 
 
 class AddTorrentJob(base.QueueJobBase):
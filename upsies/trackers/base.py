@@ -16,12 +16,16 @@ class TrackerConfigBase(dict):
     """
     Dictionary with default values that are defined by the subclass
 
-    The keys ``announce``, ``source`` and ``exclude`` always exist.
+    The keys ``source``, ``exclude``, ``private``, ``piece_size_min`` and
+    ``piece_size_max`` always exist.
     """
 
     _defaults = {
         'source'     : '',
         'exclude'    : [],
+        'private'    : types.Bool('yes'),
+        'piece_size_min' : types.Bytes('16 KiB'),
+        'piece_size_max' : types.Bytes('16 MiB'),
         'add-to'     : types.Choice(
             '',
             empty_ok=True,
@@ -355,8 +359,9 @@ class TrackerJobsBase(abc.ABC):
                 'timestamps',
                 lambda timestamps: imghost_job.set_images_total(len(timestamps)),
             )
-            # Pass ScreenshotsJob's output to ImageHostJob input.
-            self.screenshots_job.signal.register('output', imghost_job.enqueue)
+            # Pass ScreenshotsJob's screenshots (file paths or in-memory
+            # images) to ImageHostJob input.
+            self.screenshots_job.signal.register('screenshot', imghost_job.enqueue)
             # Tell imghost_job to finish the current upload and then finish.
             self.screenshots_job.signal.register('finished', self.finalize_upload_screenshots_job)
             return imghost_job
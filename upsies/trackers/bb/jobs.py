@@ -8,8 +8,7 @@ import re
 
 import unidecode
 
-from ... import (__homepage__, __project_name__, __version__, constants,
-                 errors, jobs)
+from ... import __homepage__, __project_name__, __version__, errors, jobs
 from ...utils import (cached_property, fs, http, image, release, string,
                       timestamp, video, webdbs)
 from ..base import TrackerJobsBase
@@ -832,7 +831,11 @@ class BbTrackerJobs(TrackerJobsBase):
         else:
             # Resize poster
             try:
-                resized_poster_path = image.resize(poster_path, width=300)
+                resized_poster_path = image.resize(
+                    poster_path,
+                    width=300,
+                    cache_directory=poster_job.cache_directory,
+                )
             except errors.ImageResizeError as e:
                 self.error(f'Poster resizing failed: {e}')
             else:
@@ -1088,15 +1091,7 @@ class BbTrackerJobs(TrackerJobsBase):
         if self.is_movie_release or self.is_episode_release:
             runtime = video.duration(self.content_path)
         elif self.is_season_release:
-            # Get all video files
-            filepaths = fs.file_list(self.content_path, extensions=constants.VIDEO_FILE_EXTENSIONS)
-            if len(filepaths) >= 5:
-                # Ignore first and last episode as they can be significantly longer
-                filepaths = filepaths[1:-1]
-            # Get average from 3 episodes
-            filepaths = filepaths[:3]
-            durations = [video.duration(f) for f in filepaths]
-            runtime = sum(durations) / len(durations)
+            runtime = video.season_info(self.content_path).runtime
         else:
             return None
         return f'[b]Runtime[/b]: {timestamp.pretty(runtime)}'
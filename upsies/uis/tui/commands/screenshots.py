@@ -39,6 +39,10 @@ class screenshots(CommandBase):
             'metavar': 'PATH',
             'help': 'Directory where screenshots are put (created on demand)',
         },
+        ('--mosaic', '-m'): {
+            'action': 'store_true',
+            'help': 'Also create a thumbnail mosaic of the whole video',
+        },
     }
 
     @utils.cached_property
@@ -50,8 +54,20 @@ class screenshots(CommandBase):
             content_path=self.args.CONTENT,
             timestamps=self.args.timestamps,
             count=self.args.number,
+            # Screenshots must be written to files if they are not uploaded
+            in_memory=None if self.args.upload_to else False,
         )
 
+    @utils.cached_property
+    def mosaic_job(self):
+        if self.args.mosaic:
+            return jobs.mosaic.MosaicJob(
+                home_directory=self.args.output_directory,
+                cache_directory=self.cache_directory,
+                ignore_cache=self.args.ignore_cache,
+                content_path=self.args.CONTENT,
+            )
+
     @utils.cached_property
     def upload_screenshots_job(self):
         if self.args.upload_to:
@@ -64,21 +80,35 @@ class screenshots(CommandBase):
                     config=self.config['imghosts'][self.args.upload_to],
                 ),
             )
+            image_jobs = [job for job in (self.screenshots_job, self.mosaic_job) if job]
+            mosaics_total = 1 if self.mosaic_job else 0
+
             # Timestamps are calculated in a subprocess, we have to wait for
             # that until we can set the number of expected screenhots.
             self.screenshots_job.signal.register(
                 'timestamps',
-                lambda timestamps: imghost_job.set_images_total(len(timestamps)),
+                lambda timestamps: imghost_job.set_images_total(len(timestamps) + mosaics_total),
             )
-            # Pass ScreenshotsJob's output to ImageHostJob input.
-            self.screenshots_job.signal.register('output', imghost_job.enqueue)
-            # Tell imghost_job to finish the current upload and then finish.
-            self.screenshots_job.signal.register('finished', lambda _: imghost_job.finalize())
+            # Pass ScreenshotsJob's screenshots (file paths or in-memory
+            # images) to ImageHostJob input.
+            self.screenshots_job.signal.register('screenshot', imghost_job.enqueue)
+            if self.mosaic_job:
+                self.mosaic_job.signal.register('mosaic', imghost_job.enqueue)
+
+            # Tell imghost_job to finish the current upload and then finish
+            # after all images were created.
+            def finalize(_):
+                if all(job.is_finished for job in image_jobs):
+                    imghost_job.finalize()
+
+            for job in image_jobs:
+                job.signal.register('finished', finalize)
             return imghost_job
 
     @utils.cached_property
     def jobs(self):
         return (
             self.screenshots_job,
+            self.mosaic_job,
             self.upload_screenshots_job,
         )
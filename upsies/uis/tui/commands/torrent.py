@@ -69,6 +69,13 @@ class torrent_create(CommandBase):
                     'metavar': 'PATH',
                     'help': 'Copy the created torrent to PATH (file or directory)',
                 },
+                ('--also', '-A'): {
+                    'type': utils.argtypes.tracker,
+                    'metavar': 'TRACKER',
+                    'action': 'append',
+                    'help': ('Also create torrent for TRACKER without hashing the content again\n'
+                             'This option may be given multiple times.'),
+                },
             },
             # Custom arguments defined by tracker
             **tracker.argument_definitions,
@@ -92,8 +99,24 @@ class torrent_create(CommandBase):
                 options={**self.config['trackers'][self.tracker_name],
                          **vars(self.args)},
             ),
+            additional_trackers=tuple(
+                trackers.tracker(
+                    name=tracker_name,
+                    options=self.config['trackers'][tracker_name],
+                )
+                for tracker_name in self.additional_tracker_names
+            ),
         )
 
+    @utils.cached_property
+    def additional_tracker_names(self):
+        # Remove duplicates and the main tracker while maintaining order
+        tracker_names = []
+        for tracker_name in self.args.also or ():
+            if tracker_name != self.tracker_name and tracker_name not in tracker_names:
+                tracker_names.append(tracker_name)
+        return tuple(tracker_names)
+
     @utils.cached_property
     def add_torrent_job(self):
         if self.args.add_to:
@@ -135,3 +158,70 @@ class torrent_create(CommandBase):
             self.add_torrent_job,
             self.copy_torrent_job,
         )
+
+
+class torrent_verify(CommandBase):
+    """Check if content matches torrent file and optionally add it"""
+
+    names = ('torrent-verify', 'tv')
+
+    argument_definitions = {
+        'TORRENT': {
+            'help': 'Path to torrent file',
+        },
+        'CONTENT': {
+            'type': utils.argtypes.content,
+            'help': ('Path to content\n'
+                     'This is the file of single-file torrents or the top '
+                     'directory of multi-file torrents.'),
+        },
+        ('--sample', '-s'): {
+            'type': utils.argtypes.percentage,
+            'metavar': 'PERCENT',
+            'default': 100,
+            'help': 'Only verify the first PERCENT of the content',
+        },
+        ('--add-to', '-a'): {
+            'type': utils.argtypes.client,
+            'metavar': 'CLIENT',
+            'help': ('Add torrent to CLIENT if content matches\n'
+                     'Supported clients: ' + ', '.join(utils.btclients.client_names())),
+        },
+    }
+
+    @utils.cached_property
+    def verify_torrent_job(self):
+        return jobs.torrent.VerifyTorrentJob(
+            home_directory=self.home_directory,
+            cache_directory=self.cache_directory,
+            ignore_cache=self.args.ignore_cache,
+            torrent_path=self.args.TORRENT,
+            content_path=self.args.CONTENT,
+            sample=self.args.sample,
+        )
+
+    @utils.cached_property
+    def add_torrent_job(self):
+        if self.args.add_to:
+            add_torrent_job = jobs.torrent.AddTorrentJob(
+                home_directory=self.home_directory,
+                cache_directory=self.cache_directory,
+                ignore_cache=self.args.ignore_cache,
+                client=utils.btclients.client(
+                    name=self.args.add_to,
+                    config=self.config['clients'][self.args.add_to],
+                ),
+                download_path=utils.fs.dirname(self.args.CONTENT),
+            )
+            # Pass VerifyTorrentJob output to AddTorrentJob input.
+            self.verify_torrent_job.signal.register('output', add_torrent_job.enqueue)
+            # Tell AddTorrentJob to finish the current upload and then finish.
+            self.verify_torrent_job.signal.register('finished', lambda _: add_torrent_job.finalize())
+            return add_torrent_job
+
+    @utils.cached_property
+    def jobs(self):
+        return (
+            self.verify_torrent_job,
+            self.add_torrent_job,
+        )
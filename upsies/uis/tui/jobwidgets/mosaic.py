@@ -0,0 +1,30 @@
+from ....utils import cached_property, fs
+from .. import utils
+from . import JobWidgetBase
+
+import logging  # isort:skip
+_log = logging.getLogger(__name__)
+
+
+class MosaicJobWidget(JobWidgetBase):
+    def setup(self):
+        content_name = fs.basename(self.job.kwargs['content_path'])
+        self._throbber = utils.Throbber(
+            format=f'Creating mosaic of {content_name} {{throbber}}',
+            callback=self.handle_throbber_state,
+            active=True,
+        )
+        self.job.signal.register('finished', self.handle_finished)
+
+    def handle_throbber_state(self, state):
+        self.job.info = state
+        self.invalidate()
+
+    def handle_finished(self, _):
+        self._throbber.active = False
+        self.job.info = ''
+        self.invalidate()
+
+    @cached_property
+    def runtime_widget(self):
+        return None
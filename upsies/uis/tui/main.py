@@ -5,6 +5,7 @@ Entry point
 import sys
 
 from ... import __homepage__, application_setup, application_shutdown, errors
+from ...utils import daemon
 from . import commands, utils
 
 
@@ -67,6 +68,11 @@ def _main(args=None):
 
         return exit_code
 
+    finally:
+        # Don't wait for background processes (e.g. ffmpeg) if the UI was
+        # terminated prematurely
+        daemon.shutdown()
+
 
 def _wtf():
     import os
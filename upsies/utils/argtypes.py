@@ -55,6 +55,17 @@ def option(value):
         raise argparse.ArgumentTypeError(f'Unknown option: {value}')
 
 
+def percentage(value):
+    """Number greater than 0 and less than or equal to 100"""
+    try:
+        number = float(value)
+    except (ValueError, TypeError):
+        raise argparse.ArgumentTypeError(f'Not a number: {value!r}')
+    if not 0 < number <= 100:
+        raise argparse.ArgumentTypeError(f'Not a percentage: {value!r}')
+    return number
+
+
 def release(value):
     """Same as :func:`content`, but doesn't have to exist"""
     from .. import errors
@@ -6,14 +6,35 @@ import asyncio
 import enum
 import functools
 import multiprocessing
+import os
 import pickle
+import signal
+import time
+import weakref
 
 from .. import errors
+from . import subproc
 
 import logging  # isort:skip
 _log = logging.getLogger(__name__)
 
 
+shutdown_deadline = 3
+"""
+Maximum number of seconds :func:`shutdown` waits for processes to terminate
+before they are killed
+
+This is set by :func:`~.application_setup` from the ``shutdown_deadline``
+option in the main configuration file.
+"""
+
+# How long processes may take to exit after SIGTERM before they get SIGKILL
+_TERMINATE_TIMEOUT = 1
+
+# Started DaemonProcess instances for shutdown()
+_daemon_processes = weakref.WeakSet()
+
+
 class MsgType(enum.Enum):
     """
     Enum that specifies the type of an IPC message (info, error, etc)
@@ -63,6 +84,8 @@ class DaemonProcess:
             self._target,
             self._read_queue,
             self._write_queue,
+            # Share subprocess slots with the new process
+            subproc.governor,
         )
         self._process = self._ctx.Process(
             name=self._name,
@@ -71,6 +94,7 @@ class DaemonProcess:
             kwargs=self._make_kwargs_picklable(self._target_kwargs),
         )
         self._process.start()
+        _daemon_processes.add(self)
         self._read_queue_reader_task = self._loop.create_task(self._read_queue_reader())
         self._read_queue_reader_task.add_done_callback(self._handle_read_queue_reader_task_done)
 
@@ -147,7 +171,13 @@ class DaemonProcess:
                     raise self._exception
 
     def stop(self):
-        """Stop the process"""
+        """
+        Stop the process
+
+        This sends a terminate message to `target`, which must check its input
+        queue regularly, e.g. while waiting for a subprocess, and kill any
+        subprocesses it started (see :meth:`.subproc.Governor.stop`).
+        """
         if self.is_alive:
             self._write_queue.put((MsgType.terminate, None))
 
@@ -185,9 +215,68 @@ class DaemonProcess:
                 raise exc
 
 
-def _target_process_wrapper(target, write_queue, read_queue, *args, **kwargs):
+def shutdown(deadline=None):
+    """
+    Stop all running :class:`DaemonProcess` instances
+
+    Processes get :meth:`~.DaemonProcess.stop` requests and `deadline` seconds
+    to finish. After that, they are terminated. This also kills any running
+    subprocesses (e.g. ``ffmpeg``) they started with :func:`~.subproc.run`.
+
+    :param deadline: Maximum number of seconds to wait for processes to finish
+        or `None` to use :attr:`shutdown_deadline`
+    :type deadline: int or float
+    """
+    if deadline is None:
+        deadline = shutdown_deadline
+    daemons = [daemon for daemon in _daemon_processes if daemon.is_alive]
+    for daemon in daemons:
+        daemon.stop()
+
+    def join(timeout):
+        end = time.monotonic() + timeout
+        for daemon in daemons:
+            if daemon._process:
+                daemon._process.join(max(0, end - time.monotonic()))
+
+    join(deadline)
+    for daemon in daemons:
+        if daemon.is_alive:
+            _log.debug('Terminating process: %r', daemon._process)
+            daemon._process.terminate()
+
+    join(_TERMINATE_TIMEOUT)
+    for daemon in daemons:
+        if daemon.is_alive:
+            _log.debug('Killing process: %r', daemon._process)
+            os.kill(daemon._process.pid, getattr(signal, 'SIGKILL', signal.SIGTERM))
+
+    # Unblock any threads that are still waiting for messages from a killed
+    # process
+    for daemon in daemons:
+        task = daemon._read_queue_reader_task
+        if task and not task.done():
+            daemon._read_queue.put((MsgType.terminate, None))
+
+
+class _Terminated(BaseException):
+    pass
+
+
+def _handle_sigterm(signum, frame):
+    # Kill running subprocesses, don't start new ones and unwind the target
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    subproc.governor.stop()
+    raise _Terminated()
+
+
+def _target_process_wrapper(target, write_queue, read_queue, governor, *args, **kwargs):
+    subproc.governor = governor
+    signal.signal(signal.SIGTERM, _handle_sigterm)
     try:
         target(write_queue, read_queue, *args, **kwargs)
+    except _Terminated:
+        _log.debug('Terminated: %r', target)
     except BaseException as e:
         # Because the traceback is not picklable, preserve it as a string before
         # sending it over the Queue
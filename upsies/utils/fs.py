@@ -3,8 +3,10 @@ File system helpers
 """
 
 import functools
+import hashlib
 import os
 import re
+import stat
 import time
 
 from .. import __project_name__, constants, errors
@@ -68,7 +70,8 @@ def limit_directory_size(path, max_total_size, min_age=None, max_age=None):
     """
     Delete oldest files (by access time) until maximum size is not exceeded
 
-    Empty files and directories are always deleted.
+    Empty files and directories are always deleted. Hard links to the same file
+    are only counted once.
 
     :param path: Path to directory
     :param max_total_size: Maximum combined size of all files in `path` and its
@@ -79,8 +82,16 @@ def limit_directory_size(path, max_total_size, min_age=None, max_age=None):
     :type max_age: int or float
     """
     def combined_size(filepaths):
-        return sum(file_size(f) for f in filepaths
-                   if os.path.exists(f) and not os.path.islink(f))
+        inodes = {}
+        for filepath in filepaths:
+            try:
+                statinfo = os.stat(filepath, follow_symlinks=False)
+            except OSError:
+                pass
+            else:
+                if stat.S_ISREG(statinfo.st_mode):
+                    inodes[(statinfo.st_dev, statinfo.st_ino)] = statinfo.st_size
+        return sum(inodes.values())
 
     # This should return mtime if file system was mounted with noatime.
     def atime(filepath):
@@ -300,6 +311,35 @@ def file_size(path):
     return None
 
 
+def file_fingerprint(path, chunk_size=1048576):
+    """
+    Return string that identifies file content without reading all of it
+
+    The fingerprint consists of the file size, the modification time and a
+    SHA256 hash of the first, middle and last `chunk_size` bytes. It stays the
+    same if the file is moved or renamed.
+
+    :param str path: Path to file
+    :param int chunk_size: Number of bytes to hash at each position
+
+    :raise ContentError: if `path` is not readable
+    """
+    try:
+        statinfo = os.stat(path)
+        hash = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for offset in (0, (statinfo.st_size - chunk_size) // 2, statinfo.st_size - chunk_size):
+                f.seek(max(0, offset))
+                hash.update(f.read(chunk_size))
+    except OSError as e:
+        if e.strerror:
+            raise errors.ContentError(f'{path}: {e.strerror}')
+        else:
+            raise errors.ContentError(f'{path}: {e}')
+    else:
+        return f'{statinfo.st_size}-{statinfo.st_mtime_ns}-{hash.hexdigest()[:32]}'
+
+
 def file_list(path, extensions=(), min_age=None, max_age=None, follow_dirlinks=False):
     """
     List naturally sorted files in `path` and any subdirectories
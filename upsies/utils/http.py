@@ -84,8 +84,9 @@ async def post(url, headers={}, data={}, files={}, auth=None,
     :param dict headers: Custom headers (added to default headers)
     :param dict data: Data to send as application/x-www-form-urlencoded
     :param dict files: Files to send as multipart/form-data as a dictionary that
-        maps field names to file paths or dictionaries. For dictionaries, these
-        keys are used:
+        maps field names to file paths, file-like objects or dictionaries. The
+        file name of file-like objects is :func:`~.os.path.basename` of their
+        ``name`` attribute, if it exists. For dictionaries, these keys are used:
 
              ``file``
                  File path or file-like object, e.g. return value of
@@ -304,6 +305,11 @@ def _open_files(files):
             fileobj = _get_file_object(fileinfo)
             opened[fieldname] = (filename, fileobj)
 
+        elif isinstance(fileinfo, io.IOBase):
+            name = getattr(fileinfo, 'name', None)
+            filename = os.path.basename(name) if isinstance(name, str) else None
+            opened[fieldname] = (filename, fileinfo)
+
         elif isinstance(fileinfo, collections.abc.Mapping):
             if isinstance(fileinfo['file'], str):
                 filename = fileinfo.get('filename', os.path.basename(fileinfo['file']))
@@ -2,8 +2,12 @@
 Dump frames from video file
 """
 
+import hashlib
+import io
 import os
 import re
+import struct
+import zlib
 
 from .. import errors, utils
 
@@ -20,6 +24,14 @@ def _ffmpeg_executable():
         return 'ffmpeg'
 
 
+# Use correct aspect ratio
+# https://ffmpeg.org/ffmpeg-filters.html#toc-Examples-99
+_SCREENSHOT_FILTER = 'scale=trunc(ih*dar):ih,setsar=1/1'
+
+# Let the PNG encoder pick the best prediction filter for each row. The default
+# ("none") produces much larger files.
+_SCREENSHOT_PNG_OPTIONS = ('-pred', 'mixed')
+
 def _make_screenshot_cmd(video_file, timestamp, screenshot_file):
     # ffmpeg's "image2" image file muxer uses "%" for string formatting
     screenshot_file = str(screenshot_file).replace('%', '%%')
@@ -30,12 +42,26 @@ def _make_screenshot_cmd(video_file, timestamp, screenshot_file):
         '-ss', str(timestamp),
         '-i', utils.video.make_ffmpeg_input(video_file),
         '-vframes', '1',
-        # Use correct aspect ratio
-        # https://ffmpeg.org/ffmpeg-filters.html#toc-Examples-99
-        '-vf', 'scale=trunc(ih*dar):ih,setsar=1/1',
+        '-vf', _SCREENSHOT_FILTER,
+        *_SCREENSHOT_PNG_OPTIONS,
         f'file:{screenshot_file}',
     )
 
+def _make_screenshot_buffer_cmd(video_file, timestamp):
+    return (
+        _ffmpeg_executable(),
+        '-loglevel', 'level+error',
+        '-ss', str(timestamp),
+        '-i', utils.video.make_ffmpeg_input(video_file),
+        '-vframes', '1',
+        '-vf', _SCREENSHOT_FILTER,
+        # Write PNG image to stdout
+        '-f', 'image2pipe',
+        '-vcodec', 'png',
+        *_SCREENSHOT_PNG_OPTIONS,
+        'pipe:1',
+    )
+
 def screenshot(video_file, timestamp, screenshot_file, overwrite=False):
     """
     Create single screenshot from video file
@@ -49,25 +75,352 @@ def screenshot(video_file, timestamp, screenshot_file, overwrite=False):
     :raise ScreenshotError: if something goes wrong
     :return: Path to screenshot file
     """
+    _assert_video_file_readable(video_file)
+    _assert_timestamp_valid(timestamp)
+
+    # Check for previously created screenshot
+    if not overwrite and os.path.exists(screenshot_file):
+        _log.debug('Screenshot already exists: %s', screenshot_file)
+        return screenshot_file
+
+    _assert_timestamp_in_range(video_file, timestamp)
+
+    # Make screenshot
+    cmd = _make_screenshot_cmd(video_file, timestamp, screenshot_file)
+    output = utils.subproc.run(cmd, ignore_errors=True, join_stderr=True, resource='cpu')
+    if not os.path.exists(screenshot_file):
+        raise errors.ScreenshotError(
+            f'{video_file}: Failed to create screenshot at {timestamp}: {output}'
+        )
+    else:
+        return screenshot_file
+
+
+def _make_screenshots_cmd(video_file, timestamps, screenshot_files):
+    ffmpeg_input = utils.video.make_ffmpeg_input(video_file)
+    cmd = [
+        _ffmpeg_executable(),
+        '-y',
+        '-loglevel', 'level+error',
+    ]
+    # Each timestamp gets its own input so every screenshot is made with a fast
+    # input seek (-ss before -i), just like _make_screenshot_cmd() does
+    for timestamp in timestamps:
+        cmd.extend(('-ss', str(timestamp), '-i', ffmpeg_input))
+    for i, screenshot_file in enumerate(screenshot_files):
+        # ffmpeg's "image2" image file muxer uses "%" for string formatting
+        screenshot_file = str(screenshot_file).replace('%', '%%')
+        cmd.extend((
+            '-map', f'{i}:v:0',
+            '-vframes', '1',
+            '-vf', _SCREENSHOT_FILTER,
+            *_SCREENSHOT_PNG_OPTIONS,
+            f'file:{screenshot_file}',
+        ))
+    return tuple(cmd)
+
+def screenshots(video_file, timestamps, screenshot_files, overwrite=False):
+    """
+    Create multiple screenshots from video file with one ffmpeg process
+
+    ffmpeg is started only once, but the video file is still opened and seeked
+    separately for each timestamp. Screenshots are identical to those made by
+    :func:`screenshot`.
+
+    Any screenshots that are missing after the batch process has finished are
+    created one by one with :func:`screenshot`, so one bad timestamp doesn't
+    spoil the whole batch.
+
+    :param str video_file: Path to video file
+    :param timestamps: Sequence of time locations in the video (see
+        :func:`screenshot`)
+    :param screenshot_files: Sequence of screenshot file paths, one for each
+        item in `timestamps`
+    :param bool overwrite: Whether to overwrite existing screenshot files
+
+    :raise ScreenshotError: if something goes wrong
+    :return: Tuple of screenshot file paths
+    """
+    timestamps = tuple(timestamps)
+    screenshot_files = tuple(screenshot_files)
+    if len(timestamps) != len(screenshot_files):
+        raise errors.ScreenshotError(
+            f'Got {len(timestamps)} timestamps and {len(screenshot_files)} screenshot files'
+        )
+
+    _assert_video_file_readable(video_file)
+    for timestamp in timestamps:
+        _assert_timestamp_valid(timestamp)
+
+    # Only create screenshots that don't exist yet
+    todo = {}
+    for timestamp, screenshot_file in zip(timestamps, screenshot_files):
+        if not overwrite and os.path.exists(screenshot_file):
+            _log.debug('Screenshot already exists: %s', screenshot_file)
+        else:
+            _assert_timestamp_in_range(video_file, timestamp)
+            todo[screenshot_file] = timestamp
+
+    if todo:
+        cmd = _make_screenshots_cmd(video_file, todo.values(), todo.keys())
+        output = utils.subproc.run(cmd, ignore_errors=True, join_stderr=True, resource='cpu')
+        for screenshot_file, timestamp in todo.items():
+            if not os.path.exists(screenshot_file):
+                _log.debug('Batch failed to create screenshot at %s: %s', timestamp, output)
+                screenshot(video_file, timestamp, screenshot_file, overwrite=True)
+
+    return screenshot_files
+
+
+def _make_mosaic_cmd(video_file, mosaic_file, columns, rows, tile_width, interval):
+    # ffmpeg's "image2" image file muxer uses "%" for string formatting
+    mosaic_file = str(mosaic_file).replace('%', '%%')
+    filters = (
+        # Pick first frame after every `interval` seconds, skipping the intro
+        f"select='gte(t,{interval / 2:.3f})"
+        f"*(isnan(prev_selected_t)+gte(t-prev_selected_t,{interval:.3f}))'",
+        # Use correct aspect ratio and reduce resolution
+        f'scale={tile_width}:trunc(ow/dar/2)*2',
+        'setsar=1/1',
+        f'tile={columns}x{rows}:padding=4:margin=4',
+    )
+    return (
+        _ffmpeg_executable(),
+        '-y',
+        '-loglevel', 'level+error',
+        # Only decode keyframes
+        '-skip_frame', 'nokey',
+        '-i', utils.video.make_ffmpeg_input(video_file),
+        '-map', '0:v:0',
+        '-vf', ','.join(filters),
+        '-frames:v', '1',
+        f'file:{mosaic_file}',
+    )
+
+def mosaic(video_file, mosaic_file, columns=4, rows=4, tile_width=480, overwrite=False):
+    """
+    Create thumbnail mosaic (a.k.a. contact sheet) from video file
+
+    All thumbnails are created by one ffmpeg process that only decodes
+    keyframes. Thumbnails are evenly distributed over the duration of the video.
+
+    :param str video_file: Path to video file
+    :param str mosaic_file: Path to mosaic image file
+    :param int columns: Number of thumbnails in each row
+    :param int rows: Number of thumbnails in each column
+    :param int tile_width: Width of each thumbnail in pixels
+    :param bool overwrite: Whether to overwrite `mosaic_file` if it exists
+
+    :raise ScreenshotError: if something goes wrong
+    :return: Path to mosaic file
+    """
+    _assert_video_file_readable(video_file)
+
+    # Check for previously created mosaic
+    if not overwrite and os.path.exists(mosaic_file):
+        _log.debug('Mosaic already exists: %s', mosaic_file)
+        return mosaic_file
+
+    try:
+        duration = utils.video.duration(video_file)
+    except errors.ContentError as e:
+        raise errors.ScreenshotError(e)
+
+    cmd = _make_mosaic_cmd(
+        video_file=video_file,
+        mosaic_file=mosaic_file,
+        columns=columns,
+        rows=rows,
+        tile_width=tile_width,
+        interval=duration / (columns * rows),
+    )
+    output = utils.subproc.run(cmd, ignore_errors=True, join_stderr=True, resource='cpu')
+    if not os.path.exists(mosaic_file):
+        raise errors.ScreenshotError(
+            f'{video_file}: Failed to create mosaic: {output}'
+        )
+    else:
+        return mosaic_file
+
+
+class ImageBuffer(io.BytesIO):
+    """
+    In-memory image file
+
+    Instances can be uploaded with :meth:`~.ImageHostBase.upload` like image
+    file paths. They are also picklable, so they can be passed between
+    processes.
+
+    :param bytes data: Image data
+    :param str name: File name that is reported to the image hosting service
+    """
+
+    def __init__(self, data, name):
+        super().__init__(data)
+        self.name = str(name)
+
+    def __str__(self):
+        return self.name
+
+    def __repr__(self):
+        return f'{type(self).__name__}(<{len(self.getbuffer())} bytes>, name={self.name!r})'
+
+
+def screenshot_buffer(video_file, timestamp, name):
+    """
+    Create single screenshot from video file without writing it to disk
+
+    ffmpeg writes the PNG image to its stdout.
+
+    :param str video_file: Path to video file
+    :param timestamp: Time location in the video (see :func:`screenshot`)
+    :param str name: File name of the returned :class:`ImageBuffer`
+
+    :raise ScreenshotError: if something goes wrong
+    :return: :class:`ImageBuffer` instance
+    """
+    _assert_video_file_readable(video_file)
+    _assert_timestamp_valid(timestamp)
+    _assert_timestamp_in_range(video_file, timestamp)
+
+    cmd = _make_screenshot_buffer_cmd(video_file, timestamp)
+    try:
+        data = utils.subproc.run(cmd, binary=True, resource='cpu')
+    except errors.ProcessError as e:
+        raise errors.ScreenshotError(
+            f'{video_file}: Failed to create screenshot at {timestamp}: {e}'
+        )
+    if not data.startswith(_PNG_SIGNATURE):
+        raise errors.ScreenshotError(
+            f'{video_file}: Failed to create screenshot at {timestamp}: No PNG data'
+        )
+    return ImageBuffer(data, name)
+
+
+class ScreenshotStore:
+    """
+    Screenshots that are identified by video content instead of file path
+
+    Screenshots are stored by video file fingerprint (see
+    :func:`~.fs.file_fingerprint`), timestamp and ffmpeg filter settings. This
+    means they can be reused after the video file is moved or renamed or when
+    the screenshots are needed in a different directory.
+
+    Files are hard-linked into and out of the store. If that fails (e.g.
+    because the store is on a different file system), they are copied.
+
+    :param str directory: Where to store screenshots
+    """
+
+    def __init__(self, directory):
+        self._directory = str(directory)
+        self._fingerprints = {}
+
+    @property
+    def directory(self):
+        """Where screenshots are stored"""
+        return self._directory
+
+    def _fingerprint(self, video_file):
+        if video_file not in self._fingerprints:
+            self._fingerprints[video_file] = utils.fs.file_fingerprint(video_file)
+        return self._fingerprints[video_file]
+
+    def path(self, video_file, timestamp):
+        """
+        Return path of screenshot in the store
+
+        :param str video_file: Path to video file
+        :param timestamp: Time location in the video (see :func:`screenshot`)
+
+        :raise ContentError: if `video_file` is not readable
+        :raise ValueError: if `timestamp` is invalid
+        """
+        seconds = utils.timestamp.parse(timestamp)
+        filter_hash = hashlib.sha256(_SCREENSHOT_FILTER.encode('utf-8')).hexdigest()[:8]
+        filename = f'{self._fingerprint(video_file)}.{float(seconds):.3f}.{filter_hash}.png'
+        return os.path.join(self._directory, filename)
+
+    def get(self, video_file, timestamp, screenshot_file):
+        """
+        Link or copy stored screenshot to `screenshot_file`
+
+        :param str video_file: Path to video file
+        :param timestamp: Time location in the video (see :func:`screenshot`)
+        :param str screenshot_file: Where to put the screenshot
+
+        :return: `True` if the screenshot was found in the store, `False`
+            otherwise
+        """
+        try:
+            stored_file = self.path(video_file, timestamp)
+        except (ValueError, errors.ContentError) as e:
+            _log.debug('Not using screenshot store: %s', e)
+            return False
+        if not os.path.exists(stored_file):
+            return False
+        try:
+            _link_or_copy(stored_file, screenshot_file)
+        except OSError as e:
+            _log.debug('Failed to get %s from screenshot store: %r', screenshot_file, e)
+            return False
+        else:
+            _log.debug('Got %s from screenshot store: %s', screenshot_file, stored_file)
+            return True
+
+    def put(self, video_file, timestamp, screenshot_file):
+        """
+        Link or copy `screenshot_file` into the store
+
+        Failure is logged and otherwise ignored.
+
+        :param str video_file: Path to video file
+        :param timestamp: Time location in the video (see :func:`screenshot`)
+        :param str screenshot_file: Screenshot of `video_file` at `timestamp`
+        """
+        try:
+            stored_file = self.path(video_file, timestamp)
+            utils.fs.mkdir(self._directory)
+        except (ValueError, errors.ContentError) as e:
+            _log.debug('Not using screenshot store: %s', e)
+            return
+        # Don't expose partially copied files to other processes
+        tmp_file = f'{stored_file}.{os.getpid()}.tmp'
+        try:
+            _link_or_copy(screenshot_file, tmp_file)
+            os.replace(tmp_file, stored_file)
+        except OSError as e:
+            _log.debug('Failed to put %s in screenshot store: %r', screenshot_file, e)
+            try:
+                os.remove(tmp_file)
+            except OSError:
+                pass
+
+def _link_or_copy(source, target):
+    import shutil
+    if os.path.exists(target):
+        os.remove(target)
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+
+
+def _assert_video_file_readable(video_file):
     # See if file is readable before we do further checks and launch ffmpeg
     try:
         utils.fs.assert_file_readable(video_file)
     except errors.ContentError as e:
         raise errors.ScreenshotError(e)
 
-    # Validate timestamps
+def _assert_timestamp_valid(timestamp):
     if isinstance(timestamp, str):
         if not _timestamp_format.match(timestamp):
             raise errors.ScreenshotError(f'Invalid timestamp: {timestamp!r}')
     elif not isinstance(timestamp, (int, float)):
         raise errors.ScreenshotError(f'Invalid timestamp: {timestamp!r}')
 
-    # Check for previously created screenshot
-    if not overwrite and os.path.exists(screenshot_file):
-        _log.debug('Screenshot already exists: %s', screenshot_file)
-        return screenshot_file
-
-    # Ensure timestamp is within range
+def _assert_timestamp_in_range(video_file, timestamp):
     try:
         duration = utils.video.duration(video_file)
     except errors.ContentError as e:
@@ -79,15 +432,136 @@ def screenshot(video_file, timestamp, screenshot_file, overwrite=False):
                 + utils.timestamp.pretty(timestamp)
             )
 
-    # Make screenshot
-    cmd = _make_screenshot_cmd(video_file, timestamp, screenshot_file)
-    output = utils.subproc.run(cmd, ignore_errors=True, join_stderr=True)
-    if not os.path.exists(screenshot_file):
-        raise errors.ScreenshotError(
-            f'{video_file}: Failed to create screenshot at {timestamp}: {output}'
+
+_FRAME_ANALYSIS_SIZE = (160, 90)
+_BLANK_FRAME_MAX_DARKNESS = 20
+_BLANK_FRAME_MIN_BRIGHTNESS = 235
+_BLANK_FRAME_MIN_STDDEV = 10
+
+def _make_frame_analysis_cmd(video_file, starts, frames_per_start):
+    width, height = _FRAME_ANALYSIS_SIZE
+    ffmpeg_input = utils.video.make_ffmpeg_input(video_file)
+    cmd = [
+        _ffmpeg_executable(),
+        '-loglevel', 'level+error',
+    ]
+    for start in starts:
+        cmd.extend(('-ss', str(start), '-t', str(frames_per_start), '-i', ffmpeg_input))
+
+    # Get one small grayscale frame per second from each input. Inputs near the
+    # end of the video are padded so that every input has the same number of
+    # frames. All frames are concatenated and written to stdout as raw pixels.
+    filters = [
+        (
+            f'[{i}:v:0]fps=1,scale={width}:{height},setsar=1/1,format=gray,'
+            f'tpad=stop={frames_per_start}:stop_mode=clone,'
+            f'trim=end_frame={frames_per_start},setpts=PTS-STARTPTS[v{i}]'
         )
+        for i in range(len(starts))
+    ]
+    concat_inputs = ''.join(f'[v{i}]' for i in range(len(starts)))
+    filters.append(f'{concat_inputs}concat=n={len(starts)}:v=1:a=0[frames]')
+    cmd.extend((
+        '-filter_complex', ';'.join(filters),
+        '-map', '[frames]',
+        # Don't duplicate frames to match the default output frame rate
+        '-r', '1',
+        '-f', 'rawvideo',
+        '-pix_fmt', 'gray',
+        'pipe:1',
+    ))
+    return tuple(cmd)
+
+def _score_frames(frames):
+    # Return array of scores with the same shape as `frames` minus the last two
+    # dimensions (height and width). Blank frames (black, white, fades, etc)
+    # have a negative score. Otherwise, the score is higher for frames with more
+    # contrast and details.
+    numpy = _import_numpy()
+    frames = frames.astype(numpy.float32)
+    luminance = frames.mean(axis=(-2, -1))
+    stddev = frames.std(axis=(-2, -1))
+    edge_energy = (
+        numpy.abs(numpy.diff(frames, axis=-1)).mean(axis=(-2, -1))
+        + numpy.abs(numpy.diff(frames, axis=-2)).mean(axis=(-2, -1))
+    )
+    blank = (
+        (luminance <= _BLANK_FRAME_MAX_DARKNESS)
+        | (luminance >= _BLANK_FRAME_MIN_BRIGHTNESS)
+        | (stddev <= _BLANK_FRAME_MIN_STDDEV)
+    )
+    return numpy.where(blank, -1.0, stddev + 2 * edge_energy)
+
+def _import_numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise errors.DependencyError('Missing dependency: numpy')
     else:
-        return screenshot_file
+        return numpy
+
+def best_frames(video_file, timestamps, radius=5):
+    """
+    Move timestamps away from blank frames to the most detailed frame nearby
+
+    The frames around all `timestamps` are decoded at low resolution by a single
+    ffmpeg process. Each frame is scored by mean luminance, variance and edge
+    energy with NumPy.
+
+    :param str video_file: Path to video file
+    :param timestamps: Sequence of time locations in the video in seconds
+    :param int radius: Maximum number of seconds a timestamp is moved
+
+    :raise DependencyError: if NumPy or ffmpeg is not installed
+    :raise ScreenshotError: if something goes wrong
+
+    :return: List of timestamps in seconds as :class:`int`; timestamps that are
+        only surrounded by blank frames are not moved
+    """
+    numpy = _import_numpy()
+    _assert_video_file_readable(video_file)
+    timestamps = [int(ts) for ts in timestamps]
+    if not timestamps:
+        return []
+
+    try:
+        duration = utils.video.duration(video_file)
+    except errors.ContentError as e:
+        raise errors.ScreenshotError(e)
+
+    frames_per_start = 2 * radius + 1
+    starts = [max(0, ts - radius) for ts in timestamps]
+    cmd = _make_frame_analysis_cmd(video_file, starts, frames_per_start)
+    try:
+        data = utils.subproc.run(cmd, binary=True, resource='cpu')
+    except errors.ProcessError as e:
+        raise errors.ScreenshotError(f'{video_file}: Failed to analyze frames: {e}')
+
+    width, height = _FRAME_ANALYSIS_SIZE
+    expected_size = len(starts) * frames_per_start * height * width
+    if len(data) != expected_size:
+        raise errors.ScreenshotError(
+            f'{video_file}: Failed to analyze frames: '
+            f'Expected {expected_size} bytes, got {len(data)}'
+        )
+
+    frames = numpy.frombuffer(data, dtype=numpy.uint8).reshape(
+        len(starts), frames_per_start, height, width,
+    )
+    scores = _score_frames(frames)
+
+    best = []
+    for ts, start, candidate_scores in zip(timestamps, starts, scores):
+        positions = numpy.arange(start, start + frames_per_start)
+        # Padded frames after the end of the video are not candidates
+        candidate_scores = numpy.where(positions < duration, candidate_scores, -1.0)
+        i = int(candidate_scores.argmax())
+        if candidate_scores[i] < 0:
+            _log.debug('Only blank frames around %s', ts)
+            best.append(ts)
+        else:
+            best.append(int(positions[i]))
+    return best
 
 
 def _make_resize_cmd(image_file, dimensions, resized_file):
@@ -102,20 +576,30 @@ def _make_resize_cmd(image_file, dimensions, resized_file):
         f'file:{resized_file}',
     )
 
-def resize(image_file, width=None, height=None, target_file=None):
+def resize(image_file, width=None, height=None, target_file=None, cache_directory=None):
     """
     Resize image, preserve aspect ratio
 
+    Images are resized in-process with `Pillow <https://python-pillow.org/>`_
+    if it is installed and can handle the image. Otherwise, ``ffmpeg`` is used.
+
     :param image_file: Path to source image
     :param width: Desired image width in pixels or `None`
     :param height: Desired image height in pixels or `None`
     :param target_file: Path to resized image or `None` to generate a path from
         `image_file`, `width` and `height`
+    :param cache_directory: Where to store resized images or `None` to not
+        cache them; resized images are named after the SHA256 hash of
+        `image_file`'s content and the desired dimensions, so each image is only
+        resized once per size
 
     If `width` and `height` are falsy (the default) return `image_file` if
     `target_file` is falsy or copy `image_file` to `target_file` and return
     `target_file`.
 
+    If `cache_directory` is given and `target_file` is not, the path to the
+    cached image is returned.
+
     :raise ImageResizeError: if resizing fails
 
     :return: Path to resized image
@@ -140,31 +624,354 @@ def resize(image_file, width=None, height=None, target_file=None):
         extension = f'.height={height}.'
     else:
         if target_file:
-            import shutil
-            try:
-                return str(shutil.copy2(image_file, target_file))
-            except OSError as e:
-                msg = e.strerror if e.strerror else str(e)
-                raise errors.ImageResizeError(
-                    f'Failed to copy {image_file} to {target_file}: {msg}'
-                )
+            return _copy_image(image_file, target_file)
         else:
             return str(image_file)
 
+    if cache_directory:
+        cached_file = _resized_cache_file(image_file, extension, cache_directory)
+        if not os.path.exists(cached_file):
+            try:
+                utils.fs.mkdir(cache_directory)
+            except errors.ContentError as e:
+                raise errors.ImageResizeError(e)
+            _resize(image_file, width, height, dimensions, cached_file)
+        else:
+            _log.debug('Already resized: %r', cached_file)
+        if target_file:
+            return _copy_image(cached_file, target_file)
+        else:
+            return cached_file
+
     if not target_file:
         target_file = (
             utils.fs.strip_extension(image_file)
             + extension
             + utils.fs.file_extension(image_file)
         )
+    return _resize(image_file, width, height, dimensions, target_file)
+
+def _resize(image_file, width, height, dimensions, target_file):
     _log.debug('Resizing to %r: %r', dimensions, image_file)
     _log.debug('Resize target: %r', target_file)
+    if _resize_with_pillow(image_file, width, height, target_file):
+        return str(target_file)
 
     cmd = _make_resize_cmd(image_file, dimensions, target_file)
-    output = utils.subproc.run(cmd, ignore_errors=True, join_stderr=True)
+    output = utils.subproc.run(cmd, ignore_errors=True, join_stderr=True, resource='cpu')
     if not os.path.exists(target_file):
         raise errors.ImageResizeError(
             f'{image_file}: Failed to resize: {output}'
         )
     else:
         return str(target_file)
+
+def _resize_with_pillow(image_file, width, height, target_file):
+    # Return whether `image_file` was resized
+    try:
+        from PIL import Image
+    except ImportError:
+        return False
+
+    try:
+        with Image.open(image_file) as img:
+            if not height:
+                height = max(1, round(img.height * width / img.width))
+            elif not width:
+                width = max(1, round(img.width * height / img.height))
+            resized = img.resize((int(width), int(height)), Image.BICUBIC)
+            extension = utils.fs.file_extension(target_file)
+            if Image.registered_extensions().get('.' + extension) == 'JPEG':
+                if resized.mode not in ('RGB', 'L'):
+                    resized = resized.convert('RGB')
+            # Don't leave incomplete images behind (e.g. in the cache), but keep
+            # the extension so Pillow knows which format to write
+            tmp_file = f'{target_file}.tmp.{extension}'
+            try:
+                resized.save(tmp_file, quality=90)
+                os.replace(tmp_file, target_file)
+            except BaseException:
+                if os.path.exists(tmp_file):
+                    os.remove(tmp_file)
+                raise
+    except (OSError, ValueError) as e:
+        # Let ffmpeg try (Pillow can't decode everything ffmpeg can decode)
+        _log.debug('Pillow failed to resize %r: %r', image_file, e)
+        return False
+    else:
+        return True
+
+def _resized_cache_file(image_file, extension, cache_directory):
+    try:
+        with open(image_file, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+    except OSError as e:
+        msg = e.strerror if e.strerror else str(e)
+        raise errors.ImageResizeError(f'{image_file}: {msg}')
+    else:
+        return os.path.join(
+            cache_directory,
+            digest + extension + utils.fs.file_extension(image_file),
+        )
+
+def _copy_image(image_file, target_file):
+    import shutil
+    try:
+        return str(shutil.copy2(image_file, target_file))
+    except OSError as e:
+        msg = e.strerror if e.strerror else str(e)
+        raise errors.ImageResizeError(
+            f'Failed to copy {image_file} to {target_file}: {msg}'
+        )
+
+
+IMAGE_FORMATS = ('png', 'jpeg', 'webp')
+"""Image formats supported by :func:`convert`"""
+
+_IMAGE_FORMAT_EXTENSIONS = {
+    'png': 'png',
+    'jpeg': 'jpg',
+    'webp': 'webp',
+}
+
+def _make_convert_cmd(image_file, image_format, quality, converted_file):
+    # ffmpeg's "image2" image file muxer uses "%" for string formatting
+    converted_file = str(converted_file).replace('%', '%%')
+    if image_format == 'jpeg':
+        # Map quality (1-100) to qscale (31-2)
+        encoder_args = ('-q:v', str(round(31 - (quality - 1) * 29 / 99)))
+    elif image_format == 'webp':
+        encoder_args = ('-c:v', 'libwebp', '-lossless', '1')
+    else:
+        encoder_args = ()
+    return (
+        _ffmpeg_executable(),
+        '-y',
+        '-loglevel', 'level+error',
+        '-i', f'file:{image_file}',
+        *encoder_args,
+        f'file:{converted_file}',
+    )
+
+def convert(image_file, image_format, cache_directory, quality=90):
+    """
+    Convert image to different format
+
+    Images are converted in-process with `Pillow <https://python-pillow.org/>`_
+    if it is installed. Otherwise, ``ffmpeg`` is used.
+
+    The converted image is stored in `cache_directory` and named after the
+    SHA256 hash of `image_file`'s content and the encoder settings, so each
+    variant is only encoded once.
+
+    :class:`ImageBuffer` instances are converted in memory and not stored. This
+    requires Pillow.
+
+    :param image_file: Path to image or :class:`ImageBuffer` instance
+    :param str image_format: One of :attr:`IMAGE_FORMATS`; WebP images are
+        encoded losslessly
+    :param str cache_directory: Where to store the converted image
+    :param int quality: JPEG quality from 1 (worst) to 100 (best)
+
+    If `image_file` already has the file extension of `image_format`, it is
+    returned unchanged.
+
+    :raise ImageConvertError: if `image_format` is not supported, `image_file`
+        can't be read or converted or the converted image can't be written
+
+    :return: Path to converted image or :class:`ImageBuffer` instance
+    """
+    if image_format not in IMAGE_FORMATS:
+        raise errors.ImageConvertError(f'Unsupported image format: {image_format}')
+
+    extension = _IMAGE_FORMAT_EXTENSIONS[image_format]
+    if os.path.splitext(str(image_file))[1].lower().lstrip('.') in (extension, image_format):
+        return image_file
+
+    if isinstance(image_file, ImageBuffer):
+        target = io.BytesIO()
+        if not _convert_with_pillow(image_file, image_format, quality, target):
+            raise errors.ImageConvertError(
+                f'{image_file}: Failed to convert to {image_format}: Missing dependency: Pillow'
+            )
+        name = os.path.splitext(image_file.name)[0] + f'.{extension}'
+        return ImageBuffer(target.getvalue(), name)
+
+    try:
+        with open(image_file, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+    except OSError as e:
+        msg = e.strerror if e.strerror else str(e)
+        raise errors.ImageConvertError(f'{image_file}: {msg}')
+
+    if image_format == 'jpeg':
+        settings = f'quality={quality}'
+    else:
+        settings = 'lossless'
+    converted_file = os.path.join(cache_directory, f'{digest}.{settings}.{extension}')
+    if os.path.exists(converted_file):
+        _log.debug('Already converted: %s', converted_file)
+        return converted_file
+
+    try:
+        utils.fs.mkdir(cache_directory)
+    except errors.ContentError as e:
+        raise errors.ImageConvertError(e)
+
+    # Don't leave incomplete images in the cache
+    tmp_file = f'{converted_file}.tmp.{extension}'
+    if not _convert_with_pillow(image_file, image_format, quality, tmp_file):
+        cmd = _make_convert_cmd(image_file, image_format, quality, tmp_file)
+        output = utils.subproc.run(cmd, ignore_errors=True, join_stderr=True, resource='cpu')
+        if not os.path.exists(tmp_file):
+            raise errors.ImageConvertError(
+                f'{image_file}: Failed to convert to {image_format}: {output}'
+            )
+
+    try:
+        os.rename(tmp_file, converted_file)
+    except OSError as e:
+        msg = e.strerror if e.strerror else str(e)
+        raise errors.ImageConvertError(f'{converted_file}: {msg}')
+    else:
+        return converted_file
+
+def _convert_with_pillow(image_file, image_format, quality, target):
+    # Return whether `image_file` was converted
+    try:
+        from PIL import Image
+    except ImportError:
+        return False
+
+    try:
+        if isinstance(image_file, io.IOBase):
+            image_file.seek(0)
+        with Image.open(image_file) as img:
+            if image_format == 'jpeg':
+                if img.mode not in ('RGB', 'L'):
+                    img = img.convert('RGB')
+                img.save(target, format='JPEG', quality=quality, optimize=True)
+            elif image_format == 'webp':
+                img.save(target, format='WEBP', lossless=True, quality=100, method=6)
+            else:
+                img.save(target, format='PNG', optimize=True)
+    except (OSError, ValueError) as e:
+        # Let ffmpeg try (Pillow can't decode everything ffmpeg can decode)
+        _log.debug('Pillow failed to convert %r: %r', image_file, e)
+        return False
+    else:
+        return True
+
+
+_PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+def optimize_png(image_file, cache_directory):
+    """
+    Recompress PNG image losslessly
+
+    The image data is deflated again with maximum compression and the best of
+    several zlib strategies. Pixels and all other chunks are not changed.
+
+    The optimized image is stored in `cache_directory` and named after the
+    SHA256 hash of `image_file`'s content, so each image is only optimized once.
+
+    :class:`ImageBuffer` instances are optimized in memory and not stored.
+
+    :param image_file: Path to PNG image or :class:`ImageBuffer` instance
+    :param str cache_directory: Where to store the optimized image
+
+    :raise ImageOptimizeError: if `image_file` can't be read or is not a valid
+        PNG image or if the optimized image can't be written
+
+    :return: Path to optimized image or :class:`ImageBuffer` instance
+    """
+    if isinstance(image_file, ImageBuffer):
+        try:
+            optimized_data = _optimize_png_data(image_file.getvalue())
+        except (ValueError, zlib.error) as e:
+            raise errors.ImageOptimizeError(f'{image_file}: Invalid PNG image: {e}')
+        else:
+            return ImageBuffer(optimized_data, image_file.name)
+
+    try:
+        with open(image_file, 'rb') as f:
+            data = f.read()
+    except OSError as e:
+        raise errors.ImageOptimizeError(f'{image_file}: {e.strerror}')
+
+    optimized_file = os.path.join(
+        cache_directory,
+        hashlib.sha256(data).hexdigest() + '.optimized.png',
+    )
+    if os.path.exists(optimized_file):
+        _log.debug('Already optimized: %s', optimized_file)
+        return optimized_file
+
+    try:
+        optimized_data = _optimize_png_data(data)
+    except (ValueError, zlib.error) as e:
+        raise errors.ImageOptimizeError(f'{image_file}: Invalid PNG image: {e}')
+    _log.debug('Optimized %s: %d -> %d bytes', image_file, len(data), len(optimized_data))
+
+    try:
+        utils.fs.mkdir(cache_directory)
+        with open(optimized_file + '.tmp', 'wb') as f:
+            f.write(optimized_data)
+        os.rename(optimized_file + '.tmp', optimized_file)
+    except errors.ContentError as e:
+        raise errors.ImageOptimizeError(e)
+    except OSError as e:
+        raise errors.ImageOptimizeError(f'{optimized_file}: {e.strerror}')
+    else:
+        return optimized_file
+
+def _optimize_png_data(data):
+    chunks = _read_png_chunks(data)
+    idat = b''.join(chunk_data for chunk_type, chunk_data in chunks if chunk_type == b'IDAT')
+    if not idat:
+        raise ValueError('No IDAT chunk')
+
+    raw = zlib.decompress(idat)
+    compressed = [idat]
+    for strategy in (zlib.Z_DEFAULT_STRATEGY, zlib.Z_FILTERED):
+        compressor = zlib.compressobj(9, zlib.DEFLATED, 15, 9, strategy)
+        compressed.append(compressor.compress(raw) + compressor.flush())
+    best_idat = min(compressed, key=len)
+
+    # Replace all IDAT chunks with a single IDAT chunk at the same position
+    parts = [_PNG_SIGNATURE]
+    idat_written = False
+    for chunk_type, chunk_data in chunks:
+        if chunk_type == b'IDAT':
+            if not idat_written:
+                parts.append(_make_png_chunk(b'IDAT', best_idat))
+                idat_written = True
+        else:
+            parts.append(_make_png_chunk(chunk_type, chunk_data))
+    return b''.join(parts)
+
+def _read_png_chunks(data):
+    if not data.startswith(_PNG_SIGNATURE):
+        raise ValueError('Missing PNG signature')
+    chunks = []
+    pos = len(_PNG_SIGNATURE)
+    while pos < len(data):
+        if pos + 8 > len(data):
+            raise ValueError('Truncated chunk header')
+        length, chunk_type = struct.unpack('>I4s', data[pos:pos + 8])
+        chunk_data = data[pos + 8:pos + 8 + length]
+        if len(chunk_data) != length:
+            raise ValueError('Truncated chunk')
+        chunks.append((chunk_type, chunk_data))
+        pos += 12 + length
+        if chunk_type == b'IEND':
+            break
+    return chunks
+
+def _make_png_chunk(chunk_type, chunk_data):
+    return (
+        struct.pack('>I', len(chunk_data))
+        + chunk_type
+        + chunk_data
+        + struct.pack('>I', zlib.crc32(chunk_type + chunk_data) & 0xffffffff)
+    )
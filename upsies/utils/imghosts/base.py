@@ -4,6 +4,8 @@ Base class for image uploaders
 
 import abc
 import copy
+import hashlib
+import io
 import json
 import os
 
@@ -63,7 +65,8 @@ class ImageHostBase(abc.ABC):
         """
         Upload image to gallery
 
-        :param str image_path: Path to image file
+        :param image_path: Path to image file or in-memory image file (e.g.
+            :class:`~.image.ImageBuffer`) with a ``name`` attribute
         :param bool cache: Whether to attempt to get the image URL from cache or
             cache it
 
@@ -73,6 +76,8 @@ class ImageHostBase(abc.ABC):
         """
         info = self._get_info_from_cache(image_path) if cache else {}
         if not info:
+            if isinstance(image_path, io.IOBase):
+                image_path.seek(0)
             info = await self._upload(image_path)
             _log.debug('Uploaded %r: %r', image_path, info)
             self._store_info_to_cache(image_path, info)
@@ -85,7 +90,8 @@ class ImageHostBase(abc.ABC):
         """
         Upload a single image
 
-        :param str image_path: Path to an image file
+        :param image_path: Path to an image file or in-memory image file (see
+            :meth:`upload`)
 
         :return: Dictionary that must contain an "url" key
         """
@@ -117,6 +123,17 @@ class ImageHostBase(abc.ABC):
             raise RuntimeError(f'Unable to write cache {cache_file}: {msg}')
 
     def _cache_file(self, image_path):
+        if isinstance(image_path, io.IOBase):
+            # In-memory images and other file objects are identified by their
+            # content; not every file object has getvalue()
+            image_path.seek(0)
+            digest = hashlib.sha256(image_path.read()).hexdigest()
+            image_path.seek(0)
+            name = getattr(image_path, 'name', None)
+            image_path = f'{os.path.basename(name) if isinstance(name, str) else ""}.{digest}'
+            filename = fs.sanitize_filename(image_path[-200:]) + f'.{self.name}.json'
+            return os.path.join(self.cache_directory, filename)
+
         # If image is in our cache_directory, the image's file name makes it
         # unique. This is usually the case when we're uploading screenshots. If
         # image is not in our cache_directory, use the absolute path as a unique
@@ -3,10 +3,11 @@ Dummy image uploader for testing and debugging
 """
 
 import asyncio
+import io
 import os
 
 from ... import errors
-from .. import fs
+from .. import fs, types
 from .base import ImageHostBase
 
 
@@ -17,16 +18,20 @@ class DummyImageHost(ImageHostBase):
 
     default_config = {
         'hostname': 'localhost',
+        'image_format': types.Choice('png', options=('png', 'jpeg', 'webp')),
+        'jpeg_quality': types.Integer(90, min=1, max=100),
     }
 
     async def _upload(self, image_path):
         try:
-            fs.assert_file_readable(image_path)
+            if not isinstance(image_path, io.IOBase):
+                fs.assert_file_readable(image_path)
         except errors.ContentError as e:
             raise errors.RequestError(e)
         else:
             await asyncio.sleep(1.5)
-            url = f'http://{self.config["hostname"]}/{os.path.basename(image_path)}'
+            filename = os.path.basename(getattr(image_path, 'name', image_path))
+            url = f'http://{self.config["hostname"]}/{filename}'
             return {
                 'url': url,
                 'thumbnail_url': f'{url}/thumbnail',
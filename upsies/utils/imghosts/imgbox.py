@@ -2,8 +2,12 @@
 Image uploader for imgbox.com
 """
 
+import io
+import os
+import tempfile
+
 from ... import errors
-from .. import LazyModule
+from .. import LazyModule, types
 from .base import ImageHostBase
 
 import logging  # isort:skip
@@ -13,13 +17,20 @@ pyimgbox = LazyModule(module='pyimgbox', namespace=globals())
 
 
 class ImgboxImageHost(ImageHostBase):
-    """Upload images to a gallery on imgbox.com"""
+    """
+    Upload images to a gallery on imgbox.com
+
+    In-memory images are written to a temporary file before they are uploaded.
+    """
 
     name = 'imgbox'
 
     default_config = {
         # Use smallest thumbnail size
         'thumb_width': 0,
+        # imgbox doesn't accept WebP
+        'image_format': types.Choice('png', options=('png', 'jpeg')),
+        'jpeg_quality': types.Integer(90, min=1, max=100),
     }
 
     def __init__(self, *args, **kwargs):
@@ -31,6 +42,14 @@ class ImgboxImageHost(ImageHostBase):
         )
 
     async def _upload(self, image_path):
+        if isinstance(image_path, io.IOBase):
+            # pyimgbox only uploads files
+            with tempfile.TemporaryDirectory() as tmpdir:
+                tmpfile = os.path.join(tmpdir, os.path.basename(image_path.name))
+                with open(tmpfile, 'wb') as f:
+                    f.write(image_path.read())
+                return await self._upload(tmpfile)
+
         submission = await self._gallery.upload(image_path)
         _log.debug('Submission: %r', submission)
         if not submission.success:
@@ -3,7 +3,7 @@ Image uploader for ptpimg.me
 """
 
 from ... import errors
-from .. import html, http
+from .. import html, http, types
 from .base import ImageHostBase
 
 import logging  # isort:skip
@@ -18,6 +18,8 @@ class PtpimgImageHost(ImageHostBase):
     default_config = {
         'apikey': '',
         'base_url': 'https://ptpimg.me',
+        'image_format': types.Choice('png', options=('png', 'jpeg', 'webp')),
+        'jpeg_quality': types.Integer(90, min=1, max=100),
     }
 
     async def _upload(self, image_path):
@@ -64,6 +64,18 @@ class ReleaseName(collections.abc.Mapping):
         except errors.ContentError:
             return {}
 
+    def _video_property(self, name):
+        # Prefer value that is shared by all episodes of a season pack over the
+        # value from the first video
+        if self.type is ReleaseType.season and os.path.isdir(self._path):
+            try:
+                value = getattr(video.season_info(self._path), name)
+            except errors.ContentError:
+                value = None
+            if value is not None:
+                return value
+        return getattr(video, name)(self._path)
+
     def __repr__(self):
         return f'{type(self).__name__}({self._path!r})'
 
@@ -294,7 +306,7 @@ class ReleaseName(collections.abc.Mapping):
     @property
     def resolution(self):
         '''Resolution (e.g. "1080p") or "UNKNOWN_RESOLUTION"'''
-        res = video.resolution(self._path)
+        res = self._video_property('resolution')
         if res is None:
             res = self._info.get('resolution') or 'UNKNOWN_RESOLUTION'
         return res
@@ -306,7 +318,7 @@ class ReleaseName(collections.abc.Mapping):
     @property
     def audio_format(self):
         '''Audio format or "UNKNOWN_AUDIO_FORMAT"'''
-        af = video.audio_format(self._path)
+        af = self._video_property('audio_format')
         if af is None:
             af = self._info.get('audio_codec') or 'UNKNOWN_AUDIO_FORMAT'
         return af
@@ -318,7 +330,7 @@ class ReleaseName(collections.abc.Mapping):
     @property
     def audio_channels(self):
         """Audio channels (e.g. "5.1") or empty string"""
-        ac = video.audio_channels(self._path)
+        ac = self._video_property('audio_channels')
         if ac is None:
             ac = self._info.get('audio_channels') or ''
         return ac
@@ -330,7 +342,7 @@ class ReleaseName(collections.abc.Mapping):
     @property
     def video_format(self):
         '''Video format (or encoder in case of x264/x265/XviD) or "UNKNOWN_VIDEO_FORMAT"'''
-        vf = video.video_format(self._path)
+        vf = self._video_property('video_format')
         if vf is None:
             vf = self._info.get('video_codec') or 'UNKNOWN_VIDEO_FORMAT'
         return vf
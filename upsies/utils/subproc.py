@@ -2,10 +2,14 @@
 Execute external commands
 """
 
+import contextlib
+import multiprocessing
 import os
+import signal
+import threading
 
 from .. import errors
-from ..utils import LazyModule
+from ..utils import LazyModule, os_family
 
 import logging  # isort:skip
 _log = logging.getLogger(__name__)
@@ -16,7 +20,176 @@ shlex = LazyModule(module='shlex', namespace=globals())
 _command_output_cache = {}
 
 
-def run(argv, ignore_errors=False, join_stderr=False, cache=False):
+class Governor:
+    """
+    Limit the number of concurrently running subprocesses
+
+    Each command belongs to a resource class, e.g. ``"cpu"`` for commands that
+    keep processor cores busy (``ffmpeg``) and ``"io"`` for commands that mostly
+    read from disk (``mediainfo``, ``ffprobe``). Every resource class has a
+    number of slots. Commands that don't get a free slot wait until another
+    command of the same resource class terminates.
+
+    Slots are shared with :class:`~.daemon.DaemonProcess` instances, i.e. the
+    limits apply to all processes of the application, not just the current
+    one.
+
+    :param slots: Mapping of resource class names to maximum number of
+        concurrently running commands
+    :param timeouts: Mapping of resource class names to maximum number of
+        seconds a command may run before it is killed; missing or false values
+        mean no timeout
+    """
+
+    def __init__(self, slots, timeouts={}):
+        self._init_state()
+        self.slots = slots
+        self.timeouts = timeouts
+
+    def _init_state(self):
+        # Reentrant lock because stop() may be called by a signal handler
+        self._lock = threading.RLock()
+        self._semaphores = {}
+        self._timeouts = {}
+        self._processes = set()
+        self._cancelled = set()
+        self._stopped = False
+
+    # Only slots and timeouts are passed to child processes. The semaphores can
+    # only be pickled while a child process is spawned.
+    def __getstate__(self):
+        return {'semaphores': self._semaphores, 'timeouts': self._timeouts}
+
+    def __setstate__(self, state):
+        self._init_state()
+        self._semaphores = state['semaphores']
+        self._timeouts = state['timeouts']
+
+    @property
+    def slots(self):
+        """
+        Mapping of resource class names to maximum number of concurrently
+        running commands
+
+        Setting this property only affects commands that are started afterwards
+        and processes that are spawned afterwards.
+        """
+        return {resource: slots for resource, (slots, _) in self._semaphores.items()}
+
+    @slots.setter
+    def slots(self, slots):
+        with self._lock:
+            self._semaphores = {
+                resource: (int(n), multiprocessing.get_context('spawn').BoundedSemaphore(int(n)))
+                for resource, n in slots.items()
+            }
+
+    @property
+    def timeouts(self):
+        """
+        Mapping of resource class names to maximum number of seconds a command
+        may run before it is killed
+
+        Resource classes without timeout are not included.
+        """
+        return dict(self._timeouts)
+
+    @timeouts.setter
+    def timeouts(self, timeouts):
+        with self._lock:
+            self._timeouts = {
+                resource: float(timeout)
+                for resource, timeout in timeouts.items()
+                if timeout
+            }
+
+    def timeout(self, resource):
+        """Return timeout for `resource` in seconds or `None`"""
+        return self._timeouts.get(resource, None)
+
+    @contextlib.contextmanager
+    def slot(self, resource):
+        """
+        Context manager that blocks until a slot for `resource` is available
+
+        Resource classes without configured slots are not limited.
+
+        :param str resource: Resource class name
+        """
+        with self._lock:
+            _, semaphore = self._semaphores.get(resource, (None, None))
+        if semaphore is None:
+            yield
+        else:
+            with semaphore:
+                yield
+
+    def register(self, process):
+        """
+        Remember running :class:`subprocess.Popen` instance for :meth:`cancel`
+
+        If :meth:`stop` was called, `process` is killed immediately.
+        """
+        with self._lock:
+            self._processes.add(process)
+            if self._stopped:
+                self._cancelled.add(process)
+                _kill(process)
+
+    def unregister(self, process):
+        """
+        Forget :class:`subprocess.Popen` instance
+
+        :return: Whether `process` was killed by :meth:`cancel`
+        """
+        with self._lock:
+            self._processes.discard(process)
+            if process in self._cancelled:
+                self._cancelled.discard(process)
+                return True
+            else:
+                return False
+
+    def cancel(self):
+        """Kill all running processes and their child processes"""
+        with self._lock:
+            processes = tuple(self._processes)
+            self._cancelled.update(processes)
+        for process in processes:
+            _log.debug('Killing process %r', process.pid)
+            _kill(process)
+
+    def stop(self):
+        """Kill all running processes and any processes that are started later"""
+        with self._lock:
+            self._stopped = True
+            self.cancel()
+
+    @property
+    def is_stopped(self):
+        """Whether :meth:`stop` was called"""
+        return self._stopped
+
+
+governor = Governor(slots={
+    'cpu': os.cpu_count() or 1,
+    'io': 4,
+})
+"""
+Application-wide :class:`Governor` instance that is used by :func:`run`
+
+The number of slots and the timeout per resource class are set by
+:func:`~.application_setup` from the ``subprocess_cpu_slots``,
+``subprocess_io_slots``, ``subprocess_cpu_timeout`` and
+``subprocess_io_timeout`` options in the main configuration file.
+
+:class:`~.daemon.DaemonProcess` passes this instance to its process so that
+both processes share the same slots.
+"""
+
+
+def run(argv, ignore_errors=False, join_stderr=False, cache=False, resource=None, timeout=None,
+        binary=False):
     """
     Execute command in subprocess
 
@@ -26,38 +199,89 @@ def run(argv, ignore_errors=False, join_stderr=False, cache=False):
         non-empty
     :param bool join_stderr: Redirect stderr to stdout
     :param bool cache: Cache output based on `argv`
+    :param str resource: Resource class (see :class:`Governor`) or `None` to
+        run the command immediately
+    :param timeout: Maximum number of seconds the command may run before it is
+        killed or `None` to use the timeout of `resource` (see
+        :attr:`Governor.timeouts`)
+    :type timeout: int or float
+    :param bool binary: Return stdout as :class:`bytes` instead of decoding it;
+        stderr is still decoded for error messages
 
     :raise DependencyError: if the command fails to execute
-    :raise ProcessError: if stdout is not empty and `ignore_errors` is `False`
+    :raise ProcessError: if stdout is not empty and `ignore_errors` is `False`,
+        if the command times out or if it is killed by :meth:`Governor.cancel`
 
     :return: Output from process
-    :rtype: str
+    :rtype: str or bytes
     """
     argv = tuple(str(arg) for arg in argv)
     if cache and argv in _command_output_cache:
         stdout, stderr = _command_output_cache[argv]
     else:
-        fh_stdout = subprocess.PIPE
-        if join_stderr:
-            fh_stderr = subprocess.STDOUT
-        else:
-            fh_stderr = subprocess.PIPE
-        try:
-            _log.debug('Running: %s', ' '.join(shlex.quote(arg) for arg in argv))
-            proc = subprocess.run(
-                argv,
-                shell=False,
-                encoding='utf-8',
-                stdout=fh_stdout,
-                stderr=fh_stderr,
-                stdin=subprocess.PIPE,
-            )
-        except OSError:
-            raise errors.DependencyError(f'Missing dependency: {os.path.basename(argv[0])}')
-        else:
-            stdout, stderr = proc.stdout, proc.stderr
-            if cache:
-                _command_output_cache[argv] = (stdout, stderr)
+        if timeout is None:
+            timeout = governor.timeout(resource)
+        with governor.slot(resource):
+            stdout, stderr = _run(argv, join_stderr, timeout, binary)
+        if cache:
+            _command_output_cache[argv] = (stdout, stderr)
     if stderr and not ignore_errors:
         raise errors.ProcessError(stderr)
     return stdout
+
+def _run(argv, join_stderr, timeout, binary=False):
+    fh_stdout = subprocess.PIPE
+    if join_stderr:
+        fh_stderr = subprocess.STDOUT
+    else:
+        fh_stderr = subprocess.PIPE
+    try:
+        _log.debug('Running: %s', ' '.join(shlex.quote(arg) for arg in argv))
+        proc = subprocess.Popen(
+            argv,
+            shell=False,
+            encoding=None if binary else 'utf-8',
+            stdout=fh_stdout,
+            stderr=fh_stderr,
+            stdin=subprocess.PIPE,
+            # Put process in its own process group so we can kill it together
+            # with any child processes (see _kill())
+            start_new_session=True,
+        )
+    except OSError:
+        raise errors.DependencyError(f'Missing dependency: {os.path.basename(argv[0])}')
+
+    governor.register(proc)
+    try:
+        stdout, stderr = proc.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        _kill(proc)
+        proc.communicate()
+        raise errors.ProcessError(f'{os.path.basename(argv[0])}: Timed out after {timeout} seconds')
+    except BaseException:
+        # Don't leave orphaned processes behind, e.g. on KeyboardInterrupt
+        _kill(proc)
+        proc.wait()
+        raise
+    finally:
+        cancelled = governor.unregister(proc)
+
+    if cancelled:
+        raise errors.ProcessError(f'{os.path.basename(argv[0])}: Cancelled')
+    if binary and stderr:
+        stderr = stderr.decode('utf-8', errors='replace')
+    return stdout, stderr
+
+def _kill(process):
+    # Kill `process` and all processes in its process group
+    if os_family() != 'windows':
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            # Process has already terminated
+            return
+        except OSError as e:
+            _log.debug('Failed to kill process group %r: %r', process.pid, e)
+        else:
+            return
+    process.kill()
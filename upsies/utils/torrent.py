@@ -2,28 +2,124 @@
 Create torrent file
 """
 
+import bisect
 import collections
+import concurrent.futures
+import functools
+import hashlib
+import json
+import math
+import mmap
+import os
+import threading
 import time
 from os.path import exists as _path_exists
 
 from .. import __project_name__, __version__, errors
-from . import LazyModule
+from . import LazyModule, fs
 
 import logging  # isort:skip
 _log = logging.getLogger(__name__)
 
 torf = LazyModule(module='torf', namespace=globals())
 
+IO_STRATEGIES = ('sequential', 'parallel')
+"""
+Valid values for the `io_strategy` argument of :func:`create`
+
+``sequential``
+    A single thread reads the content from start to finish and hands each piece
+    over to the hashing threads. This is best for spinning disks.
+
+``parallel``
+    Each hashing thread reads its own pieces with :func:`os.pread`. This keeps
+    multiple requests in flight, which is much faster on SSDs and RAID arrays.
+    On platforms without :func:`os.pread`, ``sequential`` is used.
+"""
+
+PAGE_CACHE_MODES = ('keep', 'drop', 'direct')
+"""
+Valid values for the `page_cache` argument of :func:`create`
+
+``keep``
+    Let the operating system decide what stays in the page cache. Hashing a
+    large torrent can evict everything else from the page cache.
+
+``drop``
+    Tell the kernel that files are read sequentially and remove everything
+    from the page cache right after it was read (see ``posix_fadvise(2)``).
+
+``direct``
+    Bypass the page cache with ``O_DIRECT``. Files on file systems that don't
+    support ``O_DIRECT`` are read like with ``drop``.
+
+``drop`` and ``direct`` have no effect on platforms that don't support them.
+"""
+
+PIECE_SIZE_MIN = 16 * 2**10
+"""Smallest piece size that is supported by :func:`calculate_piece_size`"""
+
+PIECE_SIZE_MAX = 16 * 2**20
+"""Largest piece size that is supported by :func:`calculate_piece_size`"""
+
 
 def create(*, content_path, announce, torrent_path,
            init_callback, progress_callback,
-           overwrite=False, source=None, exclude=()):
+           overwrite=False, source=None, private=True, exclude=(), **kwargs):
     """
     Generate and write torrent file
 
     :param str content_path: Path to the torrent's payload
     :param str announce: Announce URL
     :param str torrent_path: Path of the generated torrent file
+    :param str source: Value of the "source" field in the torrent or `None` to
+        leave it out
+    :param bool private: Whether the torrent is private
+
+    See :func:`create_many` for the other arguments.
+
+    :raise TorrentError: if anything goes wrong
+
+    :return: `torrent_path` or `None` if torrent creation was cancelled
+    """
+    torrent_paths = create_many(
+        content_path=content_path,
+        targets=({
+            'torrent_path': torrent_path,
+            'announce': announce,
+            'source': source,
+            'private': private,
+        },),
+        init_callback=init_callback,
+        progress_callback=progress_callback,
+        overwrite=overwrite,
+        exclude=exclude,
+        **kwargs,
+    )
+    if torrent_paths:
+        return torrent_paths[0]
+
+
+def create_many(*, content_path, targets,
+                init_callback, progress_callback,
+                overwrite=False, exclude=(), store_directory=None,
+                previous_torrent=None, workers=None, read_size=None,
+                io_strategy='sequential', page_cache='keep'):
+    """
+    Hash `content_path` once and write one torrent file per target
+
+    Piece hashes only depend on the files and the piece size, so torrents for
+    multiple trackers can share them.
+
+    :param str content_path: Path to the torrent's payload
+    :param targets: Sequence of :class:`dict` objects with the keys
+        ``torrent_path`` (path of the generated torrent file), ``announce``
+        (announce URL), ``source`` (value of the "source" field or `None` to
+        leave it out; optional), ``private`` (whether the torrent is private;
+        optional, defaults to `True`) and ``piece_size_min`` and
+        ``piece_size_max`` (limits for :func:`calculate_piece_size`; optional).
+        All targets share the same piece size, so it must satisfy the limits of
+        every target.
     :param str init_callback: Callable that is called once before torrent
         generation commences. It gets `content_path` as a tree where a node is a
         tuple in which the first item is the directory name and the second item
@@ -51,48 +147,1017 @@ def create(*, content_path, announce, torrent_path,
     :param str progress_callback: Callable that gets the progress as a number
         between 0 and 100. Torrent creation is cancelled if `progress_callback`
         returns `True` or any other truthy value.
-    :param bool overwrite: Whether to overwrite `torrent_path` if it exists
-    :param str source: Value of the "source" field in the torrent or `None` to
-        leave it out
+    :param bool overwrite: Whether to overwrite existing torrent files; if this
+        is `False`, nothing is hashed if all torrent files exist
     :param exclude: Sequence of regular expressions; matching files are not
         included in the torrent
+    :param str store_directory: Directory of a :class:`PieceHashStore` or
+        `None` to always hash the content
+    :param str previous_torrent: Path to an earlier torrent file of the same
+        content or `None` to use the first existing torrent file in `targets`;
+        pieces that only contain files with the same relative path, size and
+        modification time as when the earlier torrent was created are copied
+        instead of hashed (requires `store_directory`)
+    :param int workers: Number of threads that hash pieces or `None` to use one
+        thread per CPU core
+    :param int read_size: Maximum number of bytes per read or `None` to read
+        each piece in one go
+    :param str io_strategy: How content is read (see :attr:`IO_STRATEGIES`)
+    :param str page_cache: How content is cached (see :attr:`PAGE_CACHE_MODES`)
 
     :raise TorrentError: if anything goes wrong
 
-    :return: `torrent_path`
+    :return: Sequence of torrent file paths in the same order as `targets` or
+        `None` if torrent creation was cancelled
     """
-    if not announce:
-        raise errors.TorrentError('Announce URL is empty')
+    for target in targets:
+        if not target['announce']:
+            raise errors.TorrentError('Announce URL is empty')
+
+    torrent_paths = tuple(target['torrent_path'] for target in targets)
+    existing_paths = [torrent_path for torrent_path in torrent_paths
+                      if _path_exists(torrent_path)]
+    if not overwrite and len(set(existing_paths)) == len(set(torrent_paths)):
+        _log.debug('Torrent files already exist: %r', torrent_paths)
+        return torrent_paths
+
+    try:
+        torrent = torf.Torrent(
+            path=content_path,
+            exclude_regexs=exclude,
+            trackers=((targets[0]['announce'],),),
+            private=targets[0].get('private', True),
+            source=targets[0].get('source', None),
+            created_by=f'{__project_name__} {__version__}',
+            creation_date=time.time(),
+        )
+        init_callback(_make_file_tree(torrent.filetree))
+        files = _get_files(torrent)
+    except torf.TorfError as e:
+        raise errors.TorrentError(e)
+
+    content_size = sum(size for _, size in files)
+    if content_size < 1:
+        raise errors.TorrentError(f'{content_path}: Empty or all files excluded')
 
-    def cb(torrent, filepath, pieces_done, pieces_total):
-        return progress_callback(pieces_done / pieces_total * 100)
+    # All targets must accept the piece size
+    try:
+        piece_size = calculate_piece_size(
+            content_size,
+            min_piece_size=max((int(target['piece_size_min']) for target in targets
+                                if target.get('piece_size_min')), default=None),
+            max_piece_size=min((int(target['piece_size_max']) for target in targets
+                                if target.get('piece_size_max')), default=None),
+        )
+        torrent.piece_size = piece_size
+    except (ValueError, torf.TorfError) as e:
+        raise errors.TorrentError(e)
 
-    if not overwrite and _path_exists(torrent_path):
-        _log.debug('Torrent file already exists: %r', torrent_path)
-        return torrent_path
+    store = PieceHashStore(store_directory) if store_directory else None
+    store_key = store.key(files, piece_size) if store else None
+    # Get file stats before hashing so any change while hashing is noticed later
+    file_stats = _get_file_stats(torrent, files) if store else None
+    hashes = store.get(store_key) if store_key else None
+    if hashes is not None:
+        progress_callback(100.0)
     else:
+        # Resume from checkpoint of previous attempt
+        if store_key:
+            known_hashes = store.get_checkpoint(store_key)
+            checkpoint_callback = functools.partial(store.put_checkpoint, store_key)
+        else:
+            known_hashes = {}
+            checkpoint_callback = None
+
+        # Reuse pieces of unchanged files from an existing torrent
+        if previous_torrent is None and existing_paths:
+            previous_torrent = existing_paths[0]
+        if previous_torrent and file_stats:
+            known_hashes.update(_get_reusable_hashes(torrent, files, file_stats,
+                                                     previous_torrent, store))
+
+        hashes = _generate(
+            files=files,
+            piece_size=piece_size,
+            progress_callback=progress_callback,
+            known_hashes=known_hashes,
+            checkpoint_callback=checkpoint_callback,
+            workers=workers,
+            read_size=read_size,
+            io_strategy=io_strategy,
+            page_cache=page_cache,
+        )
+        if hashes is None:
+            return None
+        elif store_key:
+            store.put(store_key, hashes)
+
+    # Remember which files the hashes were computed from so that later torrents
+    # can reuse them
+    if file_stats:
+        store.put_file_stats(hashes, file_stats)
+
+    torrent.metainfo['info']['pieces'] = hashes
+    for i, target in enumerate(targets):
+        if not overwrite and target['torrent_path'] in existing_paths:
+            _log.debug('Torrent file already exists: %r', target['torrent_path'])
+            continue
         try:
-            torrent = torf.Torrent(
-                path=content_path,
-                exclude_regexs=exclude,
-                trackers=((announce,),),
-                private=True,
-                source=source,
-                created_by=f'{__project_name__} {__version__}',
-                creation_date=time.time(),
-            )
-            init_callback(_make_file_tree(torrent.filetree))
-            success = torrent.generate(callback=cb, interval=0.5)
+            if i > 0:
+                torrent.trackers = ((target['announce'],),)
+                torrent.private = target.get('private', True)
+                torrent.source = target.get('source', None)
+            torrent.write(target['torrent_path'], overwrite=overwrite)
         except torf.TorfError as e:
             raise errors.TorrentError(e)
+    return torrent_paths
+
+
+def calculate_piece_size(content_size, *, min_piece_size=None, max_piece_size=None,
+                         min_pieces=1000, max_pieces=2000):
+    """
+    Return piece size for `content_size` bytes
+
+    The piece size is the largest power of 2 that results in at least
+    `min_pieces` pieces without exceeding `max_pieces`. Small pieces make the
+    torrent file big and increase the overhead for BitTorrent clients, large
+    pieces mean more data must be downloaded again if a piece is corrupt.
+
+    If there is no such piece size, the smallest piece size that doesn't exceed
+    `max_pieces` is used. `min_piece_size` and `max_piece_size` take precedence
+    over `min_pieces` and `max_pieces`.
+
+    :param int content_size: Combined size of all files in bytes
+    :param int min_piece_size: Smallest allowed piece size or `None` to use
+        :attr:`PIECE_SIZE_MIN`
+    :param int max_piece_size: Largest allowed piece size or `None` to use
+        :attr:`PIECE_SIZE_MAX`
+    :param int min_pieces: Minimum number of pieces
+    :param int max_pieces: Maximum number of pieces
+
+    :raise ValueError: if `min_piece_size` is larger than `max_piece_size`
+    """
+    min_piece_size = max(int(min_piece_size or 0), PIECE_SIZE_MIN)
+    max_piece_size = min(int(max_piece_size or PIECE_SIZE_MAX), PIECE_SIZE_MAX)
+    # Piece sizes must be powers of 2
+    min_piece_size = 1 << (min_piece_size - 1).bit_length()
+    max_piece_size = 1 << (max_piece_size.bit_length() - 1)
+    if min_piece_size > max_piece_size:
+        raise ValueError(f'Minimum piece size is larger than maximum piece size: '
+                         f'{min_piece_size} > {max_piece_size}')
+
+    piece_size = min_piece_size
+    while piece_size < max_piece_size:
+        if (
+            _count_pieces(content_size, piece_size) <= max_pieces
+            and _count_pieces(content_size, piece_size * 2) < min_pieces
+        ):
+            break
+        piece_size *= 2
+    return piece_size
+
+
+def _generate(*, files, piece_size, progress_callback, known_hashes=None,
+              checkpoint_callback=None, interval=0.5, checkpoint_interval=10,
+              **kwargs):
+    # Return concatenated piece hashes or `None` if `progress_callback`
+    # cancelled. `known_hashes` maps piece indexes to hashes that are not
+    # computed again. `checkpoint_callback` gets the list of piece hashes
+    # (`None` for unknown pieces) periodically and if hashing is not finished.
+    pieces_total = _count_pieces(sum(size for _, size in files), piece_size)
+    hashes = [None] * pieces_total
+    for piece_index, piece_hash in (known_hashes or {}).items():
+        hashes[piece_index] = piece_hash
+    pieces_done = pieces_total - hashes.count(None)
+    piece_indexes = [i for i, piece_hash in enumerate(hashes) if piece_hash is None]
+
+    if pieces_done:
+        _log.debug('Reusing %d of %d piece hashes', pieces_done, pieces_total)
+        if progress_callback(pieces_done / pieces_total * 100):
+            return None
 
-        if success:
+    last_progress_time = last_checkpoint_time = time.monotonic()
+    pieces = _hash_pieces(files, piece_size, piece_indexes, **kwargs)
+    try:
+        for piece_index, piece_hash in pieces:
+            hashes[piece_index] = piece_hash
+            pieces_done += 1
+            now = time.monotonic()
+            if checkpoint_callback and now - last_checkpoint_time >= checkpoint_interval:
+                last_checkpoint_time = now
+                checkpoint_callback(hashes)
+            if now - last_progress_time >= interval or pieces_done >= pieces_total:
+                last_progress_time = now
+                if progress_callback(pieces_done / pieces_total * 100):
+                    return None
+    finally:
+        pieces.close()
+        if checkpoint_callback and pieces_done < pieces_total:
+            checkpoint_callback(hashes)
+    return b''.join(hashes)
+
+
+def _get_file_stats(torrent, files):
+    # Return list of `[relative_path, size, mtime_ns]` lists in the same order as
+    # `files` or `None` if any file is not readable
+    file_stats = []
+    for (filepath, _), (relpath, _) in zip(files, _get_relative_files(torrent)):
+        try:
+            stat = os.stat(filepath)
+        except OSError as e:
+            _log.debug('Not storing file stats: %r', e)
+            return None
+        file_stats.append(['/'.join(relpath), stat.st_size, stat.st_mtime_ns])
+    return file_stats
+
+
+def _get_reusable_hashes(torrent, files, file_stats, previous_torrent_path, store):
+    # Return dictionary that maps piece indexes of `torrent` to hashes from
+    # the torrent file `previous_torrent_path`
+    #
+    # A file is unchanged if its relative path, size and modification time are
+    # exactly the same as when the previous torrent's piece hashes were stored
+    # (see PieceHashStore.put_file_stats()). A piece is reused if it consists
+    # only of unchanged files that are at the same position relative to a piece
+    # boundary in the previous torrent.
+    try:
+        previous = torf.Torrent.read(previous_torrent_path)
+        previous_hashes = previous.hashes
+        previous_piece_size = previous.piece_size
+    except torf.TorfError as e:
+        _log.debug('Not reusing piece hashes from %s: %r', previous_torrent_path, e)
+        return {}
+
+    previous_file_stats = store.get_file_stats(previous.metainfo['info']['pieces'])
+    if previous_file_stats is None:
+        _log.debug('Not reusing piece hashes from %s: Unknown file stats', previous_torrent_path)
+        return {}
+
+    piece_size = torrent.piece_size
+    if previous_piece_size != piece_size:
+        _log.debug('Not reusing piece hashes from %s: Piece size changed from %r to %r',
+                   previous_torrent_path, previous_piece_size, piece_size)
+        return {}
+
+    # Absolute offsets of previous files by relative path and size
+    previous_offsets = {}
+    offset = 0
+    for relpath, size in _get_relative_files(previous):
+        previous_offsets[(relpath, size)] = offset
+        offset += size
+    previous_total_size = offset
+
+    # Map each unchanged file to its absolute offset in the previous torrent
+    previous_file_stats = {tuple(stats) for stats in previous_file_stats}
+    file_offsets = {}
+    relative_files = _get_relative_files(torrent)
+    for file_index, ((_, size), (relpath, _)) in enumerate(zip(files, relative_files)):
+        previous_offset = previous_offsets.get((relpath, size))
+        if previous_offset is not None and tuple(file_stats[file_index]) in previous_file_stats:
+            file_offsets[file_index] = previous_offset
+
+    layout = _PieceLayout(files, piece_size)
+    reusable_hashes = {}
+    for piece_index in range(layout.pieces_total):
+        segments = layout.segments(piece_index)
+        if not all(file_index in file_offsets for file_index, _, _ in segments):
+            continue
+        # Segments must be contiguous in the previous torrent, starting at a
+        # piece boundary
+        start = file_offsets[segments[0][0]] + segments[0][1]
+        position = start
+        for file_index, file_offset, length in segments:
+            if file_offsets[file_index] + file_offset != position:
+                break
+            position += length
+        else:
+            previous_piece_index, remainder = divmod(start, piece_size)
+            previous_piece_length = min(piece_size, previous_total_size - start)
+            if (
+                remainder == 0
+                and position - start == previous_piece_length
+                and previous_piece_index < len(previous_hashes)
+            ):
+                reusable_hashes[piece_index] = previous_hashes[previous_piece_index]
+    return reusable_hashes
+
+
+def _get_relative_files(torrent):
+    # Return sequence of (relative_path, file_size) tuples
+    info = torrent.metainfo['info']
+    if 'files' not in info:
+        return (((info['name'],), info['length']),)
+    else:
+        return tuple(
+            (tuple(fileinfo['path']), fileinfo['length'])
+            for fileinfo in info['files']
+        )
+
+
+def verify(*, torrent_path, content_path, progress_callback, sample=100,
+           workers=None, read_size=None, io_strategy='sequential', page_cache='keep'):
+    """
+    Check if content matches the piece hashes of an existing torrent
+
+    :param str torrent_path: Path to torrent file
+    :param str content_path: Path to the torrent's payload (i.e. the file for
+        single-file torrents or the top directory for multi-file torrents)
+    :param str progress_callback: Callable that gets the progress as a number
+        between 0 and 100. Verification is cancelled if `progress_callback`
+        returns `True` or any other truthy value.
+    :param sample: Only verify this percentage of pieces, starting with the
+        first piece
+    :param int workers: Number of threads that hash pieces or `None` to use one
+        thread per CPU core
+    :param int read_size: Maximum number of bytes per read or `None` to read
+        each piece in one go
+    :param str io_strategy: How content is read (see :attr:`IO_STRATEGIES`)
+    :param str page_cache: How content is cached (see :attr:`PAGE_CACHE_MODES`)
+
+    Missing files and files with the wrong size are reported without reading
+    them.
+
+    A corrupt piece that spans multiple files is blamed on the file that is
+    already known to be bad (e.g. because another piece of it is corrupt). If
+    there is no such file, the piece is reported as ``piece <index> (spans
+    files <path>, <path>, ...)`` instead of blaming all of them.
+
+    :raise TorrentError: if `torrent_path` is not readable or if reading content
+        fails
+
+    :return: Sequence of mismatching file paths and ambiguous pieces (empty if
+        content matches) or `None` if verification was cancelled
+    """
+    if not 0 < sample <= 100:
+        raise errors.TorrentError(f'Invalid sample percentage: {sample}')
+
+    try:
+        torrent = torf.Torrent.read(torrent_path)
+        files = _get_files_at(torrent, content_path)
+        piece_size = torrent.piece_size
+        expected_hashes = torrent.hashes
+    except torf.TorfError as e:
+        raise errors.TorrentError(e)
+
+    # Don't read files that can't match
+    bad_files = set()
+    for file_index, (filepath, size) in enumerate(files):
+        try:
+            if os.path.getsize(filepath) != size:
+                bad_files.add(file_index)
+        except OSError:
+            bad_files.add(file_index)
+
+    layout = _PieceLayout(files, piece_size)
+    pieces_total = math.ceil(layout.pieces_total * sample / 100)
+    piece_indexes = [
+        piece_index for piece_index in range(pieces_total)
+        if not any(segment[0] in bad_files for segment in layout.segments(piece_index))
+    ]
+    # Pieces that overlap with bad files count as done
+    pieces_done = pieces_total - len(piece_indexes)
+
+    last_progress_time = 0
+    bad_pieces = set()
+    pieces = _hash_pieces(files, piece_size, piece_indexes, workers=workers,
+                          read_size=read_size, io_strategy=io_strategy,
+                          page_cache=page_cache)
+    try:
+        for piece_index, piece_hash in pieces:
+            if piece_hash != expected_hashes[piece_index]:
+                bad_pieces.add(piece_index)
+            pieces_done += 1
+            now = time.monotonic()
+            if now - last_progress_time >= 0.5 or pieces_done >= pieces_total:
+                last_progress_time = now
+                if progress_callback(pieces_done / pieces_total * 100):
+                    return None
+    finally:
+        pieces.close()
+
+    if not piece_indexes:
+        progress_callback(100.0)
+
+    bad_files, ambiguous_pieces = _blame_files(layout, bad_pieces, bad_files)
+    return (
+        tuple(files[file_index][0] for file_index in sorted(bad_files))
+        + tuple(
+            f'piece {piece_index} (spans files '
+            + ', '.join(files[file_index][0] for file_index in file_indexes)
+            + ')'
+            for piece_index, file_indexes in ambiguous_pieces
+        )
+    )
+
+
+def _blame_files(layout, bad_pieces, bad_files):
+    # Return set of file indexes that are corrupt and sequence of
+    # `(piece_index, file_indexes)` tuples of corrupt pieces that can't be blamed
+    # on any particular file
+    bad_files = set(bad_files)
+    files_by_piece = {
+        piece_index: tuple(segment[0] for segment in layout.segments(piece_index))
+        for piece_index in sorted(bad_pieces)
+    }
+
+    # A corrupt piece that only contains one file is that file's fault
+    for file_indexes in files_by_piece.values():
+        if len(file_indexes) == 1:
+            bad_files.update(file_indexes)
+
+    # A file that is part of multiple corrupt pieces is probably corrupt
+    bad_pieces_per_file = collections.Counter(
+        file_index
+        for file_indexes in files_by_piece.values()
+        for file_index in file_indexes
+    )
+    ambiguous_pieces = []
+    for piece_index, file_indexes in files_by_piece.items():
+        if not bad_files.intersection(file_indexes):
+            suspects = [file_index for file_index in file_indexes
+                        if bad_pieces_per_file[file_index] > 1]
+            if suspects:
+                bad_files.update(suspects)
+            else:
+                ambiguous_pieces.append((piece_index, file_indexes))
+
+    return bad_files, ambiguous_pieces
+
+
+def benchmark(content_path, *, workers=(1, 2, 4, 8), read_sizes=(None,),
+              io_strategies=IO_STRATEGIES, page_cache='keep', piece_size=None,
+              exclude=()):
+    """
+    Measure piece hashing throughput for each combination of settings
+
+    Run this on the storage you are going to create torrents from. Reading a
+    file that is already in the page cache doesn't touch the disk, so the
+    content should be larger than your RAM, you should drop the page cache
+    between runs (e.g. ``echo 1 > /proc/sys/vm/drop_caches`` on Linux) or you
+    should set `page_cache` to ``direct``.
+
+    Throughput usually grows with the number of `workers` until all processor
+    cores are busy hashing or the storage can't deliver data any faster, after
+    which more workers only add overhead. SSDs and RAID arrays often benefit
+    from many workers while a single spinning disk may even get slower because
+    concurrent reads make it seek. Pick the smallest number of workers that
+    reaches the highest throughput.
+
+    Example:
+
+    .. code::
+
+       $ python3 -c 'from upsies.utils import torrent
+       > for r in torrent.benchmark("/path/to/big.remux.mkv", read_sizes=(None, 2**20)):
+       >     print(*r)'
+
+    :param str content_path: Path to file or directory
+    :param workers: Sequence of worker counts to try
+    :param read_sizes: Sequence of read sizes to try (see :func:`create`)
+    :param io_strategies: Sequence of :attr:`IO_STRATEGIES` to try
+    :param page_cache: One of :attr:`PAGE_CACHE_MODES`
+    :param int piece_size: Piece size in bytes or `None` to use the piece size
+        from :func:`calculate_piece_size` like :func:`create` does
+    :param exclude: Sequence of regular expressions; matching files are not
+        hashed
+
+    :raise TorrentError: if anything goes wrong
+
+    :return: Generator that yields `(io_strategy, workers, read_size,
+        bytes_per_second)` tuples
+    """
+    try:
+        torrent = torf.Torrent(path=content_path, exclude_regexs=exclude)
+        if piece_size is not None:
+            torrent.piece_size = piece_size
+        files = _get_files(torrent)
+    except torf.TorfError as e:
+        raise errors.TorrentError(e)
+
+    total_size = sum(size for _, size in files)
+    if piece_size is None:
+        piece_size = calculate_piece_size(total_size)
+    for io_strategy in io_strategies:
+        for workers_ in workers:
+            for read_size in read_sizes:
+                start_time = time.monotonic()
+                _generate(
+                    files=files,
+                    piece_size=piece_size,
+                    progress_callback=lambda progress: None,
+                    workers=workers_,
+                    read_size=read_size,
+                    io_strategy=io_strategy,
+                    page_cache=page_cache,
+                )
+                duration = time.monotonic() - start_time
+                yield (io_strategy, workers_, read_size, total_size / max(duration, 1e-9))
+
+
+class PieceHashStore:
+    """
+    Piece hashes that are identified by file list and piece size
+
+    The key of each entry is derived from the relative path, size and
+    modification time of each file and the piece size. If any of these change,
+    the content is hashed again.
+
+    The relative path, size and modification time of each file are also stored
+    by piece hashes (see :meth:`put_file_stats`), so unchanged files can be
+    recognized when the content changes partially.
+
+    :param str directory: Where to store piece hashes
+    """
+
+    def __init__(self, directory):
+        self._directory = str(directory)
+
+    @property
+    def directory(self):
+        """Where piece hashes are stored"""
+        return self._directory
+
+    def key(self, files, piece_size):
+        """
+        Return key for stored piece hashes or `None` if any file is not readable
+
+        :param files: Sequence of `(file_path, file_size)` tuples
+        :param int piece_size: Length of each piece in bytes
+        """
+        # Relative paths allow renaming or moving the content
+        filepaths = [filepath for filepath, _ in files]
+        if len(filepaths) == 1:
+            relpaths = [os.path.basename(filepaths[0])]
+        else:
+            common_path = os.path.commonpath(filepaths)
+            relpaths = [os.path.relpath(filepath, common_path) for filepath in filepaths]
+        entries = []
+        for filepath, relpath, (_, size) in zip(filepaths, relpaths, files):
+            try:
+                mtime = os.stat(filepath).st_mtime_ns
+            except OSError as e:
+                _log.debug('Not using piece hash store: %r', e)
+                return None
+            entries.append((relpath, size, mtime))
+        data = json.dumps((entries, piece_size)).encode('utf-8')
+        return hashlib.sha256(data).hexdigest()
+
+    def path(self, key):
+        """Return path of stored piece hashes for `key`"""
+        return os.path.join(self._directory, f'{key}.pieces')
+
+    def get(self, key):
+        """
+        Return stored piece hashes as :class:`bytes` or `None` if there are no
+        usable piece hashes for `key`
+        """
+        try:
+            with open(self.path(key), 'rb') as f:
+                hashes = f.read()
+        except OSError:
+            return None
+        if not hashes or len(hashes) % 20 != 0:
+            _log.debug('Ignoring invalid piece hashes: %s', self.path(key))
+            return None
+        _log.debug('Got piece hashes from store: %s', self.path(key))
+        return hashes
+
+    def put(self, key, hashes):
+        """
+        Store piece hashes for `key` and remove any checkpoint
+
+        Failure is logged and otherwise ignored.
+        """
+        self._write(self.path(key), hashes)
+        try:
+            os.remove(self.checkpoint_path(key))
+        except OSError:
+            pass
+
+    def checkpoint_path(self, key):
+        """Return path of incomplete piece hashes for `key`"""
+        return os.path.join(self._directory, f'{key}.partial')
+
+    def get_checkpoint(self, key):
+        """
+        Return dictionary that maps piece indexes to hashes from
+        :meth:`put_checkpoint`
+
+        If there is no usable checkpoint, return an empty dictionary.
+        """
+        try:
+            with open(self.checkpoint_path(key), 'rb') as f:
+                data = f.read()
+        except OSError:
+            return {}
+        if len(data) % 20 != 0:
+            _log.debug('Ignoring invalid checkpoint: %s', self.checkpoint_path(key))
+            return {}
+        hashes = {}
+        for piece_index, offset in enumerate(range(0, len(data), 20)):
+            piece_hash = data[offset:offset + 20]
+            if piece_hash != self._missing_hash:
+                hashes[piece_index] = piece_hash
+        _log.debug('Got %d piece hashes from checkpoint: %s', len(hashes), self.checkpoint_path(key))
+        return hashes
+
+    def put_checkpoint(self, key, hashes):
+        """
+        Store incomplete piece hashes for `key`
+
+        :param hashes: Sequence of piece hashes with `None` for each piece that
+            wasn't hashed yet
+
+        Failure is logged and otherwise ignored.
+        """
+        data = b''.join(
+            self._missing_hash if piece_hash is None else piece_hash
+            for piece_hash in hashes
+        )
+        self._write(self.checkpoint_path(key), data)
+
+    # SHA1 digest that is practically impossible
+    _missing_hash = bytes(20)
+
+    def file_stats_path(self, hashes):
+        """Return path of file stats for concatenated piece `hashes`"""
+        return os.path.join(self._directory, f'{hashlib.sha256(hashes).hexdigest()}.files')
+
+    def get_file_stats(self, hashes):
+        """
+        Return sequence of `[relative_path, size, mtime_ns]` lists from
+        :meth:`put_file_stats` or `None` if there are no usable file stats for
+        `hashes`
+        """
+        try:
+            with open(self.file_stats_path(hashes), 'rb') as f:
+                file_stats = json.loads(f.read())
+        except (OSError, ValueError):
+            return None
+        if (
+            not isinstance(file_stats, list)
+            or not all(isinstance(stats, list) and len(stats) == 3 for stats in file_stats)
+        ):
+            _log.debug('Ignoring invalid file stats: %s', self.file_stats_path(hashes))
+            return None
+        return file_stats
+
+    def put_file_stats(self, hashes, file_stats):
+        """
+        Store the files that concatenated piece `hashes` were computed from
+
+        :param file_stats: Sequence of `[relative_path, size, mtime_ns]` lists
+
+        Failure is logged and otherwise ignored.
+        """
+        self._write(self.file_stats_path(hashes), json.dumps(file_stats).encode('utf-8'))
+
+    def _write(self, filepath, data):
+        # Don't expose partially written files to other processes
+        tmp_file = f'{filepath}.{os.getpid()}.tmp'
+        try:
+            fs.mkdir(self._directory)
+            with open(tmp_file, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_file, filepath)
+        except (OSError, errors.ContentError) as e:
+            _log.debug('Failed to write %s: %r', filepath, e)
             try:
-                torrent.write(torrent_path, overwrite=overwrite)
-            except torf.TorfError as e:
-                raise errors.TorrentError(e)
+                os.remove(tmp_file)
+            except OSError:
+                pass
+
+
+def _get_files(torrent):
+    # Return sequence of (file_path, file_size) tuples in the same order as the
+    # pieces are concatenated
+    info = torrent.metainfo['info']
+    if torrent.mode == 'singlefile':
+        return ((str(torrent.path), info['length']),)
+    else:
+        return tuple(
+            (os.path.join(str(torrent.path), *fileinfo['path']), fileinfo['length'])
+            for fileinfo in info['files']
+        )
+
+
+def _get_files_at(torrent, content_path):
+    # Same as _get_files(), but for a torrent that was read from a file and
+    # content that is located at `content_path`
+    info = torrent.metainfo['info']
+    if 'files' not in info:
+        return ((str(content_path), info['length']),)
+    else:
+        return tuple(
+            (os.path.join(str(content_path), *fileinfo['path']), fileinfo['length'])
+            for fileinfo in info['files']
+        )
+
+
+def _count_pieces(total_size, piece_size):
+    return (total_size + piece_size - 1) // piece_size
+
+
+def _hash_pieces(files, piece_size, piece_indexes=None, *,
+                 workers=None, read_size=None, io_strategy='sequential',
+                 page_cache='keep'):
+    """
+    Generate SHA1 hashes of pieces
+
+    :param files: Sequence of `(file_path, file_size)` tuples
+    :param int piece_size: Length of each piece in bytes
+    :param piece_indexes: Sequence of piece indexes to hash or `None` to hash
+        all pieces
+    :param int workers: Number of hashing threads or `None` to use one thread
+        per CPU core
+    :param int read_size: Maximum number of bytes per read or `None` to read
+        each file's part of a piece in one go
+    :param str io_strategy: One of :attr:`IO_STRATEGIES`
+    :param str page_cache: One of :attr:`PAGE_CACHE_MODES`
+
+    Hashing threads are stopped when the generator is closed.
+
+    :raise TorrentError: if reading fails
+
+    :return: Generator that yields `(piece_index, piece_hash)` tuples in the
+        order of `piece_indexes`
+    """
+    if io_strategy not in IO_STRATEGIES:
+        raise errors.TorrentError(f'Invalid I/O strategy: {io_strategy!r}')
+    elif page_cache not in PAGE_CACHE_MODES:
+        raise errors.TorrentError(f'Invalid page cache mode: {page_cache!r}')
+    elif io_strategy == 'parallel' and not hasattr(os, 'pread'):
+        _log.debug('os.pread() is not available, falling back to sequential I/O')
+        io_strategy = 'sequential'
+
+    workers = workers or os.cpu_count() or 1
+    layout = _PieceLayout(files, piece_size)
+    if piece_indexes is None:
+        piece_indexes = range(layout.pieces_total)
+
+    reader = _PieceReader(files, read_size=read_size, page_cache=page_cache)
+    executor = concurrent.futures.ThreadPoolExecutor(
+        max_workers=workers,
+        thread_name_prefix='piece-hasher',
+    )
+    # Piece buffers are reused instead of allocating memory for each piece
+    free_buffers = []
+
+    if io_strategy == 'parallel':
+        # Each worker thread reads into its own buffer
+        thread_buffers = threading.local()
+
+        def submit(piece_index):
+            future = executor.submit(
+                _hash_piece_parallel, reader, layout.segments(piece_index), thread_buffers, piece_size,
+            )
+            return future, None
+    else:
+        def submit(piece_index):
+            # Read in this thread, hash in worker thread
+            buffer = free_buffers.pop() if free_buffers else memoryview(bytearray(piece_size))
+            length = reader.readinto(layout.segments(piece_index), buffer)
+            return executor.submit(_hash_bytes, buffer[:length]), buffer
+
+    # Limit bytes in flight to keep memory usage bounded, but give each worker
+    # at least one piece
+    max_pending = max(workers, _MAX_PENDING_BYTES // piece_size)
+    pending = collections.deque()
+
+    def get_result():
+        piece_index, future, buffer = pending.popleft()
+        piece_hash = future.result()
+        if buffer is not None:
+            free_buffers.append(buffer)
+        return piece_index, piece_hash
+
+    try:
+        for piece_index in piece_indexes:
+            pending.append((piece_index, *submit(piece_index)))
+            while len(pending) >= max_pending:
+                yield get_result()
+        while pending:
+            yield get_result()
+    finally:
+        for _, future, _ in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+        reader.close()
+
+
+# Maximum combined size of pieces that are read but not hashed yet
+_MAX_PENDING_BYTES = 256 * 1048576
+
+
+def _hash_bytes(data):
+    return hashlib.sha1(data).digest()
+
+
+def _hash_piece_parallel(reader, segments, thread_buffers, piece_size):
+    buffer = getattr(thread_buffers, 'buffer', None)
+    if buffer is None:
+        buffer = thread_buffers.buffer = memoryview(bytearray(piece_size))
+    length = reader.readinto(segments, buffer)
+    return hashlib.sha1(buffer[:length]).digest()
+
+
+class _PieceLayout:
+    """Map piece indexes to file segments"""
+
+    def __init__(self, files, piece_size):
+        self._sizes = tuple(size for _, size in files)
+        self._offsets = []
+        offset = 0
+        for size in self._sizes:
+            self._offsets.append(offset)
+            offset += size
+        self._total_size = offset
+        self._piece_size = piece_size
+        self.pieces_total = _count_pieces(self._total_size, piece_size)
+
+    def segments(self, piece_index):
+        """
+        Return sequence of `(file_index, file_offset, length)` tuples that make
+        up piece number `piece_index`
+        """
+        start = piece_index * self._piece_size
+        end = min(start + self._piece_size, self._total_size)
+        segments = []
+        file_index = bisect.bisect_right(self._offsets, start) - 1
+        while start < end:
+            file_offset = start - self._offsets[file_index]
+            length = min(self._sizes[file_index] - file_offset, end - start)
+            if length > 0:
+                segments.append((file_index, file_offset, length))
+                start += length
+            file_index += 1
+        return tuple(segments)
+
+
+class _PieceReader:
+    """Read file segments and translate I/O errors into :class:`TorrentError`"""
+
+    def __init__(self, files, read_size=None, page_cache='keep'):
+        self._filepaths = tuple(filepath for filepath, _ in files)
+        self._read_size = read_size
+        self._page_cache = page_cache
+        self._handles = {}
+        self._fds = {}
+        self._direct_fds = set()
+
+    def _error(self, file_index, exception):
+        msg = exception.strerror or str(exception)
+        return errors.TorrentError(f'{self._filepaths[file_index]}: {msg}')
+
+    def _eof_error(self, file_index):
+        return errors.TorrentError(f'{self._filepaths[file_index]}: Unexpected end of file')
+
+    def _get_handle(self, file_index):
+        handle = self._handles.get(file_index)
+        if handle is None:
+            handle = self._handles[file_index] = open(self._filepaths[file_index], 'rb')
+        return handle
+
+    def read(self, segments):
+        """Return concatenated segments as :class:`bytes`"""
+        if hasattr(os, 'pread'):
+            return b''.join(self.pread_chunks(segments))
+
+        data = bytearray()
+        for file_index, offset, length in segments:
+            try:
+                handle = self._get_handle(file_index)
+                handle.seek(offset)
+                while length > 0:
+                    chunk = handle.read(min(length, self._read_size or length))
+                    if not chunk:
+                        raise self._eof_error(file_index)
+                    data.extend(chunk)
+                    length -= len(chunk)
+            except OSError as e:
+                raise self._error(file_index, e)
+        return bytes(data)
+
+    def readinto(self, segments, buffer):
+        """
+        Read concatenated segments into `buffer` and return the number of bytes
+        read
+
+        :param buffer: Writable :class:`memoryview` that is large enough for all
+            `segments`
+        """
+        if not hasattr(os, 'preadv'):
+            data = self.read(segments)
+            buffer[:len(data)] = data
+            return len(data)
+
+        pos = 0
+        for file_index, offset, length in segments:
+            try:
+                fd = self._get_fd(file_index)
+                if fd in self._direct_fds:
+                    for chunk in self.pread_chunks(((file_index, offset, length),)):
+                        buffer[pos:pos + len(chunk)] = chunk
+                        pos += len(chunk)
+                    continue
+                while length > 0:
+                    size = min(length, self._read_size or length)
+                    bytes_read = os.preadv(fd, [buffer[pos:pos + size]], offset)
+                    if not bytes_read:
+                        raise self._eof_error(file_index)
+                    if self._page_cache == 'drop':
+                        # Remove what we just read from the page cache
+                        _fadvise(fd, offset, bytes_read, 'POSIX_FADV_DONTNEED')
+                    pos += bytes_read
+                    offset += bytes_read
+                    length -= bytes_read
+            except OSError as e:
+                raise self._error(file_index, e)
+        return pos
+
+    def _open(self, file_index):
+        filepath = self._filepaths[file_index]
+        if self._page_cache == 'direct' and _DIRECT_IO_SUPPORTED:
+            try:
+                fd = os.open(filepath, os.O_RDONLY | os.O_DIRECT)
+            except OSError as e:
+                # Some file systems (e.g. tmpfs) don't support O_DIRECT
+                _log.debug('Not using O_DIRECT for %s: %r', filepath, e)
             else:
-                return torrent_path
+                return fd, True
+        fd = os.open(filepath, os.O_RDONLY)
+        if self._page_cache != 'keep':
+            _fadvise(fd, 0, 0, 'POSIX_FADV_SEQUENTIAL')
+        return fd, False
+
+    def _get_fd(self, file_index):
+        # dict.setdefault() is atomic so concurrent threads get the same fd
+        fd = self._fds.get(file_index)
+        if fd is None:
+            fd, direct = self._open(file_index)
+            if direct:
+                self._direct_fds.add(fd)
+            if self._fds.setdefault(file_index, fd) != fd:
+                self._direct_fds.discard(fd)
+                os.close(fd)
+                fd = self._fds[file_index]
+        return fd
+
+    def pread_chunks(self, segments):
+        """Yield segments in chunks read with :func:`os.pread`"""
+        for file_index, offset, length in segments:
+            try:
+                fd = self._get_fd(file_index)
+                while length > 0:
+                    size = min(length, self._read_size or length)
+                    if fd in self._direct_fds:
+                        chunk = _pread_direct(fd, size, offset)
+                    else:
+                        chunk = os.pread(fd, size, offset)
+                        if self._page_cache == 'drop' and chunk:
+                            # Remove what we just read from the page cache
+                            _fadvise(fd, offset, len(chunk), 'POSIX_FADV_DONTNEED')
+                    if not chunk:
+                        raise self._eof_error(file_index)
+                    yield chunk
+                    offset += len(chunk)
+                    length -= len(chunk)
+            except OSError as e:
+                raise self._error(file_index, e)
+
+    def close(self):
+        """Close all open files"""
+        for handle in self._handles.values():
+            handle.close()
+        self._handles.clear()
+        for fd in self._fds.values():
+            os.close(fd)
+        self._fds.clear()
+        self._direct_fds.clear()
+
+
+_DIRECT_IO_SUPPORTED = hasattr(os, 'O_DIRECT') and hasattr(os, 'preadv')
+_DIRECT_IO_ALIGNMENT = 4096
+
+
+def _pread_direct(fd, size, offset):
+    # O_DIRECT requires offset, length and buffer address to be aligned to the
+    # logical block size of the file system. Anonymous mmaps are page-aligned.
+    aligned_offset = offset - offset % _DIRECT_IO_ALIGNMENT
+    padding = offset - aligned_offset
+    aligned_size = -(-(padding + size) // _DIRECT_IO_ALIGNMENT) * _DIRECT_IO_ALIGNMENT
+    with mmap.mmap(-1, aligned_size) as buffer:
+        bytes_read = os.preadv(fd, [buffer], aligned_offset)
+        return bytes(buffer[padding:max(padding, min(bytes_read, padding + size))])
+
+
+def _fadvise(fd, offset, length, advice):
+    # posix_fadvise() is only a hint, so ignore platforms that don't support it
+    if hasattr(os, 'posix_fadvise') and hasattr(os, advice):
+        try:
+            os.posix_fadvise(fd, offset, length, getattr(os, advice))
+        except OSError as e:
+            _log.debug('posix_fadvise(%r, %r, %r, %s) failed: %r', fd, offset, length, advice, e)
 
 
 def _make_file_tree(tree):
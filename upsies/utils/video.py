@@ -3,13 +3,14 @@ Video metadata
 """
 
 import collections
+import concurrent.futures
 import functools
 import json
 import os
 import re
 
 from .. import constants, errors
-from . import closest_number, fs, os_family, subproc
+from . import closest_number, deduplicate, fs, os_family, subproc
 
 import logging  # isort:skip
 _log = logging.getLogger(__name__)
@@ -18,9 +19,11 @@ _log = logging.getLogger(__name__)
 if os_family() == 'windows':
     _mediainfo_executable = 'mediainfo.exe'
     _ffprobe_executable = 'ffprobe.exe'
+    _ffmpeg_executable = 'ffmpeg.exe'
 else:
     _mediainfo_executable = 'mediainfo'
     _ffprobe_executable = 'ffprobe'
+    _ffmpeg_executable = 'ffmpeg'
 
 
 def _run_mediainfo(video_file_path, *args):
@@ -31,7 +34,7 @@ def _run_mediainfo(video_file_path, *args):
     # exceptions. Do not catch ProcessError because things like wrong mediainfo
     # arguments are bugs.
     try:
-        return subproc.run(cmd, cache=True)
+        return subproc.run(cmd, cache=True, resource='io')
     except errors.DependencyError as e:
         raise errors.ContentError(e)
 
@@ -72,6 +75,12 @@ def duration(path):
     return _duration(first_video(path))
 
 def _duration(video_file_path):
+    # Don't run ffprobe if we already have mediainfo output (see probe())
+    if _get_cached_tracks(video_file_path) is not None:
+        duration = _duration_from_mediainfo(video_file_path)
+        if duration:
+            return duration
+
     try:
         return _duration_from_ffprobe(video_file_path)
     except (RuntimeError, errors.DependencyError, errors.ProcessError):
@@ -84,7 +93,7 @@ def _duration_from_ffprobe(video_file_path):
         '-of', 'default=noprint_wrappers=1:nokey=1',
         make_ffmpeg_input(video_file_path),
     )
-    length = subproc.run(cmd, ignore_errors=True)
+    length = subproc.run(cmd, ignore_errors=True, resource='io')
     try:
         return float(length.strip())
     except ValueError:
@@ -98,6 +107,225 @@ def _duration_from_mediainfo(video_file_path):
         return 0.0
 
 
+_KEYFRAME_SEARCH_WINDOW = 15
+_KEYFRAME_MAX_SEARCH_WINDOW = 120
+
+def keyframes(video_file_path, timestamps=None, cache_directory=None):
+    """
+    Return sorted tuple of keyframe timestamps in seconds
+
+    The keyframes are read from the video packets with ``ffprobe``, which
+    doesn't decode any frames. Keyframe timestamps are relative to the start of
+    the video, i.e. the container's start time is subtracted, so they can be
+    passed to ``ffmpeg -ss``.
+
+    :param str video_file_path: Path to video file
+    :param timestamps: Sequence of positions in seconds or `None`; if given, only
+        packets in a window around each timestamp are read instead of the
+        whole file, and the window is widened for timestamps without any
+        keyframe nearby
+    :param cache_directory: Where to cache the keyframe index or `None` to not
+        cache it on disk; keyframes from all probed windows are cached together
+        so that only windows that weren't probed before are read, and the index
+        is invalidated when the video file's fingerprint (see
+        :func:`~.fs.file_fingerprint`) changes
+
+    :raise ContentError: if the keyframes can't be determined
+    """
+    fs.assert_file_readable(video_file_path)
+    kfs_cache_file = _index_cache_file(video_file_path, cache_directory, 'keyframes')
+    intervals_cache_file = _index_cache_file(video_file_path, cache_directory, 'keyframes.intervals')
+    kfs, intervals = _read_keyframes_cache(kfs_cache_file, intervals_cache_file)
+    start_time = None
+
+    def probe(wanted):
+        # `wanted` is `None` for the whole file
+        nonlocal start_time
+        if start_time is None:
+            start_time = _start_time_from_ffprobe(video_file_path)
+        kfs.update(_keyframes_from_ffprobe(video_file_path, start_time, wanted))
+        intervals.extend(wanted or [(0.0, float('inf'))])
+
+    probed = False
+    if timestamps is None:
+        if not _is_probed((0.0, float('inf')), intervals):
+            probe(None)
+            probed = True
+    else:
+        pending = sorted(set(float(ts) for ts in timestamps))
+        window = _KEYFRAME_SEARCH_WINDOW
+        while pending and window <= _KEYFRAME_MAX_SEARCH_WINDOW:
+            wanted = [
+                interval for interval in ((max(0.0, ts - window), ts + window) for ts in pending)
+                if not _is_probed(interval, intervals)
+            ]
+            if wanted:
+                probe(wanted)
+                probed = True
+            # Widen the window for timestamps that are too far away from any
+            # keyframe so they don't snap to a keyframe of another window
+            pending = [ts for ts in pending if not any(abs(kf - ts) <= window for kf in kfs)]
+            window *= 2
+
+    if not kfs:
+        raise errors.ContentError(f'{video_file_path}: Failed to find keyframes')
+    if probed and kfs_cache_file:
+        _write_index_cache(kfs_cache_file, sorted(kfs))
+        _write_index_cache(intervals_cache_file, (value for interval in intervals for value in interval))
+    return tuple(sorted(kfs))
+
+def _read_keyframes_cache(kfs_cache_file, intervals_cache_file):
+    # Return set of keyframes and list of (start, end) intervals they were read
+    # from; both are empty if there is no valid cache
+    if kfs_cache_file:
+        kfs = _read_index_cache(kfs_cache_file)
+        values = _read_index_cache(intervals_cache_file)
+        if kfs is not None and values is not None and len(values) % 2 == 0:
+            return set(kfs), list(zip(values[::2], values[1::2]))
+    return set(), []
+
+def _is_probed(interval, intervals):
+    start, end = interval
+    return any(a <= start and end <= b for a, b in intervals)
+
+def _keyframes_from_ffprobe(video_file_path, start_time, intervals=None):
+    # Return keyframes in `intervals`, which are (start, end) tuples in seconds,
+    # or in the whole file
+    cmd = [
+        _ffprobe_executable,
+        '-v', 'error', '-select_streams', 'v:0',
+    ]
+    if intervals:
+        # Packet timestamps include the start time, requested timestamps don't
+        cmd.extend(('-read_intervals', ','.join(
+            f'{start_time + start:.3f}%+{end - start:g}'
+            for start, end in intervals
+        )))
+    cmd.extend((
+        '-show_entries', 'packet=pts_time,flags',
+        '-of', 'csv=print_section=0',
+        make_ffmpeg_input(video_file_path),
+    ))
+    try:
+        output = subproc.run(tuple(cmd), ignore_errors=True, resource='io')
+    except errors.DependencyError as e:
+        raise errors.ContentError(e)
+
+    kfs = set()
+    for line in output.splitlines():
+        pts_time, _, flags = line.partition(',')
+        if 'K' in flags:
+            try:
+                kfs.add(max(0.0, round(float(pts_time) - start_time, 6)))
+            except ValueError:
+                pass
+    return kfs
+
+def _start_time_from_ffprobe(video_file_path):
+    cmd = (
+        _ffprobe_executable,
+        '-v', 'error', '-show_entries', 'format=start_time',
+        '-of', 'default=noprint_wrappers=1:nokey=1',
+        make_ffmpeg_input(video_file_path),
+    )
+    try:
+        output = subproc.run(cmd, ignore_errors=True, resource='io')
+    except errors.DependencyError as e:
+        raise errors.ContentError(e)
+    try:
+        return float(output.strip())
+    except ValueError:
+        # Some containers don't report a start time ("N/A")
+        return 0.0
+
+
+_SCENE_CHANGE_THRESHOLD = 0.3
+
+def scenes(video_file_path, cache_directory=None):
+    """
+    Return sorted tuple of shot boundary timestamps in seconds
+
+    ``ffmpeg`` only decodes keyframes at low resolution and compares each
+    keyframe to the previous one. Encoders usually put a keyframe at every scene
+    change, so this is much faster than decoding every frame while finding most
+    shot boundaries.
+
+    :param str video_file_path: Path to video file
+    :param cache_directory: Where to cache the shot boundary index or `None` to
+        not cache it on disk; the index is invalidated when the video file's
+        fingerprint (see :func:`~.fs.file_fingerprint`) changes
+
+    :raise ContentError: if the shot boundaries can't be determined
+
+    :return: Timestamps of the first frame of each shot except the first shot;
+        an empty tuple means the video is one long shot
+    """
+    fs.assert_file_readable(video_file_path)
+    cache_file = _index_cache_file(video_file_path, cache_directory, 'scenes')
+    if cache_file:
+        boundaries = _read_index_cache(cache_file)
+        if boundaries is not None:
+            return boundaries
+
+    boundaries = _scenes_from_ffmpeg(video_file_path)
+    if cache_file:
+        _write_index_cache(cache_file, boundaries)
+    return boundaries
+
+def _scenes_from_ffmpeg(video_file_path):
+    cmd = (
+        _ffmpeg_executable,
+        '-hide_banner', '-loglevel', 'error',
+        '-skip_frame', 'nokey',
+        '-i', make_ffmpeg_input(video_file_path),
+        '-map', '0:v:0',
+        '-vf', (
+            'scale=160:-2,'
+            f"select='gt(scene,{_SCENE_CHANGE_THRESHOLD})',"
+            'metadata=print:file=-'
+        ),
+        '-f', 'null', '-',
+    )
+    try:
+        output = subproc.run(cmd, resource='cpu')
+    except (errors.DependencyError, errors.ProcessError) as e:
+        raise errors.ContentError(e)
+
+    boundaries = set()
+    for match in re.finditer(r'\bpts_time:(\S+)', output):
+        try:
+            boundaries.add(float(match.group(1)))
+        except ValueError:
+            pass
+    return tuple(sorted(boundaries))
+
+def _index_cache_file(video_file_path, cache_directory, name):
+    if cache_directory:
+        try:
+            fingerprint = fs.file_fingerprint(video_file_path)
+        except errors.ContentError:
+            pass
+        else:
+            filename = fs.sanitize_filename(f'{fs.basename(video_file_path)}.{fingerprint}.{name}')
+            return os.path.join(cache_directory, filename)
+
+def _read_index_cache(cache_file):
+    # Return `None` if there is no valid cache
+    try:
+        with open(cache_file, 'r') as f:
+            return tuple(float(line) for line in f.read().split())
+    except (OSError, ValueError):
+        return None
+
+def _write_index_cache(cache_file, values):
+    try:
+        fs.mkdir(os.path.dirname(cache_file))
+        with open(cache_file, 'w') as f:
+            f.write('\n'.join(str(value) for value in values))
+    except (OSError, errors.ContentError) as e:
+        _log.debug('Failed to write cache %s: %r', cache_file, e)
+
+
 def tracks(path):
     """
     ``mediainfo --Output=JSON`` as dictionary that maps each track's ``@type``
@@ -110,19 +338,109 @@ def tracks(path):
     """
     return _tracks(first_video(path))
 
+_TRACKS_CACHE_SIZE = 512
+_tracks_cache = collections.OrderedDict()
+
+def _tracks_cache_key(video_file_path):
+    # Identify file by path, size and modification time so that the cache is
+    # invalidated if the file changes
+    video_file_path = str(video_file_path)
+    try:
+        stat = os.stat(video_file_path)
+    except OSError:
+        return (video_file_path, None, None)
+    else:
+        return (video_file_path, stat.st_size, stat.st_mtime_ns)
+
+def _get_cached_tracks(video_file_path):
+    key = _tracks_cache_key(video_file_path)
+    tracks = _tracks_cache.get(key)
+    if tracks is not None:
+        _tracks_cache.move_to_end(key)
+    return tracks
+
+def _cache_tracks(video_file_path, tracks):
+    _tracks_cache[_tracks_cache_key(video_file_path)] = tracks
+    while len(_tracks_cache) > _TRACKS_CACHE_SIZE:
+        _tracks_cache.popitem(last=False)
+
 def _tracks(video_file_path):
+    tracks = _get_cached_tracks(video_file_path)
+    if tracks is not None:
+        return tracks
+
     stdout = _run_mediainfo(video_file_path, '--Output=JSON')
-    tracks = {}
     try:
-        for track in json.loads(stdout)['media']['track']:
-            if not track['@type'] in tracks:
-                tracks[track['@type']] = []
-            tracks[track['@type']].append(track)
-        return tracks
+        tracks = _parse_tracks(json.loads(stdout)['media'])
     except (ValueError, TypeError) as e:
         raise RuntimeError(f'{video_file_path}: Unexpected mediainfo output: {stdout}: {e}')
     except KeyError as e:
         raise RuntimeError(f'{video_file_path}: Unexpected mediainfo output: {stdout}: Missing field: {e}')
+    else:
+        _cache_tracks(video_file_path, tracks)
+        return tracks
+
+def _parse_tracks(media):
+    tracks = {}
+    for track in media['track']:
+        if not track['@type'] in tracks:
+            tracks[track['@type']] = []
+        tracks[track['@type']].append(track)
+    return tracks
+
+
+_MEDIAINFO_BATCH_SIZE = 32
+
+def probe(video_file_paths):
+    """
+    Run ``mediainfo --Output=JSON`` on multiple video files at once
+
+    Instead of running one ``mediainfo`` process per file, ``mediainfo`` is
+    executed once for every 32 files. The tracks of each file are cached so
+    that subsequent calls to :func:`tracks`, :func:`duration`, etc do not run
+    any more processes.
+
+    Files that were already probed are ignored unless their size or
+    modification time changed.
+
+    This is only an optimization. Any errors are logged and ignored, and the
+    affected files are probed individually later, which reports any errors
+    properly.
+
+    :param video_file_paths: Sequence of paths to video files
+    """
+    paths = tuple(fp for fp in deduplicate(str(fp) for fp in video_file_paths)
+                  if _get_cached_tracks(fp) is None)
+    for i in range(0, len(paths), _MEDIAINFO_BATCH_SIZE):
+        chunk = paths[i:i + _MEDIAINFO_BATCH_SIZE]
+        try:
+            _probe(chunk)
+        except (errors.ContentError, errors.DependencyError, errors.ProcessError, RuntimeError) as e:
+            _log.debug('Failed to probe %r: %r', chunk, e)
+
+def _probe(video_file_paths):
+    for fp in video_file_paths:
+        fs.assert_file_readable(fp)
+
+    cmd = (_mediainfo_executable, '--Output=JSON') + tuple(video_file_paths)
+    stdout = subproc.run(cmd, resource='io')
+    try:
+        medias = json.loads(stdout)
+        # mediainfo only returns a list for multiple files
+        if not isinstance(medias, list):
+            medias = [medias]
+        # Map results to files by path in case mediainfo skips any file
+        paths = {os.path.abspath(fp): fp for fp in video_file_paths}
+        for media in medias:
+            fp = paths.get(os.path.abspath(media['media'].get('@ref', '')))
+            if fp is None:
+                _log.debug('Ignoring unexpected mediainfo result: %r', media['media'].get('@ref'))
+            else:
+                _cache_tracks(fp, _parse_tracks(media['media']))
+    except (ValueError, TypeError, AttributeError) as e:
+        raise RuntimeError(f'Unexpected mediainfo output: {stdout}: {e}')
+    except KeyError as e:
+        raise RuntimeError(f'Unexpected mediainfo output: {stdout}: Missing field: {e}')
 
 
 def default_track(type, path):
@@ -139,26 +457,95 @@ def default_track(type, path):
     :rtype: dict
     """
     all_tracks = tracks(path)
+    track = _find_default_track(type, all_tracks)
+    if track is not None:
+        return track
+    else:
+        _log.debug('WTFSD: all tracks: %s', all_tracks)
+        raise errors.ContentError(f'{path}: No {type.lower()} track found')
+
+def _find_default_track(type, all_tracks):
+    typed_tracks = all_tracks.get(type.capitalize(), ())
 
     # Find track marked as default
-    try:
-        for track in all_tracks[type.capitalize()]:
-            if track.get('Default') == 'Yes':
-                return track
-    except KeyError:
-        pass
+    for track in typed_tracks:
+        if track.get('Default') == 'Yes':
+            return track
 
     # Default to first track
-    try:
-        return all_tracks[type.capitalize()][0]
-    except (KeyError, IndexError):
-        pass
+    if typed_tracks:
+        return typed_tracks[0]
+
+    return None
+
+
+class VideoInfo:
+    """
+    Properties of a video file's default video and audio tracks
 
-    _log.debug('WTFSD: all tracks: %s', all_tracks)
-    raise errors.ContentError(f'{path}: No {type.lower()} track found')
+    All properties are extracted in one go from the return value of
+    :func:`tracks`. Use :func:`info` to get a cached instance for a path.
+
+    :param all_tracks: Return value of :func:`tracks` or `None` if the tracks
+        can't be determined
+    """
+
+    __slots__ = (
+        'width', 'height', 'resolution', 'frame_rate', 'bit_depth', 'hdr_format',
+        'audio_format', 'audio_channels', 'video_format', 'has_dual_audio',
+    )
+
+    def __init__(self, all_tracks):
+        video_track = _find_default_track('video', all_tracks or {})
+        if video_track is not None:
+            self.width = _get_display_width(video_track)
+            self.height = _get_display_height(video_track)
+            self.resolution = _get_resolution(video_track)
+            self.frame_rate = float(video_track.get('FrameRate', 0))
+            self.bit_depth = video_track.get('BitDepth', None)
+            self.hdr_format = _get_hdr_format(video_track)
+            self.video_format = _get_video_format(video_track)
+        else:
+            self.width = self.height = 0
+            self.frame_rate = 0
+            self.resolution = self.bit_depth = self.hdr_format = self.video_format = None
+
+        audio_track = _find_default_track('audio', all_tracks or {})
+        if audio_track is not None:
+            self.audio_format = _get_audio_format(audio_track)
+            self.audio_channels = _get_audio_channels(audio_track)
+        else:
+            self.audio_format = self.audio_channels = None
+
+        if all_tracks is not None:
+            self.has_dual_audio = _get_dual_audio(all_tracks.get('Audio', ()))
+        else:
+            self.has_dual_audio = None
+
+    def __repr__(self):
+        kwargs = ', '.join(f'{name}={getattr(self, name)!r}' for name in self.__slots__)
+        return f'{type(self).__name__}({kwargs})'
 
 
 @functools.lru_cache(maxsize=None)
+def info(path):
+    """
+    Return :class:`VideoInfo` instance for `path`
+
+    :param str path: Path to video file or directory. :func:`first_video` is
+        applied.
+
+    If the tracks of `path` can't be determined, all properties of the returned
+    :class:`VideoInfo` are falsy.
+    """
+    try:
+        all_tracks = tracks(path)
+    except errors.ContentError as e:
+        _log.debug('WTFSD: tracks(%r) failed: %r', path, e)
+        all_tracks = None
+    return VideoInfo(all_tracks)
+
+
 def width(path):
     """
     Return displayed width of video file `path` or `0`
@@ -168,15 +555,8 @@ def width(path):
 
     :return: int
     """
-    try:
-        video_track = default_track('video', path)
-    except errors.ContentError as e:
-        _log.debug('WTFSD: width(%r) failed: %r', path, e)
-        return 0
-    else:
-        return _get_display_width(video_track)
+    return info(path).width
 
-@functools.lru_cache(maxsize=None)
 def height(path):
     """
     Return displayed height of video file `path` or `0`
@@ -186,15 +566,8 @@ def height(path):
 
     :return: int
     """
-    try:
-        video_track = default_track('video', path)
-    except errors.ContentError as e:
-        _log.debug('WTFSD: height(%r) failed: %r', path, e)
-        return 0
-    else:
-        return _get_display_height(video_track)
+    return info(path).height
 
-@functools.lru_cache(maxsize=None)
 def resolution(path):
     """
     Return resolution of video file `path` (e.g. "1080p") or `None`
@@ -202,11 +575,9 @@ def resolution(path):
     :param str path: Path to video file or directory. :func:`first_video` is
         applied.
     """
-    try:
-        video_track = default_track('video', path)
-    except errors.ContentError:
-        return None
+    return info(path).resolution
 
+def _get_resolution(video_track):
     # Expect non-wide (1392x1080), narrow (1920x800) and weird (1918x1040)
     std_resolution = _get_closest_standard_resolution(video_track)
     if std_resolution:
@@ -304,29 +675,17 @@ def _get_closest_standard_resolution(video_track):
     return std_resolution
 
 
-@functools.lru_cache(maxsize=None)
 def frame_rate(path):
     """
     Return frames per second as :class:`float` of default video track or `0` if
     it can't be determined
     """
-    try:
-        video_track = default_track('video', path)
-    except errors.ContentError:
-        return 0
-    else:
-        return float(video_track.get('FrameRate', 0))
+    return info(path).frame_rate
 
 
-@functools.lru_cache(maxsize=None)
 def bit_depth(path):
     """Return bit depth of default video track or `None` if it can't be determined"""
-    try:
-        video_track = default_track('video', path)
-    except errors.ContentError:
-        return None
-    else:
-        return video_track.get('BitDepth', None)
+    return info(path).bit_depth
 
 
 hdr_formats = {
@@ -345,56 +704,51 @@ Map HDR format names (e.g. "Dolby Vision") to dictinaries that map mediainfo
 video track fields to regular expressions that must match the fields' values
 """
 
-@functools.lru_cache(maxsize=None)
 def hdr_format(path):
     """Return HDR format based on `hdr_formats`, e.g. "HDR10", or `None`"""
-    try:
-        video_track = default_track('video', path)
-    except errors.ContentError:
-        return None
-    else:
-        def is_match(video_track, conditions):
-            if isinstance(conditions, collections.abc.Mapping):
-                # `conditions` maps field names to field value matching regexes
-                for key, regex in conditions.items():
-                    value = video_track.get(key, '')
-                    if regex.search(value):
-                        return True
-            else:
-                # `conditions` is a sequence of mappings that map field names to
-                # field value matching regexes (see above)
-                for condition in conditions:
-                    if is_match(video_track, condition):
-                        return True
-            return False
-
-        for hdr_format, conditions in hdr_formats.items():
-            if is_match(video_track, conditions):
-                return hdr_format
+    return info(path).hdr_format
+
+def _get_hdr_format(video_track):
+    def is_match(video_track, conditions):
+        if isinstance(conditions, collections.abc.Mapping):
+            # `conditions` maps field names to field value matching regexes
+            for key, regex in conditions.items():
+                value = video_track.get(key, '')
+                if regex.search(value):
+                    return True
+        else:
+            # `conditions` is a sequence of mappings that map field names to
+            # field value matching regexes (see above)
+            for condition in conditions:
+                if is_match(video_track, condition):
+                    return True
+        return False
+
+    for hdr_format, conditions in hdr_formats.items():
+        if is_match(video_track, conditions):
+            return hdr_format
+    return None
 
 
-@functools.lru_cache(maxsize=None)
 def has_dual_audio(path):
     """
     Return `True` if `path` contains multiple audio tracks with different
     languages and one of them is English, `False` otherwise, `None` if it can't
     be determined
     """
-    try:
-        audio_tracks = tracks(path).get('Audio', ())
-    except errors.ContentError:
-        return None
+    return info(path).has_dual_audio
+
+def _get_dual_audio(audio_tracks):
+    languages = set()
+    for track in audio_tracks:
+        if 'commentary' not in track.get('Title', '').lower():
+            language = track.get('Language', '')
+            if language:
+                languages.add(language.casefold())
+    if len(languages) > 1 and 'en' in languages:
+        return True
     else:
-        languages = set()
-        for track in audio_tracks:
-            if 'commentary' not in track.get('Title', '').lower():
-                language = track.get('Language', '')
-                if language:
-                    languages.add(language.casefold())
-        if len(languages) > 1 and 'en' in languages:
-            return True
-        else:
-            return False
+        return False
 
 
 _audio_format_translations = (
@@ -419,7 +773,6 @@ _audio_format_translations = (
     ('Vorbis', {'Format': re.compile(r'\bOgg\b')}),
 )
 
-@functools.lru_cache(maxsize=None)
 def audio_format(path):
     """
     Return audio format (e.g. "AAC", "MP3") or `None`
@@ -427,35 +780,33 @@ def audio_format(path):
     :param str path: Path to video file or directory. :func:`first_video` is
         applied.
     """
-    try:
-        audio_track = default_track('audio', path)
-    except errors.ContentError:
-        return None
-    else:
-        def is_match(regexs, audio_track):
-            for key,regex in regexs.items():
-                if regex is None:
-                    if key in audio_track:
-                        # `key` must not exists but it does
-                        return False
-                else:
-                    # regex is not None
-                    if key not in audio_track:
-                        # `key` doesn't exist
-                        return False
-                    elif not regex.search(audio_track.get(key, '')):
-                        # `key` has value that doesn't match `regex`
-                        return False
-            # All `regexs` match and no forbidden keys exist in `audio_track`
-            return True
-
-        _log.debug('Audio track for %r: %r', path, audio_track)
-        parts = []
-        for fmt,regexs in _audio_format_translations:
-            if fmt not in parts and is_match(regexs, audio_track):
-                parts.append(fmt)
-
-        return ' '.join(parts) or None
+    return info(path).audio_format
+
+def _get_audio_format(audio_track):
+    def is_match(regexs, audio_track):
+        for key,regex in regexs.items():
+            if regex is None:
+                if key in audio_track:
+                    # `key` must not exists but it does
+                    return False
+            else:
+                # regex is not None
+                if key not in audio_track:
+                    # `key` doesn't exist
+                    return False
+                elif not regex.search(audio_track.get(key, '')):
+                    # `key` has value that doesn't match `regex`
+                    return False
+        # All `regexs` match and no forbidden keys exist in `audio_track`
+        return True
+
+    _log.debug('Audio track: %r', audio_track)
+    parts = []
+    for fmt,regexs in _audio_format_translations:
+        if fmt not in parts and is_match(regexs, audio_track):
+            parts.append(fmt)
+
+    return ' '.join(parts) or None
 
 
 # NOTE: guessit only recognizes 7.1, 5.1, 2.0 and 1.0
@@ -472,7 +823,6 @@ _audio_channels_translations = (
     ('7.1', re.compile(r'^10$')),
 )
 
-@functools.lru_cache(maxsize=None)
 def audio_channels(path):
     """
     Return audio channels (e.g. "5.1") or `None`
@@ -480,20 +830,18 @@ def audio_channels(path):
     :param str path: Path to video file or directory. :func:`first_video` is
         applied.
     """
-    try:
-        audio_track = default_track('audio', path)
-    except errors.ContentError:
-        return None
-    else:
-        audio_channels = None
-        channels = audio_track.get('Channels', '')
-        if channels:
-            for achan,regex in _audio_channels_translations:
-                if regex.search(channels):
-                    audio_channels = achan
-                    break
-        _log.debug('Detected audio channels: %s', audio_channels)
-        return audio_channels
+    return info(path).audio_channels
+
+def _get_audio_channels(audio_track):
+    audio_channels = None
+    channels = audio_track.get('Channels', '')
+    if channels:
+        for achan,regex in _audio_channels_translations:
+            if regex.search(channels):
+                audio_channels = achan
+                break
+    _log.debug('Detected audio channels: %s', audio_channels)
+    return audio_channels
 
 
 _video_translations = (
@@ -506,7 +854,6 @@ _video_translations = (
     ('MPEG-2', {'Format': re.compile(r'^MPEG Video$'), 'Format_Version': re.compile(r'^2$')}),
 )
 
-@functools.lru_cache(maxsize=None)
 def video_format(path):
     """
     Return video format or x264/x265/XviD if they were used or `None`
@@ -514,6 +861,9 @@ def video_format(path):
     :param str path: Path to video file or directory. :func:`first_video` is
         applied.
     """
+    return info(path).video_format
+
+def _get_video_format(video_track):
     def translate(video_track):
         for vfmt,regexs in _video_translations:
             for key,regex in regexs.items():
@@ -523,15 +873,9 @@ def video_format(path):
                         return vfmt
         return None
 
-    try:
-        video_track = default_track('video', path)
-    except errors.ContentError:
-        return None
-    else:
-        # _log.debug('Video track for %r: %r', path, video_track)
-        video_format = translate(video_track)
-        _log.debug('Detected video format: %s', video_format)
-        return video_format
+    video_format = translate(video_track)
+    _log.debug('Detected video format: %s', video_format)
+    return video_format
 
 
 @functools.lru_cache(maxsize=None)
@@ -593,6 +937,16 @@ def filter_similar_duration(video_file_paths):
 
     This is useful to exclude samples or short .VOBs from DVD images.
 
+    Before any durations are probed, videos that are less than 10% of the size
+    of the largest video are excluded. Samples, trailers and other extras that
+    are recognized by their file name or by the name of a subdirectory below
+    the common parent directory of `video_file_paths` are excluded if they are
+    less than half the size of the largest video. If all remaining videos are
+    at least half the size of the largest video and none of them looks like an
+    extra, they are returned without probing.
+
+    Videos that look like extras are sorted after all other videos.
+
     .. note:: Because this function is decorated with
        :func:`functools.lru_cache`, `video_file_paths` should be a tuple (or any
        other hashable sequence).
@@ -603,15 +957,243 @@ def filter_similar_duration(video_file_paths):
 
     :raise ContentError: if any path in `video_file_paths` is not readable
     """
-    paths = tuple(video_file_paths)
+    paths = _prefilter(video_file_paths)
+    extras = _get_extras(paths)
     if len(paths) < 2:
         return paths
+    elif _have_similar_size(paths) and not extras:
+        _log.debug('Not probing files of similar size: %r', paths)
+        return paths
     else:
-        durations = {fp: _duration(fp) for fp in video_file_paths}
+        # Get all durations from as few mediainfo processes as possible
+        probe(paths)
+        durations = {fp: _duration(fp) for fp in paths}
         avg = sum(durations.values()) / len(durations)
         min_duration = avg * 0.5
-        return tuple(fp for fp,l in durations.items()
-                     if l >= min_duration)
+        # Prefer the main video over extras of similar duration
+        return tuple(sorted(
+            (fp for fp,l in durations.items() if l >= min_duration),
+            key=lambda fp: fp in extras,
+        ))
+
+
+_extras_directory_regex = re.compile(
+    r'^(?:samples?|extras?|featurettes?|bonus|trailers?|interviews?'
+    r'|behind[ ._-]the[ ._-]scenes|deleted[ ._-]scenes)$',
+    flags=re.IGNORECASE,
+)
+_extras_file_regex = re.compile(
+    r'(?:^|[ ._-])(?:sample|trailers?|featurettes?|interviews?|making[ ._-]of'
+    r'|behind[ ._-]the[ ._-]scenes|deleted[ ._-]scenes)(?:[ ._-]|$)',
+    flags=re.IGNORECASE,
+)
+_MIN_RELATIVE_SIZE = 0.1
+_SIMILAR_RELATIVE_SIZE = 0.5
+
+def _prefilter(video_file_paths):
+    # Exclude obvious samples and extras without probing anything
+    paths = tuple(video_file_paths)
+    sizes = [fs.file_size(fp) for fp in paths]
+    if sizes and all(sizes):
+        # A name that looks like an extra is not enough (e.g. "The Interview"),
+        # extras must also be considerably smaller than the largest video
+        extras = _get_extras(paths)
+        min_size = max(sizes) * _MIN_RELATIVE_SIZE
+        min_extra_size = max(sizes) * _SIMILAR_RELATIVE_SIZE
+        paths = tuple(
+            fp for fp, size in zip(paths, sizes)
+            if size >= min_size and (fp not in extras or size >= min_extra_size)
+        )
+    return paths
+
+def _get_extras(video_file_paths):
+    # Return subset of `video_file_paths` that look like samples, trailers, etc
+    if not video_file_paths:
+        return frozenset()
+
+    # Only look at directories below the common parent directory so a parent
+    # directory like "Extras" doesn't make everything look like an extra
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(fp)) for fp in video_file_paths])
+
+    def is_extra(path):
+        dirpath, filename = os.path.split(os.path.relpath(os.path.abspath(path), root))
+        return (
+            bool(_extras_file_regex.search(fs.strip_extension(filename)))
+            or any(_extras_directory_regex.search(name) for name in dirpath.split(os.sep))
+        )
+
+    return frozenset(fp for fp in video_file_paths if is_extra(fp))
+
+def _have_similar_size(video_file_paths):
+    sizes = [fs.file_size(fp) for fp in video_file_paths]
+    return all(sizes) and min(sizes) >= max(sizes) * _SIMILAR_RELATIVE_SIZE
+
+
+class SeasonInfo:
+    """
+    Aggregated properties of all episodes in a season pack
+
+    Use :func:`season_info` to get a cached instance for a path.
+
+    :param durations: Mapping of video file paths to durations in seconds
+    :param bitrates: Mapping of video file paths to overall bitrates in bits per
+        second
+    :param infos: Mapping of video file paths to :class:`VideoInfo` instances
+
+    All mappings must have the same keys in the same order.
+    """
+
+    __slots__ = ('durations', 'bitrates', 'infos')
+
+    def __init__(self, durations, bitrates, infos):
+        self.durations = durations
+        self.bitrates = bitrates
+        self.infos = infos
+
+    @property
+    def video_files(self):
+        """Sequence of episode file paths"""
+        return tuple(self.durations)
+
+    @property
+    def runtime(self):
+        """
+        Average duration of a typical episode in seconds
+
+        If there are at least 5 episodes, the first and the last episode are
+        ignored because they can be significantly longer.
+        """
+        durations = tuple(self.durations.values())
+        if len(durations) >= 5:
+            durations = durations[1:-1]
+        if durations:
+            return sum(durations) / len(durations)
+        else:
+            return 0.0
+
+    @property
+    def min_bitrate(self):
+        """Lowest overall bitrate of any episode in bits per second"""
+        return min(self.bitrates.values(), default=0)
+
+    @property
+    def avg_bitrate(self):
+        """Average overall bitrate of all episodes in bits per second"""
+        if self.bitrates:
+            return sum(self.bitrates.values()) / len(self.bitrates)
+        else:
+            return 0
+
+    @property
+    def max_bitrate(self):
+        """Highest overall bitrate of any episode in bits per second"""
+        return max(self.bitrates.values(), default=0)
+
+    def _common(self, *attributes):
+        values = {tuple(getattr(info, attr) for attr in attributes)
+                  for info in self.infos.values()}
+        if len(values) == 1:
+            return values.pop()
+        else:
+            return None
+
+    @property
+    def has_consistent_resolution(self):
+        """Whether all episodes have the same resolution"""
+        return self._common('resolution') is not None
+
+    @property
+    def has_consistent_video_format(self):
+        """Whether all episodes have the same video codec, bit depth and HDR format"""
+        return self._common('video_format', 'bit_depth', 'hdr_format') is not None
+
+    @property
+    def has_consistent_audio(self):
+        """Whether all episodes have the same audio format, channels and dual audio"""
+        return self._common('audio_format', 'audio_channels', 'has_dual_audio') is not None
+
+    @property
+    def is_consistent(self):
+        """Whether all episodes share resolution, video format and audio layout"""
+        return (
+            self.has_consistent_resolution
+            and self.has_consistent_video_format
+            and self.has_consistent_audio
+        )
+
+    @property
+    def resolution(self):
+        """Resolution of all episodes or `None` if it differs"""
+        return (self._common('resolution') or (None,))[0]
+
+    @property
+    def video_format(self):
+        """Video format of all episodes or `None` if it differs"""
+        return (self._common('video_format') or (None,))[0]
+
+    @property
+    def audio_format(self):
+        """Audio format of all episodes or `None` if it differs"""
+        return (self._common('audio_format') or (None,))[0]
+
+    @property
+    def audio_channels(self):
+        """Audio channels of all episodes or `None` if they differ"""
+        return (self._common('audio_channels') or (None,))[0]
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self.durations!r}, {self.bitrates!r}, {self.infos!r})'
+
+
+@functools.lru_cache(maxsize=None)
+def season_info(path):
+    """
+    Probe all episodes in season pack `path` concurrently
+
+    Up to one ``mediainfo`` process per CPU is executed at the same time.
+    Samples and other short videos are excluded with
+    :func:`filter_similar_duration`.
+
+    :param str path: Path to directory that contains video files
+
+    :return: :class:`SeasonInfo` instance
+
+    :raise ContentError: if no video file can be found or if any of them is
+        unreadable
+    """
+    files = _prefilter(fs.file_list(path, extensions=constants.VIDEO_FILE_EXTENSIONS))
+    if not files:
+        raise errors.ContentError(f'{path}: No video file found')
+
+    workers = min(os.cpu_count() or 1, len(files))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        # Distribute files evenly among workers
+        chunk_size = min(-(-len(files) // workers), _MEDIAINFO_BATCH_SIZE)
+        chunks = [files[i:i + chunk_size] for i in range(0, len(files), chunk_size)]
+        tuple(executor.map(probe, chunks))
+
+        files = filter_similar_duration(tuple(files))
+        stats = tuple(executor.map(_episode_stats, files))
+
+    return SeasonInfo(
+        durations={fp: duration for fp, (duration, _, _) in zip(files, stats)},
+        bitrates={fp: bitrate for fp, (_, bitrate, _) in zip(files, stats)},
+        infos={fp: info for fp, (_, _, info) in zip(files, stats)},
+    )
+
+def _episode_stats(video_file_path):
+    duration = _duration(video_file_path)
+    return duration, _bitrate(video_file_path, duration), info(video_file_path)
+
+def _bitrate(video_file_path, duration):
+    try:
+        return int(float(_tracks(video_file_path)['General'][0]['OverallBitRate']))
+    except (KeyError, IndexError, TypeError, ValueError, RuntimeError, errors.ContentError):
+        size = fs.file_size(video_file_path)
+        if size and duration:
+            return int(size * 8 / duration)
+        else:
+            return 0
 
 
 def make_ffmpeg_input(path):